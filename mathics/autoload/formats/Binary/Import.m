@@ -0,0 +1,31 @@
+(* Importers of binary numbers *)
+
+Begin["System`Convert`BinaryDump`"]
+
+
+(* each fixed-width binary type is a format, whose data is read at once *)
+Scan[
+    With[{type = #, importer = Symbol["System`Convert`BinaryDump`Import" <> #]},
+        importer[filename_String, opts___] :=
+            {"Data" -> BinaryReadList[filename, type, opts]};
+        ImportExport`RegisterImport[
+            type,
+            importer,
+            {},
+            AvailableElements -> {"Data"},
+            DefaultElement -> "Data",
+            FunctionChannels -> {"FileNames"},
+            Options -> {"ByteOrdering"}
+        ]
+    ]&,
+    {
+        "Byte",
+        "Complex64", "Complex128",
+        "Integer8", "Integer16", "Integer32", "Integer64",
+        "Real32", "Real64",
+        "UnsignedInteger8", "UnsignedInteger16", "UnsignedInteger32", "UnsignedInteger64"
+    }
+]
+
+
+End[]
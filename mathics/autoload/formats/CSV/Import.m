@@ -1,39 +1,17 @@
 (* CSV Importer *)
 
-Begin["System`Convert`TableDump`"]
-
-
-Options[ImportCSV] = {
-    "CharacterEncoding" :> $CharacterEncoding,
-    "FieldSeparators" -> ","
-};
-
-ImportCSV[stream_InputStream, OptionsPattern[]]:=
-    Module[{data, grid, sep = OptionValue["FieldSeparators"]},        
-        data = StringSplit[#, sep]& /@ ReadList[stream, String];
-        grid = Grid[data];
-        {
-            "Data" -> data,
-            "Grid" -> grid
-        }
-]
-
 ImportExport`RegisterImport[
     "CSV",
     System`Convert`TableDump`ImportCSV,
-    {
-        "Data" :> GetData,
-	    "Grid" :> GetGrid
-    },
-    (* Sources -> ImportExport`DefaultSources["Table"], *)
-    FunctionChannels -> {"Streams"},
-    AvailableElements -> {"Data", "Grid"},
+    {},
+    FunctionChannels -> {"FileNames"},
+    AvailableElements -> {"ColumnLabels", "Data", "Grid"},
     DefaultElement -> "Data",
     Options -> {
         "CharacterEncoding",
-        "FieldSeparators"
+        "FieldSeparators",
+        "HeaderLines",
+        "SkipLines",
+        "Rows"
     }
 ]
-
-
-End[]
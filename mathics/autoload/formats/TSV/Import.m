@@ -0,0 +1,17 @@
+(* TSV Importer *)
+
+ImportExport`RegisterImport[
+    "TSV",
+    System`Convert`TableDump`ImportTSV,
+    {},
+    FunctionChannels -> {"FileNames"},
+    AvailableElements -> {"ColumnLabels", "Data", "Grid"},
+    DefaultElement -> "Data",
+    Options -> {
+        "CharacterEncoding",
+        "FieldSeparators",
+        "HeaderLines",
+        "SkipLines",
+        "Rows"
+    }
+]
@@ -3,6 +3,7 @@
 
 
 import time
+import tracemalloc
 from argparse import ArgumentParser
 
 
@@ -18,6 +19,7 @@ import mathics
 from mathics.core.parser import parse, MathicsMultiLineFeeder, MathicsSingleLineFeeder
 from mathics.core.definitions import Definitions
 from mathics.core.evaluation import Evaluation
+from mathics.builtin.structure import bytecount_support
 
 
 # Default number of times to repeat each benchmark. None -> Automatic
@@ -54,13 +56,53 @@ BENCHMARKS = {
         "Expand[(a1+a2)^200]",
         "Expand[(a1+a2+a3)^25]",
         "Expand[(a1+a2+a3+a4+a5+a6+a7)^3]",
+        "Expand[(a+b+c+d+e)^12]",
+    ],
+    # hashing expressions with shared parts, see Expression.__hash__
+    "Gather": [
+        "Tally[gatheritems]",
+        "DeleteDuplicates[gatheritems]",
+    ],
+    # rules that change few parts of a large expression
+    "Replace": [
+        "replaceitems /. g[1] -> 0",
+        "replaceitems /. z -> 0",
+        "Replace[replaceitems, g[1] -> 0, {2}]",
+    ],
+    # canonical ordering of compound expressions, see Expression.get_sort_key
+    "Sort": [
+        "Sort[sortitems]",
+        "Union[sortitems]",
+        "Order[sortitems, Reverse[sortitems]]",
     ],
     "Matrix": [
         "RandomInteger[{0,1}, {10,10}] . RandomInteger[{0,1}, {10,10}]",
         "RandomInteger[{0,10}, {10,10}] + RandomInteger[{0,10}, {10,10}]",
     ],
+    # re-evaluating a large list of distinct symbols checks whether any of
+    # their definitions changed since the list was evaluated
+    "SymbolicList": [
+        "Do[symbols, {100}]",
+        "Do[Length[symbols], {100}]",
+        "Do[x = i; symbols, {i, 100}]",
+    ],
 }
 
+# Mathics expressions evaluated once before the benchmarks of a section
+BENCHMARK_SETUP = {
+    "SymbolicList": 'symbols = ToExpression["s" <> ToString[#]]& /@ Range[2000];',
+    "Gather": "gatheritems = With[{g = Range[200]}, Table[f[Mod[i, 50], g], {i, 2000}]];",
+    "Replace": "replaceitems = Table[f[i, {g[i], h[x]}], {i, 5000}];",
+    "Sort": "sortitems = Table[f[Mod[i^2, 101], {g[i], x^Mod[i, 7]}], {i, 3000}];",
+}
+
+# Mathics expressions whose results are measured in bytes
+MEMORY_BENCHMARKS = [
+    'Table[{i, x, "s", i / 7, 1.5 + I}, {i, 10^4}]',
+    "Expand[(a + b + c)^20]",
+    "Nest[f[#, #] &, x, 16]",
+]
+
 DEPTH = 300
 
 PARSING_BENCHMARKS = [
@@ -89,6 +131,15 @@ def format_time_units(seconds):
         return "{0:4.3g} s ".format(seconds)
 
 
+def format_memory_units(size):
+    if size < 2 ** 10:
+        return "{0:4n} B ".format(size)
+    elif size < 2 ** 20:
+        return "{0:4.3g} kB".format(size / 2 ** 10)
+    else:
+        return "{0:4.3g} MB".format(size / 2 ** 20)
+
+
 def timeit(func, repeats=None):
     if repeats is None:
         global TESTS_PER_BENCHMARK
@@ -176,8 +227,38 @@ def benchmark_expression(expression_string):
     timeit(lambda: expr.evaluate(evaluation))
 
 
+def benchmark_memory_expression(expression_string):
+    print("  '{0}'".format(expression_string))
+    expr = parse(definitions, MathicsSingleLineFeeder(expression_string))
+    tracemalloc.start()
+    result = expr.evaluate(evaluation)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if bytecount_support:
+        from mathics.builtin.structure import count_bytes
+
+        size = format_memory_units(count_bytes(result))
+    else:
+        size = "n/a"
+    print(
+        "    ByteCount: {0}, peak allocated while evaluating: {1}".format(
+            size, format_memory_units(peak)
+        )
+    )
+
+
+def benchmark_memory():
+    print("MEMORY BENCHMARKS:")
+    for expression_string in MEMORY_BENCHMARKS:
+        benchmark_memory_expression(expression_string)
+    print()
+
+
 def benchmark_section(section_name):
     print(section_name)
+    setup = BENCHMARK_SETUP.get(section_name)
+    if setup is not None:
+        parse(definitions, MathicsSingleLineFeeder(setup)).evaluate(evaluation)
     for benchmark in BENCHMARKS.get(section_name):
         benchmark_expression(benchmark)
     print()
@@ -207,6 +288,13 @@ def main():
 
     parser.add_argument("-p", "--parser", action="store_true", help="only test parser")
 
+    parser.add_argument(
+        "-m",
+        "--memory",
+        action="store_true",
+        help="only measure the memory used by expressions",
+    )
+
     parser.add_argument(
         "--expression",
         "-e",
@@ -234,8 +322,11 @@ def main():
         benchmark_section(args.section)
     elif args.parser:
         benchmark_parser()
+    elif args.memory:
+        benchmark_memory()
     else:
         benchmark_all_sections()
+        benchmark_memory()
         benchmark_parser()
 
 
@@ -9,6 +9,7 @@ import glob
 import importlib
 import pkgutil
 import re
+import sys
 import os.path as osp
 from mathics.settings import ENABLE_FILES_MODULE
 from mathics.version import __version__  # noqa used in loading to check consistency.
@@ -22,6 +23,7 @@ __py_files__ = [
     for f in glob.glob(osp.join(osp.dirname(__file__), "[a-z]*.py"))
 ]
 
+from mathics.builtin import base
 from mathics.builtin.base import (
     Builtin,
     SympyObject,
@@ -30,6 +32,57 @@ from mathics.builtin.base import (
 )
 
 
+class LazyRegistry(dict):
+    """
+    A dict that is filled in as the builtin modules are loaded.
+
+    A key that is not there yet makes the registry load the module that
+    defines it, according to the manifest installed with
+    install_manifest(). Without a manifest, all builtin modules are
+    loaded on the first miss. Iterating over the registry loads all
+    builtin modules.
+    """
+
+    def __init__(self, name) -> None:
+        super().__init__()
+        self.name = name
+
+    def __missing__(self, key):
+        if load_builtins_for(self.name, key):
+            return self[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key) or load_builtins_for(self.name, key):
+            return dict.get(self, key, default)
+        return default
+
+    def __contains__(self, key) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        return load_builtins_for(self.name, key) and dict.__contains__(self, key)
+
+    def __iter__(self):
+        load_all_builtins()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        load_all_builtins()
+        return super().__len__()
+
+    def keys(self):
+        load_all_builtins()
+        return super().keys()
+
+    def values(self):
+        load_all_builtins()
+        return super().values()
+
+    def items(self):
+        load_all_builtins()
+        return super().items()
+
+
 def add_builtins(new_builtins):
     for var_name, builtin in new_builtins:
         name = builtin.get_name()
@@ -100,25 +153,8 @@ def import_builtins(module_names: List[str], submodule_name=None) -> None:
     Mathics we have these Builtin Functions, like Plus[], List[] are defined.
 
     """
-
-    def import_module(module_name: str, import_name: str):
-        try:
-            module = importlib.import_module(import_name)
-        except Exception as e:
-            print(e)
-            print(f"    Not able to load {module_name}. Check your installation.")
-            print(f"    mathics.builtin loads from {__file__[:-11]}")
-            return None
-
-        if __version__ != module.__version__:
-            print(
-                f"Version {module.__version__} in the module does not match top-level Mathics version {__version__}"
-            )
-        if module:
-            modules.append(module)
-
     if submodule_name:
-        import_module(submodule_name, f"mathics.builtin.{submodule_name}")
+        load_builtin_module(f"mathics.builtin.{submodule_name}")
 
     for module_name in module_names:
         import_name = (
@@ -126,7 +162,7 @@ def import_builtins(module_names: List[str], submodule_name=None) -> None:
             if submodule_name
             else f"mathics.builtin.{module_name}"
         )
-        import_module(module_name, import_name)
+        load_builtin_module(import_name)
 
 
 def is_builtin(var):
@@ -143,17 +179,11 @@ module_names = [
     f for f in __py_files__ if re.match("^[a-z0-9]+$", f) if f not in exclude_files
 ]
 
-modules = []
-import_builtins(module_names)
-
-_builtins = []
-builtins_by_module = {}
-
 disable_file_module_names = (
     [] if ENABLE_FILES_MODULE else ["files_io.files", "files_io.importexport"]
 )
 
-for subdir in (
+subdirs = (
     "arithfns",
     "colors",
     "distance",
@@ -166,21 +196,56 @@ for subdir in (
     "specialfns",
     "string",
     "fileformats",
-):
-    import_name = f"{__name__}.{subdir}"
+)
+
+
+def get_builtin_module_names() -> List[str]:
+    """
+    Returns the names of all builtin modules, in the order in which they
+    are loaded.
+    """
+    import_names = [f"{__name__}.{module_name}" for module_name in module_names]
+    for subdir in subdirs:
+        import_name = f"{__name__}.{subdir}"
+
+        if import_name in disable_file_module_names:
+            continue
+
+        import_names.append(import_name)
+        submodule_names = [
+            modname
+            for importer, modname, ispkg in pkgutil.iter_modules(
+                [osp.join(osp.dirname(__file__), subdir)]
+            )
+        ]
+        import_names.extend(f"{import_name}.{modname}" for modname in submodule_names)
+    return import_names
 
-    if import_name in disable_file_module_names:
-        continue
 
-    builtin_module = importlib.import_module(import_name)
-    submodule_names = [
-        modname
-        for importer, modname, ispkg in pkgutil.iter_modules(builtin_module.__path__)
-    ]
-    # print("XXX3", submodule_names)
-    import_builtins(submodule_names, subdir)
+def load_builtin_module(import_name: str) -> None:
+    """
+    Imports a builtin module, if that has not been done yet, and registers
+    the builtins it defines.
+    """
+    if import_name in _loaded_modules:
+        return
+    _loaded_modules.add(import_name)
+
+    try:
+        module = importlib.import_module(import_name)
+    except Exception as e:
+        print(e)
+        print(f"    Not able to load {import_name}. Check your installation.")
+        print(f"    mathics.builtin loads from {__file__[:-11]}")
+        return
+
+    if __version__ != module.__version__:
+        print(
+            f"Version {module.__version__} in the module does not match top-level Mathics version {__version__}"
+        )
+    modules.append(module)
 
-for module in modules:
+    new_builtins = []
     builtins_by_module[module.__name__] = []
     vars = dir(module)
     for name in vars:
@@ -200,20 +265,135 @@ for module in modules:
                 # This set the default context for symbols in mathics.builtins
                 if not type(instance).context:
                     type(instance).context = "System`"
-                _builtins.append((instance.get_name(), instance))
+                new_builtins.append((instance.get_name(), instance))
                 builtins_by_module[module.__name__].append(instance)
 
+    add_builtins(new_builtins)
 
-mathics_to_sympy = {}  # here we have: name -> sympy object
-mathics_to_python = {}  # here we have: name -> string
-sympy_to_mathics = {}
+    for function in _load_callbacks.pop(import_name, ()):
+        function(module)
 
-pattern_objects = {}
-builtins_precedence = {}
 
-new_builtins = _builtins
+def load_all_builtins() -> None:
+    """Loads all the builtin modules that have not been loaded yet."""
+    global _loading_all, _all_loaded
+
+    if _all_loaded or _loading_all:
+        return
+    _loading_all = True
+    try:
+        import_names = get_builtin_module_names()
+        for import_name in import_names:
+            load_builtin_module(import_name)
+        # keep the modules in their canonical order, however they were loaded
+        modules.sort(
+            key=lambda module: import_names.index(module.__name__)
+            if module.__name__ in import_names
+            else len(import_names)
+        )
+        _all_loaded = True
+    finally:
+        _loading_all = False
 
-# FIXME: some magic is going on here..
-_builtins = {}
 
-add_builtins(new_builtins)
+def load_builtins_for(registry: str, key) -> bool:
+    """
+    Loads the builtin module that puts key into the registry with the
+    given name. Returns whether anything was loaded.
+    """
+    if _all_loaded or _loading_all:
+        return False
+    if _manifest is None:
+        load_all_builtins()
+        return True
+    import_name = _manifest["registries"].get(registry, {}).get(key)
+    if import_name is None or import_name in _loaded_modules:
+        return False
+    load_builtin_module(import_name)
+    return True
+
+
+def call_when_loaded(import_name: str, function) -> None:
+    """Calls function(module) once the builtin module has been loaded."""
+    if import_name in _loaded_modules:
+        module = sys.modules.get(import_name)
+        if module is not None:
+            function(module)
+    else:
+        _load_callbacks.setdefault(import_name, []).append(function)
+
+
+def get_manifest() -> dict:
+    """
+    Returns a description of where each builtin is defined, which
+    install_manifest() uses to load the builtin modules on demand.
+    """
+    load_all_builtins()
+
+    def module_name(builtin):
+        return type(builtin).__module__
+
+    registries = {
+        "_builtins": {
+            name: module_name(builtin) for name, builtin in _builtins.items()
+        },
+        "mathics_to_sympy": {
+            name: module_name(builtin) for name, builtin in mathics_to_sympy.items()
+        },
+        "sympy_to_mathics": {
+            name: module_name(builtin) for name, builtin in sympy_to_mathics.items()
+        },
+        "pattern_objects": {
+            name: cls.__module__ for name, cls in pattern_objects.items()
+        },
+    }
+    for registry in registries.values():
+        for name in [
+            name
+            for name, import_name in registry.items()
+            if not import_name.startswith("mathics.builtin.")
+        ]:
+            del registry[name]
+    return {
+        "registries": registries,
+        "builtins_precedence": dict(builtins_precedence),
+        "mathics_to_python": dict(mathics_to_python),
+        "base_mathics_to_python": dict(base.mathics_to_python),
+    }
+
+
+def install_manifest(manifest: dict) -> None:
+    """
+    Makes the registries load builtin modules on demand, using a manifest
+    returned by get_manifest(). This has no effect once all builtin
+    modules have been loaded.
+    """
+    global _manifest
+
+    if _all_loaded or _loading_all or _manifest is not None:
+        return
+    _manifest = manifest
+    # values that do not need the builtin itself are taken from the manifest
+    dict.update(builtins_precedence, manifest["builtins_precedence"])
+    dict.update(mathics_to_python, manifest["mathics_to_python"])
+    base.mathics_to_python.update(manifest["base_mathics_to_python"])
+
+
+modules = []
+_loaded_modules = set()
+_load_callbacks = {}
+_manifest = None
+_loading_all = False
+_all_loaded = False
+
+_builtins = LazyRegistry("_builtins")
+builtins_by_module = LazyRegistry("builtins_by_module")
+
+mathics_to_sympy = LazyRegistry(
+    "mathics_to_sympy"
+)  # here we have: name -> sympy object
+mathics_to_python = LazyRegistry("mathics_to_python")  # here we have: name -> string
+sympy_to_mathics = LazyRegistry("sympy_to_mathics")
+
+pattern_objects = LazyRegistry("pattern_objects")
+builtins_precedence = LazyRegistry("builtins_precedence")
@@ -274,6 +274,7 @@ class Plus(BinaryOperator, SympyFunction):
     }
 
     sympy_name = "Add"
+    numpy_name = "add"
 
     def format_plus(self, items, evaluation):
         "Plus[items__]"
@@ -499,6 +500,7 @@ class Power(BinaryOperator, _MPMathFunction):
 
     sympy_name = "Pow"
     mpmath_name = "power"
+    numpy_name = "power"
     nargs = 2
 
     messages = {
@@ -536,6 +538,10 @@ class Power(BinaryOperator, _MPMathFunction):
         "Power[x_]": "x",
     }
 
+    def accepts_machine_arrays(self, arrays, inexact) -> bool:
+        # powers of zero are special cases, see apply_check
+        return len(arrays) == 2 and any(inexact) and not (arrays[0] == 0).any()
+
     def apply_check(self, x, y, evaluation):
         "Power[x_, y_]"
 
@@ -732,6 +738,7 @@ class Times(BinaryOperator, SympyFunction):
     default_formats = False
 
     sympy_name = "Mul"
+    numpy_name = "multiply"
 
     rules = {}
 
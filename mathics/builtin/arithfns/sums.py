@@ -5,9 +5,12 @@ Sums, Simple Statistics
 These functions perform a simple arithmetic computation over a list.
 """
 
+import numpy
+
 from mathics.version import __version__  # noqa used in loading to check consistency.
 
 from mathics.builtin.base import Builtin
+from mathics.core.expression import Expression, PackedArray, Symbol, from_numpy
 
 
 class Accumulate(Builtin):
@@ -71,9 +74,34 @@ class Total(Builtin):
     Total over rows instead of columns
     >> Total[{{1, 2, 3}, {4, 5, 6}, {7, 8 ,9}}, {2}]
      = {6, 15, 24}
+
+    #> Total[Range[10^6]]
+     = 500000500000
+    #> Total[Range[2^62, 2^62 + 2]]
+     = 13835058055282163715
+    #> Total[ConstantArray[0.5, {3, 2}]]
+     = {1.5, 1.5}
     """
 
     rules = {
-        "Total[head_]": "Apply[Plus, head]",
         "Total[head_, n_]": "Apply[Plus, Flatten[head, n]]",
     }
+
+    def apply(self, head, evaluation):
+        "Total[head_]"
+        array = head.get_array() if isinstance(head, PackedArray) else None
+        if array is not None and len(array):
+            # add up the rows of a packed array on its array
+            if array.dtype.kind == "i":
+                # the largest magnitude times the number of rows bounds every
+                # partial sum, which must not overflow
+                bound = max(-int(array.min()), int(array.max())) * len(array)
+                if bound <= numpy.iinfo(numpy.int64).max:
+                    return from_numpy(array.sum(axis=0))
+            else:
+                with numpy.errstate(all="ignore"):
+                    # mpmath has no negative zero
+                    result = array.sum(axis=0) + 0.0
+                if numpy.isfinite(result).all():
+                    return from_numpy(result)
+        return Expression("Apply", Symbol("Plus"), head)
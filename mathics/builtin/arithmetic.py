@@ -82,6 +82,10 @@ class _MPMathFunction(SympyFunction):
 
     nargs = 1
 
+    def accepts_machine_arrays(self, arrays, inexact) -> bool:
+        # with exact arguments, the result is not a machine number
+        return len(arrays) == self.nargs and all(inexact)
+
     @lru_cache(maxsize=1024)
     def get_mpmath_function(self, args):
         if self.mpmath_name is None or len(args) != self.nargs:
@@ -389,6 +393,7 @@ class Conjugate(_MPMathFunction):
     """
 
     mpmath_name = "conj"
+    numpy_name = "conjugate"
 
 
 class Abs(_MPMathFunction):
@@ -419,6 +424,7 @@ class Abs(_MPMathFunction):
 
     sympy_name = "Abs"
     mpmath_name = "fabs"  # mpmath actually uses python abs(x) / x.__abs__()
+    numpy_name = "absolute"
 
 
 class Arg(_MPMathFunction):
@@ -29,6 +29,7 @@ from mathics.core.expression import (
     strip_context,
 )
 from mathics.core.numbers import get_precision, PrecisionValueError
+from mathics.builtin import numpy_utils
 
 
 def get_option(options, name, evaluation, pop=False, evaluate=True):
@@ -55,6 +56,33 @@ def has_option(options, name, evaluation):
     return get_option(options, name, evaluation, evaluate=False) is not None
 
 
+class OptionsChecker(object):
+    """Checks that the options passed to a builtin are supported by it.
+
+    This is a class rather than a closure so that the builtin rules
+    holding it can be pickled.
+    """
+
+    def __init__(self, name, options, strict) -> None:
+        self.name = name
+        self.options = options
+        self.strict = strict
+
+    def __call__(self, options_to_check, evaluation):
+        for key, value in options_to_check.items():
+            short_key = strip_context(key)
+            if not has_option(self.options, short_key, evaluation):
+                evaluation.message(
+                    self.name,
+                    "optx",
+                    Expression("Rule", short_key, value),
+                    strip_context(self.name),
+                )
+                if self.strict:
+                    return False
+        return True
+
+
 mathics_to_python = {}
 
 
@@ -121,22 +149,9 @@ class Builtin(object):
         # - 'Ignore': allow unsupported options, do not warn
 
         if option_syntax in ("Strict", "Warn", "System`Strict", "System`Warn"):
-
-            def check_options(options_to_check, evaluation):
-                name = self.get_name()
-                for key, value in options_to_check.items():
-                    short_key = strip_context(key)
-                    if not has_option(options, short_key, evaluation):
-                        evaluation.message(
-                            name,
-                            "optx",
-                            Expression("Rule", short_key, value),
-                            strip_context(name),
-                        )
-                        if option_syntax in ("Strict", "System`Strict"):
-                            return False
-                return True
-
+            check_options = OptionsChecker(
+                name, options, option_syntax in ("Strict", "System`Strict")
+            )
         elif option_syntax in ("Ignore", "System`Ignore"):
             check_options = None
         else:
@@ -243,6 +258,8 @@ class Builtin(object):
         attributes += list(ensure_context(a) for a in self.attributes)
         options = {}
         for option, value in self.options.items():
+            if option == "$OptionSyntax":
+                continue
             option = ensure_context(option)
             options[option] = parse_builtin_rule(value)
             if option.startswith("System`"):
@@ -337,26 +354,29 @@ class Builtin(object):
     def get_option(options, name, evaluation, pop=False):
         return get_option(options, name, evaluation, pop)
 
-    def _get_unavailable_function(self):
+    def _get_missing_package(self):
         requires = getattr(self, "requires", [])
 
         for package in requires:
             try:
                 importlib.import_module(package)
             except ImportError:
-
-                def apply(**kwargs):  # will override apply method
-                    kwargs["evaluation"].message(
-                        "General",
-                        "pyimport",  # see inout.py
-                        strip_context(self.get_name()),
-                        package,
-                    )
-
-                return apply
-
+                return package
         return None
 
+    def _get_unavailable_function(self):
+        if self._get_missing_package() is None:
+            return None
+        return self._apply_unavailable
+
+    def _apply_unavailable(self, **kwargs):  # will override apply method
+        kwargs["evaluation"].message(
+            "General",
+            "pyimport",  # see inout.py
+            strip_context(self.get_name()),
+            self._get_missing_package(),
+        )
+
     def get_option_string(self, *params):
         s = self.get_option(*params)
         if isinstance(s, String):
@@ -535,6 +555,41 @@ class Test(Builtin):
 
 
 class SympyFunction(SympyObject):
+    # name of the numpy function computing this function on arrays of
+    # machine numbers, see compute_machine_arrays
+    numpy_name: typing.Optional[str] = None
+
+    def accepts_machine_arrays(self, arrays, inexact) -> bool:
+        """
+        Tells whether applying numpy_name to the arrays gives the same
+        result as threading the function over them. inexact holds, for
+        each array, whether all of its elements are machine numbers.
+
+        By default, some argument has to be inexact, so that every
+        element of the result is computed in machine precision.
+        """
+        return any(inexact)
+
+    def compute_machine_arrays(self, leaves, evaluation):
+        """
+        Fast path for a Listable function applied to lists of machine
+        numbers: instead of threading over the lists and evaluating each
+        element through the rules, the whole computation is done by numpy.
+        Returns the resulting List, or None if the fast path does not
+        apply.
+        """
+        arrays = []
+        inexact = []
+        for leaf in leaves:
+            converted = numpy_utils.machine_array(leaf)
+            if converted is None:
+                return None
+            arrays.append(converted[0])
+            inexact.append(converted[1])
+        if not self.accepts_machine_arrays(arrays, inexact):
+            return None
+        return numpy_utils.apply_machine_ufunc(self.numpy_name, arrays)
+
     def apply(self, *args):
         """
         Generic apply method that uses the class sympy_name.
@@ -8,6 +8,9 @@ When LLVM and Python libraries are available, compilation produces LLVM code.
 
 
 import ctypes
+import math
+
+import numpy
 
 from mathics.version import __version__  # noqa used in loading to check consistency.
 
@@ -18,8 +21,10 @@ from mathics.core.expression import (
     Atom,
     Expression,
     Integer,
+    PackedArray,
     String,
     Symbol,
+    from_numpy,
     from_python,
 )
 from types import FunctionType
@@ -33,8 +38,16 @@ class Compile(Builtin):
 
       <dt>'Compile[{{$x1$, $t1$} {$x2$, $t1$} ...}, $expr$]'
       <dd>Compiles assuming each $xi$ matches type $ti$.
+
+      <dt>'Compile[{{$x1$, $t1$, $n1$} ...}, $expr$]'
+      <dd>Compiles assuming each $xi$ is a rank $ni$ tensor of type $ti$.
     </dl>
 
+    With 'RuntimeAttributes -> {Listable}', the compiled function threads over
+    lists of its arguments. Functions of numbers then run over all elements in
+    compiled code; with 'Parallelization -> True' the elements are split
+    across all processors.
+
     Compilation is performed using llvmlite , or Python's builtin
     "compile" function.
 
@@ -75,15 +88,81 @@ class Compile(Builtin):
     #> cf[0, -2]
      = 0.5
 
-    Loops and variable assignments are supported usinv Python builtin "compile" function:
-    >> Compile[{{a, _Integer}, {b, _Integer}}, While[b != 0, {a, b} = {b, Mod[a, b]}]; a]       (* GCD of a, b *)
-     =  CompiledFunction[{a, b}, a, -PythonizedCode-]
+    Loops, local variables and assignments are compiled as well:
+    >> gcd = Compile[{{a, _Integer}, {b, _Integer}}, While[b != 0, {a, b} = {b, Mod[a, b]}]; a]
+     = CompiledFunction[{a, b}, While[b != 0, {a, b} = {b, Mod[a, b]}] ; a, -CompiledCode-]
+    >> gcd[12, 18]
+     = 6
+
+    Arguments can be tensors of a given rank, which are passed as arrays of
+    machine numbers:
+    >> norm = Compile[{{v, _Real, 1}}, Module[{s = 0.}, Do[s += v[[i]] ^ 2, {i, Length[v]}]; Sqrt[s]]];
+    >> norm[{3, 4}]
+     = 5.
+    >> squares = Compile[{{n, _Integer}}, Table[i i, {i, n}]];
+    >> squares[5]
+     = {1, 4, 9, 16, 25}
+    #> Compile[{{m, _Integer, 2}}, Module[{t = m}, t[[1, 1]] = 0; t]][{{1, 2}, {3, 4}}]
+     = {{0, 2}, {3, 4}}
+    #> Compile[{{x, _Real}}, Table[{i, j x}, {i, 2}, {j, 2}]][0.5]
+     = {{{1., 0.5}, {1., 1.}}, {{2., 0.5}, {2., 1.}}}
+    #> Compile[{{v, _Integer, 1}}, Total[v]][{{1}}]
+     : Invalid argument {{1}} should be Integer, Real or boolean.
+     = CompiledFunction[{v}, Total[v], -CompiledCode-][{{1}}]
+
+    If the compiled code cannot complete, e.g. because a part does not exist,
+    the expression is evaluated without compilation:
+    >> part = Compile[{{v, _Integer, 1}, {k, _Integer}}, v[[k]]];
+    >> part[{1, 2, 3}, 4]
+     : Could not complete external evaluation; proceeding with uncompiled evaluation.
+     : Part 4 of {1, 2, 3} does not exist.
+     = {1, 2, 3}[[4]]
+
+    Numerical errors, e.g. results that are not real, are handled the same way:
+    >> Compile[{{x, _Real}}, Sqrt[x]][-1.]
+     : Numerical error encountered; proceeding with uncompiled evaluation.
+     = 0. + 1. I
+    #> Compile[{{n, _Integer}}, Module[{s = 0}, For[i = 1, i <= n, i++, s += 2 i - 1]; s]][5]
+     = 25
+
+    Listable compiled functions:
+    >> cf = Compile[{x, {n, _Integer}}, x ^ n + 1, RuntimeAttributes -> {Listable}, Parallelization -> True];
+    >> cf[{1, 2, 3}, 2]
+     = {2., 5., 10.}
+    >> cf[{{1, 2}, {3, 4}}, {1, 2}]
+     = {{2., 3.}, {10., 17.}}
+    >> Total[cf[Range[10^5] / 10.^5, 1]]
+     = 150001.
+    #> cf[{1, 2}, {1, 2, 3}]
+     : Could not complete external evaluation; proceeding with uncompiled evaluation.
+     : Objects of unequal length cannot be combined.
+     = 1 + {1, 2} ^ {1, 2, 3}
+    #> Compile[{{v, _Integer, 1}}, Total[v], RuntimeAttributes -> {Listable}][{{1, 2}, {3, 4}}]
+     = {3, 7}
+    #> Compile[{{x, _Integer}}, x > 1, RuntimeAttributes -> {Listable}][{1, 2}]
+     = {False, True}
+    #> Compile[{x}, x ^ 2, RuntimeAttributes -> Listable][{1, 2}]
+     = {1., 4.}
+
+    Elements with numerical errors are evaluated without compilation as well:
+    >> Compile[{x}, If[x > 0, Sqrt[x], Log[x]], RuntimeAttributes -> {Listable}][{-1., 4.}]
+     : Numerical error encountered; proceeding with uncompiled evaluation.
+     = {0. + 3.14159 I, 2.}
+    #> Compile[{x}, 1 / x, RuntimeAttributes -> {Listable}][{0., 4.}]
+     : Numerical error encountered; proceeding with uncompiled evaluation.
+     : Infinite expression 1 / 0. encountered.
+     = {ComplexInfinity, 0.25}
     """
 
     requires = ("llvmlite",)
 
     attributes = ("HoldAll",)
 
+    options = {
+        "RuntimeAttributes": "{}",
+        "Parallelization": "False",
+    }
+
     messages = {
         "invar": "Variable `1` should be {symbol, type} annotation.",
         "invars": "Variables should be a list of {symbol, type} annotations.",
@@ -91,13 +170,14 @@ class Compile(Builtin):
         "fdup": "Duplicate parameter `1` found in `2`.",
     }
 
-    def apply(self, vars, expr, evaluation):
-        "Compile[vars_, expr_]"
+    def apply(self, vars, expr, evaluation, options):
+        "Compile[vars_, expr_, OptionsPattern[Compile]]"
         from mathics.builtin.compile import (
             _compile,
             int_type,
             real_type,
             bool_type,
+            tensor_type,
             CompileArg,
             CompileError,
         )
@@ -119,13 +199,20 @@ class Compile(Builtin):
                 symb = var
                 name = symb.get_name()
                 typ = real_type
-            elif var.has_form("List", 2):
-                symb, typ = var.get_leaves()
+            elif var.has_form("List", 2, 3):
+                symb, typ = var.leaves[:2]
                 if isinstance(symb, Symbol) and typ in permitted_types:
                     name = symb.get_name()
                     typ = permitted_types[typ]
                 else:
                     return evaluation.message("Compile", "invar", var)
+                if len(var.leaves) == 3:
+                    # {x, type, rank} is a tensor of numbers of that type
+                    rank = var.leaves[2].get_int_value()
+                    if rank is None or rank < 0 or typ == bool_type:
+                        return evaluation.message("Compile", "invar", var)
+                    if rank > 0:
+                        typ = tensor_type(typ, rank)
             else:
                 return evaluation.message("Compile", "invar", var)
 
@@ -136,8 +223,18 @@ class Compile(Builtin):
                 names.append(name)
             args.append(CompileArg(name, typ))
 
+        runtime_attributes = self.get_option(options, "RuntimeAttributes", evaluation)
+        if runtime_attributes.has_form("List", None):
+            runtime_attributes = runtime_attributes.leaves
+        else:
+            runtime_attributes = [runtime_attributes]
+        listable = any(
+            leaf.get_name() == "System`Listable" for leaf in runtime_attributes
+        )
+        parallel = self.get_option(options, "Parallelization", evaluation).is_true()
+
         try:
-            cfunc = _compile(expr, args)
+            cfunc = _compile(expr, args, listable=listable, parallel=parallel)
         except CompileError:
             cfunc = None
 
@@ -146,9 +243,16 @@ class Compile(Builtin):
 
                 def _pythonized_mathics_expr(*x):
                     inner_evaluation = Evaluation(definitions=evaluation.definitions)
-                    vars = dict(list(zip(names, x[: len(names)])))
-                    pyexpr = expr.replace_vars(vars)
-                    pyexpr = Expression("N", pyexpr).evaluate(inner_evaluation)
+                    vars = dict(
+                        (name, from_numpy(value))
+                        if isinstance(value, numpy.ndarray)
+                        else (name, from_python(value))
+                        for name, value in zip(names, x)
+                    )
+                    pyexpr = expr.replace_vars(vars).evaluate(inner_evaluation)
+                    # like in compiled code, integer results stay integers
+                    if not _is_integer_tensor(pyexpr):
+                        pyexpr = Expression("N", pyexpr).evaluate(inner_evaluation)
                     res = pyexpr.to_python(n_evaluation=inner_evaluation)
                     return res
 
@@ -167,6 +271,22 @@ class Compile(Builtin):
         return Expression("CompiledFunction", arg_names, expr, code)
 
 
+def _is_integer_tensor(expr) -> bool:
+    if isinstance(expr, Integer):
+        return True
+    if isinstance(expr, PackedArray) and expr.get_array() is not None:
+        return expr.get_array().dtype.kind in "iu"
+    return expr.has_form("List", 1, None) and all(
+        _is_integer_tensor(leaf) for leaf in expr.leaves
+    )
+
+
+def _is_finite(result) -> bool:
+    if isinstance(result, numpy.ndarray):
+        return result.dtype.kind not in "fc" or bool(numpy.isfinite(result).all())
+    return not isinstance(result, float) or math.isfinite(result)
+
+
 class CompiledCode(Atom):
     def __init__(self, cfunc, args, **kwargs):
         super(CompiledCode, self).__init__(**kwargs)
@@ -209,7 +329,7 @@ class CompiledCode(Atom):
         raise NotImplementedError
 
     def __hash__(self):
-        return hash(("CompiledCode", ctypes.addressof(self.cfunc)))  # XXX hack
+        return hash(("CompiledCode", id(self.cfunc)))
 
     def atom_to_boxes(self, f, evaluation):
         return CompiledCodeBox(String(self.__str__()), evaluation=evaluation)
@@ -223,7 +343,7 @@ class CompiledFunction(Builtin):
     </dl>
 
     >> sqr = Compile[{x}, x x]
-     = CompiledFunction[{x}, x ^ 2, -CompiledCode-]
+     = CompiledFunction[{x}, x x, -CompiledCode-]
     >> Head[sqr]
      = CompiledFunction
     >> sqr[2]
@@ -231,7 +351,14 @@ class CompiledFunction(Builtin):
 
     """
 
-    messages = {"argerr": "Invalid argument `1` should be Integer, Real or boolean."}
+    # the code is not evaluated, like the body of Function
+    attributes = ("HoldAll",)
+
+    messages = {
+        "argerr": "Invalid argument `1` should be Integer, Real or boolean.",
+        "cfex": "Could not complete external evaluation; proceeding with uncompiled evaluation.",
+        "cfn": "Numerical error encountered; proceeding with uncompiled evaluation.",
+    }
 
     def apply(self, argnames, expr, code, args, evaluation):
         "CompiledFunction[argnames_, expr_, code_CompiledCode][args__]"
@@ -241,9 +368,16 @@ class CompiledFunction(Builtin):
         if len(argseq) != len(code.args):
             return
 
+        from mathics.builtin.compile import CompiledCodeError
+
         py_args = []
         for arg in argseq:
-            if isinstance(arg, Integer):
+            if isinstance(arg, PackedArray) and arg.get_array() is not None:
+                py_args.append(arg.get_array())
+            elif arg.has_form("List", None):
+                # tensor arguments are checked when the code is called
+                py_args.append(arg.to_python())
+            elif isinstance(arg, Integer):
                 py_args.append(arg.get_int_value())
             elif arg.sameQ(Symbol("True")):
                 py_args.append(True)
@@ -255,4 +389,21 @@ class CompiledFunction(Builtin):
             result = code.cfunc(*py_args)
         except (TypeError, ctypes.ArgumentError):
             return evaluation.message("CompiledFunction", "argerr", args)
+        except CompiledCodeError:
+            evaluation.message("CompiledFunction", "cfex")
+            names = [leaf.get_name() for leaf in argnames.get_leaves()]
+            return expr.replace_vars(dict(zip(names, argseq)))
+        if not _is_finite(result):
+            # e.g. the square root of a negative number, which is complex
+            evaluation.message("CompiledFunction", "cfn")
+            if getattr(code.cfunc, "listable", False):
+                # evaluated element by element, like the compiled code
+                function = Expression("Function", argnames, expr, Symbol("Listable"))
+                return Expression(function, *argseq)
+            names = [leaf.get_name() for leaf in argnames.get_leaves()]
+            return expr.replace_vars(dict(zip(names, argseq)))
+        if isinstance(result, numpy.ndarray):
+            if result.dtype.kind == "b":
+                return from_python(result.tolist())
+            return from_numpy(result)
         return from_python(result)
@@ -12,5 +12,5 @@ except ImportError:
 if has_llvmlite:
     from .ir import IRGenerator
     from .compile import _compile
-    from .base import CompileArg, CompileError
+    from .base import CompileArg, CompileError, CompiledCodeError
     from .types import *
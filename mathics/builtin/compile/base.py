@@ -6,6 +6,12 @@ class CompileError(Exception):
     pass
 
 
+class CompiledCodeError(Exception):
+    """Raised when compiled code cannot complete, e.g. on a Part out of range."""
+
+    pass
+
+
 class CompileArg(object):
     def __init__(self, name, type):
         self.name = name
@@ -1,7 +1,12 @@
 import llvmlite.binding as llvm
 from llvmlite.llvmpy.core import Type
-from ctypes import CFUNCTYPE
+from ctypes import CFUNCTYPE, addressof, c_int64, c_void_p
 
+import numpy
+
+from mathics.builtin.compile import runtime
+from mathics.builtin.compile.base import CompileError, CompiledCodeError
+from mathics.builtin.compile.types import is_tensor_type, tensor_rank
 from mathics.builtin.compile.utils import llvm_to_ctype
 from mathics.builtin.compile.ir import IRGenerator
 
@@ -20,11 +25,28 @@ def create_execution_engine():
     """
     # Create a target machine representing the host
     target = llvm.Target.from_default_triple()
-    target_machine = target.create_target_machine()
+    target_machine = target.create_target_machine(
+        cpu=llvm.get_host_cpu_name(), features=llvm.get_host_cpu_features().flatten()
+    )
     # And an execution engine with an empty backing module
     backing_mod = llvm.parse_assembly("")
     engine = llvm.create_mcjit_compiler(backing_mod, target_machine)
-    return engine
+    return engine, target_machine
+
+
+def create_pass_manager(target_machine):
+    """
+    Create the module passes the generated code is optimized with. Loops
+    over tensors in particular benefit from the vectorizers.
+    """
+    builder = llvm.create_pass_manager_builder()
+    builder.opt_level = 2
+    builder.loop_vectorize = True
+    builder.slp_vectorize = True
+    pass_manager = llvm.create_module_pass_manager()
+    target_machine.add_analysis_passes(pass_manager)
+    builder.populate(pass_manager)
+    return pass_manager
 
 
 def compile_ir(engine, llvm_ir):
@@ -35,25 +57,186 @@ def compile_ir(engine, llvm_ir):
     # Create a LLVM module object from the IR
     mod = llvm.parse_assembly(llvm_ir)
     mod.verify()
+    pass_manager.run(mod)
     # Now add the module and make sure it is ready for execution
     engine.add_module(mod)
     engine.finalize_object()
     return mod
 
 
-engine = create_execution_engine()
+engine, target_machine = create_execution_engine()
+pass_manager = create_pass_manager(target_machine)
+
+
+class CompiledCall(object):
+    """
+    Calls the compiled function. Tensors are passed as NumPy arrays (or
+    anything numpy.asarray accepts) and returned as NumPy arrays. Raises
+    CompiledCodeError if the compiled code fails.
+
+    Listable functions thread over arguments of a higher rank than declared,
+    running kernel_ptr (see IRGenerator.generate_kernel) if given, split
+    across threads if parallel is set.
+    """
+
+    def __init__(
+        self,
+        func_ptr,
+        args,
+        ret_type,
+        mutated_args=(),
+        listable=False,
+        kernel_ptr=None,
+        parallel=False,
+    ):
+        self.args = args
+        self.ret_type = ret_type
+        self.mutated_args = frozenset(mutated_args)
+        self.listable = listable
+        self.parallel = parallel
+        param_types = []
+        for arg in args:
+            if is_tensor_type(arg.type):
+                param_types.append(c_void_p)
+                param_types.extend([c_int64] * tensor_rank(arg.type))
+            else:
+                param_types.append(llvm_to_ctype(arg.type))
+        param_types.append(c_void_p)  # error flag
+        if is_tensor_type(ret_type):
+            param_types.append(c_void_p)
+            self.cfunc = CFUNCTYPE(None, *param_types)(func_ptr)
+        else:
+            self.cfunc = CFUNCTYPE(llvm_to_ctype(ret_type), *param_types)(func_ptr)
+        if kernel_ptr is None:
+            self.kernel = None
+        else:
+            param_types = [c_int64, c_int64] + [c_void_p, c_int64] * len(args)
+            param_types.extend([c_void_p, c_void_p])
+            self.kernel = CFUNCTYPE(None, *param_types)(kernel_ptr)
+
+    def __call__(self, *values):
+        if len(values) != len(self.args):
+            raise TypeError("expected %d arguments" % len(self.args))
+        if self.listable:
+            try:
+                arrays = [numpy.asarray(value) for value in values]
+            except ValueError:
+                raise TypeError(values)
+            if any(
+                array.ndim > runtime.rank(arg.type)
+                for arg, array in zip(self.args, arrays)
+            ):
+                return self.thread(arrays)
+        return self.call(values)
+
+    def thread(self, arrays):
+        # like Listable, lists of lower rank are matched against the outer
+        # dimensions of the others
+        outer = [
+            array.shape[: array.ndim - runtime.rank(arg.type)]
+            for arg, array in zip(self.args, arrays)
+        ]
+        shape = max(outer, key=len)
+        if any(shape[: len(dims)] != dims for dims in outer):
+            raise CompiledCodeError()
+        if self.kernel is not None:
+            return self.run_kernel(arrays, outer, shape)
+
+        results = []
+        for index in numpy.ndindex(*shape):
+            results.append(
+                self.call(
+                    [array[index[: len(dims)]] for array, dims in zip(arrays, outer)]
+                )
+            )
+        results = numpy.array(results)
+        return results.reshape(shape + results.shape[1:])
+
+    def run_kernel(self, arrays, outer, shape):
+        size = int(numpy.prod(shape))
+        buffers = []
+        c_args = []
+        for arg, array, dims in zip(self.args, arrays, outer):
+            if dims and dims != shape:
+                array = numpy.broadcast_to(
+                    array.reshape(dims + (1,) * (len(shape) - len(dims))), shape
+                )
+            buffer = runtime.buffer_argument(array, arg.type)
+            buffers.append(buffer)
+            # scalars are repeated
+            c_args.extend([buffer.ctypes.data, 1 if dims else 0])
+        result = runtime.empty_buffer(shape, self.ret_type)
+        c_args.append(result.ctypes.data)
+
+        def run(chunk):
+            error = c_int64(0)
+            with runtime.arena():
+                self.kernel(chunk[0], chunk[1], *(c_args + [addressof(error)]))
+            return error.value
+
+        chunks = runtime.chunks(size, self.parallel)
+        if len(chunks) > 1:
+            errors = list(runtime.thread_pool().map(run, chunks))
+        else:
+            errors = [run(chunk) for chunk in chunks]
+        if any(errors):
+            raise CompiledCodeError()
+        return result
+
+    def call(self, values):
+        c_args = []
+        # the arrays have to be kept alive during the call
+        arrays = []
+        for arg, value in zip(self.args, values):
+            if is_tensor_type(arg.type):
+                # assignments to parts of an argument must not change the
+                # caller's array
+                array = runtime.tensor_argument(
+                    value, arg.type, copy=arg.name in self.mutated_args
+                )
+                arrays.append(array)
+                c_args.append(array.ctypes.data)
+                c_args.extend(array.shape)
+            else:
+                c_args.append(value)
+        error = c_int64(0)
+        c_args.append(addressof(error))
+        if is_tensor_type(self.ret_type):
+            result = runtime.tensor_struct(tensor_rank(self.ret_type))()
+            c_args.append(addressof(result))
+        with runtime.arena():
+            value = self.cfunc(*c_args)
+            if error.value:
+                raise CompiledCodeError()
+            if is_tensor_type(self.ret_type):
+                return runtime.tensor_result(result, self.ret_type)
+            return value
 
 
-def _compile(expr, args):
+def _compile(expr, args, listable=False, parallel=False):
     ir_gen = IRGenerator(expr, args, "mathics")
     llvm_ir, ret_type = ir_gen.generate_ir()
+    kernel = False
+    if listable:
+        try:
+            llvm_ir = ir_gen.generate_kernel("mathics_kernel")
+            kernel = True
+        except CompileError:
+            # threaded in Python instead
+            pass
     mod = compile_ir(engine, llvm_ir)
 
     # lookup function pointer
     func_ptr = engine.get_function_address("mathics")
+    kernel_ptr = engine.get_function_address("mathics_kernel") if kernel else None
 
     # run function via ctypes
-    cfunc = CFUNCTYPE(
-        llvm_to_ctype(ret_type), *(llvm_to_ctype(arg.type) for arg in args)
-    )(func_ptr)
-    return cfunc
+    return CompiledCall(
+        func_ptr,
+        args,
+        ret_type,
+        ir_gen.mutated_args,
+        listable=listable,
+        kernel_ptr=kernel_ptr,
+        parallel=parallel,
+    )
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from functools import reduce
 import itertools
 
@@ -5,9 +6,32 @@ from llvmlite import ir
 import ctypes
 
 from mathics.core.expression import Expression, Integer, Symbol, Real, String
-from mathics.builtin.compile.types import int_type, real_type, bool_type, void_type
+from mathics.builtin.compile.types import (
+    int_type,
+    real_type,
+    bool_type,
+    void_type,
+    null_type,
+    tensor_type,
+    is_tensor_type,
+    tensor_elem_type,
+    tensor_rank,
+)
 from mathics.builtin.compile.utils import pairwise, llvm_to_ctype
 from mathics.builtin.compile.base import CompileError
+from mathics.builtin.compile.runtime import allocate_address
+
+# the value of expressions without a value
+null_value = ir.Constant(null_type, None)
+
+
+class _Regenerate(Exception):
+    """
+    Raised when a variable is assigned a value of a wider type than it was
+    allocated with, so that the code has to be generated again.
+    """
+
+    pass
 
 
 def single_real_arg(f):
@@ -113,7 +137,9 @@ class IRGenerator(object):
         self.builder = None
         self._known_ret_type = None
         self._returned_type = None
-        self.lookup_args = None
+        self._var_types = {}  # types variables were widened to in earlier passes
+        self.variables = None
+        self.mutated_args = set()  # tensor arguments whose parts are assigned
 
     def generate_ir(self):
         """
@@ -122,49 +148,183 @@ class IRGenerator(object):
         # assume that the function returns a real. Note that this is verified by
         # looking at the type of the head of the converted expression.
         ret_type = real_type if self._known_ret_type is None else self._known_ret_type
+        self.ret_type = ret_type
 
         # create an empty module
         module = ir.Module(name=__file__)
 
-        func_type = ir.FunctionType(ret_type, tuple(arg.type for arg in self.args))
+        # Tensor arguments are passed as a pointer to their elements followed
+        # by their dimensions. The function gets a pointer to an error flag,
+        # which is set if the computation fails, as an additional argument,
+        # and returns tensors by storing them to a pointer passed last.
+        param_types = []
+        for arg in self.args:
+            if is_tensor_type(arg.type):
+                param_types.extend(arg.type.elements)
+            else:
+                param_types.append(arg.type)
+        param_types.append(int_type.as_pointer())
+        if is_tensor_type(ret_type):
+            param_types.append(ret_type.as_pointer())
+            func_type = ir.FunctionType(void_type, param_types)
+        else:
+            func_type = ir.FunctionType(ret_type, param_types)
 
         # declare a function inside the module
         func = ir.Function(module, func_type, name=self.func_name)
-
-        # implement the function
-        block = func.append_basic_block(name="entry")
-        self.builder = ir.IRBuilder(block)
-
-        self.lookup_args = {
-            arg.name: func_arg for arg, func_arg in zip(self.args, func.args)
-        }
-
-        ir_code = self._gen_ir(self.expr)
+        self.module = module
+        self.function = func
+
+        # implement the function. Variables are allocated in the entry block,
+        # which branches to the body once the code is complete.
+        self.entry_block = func.append_basic_block(name="entry")
+        body_block = func.append_basic_block(name="body")
+        self.builder = ir.IRBuilder(self.entry_block)
+        self.error_block = None
+        self.loops = []  # (continue block, break block) of enclosing loops
+        self._fresh = set()  # ids of tensors that no variable refers to
+
+        params = iter(func.args)
+        self.variables = {}
+        for arg in self.args:
+            if is_tensor_type(arg.type):
+                data = next(params)
+                dims = [next(params) for _ in range(tensor_rank(arg.type))]
+                value = self.make_tensor(arg.type, data, dims)
+                self._fresh.add(id(value))
+            else:
+                value = next(params)
+            self.variables[arg.name] = None
+            self.store_variable(arg.name, value)
+        self.error_flag = next(params)
+        self.result_ptr = next(params, None)
+
+        self.builder.position_at_end(body_block)
+        try:
+            ir_code = self._gen_ir(self.expr)
+        except _Regenerate:
+            return self.generate_ir()
+
+        # determine the type returned, including explicit Return[]s
+        if ir_code.type == void_type:
+            result_type = self._returned_type
+        else:
+            result_type = self.unify_types(self._returned_type, ir_code.type)
+        if result_type is None or result_type == null_type:
+            raise CompileError()
 
         # if the return type isn't correct then try again
-        if self._known_ret_type is None:
-            # determine the type returned
-            if ir_code.type == void_type:
-                if self._returned_type is not None:
-                    # we returned something so use that type
-                    self._known_ret_type = self._returned_type
-                    # force generation again in case multiple returns of different types
-                    return self.generate_ir()
-                else:
-                    # actually returned void e.g. Print[]
-                    pass
-
-            if ir_code.type != ret_type:
-                # guessed incorrectly - try again
-                self._known_ret_type = ir_code.type
-                return self.generate_ir()
+        if result_type != ret_type:
+            self._known_ret_type = result_type
+            return self.generate_ir()
 
         # void handles its own returns
         if ir_code.type != void_type:
-            self.builder.ret(ir_code)
+            self.emit_return(ir_code)
+
+        with self.builder.goto_block(self.entry_block):
+            self.builder.branch(body_block)
+        if self.error_block is not None:
+            self.builder.position_at_end(self.error_block)
+            self.builder.store(int_type(1), self.error_flag)
+            self.emit_return(None)
 
         return str(module), ret_type
 
+    def generate_kernel(self, name):
+        """
+        Adds a function to the module that applies the function generated by
+        generate_ir() to the elements start, ..., stop - 1 of buffers, for
+        functions of scalars only. The kernel takes start and stop, a pointer
+        and a stride (0 to repeat the first element) for each argument, a
+        pointer to the results and the error flag. Booleans are stored as
+        bytes. Generating the kernel fails with a CompileError otherwise.
+        """
+        scalar_types = (int_type, real_type, bool_type)
+        arg_types = [arg.type for arg in self.args]
+        if self.ret_type not in scalar_types or any(
+            typ not in scalar_types for typ in arg_types
+        ):
+            raise CompileError()
+
+        def storage_type(typ):
+            return ir.IntType(8) if typ == bool_type else typ
+
+        param_types = [int_type, int_type]
+        for typ in arg_types:
+            param_types.extend([storage_type(typ).as_pointer(), int_type])
+        param_types.append(storage_type(self.ret_type).as_pointer())
+        param_types.append(int_type.as_pointer())
+        func = ir.Function(
+            self.module, ir.FunctionType(void_type, param_types), name=name
+        )
+        params = list(func.args)
+        start, stop = params[:2]
+        buffers = params[2:-2]
+        result, error_flag = params[-2:]
+
+        builder = ir.IRBuilder(func.append_basic_block(name="entry"))
+        cond_block = func.append_basic_block(name="loop.cond")
+        body_block = func.append_basic_block(name="loop.body")
+        end_block = func.append_basic_block(name="loop.end")
+        counter = builder.alloca(int_type)
+        builder.store(start, counter)
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        k = builder.load(counter)
+        builder.cbranch(builder.icmp_signed("<", k, stop), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        values = []
+        for typ, (data, stride) in zip(arg_types, zip(buffers[::2], buffers[1::2])):
+            value = builder.load(builder.gep(data, [builder.mul(k, stride)]))
+            if typ == bool_type:
+                value = builder.trunc(value, bool_type)
+            values.append(value)
+        value = builder.call(self.function, values + [error_flag])
+        if self.ret_type == bool_type:
+            value = builder.zext(value, ir.IntType(8))
+        builder.store(value, builder.gep(result, [k]))
+        builder.store(builder.add(k, int_type(1)), counter)
+        # stop at the first error
+        failed = builder.icmp_signed("!=", builder.load(error_flag), int_type(0))
+        builder.cbranch(failed, end_block, cond_block)
+
+        builder.position_at_end(end_block)
+        builder.ret_void()
+        return str(self.module)
+
+    def unify_types(self, type1, type2):
+        """
+        Returns the type that values of both types can be converted to.
+        None stands for no value at all.
+        """
+        if type1 is None or type1 == type2:
+            return type2
+        elif type2 is None:
+            return type1
+        elif set((type1, type2)) == set((int_type, real_type)):
+            return real_type
+        raise CompileError("Conflicting types {} and {}.".format(type1, type2))
+
+    def emit_return(self, value):
+        """
+        returns value from the function, or a dummy value if value is None
+        """
+        builder = self.builder
+        ret_type = self.ret_type
+        if is_tensor_type(ret_type):
+            if value is not None and value.type == ret_type:
+                builder.store(value, self.result_ptr)
+            return builder.ret_void()
+        if value is not None and value.type == int_type and ret_type == real_type:
+            value = self.int_to_real(value)
+        if value is None or value.type != ret_type:
+            # only while the return type is still being determined
+            value = ir.Constant(ret_type, None)
+        return builder.ret(value)
+
     def call_fp_intr(self, name, args, ret_type=real_type):
         """
         call a LLVM intrinsic floating-point operation
@@ -215,11 +375,20 @@ class IRGenerator(object):
         walks an expression tree and constructs the ir block
         """
         if isinstance(expr, Symbol):
-            try:
-                arg = self.lookup_args[expr.get_name()]
-            except KeyError:
-                raise CompileError()
-            return arg
+            name = expr.get_name()
+            if name in self.variables:
+                ptr = self.variables[name]
+                if ptr is None:
+                    # used before it is assigned a value
+                    raise CompileError()
+                return self.builder.load(ptr)
+            elif name == "System`True":
+                return bool_type(1)
+            elif name == "System`False":
+                return bool_type(0)
+            elif name == "System`Null":
+                return null_value
+            raise CompileError()
         elif isinstance(expr, Integer):
             return int_type(expr.get_int_value())
         elif isinstance(expr, Real):
@@ -240,18 +409,14 @@ class IRGenerator(object):
         return method(expr)
 
     def _gen_If(self, expr):
-        if not expr.has_form("If", 3):
+        if not expr.has_form("If", 2, 3):
             raise CompileError()
 
         builder = self.builder
         args = expr.get_leaves()
 
         # condition
-        cond = self._gen_ir(args[0])
-        if cond.type == int_type:
-            cond = self.int_to_bool(cond)
-        if cond.type != bool_type:
-            raise CompileError()
+        cond = self.condition(args[0])
 
         # construct new blocks
         then_block = builder.append_basic_block()
@@ -260,47 +425,52 @@ class IRGenerator(object):
         # branch to then or else block
         builder.cbranch(cond, then_block, else_block)
 
-        # results for both block
-        with builder.goto_block(then_block):
-            then_result = self._gen_ir(args[1])
-        with builder.goto_block(else_block):
+        # results for both blocks, and the blocks they end in
+        builder.position_at_end(then_block)
+        then_result = self._gen_ir(args[1])
+        then_end = builder.block
+        builder.position_at_end(else_block)
+        if len(args) == 3:
             else_result = self._gen_ir(args[2])
-
-        # type check both blocks - determine resulting type
-        if then_result.type == void_type and else_result.type == void_type:
+        else:
+            else_result = null_value
+        else_end = builder.block
+
+        results = [
+            (result, end)
+            for result, end in ((then_result, then_end), (else_result, else_end))
+            if result.type != void_type
+        ]
+        if not results:
             # both blocks terminate so no continuation block
             return then_result
-        elif then_result.type == else_result.type:
-            ret_type = then_result.type
-        elif then_result.type == int_type and else_result.type == real_type:
-            builder.position_at_end(then_block)
-            then_result = self.int_to_real(then_result)
-            ret_type = real_type
-        elif then_result.type == real_type and else_result.type == int_type:
-            builder.position_at_end(else_block)
-            else_result = self.int_to_real(else_result)
+
+        # type check both blocks - determine resulting type
+        types = set(result.type for result, _ in results)
+        if len(types) == 1:
+            ret_type = types.pop()
+        elif types == set((int_type, real_type)):
             ret_type = real_type
-        elif then_result.type == void_type and else_result.type != void_type:
-            ret_type = else_result.type
-        elif then_result.type != void_type and else_result.type == void_type:
-            ret_type = then_result.type
         else:
-            raise CompileError()
+            # e.g. If[c, x = 1]: there is no value to continue with
+            ret_type = null_type
 
         # continuation block
         cont_block = builder.append_basic_block()
-        builder.position_at_start(cont_block)
+        incoming = []
+        for result, end in results:
+            builder.position_at_end(end)
+            if ret_type == real_type and result.type == int_type:
+                result = self.int_to_real(result)
+            builder.branch(cont_block)
+            incoming.append((result, end))
+
+        builder.position_at_end(cont_block)
+        if ret_type == null_type:
+            return null_value
         result = builder.phi(ret_type)
-
-        # both blocks branch to continuation block (unless they terminate)
-        if then_result.type != void_type:
-            with builder.goto_block(then_block):
-                builder.branch(cont_block)
-            result.add_incoming(then_result, then_block)
-        if else_result.type != void_type:
-            with builder.goto_block(else_block):
-                builder.branch(cont_block)
-            result.add_incoming(else_result, else_block)
+        for value, block in incoming:
+            result.add_incoming(value, block)
         return result
 
     def _gen_Return(self, expr):
@@ -312,21 +482,8 @@ class IRGenerator(object):
         if arg.type == void_type:
             return arg
 
-        if self._returned_type == arg.type:
-            pass
-        elif self._returned_type is None:
-            self._returned_type = arg.type
-        elif self._returned_type == real_type and arg.type == int_type:
-            arg = self.int_to_real(arg)
-        elif self._returned_type == int_type and arg.type == real_type:
-            self._returned_type = arg.type
-        else:
-            raise CompileError(
-                "Conflicting return types {} and {}.".format(
-                    self._returned_type, arg.type
-                )
-            )
-        return self.builder.ret(arg)
+        self._returned_type = self.unify_types(self._returned_type, arg.type)
+        return self.emit_return(arg)
 
     @int_real_args(1)
     def _gen_Plus(self, args, ret_type):
@@ -624,3 +781,740 @@ class IRGenerator(object):
     @int_args
     def _gen_BitNot(self, args):
         return self.builder.not_(args[0])
+
+    @single_real_arg
+    def _gen_Sqrt(self, args):
+        return self.call_fp_intr("llvm.sqrt", args)
+
+    @int_real_args(2)
+    def _gen_Mod(self, args, ret_type):
+        if len(args) != 2:
+            raise CompileError()
+        builder = self.builder
+        x, m = args
+        if ret_type == int_type:
+            self.check(builder.icmp_signed("!=", m, int_type(0)))
+            # the result has the sign of m
+            rem = builder.srem(x, m)
+            adjust = builder.and_(
+                builder.icmp_signed("!=", rem, int_type(0)),
+                builder.icmp_signed("<", builder.xor(rem, m), int_type(0)),
+            )
+            return builder.select(adjust, builder.add(rem, m), rem)
+        elif ret_type == real_type:
+            quotient = self.call_fp_intr("llvm.floor", [builder.fdiv(x, m)])
+            return builder.fsub(x, builder.fmul(m, quotient))
+
+    @int_args
+    def _gen_Quotient(self, args):
+        if len(args) != 2:
+            raise CompileError()
+        builder = self.builder
+        n, m = args
+        self.check(builder.icmp_signed("!=", m, int_type(0)))
+        # round towards minus infinity
+        quotient = builder.sdiv(n, m)
+        rem = builder.srem(n, m)
+        adjust = builder.and_(
+            builder.icmp_signed("!=", rem, int_type(0)),
+            builder.icmp_signed("<", builder.xor(rem, m), int_type(0)),
+        )
+        return builder.select(adjust, builder.sub(quotient, int_type(1)), quotient)
+
+    # run-time checks and memory
+
+    def condition(self, expr):
+        cond = self._gen_ir(expr)
+        if cond.type == int_type:
+            cond = self.int_to_bool(cond)
+        if cond.type != bool_type:
+            raise CompileError()
+        return cond
+
+    def check(self, cond):
+        """
+        continues if cond holds and otherwise sets the error flag and returns
+        """
+        builder = self.builder
+        if self.error_block is None:
+            self.error_block = builder.function.append_basic_block(name="error")
+        ok_block = builder.append_basic_block(name="ok")
+        builder.cbranch(cond, ok_block, self.error_block)
+        builder.position_at_end(ok_block)
+
+    def allocate(self, elem_type, count):
+        """
+        allocates memory for count elements of elem_type, which lives as long
+        as the call of the compiled function (see runtime.arena)
+        """
+        builder = self.builder
+        byte_ptr = ir.IntType(8).as_pointer()
+        alloc_type = ir.FunctionType(byte_ptr, [int_type])
+        alloc = builder.inttoptr(int_type(allocate_address), alloc_type.as_pointer())
+        data = builder.call(alloc, [builder.mul(count, int_type(8))])
+        self.check(builder.icmp_unsigned("!=", data, ir.Constant(byte_ptr, None)))
+        return builder.bitcast(data, elem_type.as_pointer())
+
+    def copy_elements(self, dest, src, count):
+        builder = self.builder
+        byte_ptr = ir.IntType(8).as_pointer()
+        memmove = builder.module.declare_intrinsic(
+            "llvm.memmove", [byte_ptr, byte_ptr, int_type]
+        )
+        builder.call(
+            memmove,
+            [
+                builder.bitcast(dest, byte_ptr),
+                builder.bitcast(src, byte_ptr),
+                builder.mul(count, int_type(8)),
+                bool_type(0),
+            ],
+        )
+
+    # tensors
+
+    def make_tensor(self, typ, data, dims):
+        builder = self.builder
+        value = builder.insert_value(ir.Constant(typ, None), data, 0)
+        for k, dim in enumerate(dims):
+            value = builder.insert_value(value, dim, k + 1)
+        return value
+
+    def new_tensor(self, elem_type, dims):
+        size = reduce(self.builder.mul, dims)
+        data = self.allocate(elem_type, size)
+        tensor = self.make_tensor(tensor_type(elem_type, len(dims)), data, dims)
+        self._fresh.add(id(tensor))
+        return tensor
+
+    def copy_tensor(self, tensor):
+        dims = self.tensor_dims(tensor)
+        result = self.new_tensor(tensor_elem_type(tensor.type), dims)
+        self.copy_elements(
+            self.tensor_data(result), self.tensor_data(tensor), self.tensor_size(tensor)
+        )
+        return result
+
+    def tensor_data(self, tensor):
+        return self.builder.extract_value(tensor, 0)
+
+    def tensor_dims(self, tensor):
+        return [
+            self.builder.extract_value(tensor, k + 1)
+            for k in range(tensor_rank(tensor.type))
+        ]
+
+    def tensor_size(self, tensor):
+        return reduce(self.builder.mul, self.tensor_dims(tensor))
+
+    def check_dims(self, dims1, dims2):
+        builder = self.builder
+        if dims1:
+            self.check(
+                reduce(
+                    builder.and_,
+                    [
+                        builder.icmp_signed("==", dim1, dim2)
+                        for dim1, dim2 in zip(dims1, dims2)
+                    ],
+                )
+            )
+
+    def part_pointer(self, tensor, indices):
+        """
+        returns a pointer to the part of tensor with the given indices, which
+        are checked to be in range, and the dimensions of that part
+        """
+        builder = self.builder
+        dims = self.tensor_dims(tensor)
+        if len(indices) > len(dims) or any(index.type != int_type for index in indices):
+            raise CompileError()
+        offset = int_type(0)
+        for index, dim in zip(indices, dims):
+            # negative indices count from the end
+            index = builder.select(
+                builder.icmp_signed("<", index, int_type(0)),
+                builder.add(index, builder.add(dim, int_type(1))),
+                index,
+            )
+            self.check(
+                builder.and_(
+                    builder.icmp_signed(">=", index, int_type(1)),
+                    builder.icmp_signed("<=", index, dim),
+                )
+            )
+            offset = builder.add(
+                builder.mul(offset, dim), builder.sub(index, int_type(1))
+            )
+        rest = dims[len(indices) :]
+        for dim in rest:
+            offset = builder.mul(offset, dim)
+        return builder.gep(self.tensor_data(tensor), [offset]), rest
+
+    def part(self, tensor, indices):
+        ptr, dims = self.part_pointer(tensor, indices)
+        if not dims:
+            return self.builder.load(ptr)
+        return self.make_tensor(
+            tensor_type(tensor_elem_type(tensor.type), len(dims)), ptr, dims
+        )
+
+    def _gen_List(self, expr):
+        builder = self.builder
+        values = [self._gen_ir(leaf) for leaf in expr.get_leaves()]
+        if not values:
+            raise CompileError()
+        types = set(value.type for value in values)
+        count = int_type(len(values))
+        if types <= set((int_type, real_type)):
+            elem_type = real_type if real_type in types else int_type
+            tensor = self.new_tensor(elem_type, [count])
+            data = self.tensor_data(tensor)
+            for k, value in enumerate(values):
+                if value.type != elem_type:
+                    value = self.int_to_real(value)
+                builder.store(value, builder.gep(data, [int_type(k)]))
+        elif len(types) == 1 and is_tensor_type(values[0].type):
+            # all rows have to have the same dimensions
+            dims = self.tensor_dims(values[0])
+            size = self.tensor_size(values[0])
+            tensor = self.new_tensor(tensor_elem_type(values[0].type), [count] + dims)
+            data = self.tensor_data(tensor)
+            for k, value in enumerate(values):
+                self.check_dims(dims, self.tensor_dims(value))
+                dest = builder.gep(data, [builder.mul(int_type(k), size)])
+                self.copy_elements(dest, self.tensor_data(value), size)
+        else:
+            raise CompileError()
+        return tensor
+
+    def _gen_Part(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) < 2:
+            raise CompileError()
+        tensor = self._gen_ir(leaves[0])
+        if not is_tensor_type(tensor.type):
+            raise CompileError()
+        indices = [self._gen_ir(leaf) for leaf in leaves[1:]]
+        return self.part(tensor, indices)
+
+    def _gen_Length(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) != 1:
+            raise CompileError()
+        value = self._gen_ir(leaves[0])
+        if is_tensor_type(value.type):
+            return self.tensor_dims(value)[0]
+        elif value.type in (int_type, real_type, bool_type):
+            return int_type(0)
+        raise CompileError()
+
+    def _gen_Total(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) != 1:
+            raise CompileError()
+        builder = self.builder
+        tensor = self._gen_ir(leaves[0])
+        if not (is_tensor_type(tensor.type) and tensor_rank(tensor.type) == 1):
+            raise CompileError()
+        elem_type = tensor_elem_type(tensor.type)
+        data = self.tensor_data(tensor)
+        total = self._alloca(elem_type)
+        builder.store(ir.Constant(elem_type, 0), total)
+
+        def body(k, next_block):
+            value = builder.load(builder.gep(data, [k]))
+            if elem_type == real_type:
+                builder.store(builder.fadd(builder.load(total), value), total)
+            else:
+                builder.store(builder.add(builder.load(total), value), total)
+
+        self.loop(self.tensor_dims(tensor)[0], body)
+        return builder.load(total)
+
+    # variables
+
+    def _alloca(self, typ):
+        with self.builder.goto_block(self.entry_block):
+            return self.builder.alloca(typ)
+
+    @contextmanager
+    def scope(self, names):
+        """
+        restores the variables with the given names when leaving the block
+        """
+        saved = [(name, self.variables.get(name, self)) for name in names]
+        try:
+            yield
+        finally:
+            for name, ptr in saved:
+                if ptr is self:
+                    self.variables.pop(name, None)
+                else:
+                    self.variables[name] = ptr
+
+    def declare_variable(self, name, typ):
+        # a type the variable was widened to in an earlier pass takes precedence
+        typ = self._var_types.setdefault(name, typ)
+        ptr = self._alloca(typ)
+        self.variables[name] = ptr
+        return ptr
+
+    def store_variable(self, name, value):
+        if not (
+            value.type in (int_type, real_type, bool_type) or is_tensor_type(value.type)
+        ):
+            raise CompileError()
+        ptr = self.variables[name]
+        if ptr is None:
+            ptr = self.declare_variable(name, value.type)
+        typ = ptr.type.pointee
+        if value.type == typ:
+            pass
+        elif typ == real_type and value.type == int_type:
+            value = self.int_to_real(value)
+        elif typ == int_type and value.type == real_type:
+            self._var_types[name] = real_type
+            raise _Regenerate()
+        else:
+            raise CompileError()
+        if is_tensor_type(typ) and id(value) not in self._fresh:
+            # variables have their own copy of tensors, so that assigning parts
+            # of one doesn't change others
+            value = self.copy_tensor(value)
+        self.builder.store(value, ptr)
+
+    def assign(self, target, value):
+        builder = self.builder
+        if isinstance(target, Symbol):
+            name = target.get_name()
+            if name not in self.variables:
+                raise CompileError()
+            self.store_variable(name, value)
+        elif target.has_form("Part", 2, None) and isinstance(target.leaves[0], Symbol):
+            name = target.leaves[0].get_name()
+            ptr = self.variables.get(name)
+            if ptr is None or not is_tensor_type(ptr.type.pointee):
+                raise CompileError()
+            tensor = builder.load(ptr)
+            elem_type = tensor_elem_type(tensor.type)
+            indices = [self._gen_ir(leaf) for leaf in target.leaves[1:]]
+            part_ptr, dims = self.part_pointer(tensor, indices)
+            if dims:
+                if value.type != tensor_type(elem_type, len(dims)):
+                    raise CompileError()
+                self.check_dims(dims, self.tensor_dims(value))
+                self.copy_elements(
+                    part_ptr, self.tensor_data(value), self.tensor_size(value)
+                )
+            else:
+                if value.type == int_type and elem_type == real_type:
+                    value = self.int_to_real(value)
+                if value.type != elem_type:
+                    raise CompileError()
+                builder.store(value, part_ptr)
+            if any(arg.name == name for arg in self.args):
+                self.mutated_args.add(name)
+        else:
+            raise CompileError()
+
+    def _gen_Set(self, expr):
+        if not expr.has_form("Set", 2):
+            raise CompileError()
+        lhs, rhs = expr.get_leaves()
+        if lhs.has_form("List", None) and rhs.has_form("List", len(lhs.leaves)):
+            # {a, b} = {b, a} computes all values before assigning them
+            values = [self._gen_ir(leaf) for leaf in rhs.leaves]
+            if any(value.type == void_type for value in values):
+                raise CompileError()
+            for target, value in zip(lhs.leaves, values):
+                self.assign(target, value)
+            return null_value
+        value = self._gen_ir(rhs)
+        if value.type == void_type:
+            return value
+        self.assign(lhs, value)
+        return value
+
+    def _update(self, expr, operator, operand, post=False):
+        leaves = expr.get_leaves()
+        if len(leaves) != (1 if operand is not None else 2):
+            raise CompileError()
+        target = leaves[0]
+        if operand is None:
+            operand = leaves[1]
+        old = self._gen_ir(target) if post else None
+        new = self._gen_Set(Expression("Set", target, operator(target, operand)))
+        return old if post else new
+
+    def _gen_Increment(self, expr):
+        return self._update(expr, _plus, Integer(1), post=True)
+
+    def _gen_Decrement(self, expr):
+        return self._update(expr, _plus, Integer(-1), post=True)
+
+    def _gen_PreIncrement(self, expr):
+        return self._update(expr, _plus, Integer(1))
+
+    def _gen_PreDecrement(self, expr):
+        return self._update(expr, _plus, Integer(-1))
+
+    def _gen_AddTo(self, expr):
+        return self._update(expr, _plus, None)
+
+    def _gen_SubtractFrom(self, expr):
+        return self._update(expr, _minus, None)
+
+    def _gen_TimesBy(self, expr):
+        return self._update(expr, _times, None)
+
+    def _gen_DivideBy(self, expr):
+        return self._update(expr, _divide, None)
+
+    def _gen_Module(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) != 2 or not leaves[0].has_form("List", None):
+            raise CompileError()
+        names = []
+        values = []
+        for spec in leaves[0].leaves:
+            if isinstance(spec, Symbol):
+                name = spec.get_name()
+                value = None
+            elif spec.has_form("Set", 2) and isinstance(spec.leaves[0], Symbol):
+                name = spec.leaves[0].get_name()
+                # initial values are computed outside of the new scope
+                value = self._gen_ir(spec.leaves[1])
+                if value.type == void_type:
+                    return value
+            else:
+                raise CompileError()
+            names.append(name)
+            values.append(value)
+        with self.scope(names):
+            for name, value in zip(names, values):
+                self.variables[name] = None
+                if value is not None:
+                    self.store_variable(name, value)
+                elif name in self._var_types:
+                    self.declare_variable(name, self._var_types[name])
+            return self._gen_ir(leaves[1])
+
+    # compiled code has no dynamic scoping, so all of these are the same
+    _gen_Block = _gen_Module
+    _gen_With = _gen_Module
+
+    # control flow
+
+    def _gen_CompoundExpression(self, expr):
+        result = null_value
+        for leaf in expr.get_leaves():
+            result = self._gen_ir(leaf)
+            if result.type == void_type:
+                # the rest is never reached
+                break
+        return result
+
+    def loop(self, count, body):
+        """
+        generates a loop calling body(k, next_block) to generate the code for
+        k = 0, ..., count - 1; branching to next_block continues with the next
+        iteration
+        """
+        builder = self.builder
+        counter = self._alloca(int_type)
+        builder.store(int_type(0), counter)
+        cond_block = builder.append_basic_block(name="loop.cond")
+        body_block = builder.append_basic_block(name="loop.body")
+        next_block = builder.append_basic_block(name="loop.next")
+        end_block = builder.append_basic_block(name="loop.end")
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        k = builder.load(counter)
+        builder.cbranch(builder.icmp_signed("<", k, count), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        body(k, next_block)
+        if not builder.block.is_terminated:
+            builder.branch(next_block)
+
+        builder.position_at_end(next_block)
+        builder.store(builder.add(k, int_type(1)), counter)
+        builder.branch(cond_block)
+
+        builder.position_at_end(end_block)
+
+    def loop_body(self, expr, next_block, end_block):
+        # Continue[] and Break[] branch to next_block and end_block
+        self.loops.append((next_block, end_block))
+        try:
+            self._gen_ir(expr)
+        finally:
+            self.loops.pop()
+
+    def iterator(self, spec):
+        """
+        Sets up the iteration given by an iterator specification {i, imax},
+        {i, imin, imax}, {i, imin, imax, di}, {i, list} or {imax}. Returns
+        the name of the variable (None for {imax}), the number of iterations
+        and a function that gives the value of the variable in the k-th
+        iteration, counting from zero.
+        """
+        builder = self.builder
+        if not spec.has_form("List", None):
+            spec = Expression("List", spec)
+        leaves = spec.get_leaves()
+        if len(leaves) == 1:
+            name = None
+        elif 2 <= len(leaves) <= 4 and isinstance(leaves[0], Symbol):
+            name = leaves[0].get_name()
+            leaves = leaves[1:]
+        else:
+            raise CompileError()
+
+        values = [self._gen_ir(leaf) for leaf in leaves]
+        if len(values) == 1:
+            if name is not None and is_tensor_type(values[0].type):
+                tensor = values[0]
+                count = self.tensor_dims(tensor)[0]
+                return (
+                    name,
+                    count,
+                    lambda k: self.part(tensor, [builder.add(k, int_type(1))]),
+                )
+            values.insert(0, int_type(1))
+        if len(values) == 2:
+            values.append(int_type(1))
+
+        imin, imax, di = values
+        types = set(value.type for value in values)
+        if types == set((int_type,)):
+            self.check(builder.icmp_signed("!=", di, int_type(0)))
+            diff = builder.sub(imax, imin)
+            # no iterations if imax lies in the other direction
+            valid = builder.or_(
+                builder.icmp_signed("==", diff, int_type(0)),
+                builder.icmp_signed(">=", builder.xor(diff, di), int_type(0)),
+            )
+            count = builder.select(
+                valid,
+                builder.add(builder.sdiv(diff, di), int_type(1)),
+                int_type(0),
+            )
+            return name, count, lambda k: builder.add(imin, builder.mul(k, di))
+        elif types <= set((int_type, real_type)):
+            imin, imax, di = [
+                self.int_to_real(value) if value.type == int_type else value
+                for value in values
+            ]
+            self.check(builder.fcmp_ordered("!=", di, real_type(0.0)))
+            steps = self.call_fp_intr(
+                "llvm.floor", [builder.fdiv(builder.fsub(imax, imin), di)]
+            )
+            count = builder.select(
+                builder.fcmp_ordered(">=", steps, real_type(0.0)),
+                builder.add(builder.fptosi(steps, int_type), int_type(1)),
+                int_type(0),
+            )
+            return (
+                name,
+                count,
+                lambda k: builder.fadd(
+                    imin, builder.fmul(builder.sitofp(k, real_type), di)
+                ),
+            )
+        raise CompileError()
+
+    def iterate(self, specs, body, iterators=None):
+        """
+        Generates nested loops over the iterator specifications specs and
+        calls body(next_block) to generate the innermost body. Iterators are
+        set up in the enclosing loop, so that their bounds can depend on outer
+        iterator variables, unless they are passed as set up by iterator().
+        """
+        if iterators is None:
+            name, count, value = self.iterator(specs[0])
+        else:
+            name, count, value = iterators[0]
+            iterators = iterators[1:]
+
+        def loop_body(k, next_block):
+            if name is not None:
+                self.store_variable(name, value(k))
+            if len(specs) > 1:
+                self.iterate(specs[1:], body, iterators)
+            else:
+                body(next_block)
+
+        names = [name] if name is not None else []
+        with self.scope(names):
+            for name_ in names:
+                self.variables[name_] = None
+            self.loop(count, loop_body)
+
+    def _gen_Do(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) < 2:
+            raise CompileError()
+        builder = self.builder
+        end_block = builder.append_basic_block(name="do.end")
+        self.iterate(
+            leaves[1:],
+            lambda next_block: self.loop_body(leaves[0], next_block, end_block),
+        )
+        builder.branch(end_block)
+        builder.position_at_end(end_block)
+        return null_value
+
+    def _gen_Table(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) < 2:
+            raise CompileError()
+        builder = self.builder
+        body, specs = leaves[0], leaves[1:]
+
+        # the dimensions are needed before the first iteration, so the bounds
+        # can't depend on outer iterator variables
+        iterators = []
+        names = []
+        for spec in specs:
+            if any(spec.has_symbol(name) for name in names):
+                raise CompileError()
+            iterator = self.iterator(spec)
+            if iterator[0] is not None:
+                names.append(iterator[0])
+            iterators.append(iterator)
+        counts = [count for _, count, _ in iterators]
+        total = reduce(builder.mul, counts)
+
+        # the result is allocated in the first iteration, once the dimensions
+        # of the body are known
+        init_block = builder.block
+        position = self._alloca(int_type)
+        builder.store(int_type(0), position)
+        result = {}
+
+        def innermost(next_block):
+            value = self._gen_ir(body)
+            if is_tensor_type(value.type):
+                elem_type = tensor_elem_type(value.type)
+                dims = self.tensor_dims(value)
+                size = self.tensor_size(value)
+            elif value.type in (int_type, real_type):
+                elem_type = value.type
+                dims = []
+                size = int_type(1)
+            else:
+                raise CompileError()
+            data_ptr = self._alloca(elem_type.as_pointer())
+            dim_ptrs = [self._alloca(int_type) for _ in dims]
+            with builder.goto_block(init_block):
+                builder.store(ir.Constant(elem_type.as_pointer(), None), data_ptr)
+                for dim_ptr in dim_ptrs:
+                    builder.store(int_type(0), dim_ptr)
+
+            pos = builder.load(position)
+            with builder.if_then(builder.icmp_signed("==", pos, int_type(0))):
+                builder.store(
+                    self.allocate(elem_type, builder.mul(total, size)), data_ptr
+                )
+                for dim, dim_ptr in zip(dims, dim_ptrs):
+                    builder.store(dim, dim_ptr)
+            self.check_dims(dims, [builder.load(dim_ptr) for dim_ptr in dim_ptrs])
+            dest = builder.gep(builder.load(data_ptr), [builder.mul(pos, size)])
+            if dims:
+                self.copy_elements(dest, self.tensor_data(value), size)
+            else:
+                builder.store(value, dest)
+            builder.store(builder.add(pos, int_type(1)), position)
+            result["type"] = elem_type
+            result["data"] = data_ptr
+            result["dims"] = dim_ptrs
+
+        self.iterate(specs, innermost, iterators)
+
+        dims = counts + [builder.load(dim_ptr) for dim_ptr in result["dims"]]
+        tensor = self.make_tensor(
+            tensor_type(result["type"], len(dims)), builder.load(result["data"]), dims
+        )
+        self._fresh.add(id(tensor))
+        return tensor
+
+    def _gen_While(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) not in (1, 2):
+            raise CompileError()
+        builder = self.builder
+        cond_block = builder.append_basic_block(name="while.cond")
+        body_block = builder.append_basic_block(name="while.body")
+        end_block = builder.append_basic_block(name="while.end")
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        builder.cbranch(self.condition(leaves[0]), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        if len(leaves) == 2:
+            self.loop_body(leaves[1], cond_block, end_block)
+        if not builder.block.is_terminated:
+            builder.branch(cond_block)
+
+        builder.position_at_end(end_block)
+        return null_value
+
+    def _gen_For(self, expr):
+        leaves = expr.get_leaves()
+        if len(leaves) not in (3, 4):
+            raise CompileError()
+        builder = self.builder
+        start = self._gen_ir(leaves[0])
+        if start.type == void_type:
+            return start
+        cond_block = builder.append_basic_block(name="for.cond")
+        body_block = builder.append_basic_block(name="for.body")
+        incr_block = builder.append_basic_block(name="for.incr")
+        end_block = builder.append_basic_block(name="for.end")
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        builder.cbranch(self.condition(leaves[1]), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        if len(leaves) == 4:
+            self.loop_body(leaves[3], incr_block, end_block)
+        if not builder.block.is_terminated:
+            builder.branch(incr_block)
+
+        builder.position_at_end(incr_block)
+        if self._gen_ir(leaves[2]).type != void_type:
+            builder.branch(cond_block)
+
+        builder.position_at_end(end_block)
+        return null_value
+
+    def _gen_Break(self, expr):
+        if expr.get_leaves() or not self.loops:
+            raise CompileError()
+        return self.builder.branch(self.loops[-1][1])
+
+    def _gen_Continue(self, expr):
+        if expr.get_leaves() or not self.loops:
+            raise CompileError()
+        return self.builder.branch(self.loops[-1][0])
+
+
+def _plus(x, y):
+    return Expression("Plus", x, y)
+
+
+def _minus(x, y):
+    return Expression("Plus", x, Expression("Times", Integer(-1), y))
+
+
+def _times(x, y):
+    return Expression("Times", x, y)
+
+
+def _divide(x, y):
+    return Expression("Times", x, Expression("Power", y, Integer(-1)))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Run-time support for compiled code.
+
+Tensors are exchanged with compiled code as NumPy buffers. Buffers for
+tensors created by compiled code (e.g. by Table) are allocated through a
+callback into Python, from an arena that lives as long as the call.
+
+Listable compiled functions run a kernel over whole buffers, which can be
+split across a pool of threads: ctypes releases the GIL while native code
+runs.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import ctypes
+import functools
+import os
+import threading
+
+import numpy
+
+from mathics.builtin.compile.types import (
+    int_type,
+    bool_type,
+    is_tensor_type,
+    tensor_elem_type,
+    tensor_rank,
+)
+
+_arenas = threading.local()
+
+
+@contextmanager
+def arena():
+    "Keeps the buffers allocated by compiled code alive within the block."
+    outer = getattr(_arenas, "current", None)
+    _arenas.current = []
+    try:
+        yield
+    finally:
+        _arenas.current = outer
+
+
+@ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_int64)
+def _allocate(size):
+    # returning NULL tells the compiled code that allocation failed.
+    try:
+        buffer = numpy.empty(max(size, 1), dtype=numpy.uint8)
+    except (MemoryError, ValueError):
+        return None
+    _arenas.current.append(buffer)
+    return buffer.ctypes.data
+
+
+allocate_address = ctypes.cast(_allocate, ctypes.c_void_p).value
+
+
+def _dtype(typ):
+    if is_tensor_type(typ):
+        typ = tensor_elem_type(typ)
+    if typ == int_type:
+        return numpy.int64, "iu"
+    elif typ == bool_type:
+        return numpy.bool_, "b"
+    else:
+        return numpy.float64, "iuf"
+
+
+def rank(typ):
+    "The number of dimensions of values of the given type."
+    return tensor_rank(typ) if is_tensor_type(typ) else 0
+
+
+def buffer_argument(value, typ):
+    """
+    Converts value to a contiguous NumPy array of any shape, with the
+    element type of typ. Raises TypeError if that is not possible.
+    """
+    try:
+        array = numpy.asarray(value)
+    except ValueError:
+        raise TypeError(value)
+    dtype, kinds = _dtype(typ)
+    if array.dtype.kind not in kinds:
+        raise TypeError(value)
+    return numpy.ascontiguousarray(array, dtype=dtype)
+
+
+def empty_buffer(shape, typ):
+    return numpy.empty(shape, dtype=_dtype(typ)[0])
+
+
+def tensor_argument(value, typ, copy=False):
+    """
+    Converts value to a contiguous NumPy array with the element type and
+    rank of the tensor type typ. Raises TypeError if that is not possible.
+    """
+    try:
+        array = numpy.asarray(value)
+    except ValueError:
+        raise TypeError(value)
+    dtype, kinds = _dtype(typ)
+    if array.ndim != tensor_rank(typ) or array.dtype.kind not in kinds:
+        raise TypeError(value)
+    if copy:
+        return numpy.array(array, dtype=dtype, order="C")
+    return numpy.ascontiguousarray(array, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=None)
+def tensor_struct(rank):
+    "Returns the ctypes Structure holding a tensor of the given rank."
+    fields = [("data", ctypes.c_void_p)]
+    fields.extend(("dim%d" % k, ctypes.c_int64) for k in range(rank))
+    return type("Tensor%d" % rank, (ctypes.Structure,), {"_fields_": fields})
+
+
+def tensor_result(result, typ):
+    "Copies the tensor described by the tensor_struct result into an array."
+    dtype, _ = _dtype(typ)
+    shape = tuple(getattr(result, "dim%d" % k) for k in range(tensor_rank(typ)))
+    size = int(numpy.prod(shape))
+    if size == 0:
+        return numpy.empty(shape, dtype=dtype)
+    buffer = (ctypes.c_char * (size * 8)).from_address(result.data)
+    return numpy.frombuffer(buffer, dtype=dtype).reshape(shape).copy()
+
+
+# the number of threads parallel kernels run on, and the smallest part of a
+# buffer worth running on a separate thread
+thread_count = os.cpu_count() or 1
+min_chunk_size = 4096
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def thread_pool():
+    "Returns the pool of threads parallel kernels run on."
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=thread_count)
+        return _pool
+
+
+def chunks(size, parallel):
+    "Splits range(size) into (start, stop) pairs to be run in parallel."
+    count = 1
+    if parallel:
+        count = max(1, min(thread_count, size // min_chunk_size))
+    bounds = [size * k // count for k in range(count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
@@ -7,3 +7,30 @@ int_type = ir.IntType(64)
 real_type = ir.DoubleType()
 bool_type = ir.IntType(1)
 void_type = ir.VoidType()
+
+# type of expressions that don't have a value, like Do[...]
+null_type = ir.LiteralStructType([])
+
+
+def tensor_type(elem_type, rank):
+    """
+    Tensors are passed around as a pointer to their elements, stored in
+    row-major order, followed by their dimensions.
+    """
+    return ir.LiteralStructType([elem_type.as_pointer()] + [int_type] * rank)
+
+
+def is_tensor_type(t):
+    return (
+        isinstance(t, ir.LiteralStructType)
+        and len(t.elements) > 1
+        and isinstance(t.elements[0], ir.PointerType)
+    )
+
+
+def tensor_elem_type(t):
+    return t.elements[0].pointee
+
+
+def tensor_rank(t):
+    return len(t.elements) - 1
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from llvmlite import ir
+
 from mathics.builtin.compile.types import int_type, real_type, bool_type, void_type
 from ctypes import c_int64, c_double, c_bool, c_void_p
 
@@ -29,5 +31,7 @@ def llvm_to_ctype(t):
         return c_bool
     elif t == void_type:
         return c_void_p
+    elif isinstance(t, ir.PointerType):
+        return c_void_p
     else:
         raise TypeError(t)
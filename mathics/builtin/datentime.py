@@ -11,7 +11,6 @@ Date object can also input and output dates and times in a wide range of formats
 from datetime import datetime, timedelta
 import dateutil.parser
 import re
-import sys
 import time
 
 from mathics.version import __version__  # noqa used in loading to check consistency.
@@ -27,7 +26,7 @@ from mathics.core.expression import (
     from_python,
 )
 
-from mathics.core.evaluation import TimeoutInterrupt, run_with_timeout_and_stack
+from mathics.core.evaluation import TimeoutInterrupt
 
 from mathics.builtin.base import Builtin, Predefined
 from mathics.settings import TIME_12HOUR
@@ -121,78 +120,86 @@ class TimeRemaining(Builtin):
 
     def apply(self, evaluation):
         "TimeRemaining[]"
-        if len(evaluation.timeout_queue) > 0:
-            t, start_time = evaluation.timeout_queue[-1]
-            curr_time = datetime.now().timestamp()
-            deltat = t + start_time - curr_time
-            return Real(deltat)
-        else:
+        remaining = evaluation.time_remaining()
+        if remaining is None:
             return SymbolInfinity
+        return Real(max(remaining, 0.0))
 
 
-if sys.platform != "win32" and ("Pyston" not in sys.version):
-
-    class TimeConstrained(Builtin):
-        """
-        <dl>
-        <dt>'TimeConstrained[$expr$, $t$]'
-            <dd>'evaluates $expr$, stopping after $t$ seconds.'
-        <dt>'TimeConstrained[$expr$, $t$, $failexpr$]'
-            <dd>'returns $failexpr$ if the time constraint is not met.'
-        </dl>
-
-        Possible issues: for certain time-consuming functions (like simplify)
-        which are based on sympy or other libraries, it is possible that
-        the evaluation continues after the timeout. However, at the end of the evaluation, the function will return $\\$Aborted$ and the results will not affect
-        the state of the mathics kernel.
-
-        """
-
-        # FIXME: these tests sometimes cause SEGVs which probably means
-        # that TimeConstraint has bugs.
+class TimeConstrained(Builtin):
+    """
+    <dl>
+    <dt>'TimeConstrained[$expr$, $t$]'
+        <dd>'evaluates $expr$, stopping after $t$ seconds.'
+    <dt>'TimeConstrained[$expr$, $t$, $failexpr$]'
+        <dd>'returns $failexpr$ if the time constraint is not met.'
+    </dl>
 
-        # Consider testing via unit tests.
-        # >> TimeConstrained[Integrate[Sin[x]^1000000,x],1]
-        # = $Aborted
+    Possible issues: for certain time-consuming functions (like simplify)
+    which are based on sympy or other libraries, it is possible that
+    the evaluation continues after the timeout. However, at the end of the evaluation, the function will return $\\$Aborted$ and the results will not affect
+    the state of the mathics kernel.
+
+    >> TimeConstrained[Pause[5]; x, 0.5]
+     = $Aborted
+    >> TimeConstrained[Pause[5]; x, 0.5, y]
+     = y
+
+    A time constraint only applies to its own computation:
+    >> TimeConstrained[TimeConstrained[Pause[5], 0.5, inner]; x, 10]
+     = x
+
+    #> TimeConstrained[x, Infinity]
+     = x
+    #> TimeConstrained[x, -1]
+     : Number of seconds -1 is not a positive machine-sized number or Infinity.
+     = TimeConstrained[x, -1]
+    """
 
-        # >> TimeConstrained[Integrate[Sin[x]^1000000,x], 1, Integrate[Cos[x],x]]
-        # = Sin[x]
+    # Computations in sympy are not interrupted, so these take much longer
+    # than the time constraint.
+    # >> TimeConstrained[Integrate[Sin[x]^1000000,x],1]
+    # = $Aborted
 
-        # >> s=TimeConstrained[Integrate[Sin[x] ^ 3, x], a]
-        #  : Number of seconds a is not a positive machine-sized number or Infinity.
-        #  = TimeConstrained[Integrate[Sin[x] ^ 3, x], a]
+    # >> TimeConstrained[Integrate[Sin[x]^1000000,x], 1, Integrate[Cos[x],x]]
+    # = Sin[x]
 
-        # >> a=1; s
-        # =  Cos[x] (-5 + Cos[2 x]) / 6
+    # >> s=TimeConstrained[Integrate[Sin[x] ^ 3, x], a]
+    #  : Number of seconds a is not a positive machine-sized number or Infinity.
+    #  = TimeConstrained[Integrate[Sin[x] ^ 3, x], a]
 
-        attributes = ("HoldAll",)
-        messages = {
-            "timc": "Number of seconds `1` is not a positive machine-sized number or Infinity.",
-        }
+    # >> a=1; s
+    # =  Cos[x] (-5 + Cos[2 x]) / 6
 
-        def apply_2(self, expr, t, evaluation):
-            "TimeConstrained[expr_, t_]"
-            return self.apply_3(expr, t, SymbolAborted, evaluation)
+    attributes = ("HoldAll",)
+    messages = {
+        "timc": "Number of seconds `1` is not a positive machine-sized number or Infinity.",
+    }
 
-        def apply_3(self, expr, t, failexpr, evaluation):
-            "TimeConstrained[expr_, t_, failexpr_]"
-            t = t.evaluate(evaluation)
-            if not t.is_numeric():
-                evaluation.message("TimeConstrained", "timc", t)
-                return
-            try:
-                t = float(t.to_python())
-                evaluation.timeout_queue.append((t, datetime.now().timestamp()))
-                request = lambda: expr.evaluate(evaluation)
-                res = run_with_timeout_and_stack(request, t, evaluation)
-            except TimeoutInterrupt:
-                evaluation.timeout_queue.pop()
-                return failexpr.evaluate(evaluation)
-            except:
-                evaluation.timeout_queue.pop()
+    def apply_2(self, expr, t, evaluation):
+        "TimeConstrained[expr_, t_]"
+        return self.apply_3(expr, t, SymbolAborted, evaluation)
+
+    def apply_3(self, expr, t, failexpr, evaluation):
+        "TimeConstrained[expr_, t_, failexpr_]"
+        t = t.evaluate(evaluation)
+        if t.sameQ(Expression("DirectedInfinity", Integer(1))):
+            return expr.evaluate(evaluation)
+        seconds = t.round_to_float(evaluation) if t.is_numeric() else None
+        if seconds is None or seconds <= 0:
+            evaluation.message("TimeConstrained", "timc", t)
+            return
+        deadline = evaluation.push_deadline(seconds)
+        try:
+            return expr.evaluate(evaluation)
+        except TimeoutInterrupt:
+            # the deadline of an enclosing TimeConstrained has passed, or the
+            # evaluation was aborted
+            if evaluation.stopped or time.monotonic() < deadline:
                 raise
-            evaluation.timeout_queue.pop()
-            return res
+        finally:
+            evaluation.pop_deadline()
+        return failexpr.evaluate(evaluation)
 
 
 class Timing(Builtin):
@@ -896,7 +903,13 @@ class Pause(Builtin):
             evaluation.message("Pause", "numnm", Expression("Pause", n))
             return
 
-        time.sleep(sleeptime)
+        # sleep no longer than the enclosing TimeConstrained allows
+        remaining = evaluation.time_remaining()
+        if remaining is not None and remaining < sleeptime:
+            time.sleep(max(remaining, 0))
+            evaluation.check_stopped()
+        else:
+            time.sleep(sleeptime)
         return Symbol("Null")
 
 
@@ -17,6 +17,7 @@ from mathics.core.expression import (
     Rational,
     Real,
     MachineReal,
+    PackedArray,
     Symbol,
     SymbolNull,
     SymbolList,
@@ -125,9 +126,8 @@ def matrix_to_numpy(a):
 def numpy_to_matrix(pixels):
     channels = pixels.shape[2]
     if channels == 1:
-        return pixels[:, :, 0].tolist()
-    else:
-        return pixels.tolist()
+        pixels = pixels[:, :, 0]
+    return PackedArray(pixels)
 
 
 def numpy_flip(pixels, axis):
@@ -1578,7 +1578,7 @@ class ImageData(_ImageBuiltin):
             pixels = pixels.astype(numpy.int)
         else:
             return evaluation.message("ImageData", "pixelfmt", stype)
-        return from_python(numpy_to_matrix(pixels))
+        return numpy_to_matrix(pixels)
 
 
 class ImageTake(_ImageBuiltin):
@@ -9,6 +9,7 @@ Plotting functions take a function as a parameter and data, often a range of poi
 from math import sin, cos, pi, sqrt, isnan, isinf
 import numbers
 import itertools
+import numpy
 import palettable
 
 from mathics.version import __version__  # noqa used in loading to check consistency.
@@ -24,12 +25,13 @@ from mathics.core.expression import (
     SymbolList,
     SymbolN,
     SymbolRule,
+    PackedArray,
 )
 
 from mathics.builtin.base import Builtin
 from mathics.builtin.graphics import Graphics
 from mathics.builtin.drawing.graphics3d import Graphics3D
-from mathics.builtin.numeric import chop
+from mathics.builtin.numeric import chop, _lambdify
 from mathics.builtin.options import options_to_rules
 from mathics.builtin.scoping import dynamic_scoping
 
@@ -288,6 +290,78 @@ def compile_quiet_function(expr, arg_names, evaluation, expect_list):
     return quiet_f
 
 
+def _real_values(values, shape, expect_list):
+    """
+    Converts the result of a function of arrays to a float array of the given
+    shape, or of shape + (k,) for lists of k values. Values which are not real
+    become nan.
+    """
+    if expect_list:
+        values = numpy.stack(
+            [numpy.broadcast_to(value, shape) for value in values], axis=-1
+        )
+    else:
+        values = numpy.broadcast_to(values, shape)
+    if numpy.iscomplexobj(values):
+        values = numpy.where(values.imag == 0, values.real, numpy.nan)
+    return numpy.asarray(values, dtype=float)
+
+
+def compile_quiet_batch_function(expr, arg_names, evaluation, expect_list):
+    """
+    Given an expression return a quiet callable version which takes an
+    array of values for each argument and returns the list of results, None
+    where there is no real result. Evaluates whole arrays with NumPy or a
+    Listable compiled function where possible, and the points where this
+    gives no finite value one at a time.
+    """
+    array_f = _lambdify(expr, arg_names, expect_list)
+    if array_f is None and has_compile and not expect_list:
+        try:
+            array_f = _compile(
+                expr,
+                [CompileArg(arg_name, real_type) for arg_name in arg_names],
+                listable=True,
+            )
+        except CompileError:
+            pass
+    quiet_f = None
+
+    def batch_f(*args):
+        nonlocal array_f, quiet_f
+        arrays = [numpy.asarray(arg, dtype=float) for arg in args]
+        shape = arrays[0].shape
+        values = None
+        if array_f is not None and arrays[0].size:
+            try:
+                with numpy.errstate(all="ignore"):
+                    values = _real_values(array_f(*arrays), shape, expect_list)
+            except Exception:
+                # e.g. a function NumPy doesn't have, or a failure in the
+                # compiled code
+                array_f = None
+        if values is None:
+            values = numpy.full(shape + ((2,) if expect_list else ()), numpy.nan)
+
+        finite = numpy.isfinite(values)
+        if expect_list:
+            finite = finite.all(axis=-1)
+        results = values.tolist()
+        for index in zip(*numpy.nonzero(~finite)):
+            if quiet_f is None:
+                quiet_f = compile_quiet_function(
+                    expr, arg_names, evaluation, expect_list
+                )
+            # results is a nested list for arrays of more than one dimension
+            target = results
+            for i in index[:-1]:
+                target = target[i]
+            target[index[-1]] = quiet_f(*[float(array[index]) for array in arrays])
+        return results
+
+    return batch_f
+
+
 def automatic_plot_range(values):
     """Calculates mean and standard deviation, throwing away all points
     which are more than 'thresh' number of standard deviations away from
@@ -547,10 +621,10 @@ class _Plot(Builtin):
             tmp_mesh_points = []  # For this function only
             continuous = False
             d = (stop - start) / (plotpoints - 1)
-            cf = compile_quiet_function(f, [x_name], evaluation, self.expect_list)
-            for i in range(plotpoints):
-                x_value = start + i * d
-                point = self.eval_f(cf, x_value)
+            cf = compile_quiet_batch_function(f, [x_name], evaluation, self.expect_list)
+            x_values = [start + i * d for i in range(plotpoints)]
+            for x_value, value in zip(x_values, cf(x_values)):
+                point = self.get_point(x_value, value)
                 if point is not None:
                     if continuous:
                         points[-1].append(point)
@@ -609,14 +683,14 @@ class _Plot(Builtin):
             # Cos of the maximum angle between successive line segments
             ang_thresh = cos(pi / 180)
 
+            # each level of refinement is evaluated as one batch
             for line, line_xvalues in zip(points, xvalues):
                 recursion_count = 0
-                smooth = False
-                while not smooth and recursion_count < maxrecursion:
+                while recursion_count < maxrecursion:
                     recursion_count += 1
-                    smooth = True
-                    i = 2
-                    while i < len(line):
+                    # the indices i of the intervals (i - 1, i) to refine
+                    refine = set()
+                    for i in range(2, len(line)):
                         vec1 = (
                             xscale * (line[i - 1][0] - line[i - 2][0]),
                             yscale * (line[i - 1][1] - line[i - 2][1]),
@@ -633,26 +707,31 @@ class _Plot(Builtin):
                         except ZeroDivisionError:
                             angle = 0.0
                         if abs(angle) < ang_thresh:
-                            smooth = False
-                            incr = 0
-
-                            x_value = 0.5 * (line_xvalues[i - 1] + line_xvalues[i])
-
-                            point = self.eval_f(cf, x_value)
-                            if point is not None:
-                                line.insert(i, point)
-                                line_xvalues.insert(i, x_value)
-                                incr += 1
-
-                            x_value = 0.5 * (line_xvalues[i - 2] + line_xvalues[i - 1])
-                            point = self.eval_f(cf, x_value)
-                            if point is not None:
-                                line.insert(i - 1, point)
-                                line_xvalues.insert(i - 1, x_value)
-                                incr += 1
+                            refine.update((i - 1, i))
+                    if not refine:
+                        break
 
-                            i += incr
-                        i += 1
+                    refine = sorted(refine)
+                    new_xvalues = [
+                        0.5 * (line_xvalues[i - 1] + line_xvalues[i]) for i in refine
+                    ]
+                    new_points = dict(
+                        (i, (x_value, self.get_point(x_value, value)))
+                        for i, x_value, value in zip(
+                            refine, new_xvalues, cf(new_xvalues)
+                        )
+                    )
+                    new_line = [line[0]]
+                    new_line_xvalues = [line_xvalues[0]]
+                    for i in range(1, len(line)):
+                        x_value, point = new_points.get(i, (None, None))
+                        if point is not None:
+                            new_line.append(point)
+                            new_line_xvalues.append(x_value)
+                        new_line.append(line[i])
+                        new_line_xvalues.append(line_xvalues[i])
+                    line[:] = new_line
+                    line_xvalues[:] = new_line_xvalues
 
             if exclusions == "System`None":  # Join all the Lines
                 points = [[(xx, yy) for line in points for xx, yy in line]]
@@ -1603,6 +1682,199 @@ class _ListPlot(Builtin):
         )
 
 
+class _Surface(object):
+    """
+    A triangulation of the graph of a function of two variables. Vertices are
+    memoized by their coordinates, and the new vertices of each level of
+    subdivision are evaluated in one call of the batch function f. Triangles
+    are arrays of vertex indices.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.index = {}  # (x, y) -> vertex index
+        self.xs = []
+        self.ys = []
+        self.zs = []  # nan where the function has no real value
+        self.pending = []  # vertices not evaluated yet
+        self.split_edges = set()  # (i, j) with i < j, for subdivided edges
+
+    def vertex(self, x, y):
+        i = self.index.get((x, y))
+        if i is None:
+            i = self.index[(x, y)] = len(self.xs)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.zs.append(numpy.nan)
+            self.pending.append(i)
+        return i
+
+    def midpoint(self, i, j):
+        return self.vertex(
+            0.5 * (self.xs[i] + self.xs[j]), 0.5 * (self.ys[i] + self.ys[j])
+        )
+
+    def evaluate(self):
+        "Evaluates the new vertices in one batch and returns all values."
+        if self.pending:
+            values = self.f(
+                [self.xs[i] for i in self.pending], [self.ys[i] for i in self.pending]
+            )
+            for i, value in zip(self.pending, values):
+                if value is not None:
+                    self.zs[i] = float(value)
+            self.pending = []
+        return numpy.array(self.zs)
+
+    def subdivide(self, triangles):
+        """
+        Splits each triangle into four, the 'triforce' pattern:
+                1
+                /\\
+             4 /__\\ 6
+              /\\  /\\
+             /__\\/__\\
+            2   5    3
+        """
+        children = []
+        for i1, i2, i3 in triangles.tolist():
+            i4, i5, i6 = (
+                self.midpoint(i1, i2),
+                self.midpoint(i2, i3),
+                self.midpoint(i1, i3),
+            )
+            for i, j in ((i1, i2), (i2, i3), (i1, i3)):
+                self.split_edges.add((i, j) if i < j else (j, i))
+            children.extend(((i1, i4, i6), (i4, i2, i5), (i6, i5, i3), (i4, i5, i6)))
+        return numpy.array(children, dtype=int).reshape(-1, 3)
+
+    def refine(self, triangles, depth, max_depth):
+        """
+        Returns the triangles on which the function is defined. Triangles
+        with undefined vertices are subdivided, level by level, up to
+        max_depth to find the edge of the region where it is defined.
+        """
+        result = []
+        while len(triangles):
+            zs = self.evaluate()
+            undefined = numpy.isnan(zs[triangles])
+            defined = ~undefined.any(axis=1)
+            result.append(triangles[defined])
+            if depth >= max_depth:
+                break
+            # stop early where the entire region is undefined, but recurse
+            # 'a little' to avoid missing well defined regions
+            split = ~defined
+            if depth > max_depth // 2:
+                split &= ~undefined.all(axis=1)
+            triangles = self.subdivide(triangles[split])
+            depth += 1
+        return numpy.concatenate(result) if result else triangles
+
+    def edge_keys(self, triangles):
+        "Returns the keys of the edges (i1, i2), (i2, i3), (i1, i3) of each triangle."
+        n = len(self.xs)
+        keys = []
+        for a, b in ((0, 1), (1, 2), (0, 2)):
+            i, j = triangles[:, a], triangles[:, b]
+            keys.append(numpy.minimum(i, j) * n + numpy.maximum(i, j))
+        return numpy.stack(keys, axis=1)
+
+    def bent(self, triangles, ang_thresh):
+        "Returns a mask of the triangles at an angle to a neighbour."
+        zs = self.evaluate()
+        points = numpy.stack([self.xs, self.ys, zs], axis=1)[triangles]
+        normals = numpy.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+        keys = self.edge_keys(triangles).ravel()
+        order = numpy.argsort(keys, kind="stable")
+        shared = keys[order][1:] == keys[order][:-1]
+        t1, t2 = order[:-1][shared] // 3, order[1:][shared] // 3
+        n1, n2 = normals[t1], normals[t2]
+        norms = numpy.sqrt((n1 ** 2).sum(axis=1) * (n2 ** 2).sum(axis=1))
+        with numpy.errstate(all="ignore"):
+            angles = numpy.where(norms == 0, 0.0, (n1 * n2).sum(axis=1) / norms)
+        mask = numpy.zeros(len(triangles), dtype=bool)
+        bent = abs(angles) < ang_thresh
+        mask[t1[bent]] = True
+        mask[t2[bent]] = True
+        return mask
+
+    def fix_split_edges(self, triangles):
+        """
+        Subdivides the triangles with an edge that a neighbour has split.
+        Midpoints that were never evaluated get the mean of the ends.
+        """
+        n = len(self.xs)
+        split_keys = numpy.array(
+            [i * n + j for i, j in self.split_edges], dtype=numpy.int64
+        )
+        done = []
+        while len(triangles):
+            if len(self.xs) != n:
+                # the keys depend on the number of vertices
+                n = len(self.xs)
+                split_keys = numpy.array(
+                    [i * n + j for i, j in self.split_edges], dtype=numpy.int64
+                )
+            mask = numpy.isin(self.edge_keys(triangles), split_keys).any(axis=1)
+            done.append(triangles[~mask])
+            triangles = triangles[mask]
+            children = []
+            for i1, i2, i3 in triangles.tolist():
+                i4, i5, i6 = (
+                    self.fake_midpoint(i1, i2),
+                    self.fake_midpoint(i2, i3),
+                    self.fake_midpoint(i1, i3),
+                )
+                children.extend(
+                    ((i1, i4, i6), (i4, i2, i5), (i6, i5, i3), (i4, i5, i6))
+                )
+            triangles = numpy.array(children, dtype=int).reshape(-1, 3)
+            if len(triangles):
+                zs = numpy.array(self.zs)
+                triangles = triangles[~numpy.isnan(zs[triangles]).any(axis=1)]
+        return numpy.concatenate(done) if done else triangles
+
+    def fake_midpoint(self, i, j):
+        x, y = 0.5 * (self.xs[i] + self.xs[j]), 0.5 * (self.ys[i] + self.ys[j])
+        k = self.index.get((x, y))
+        if k is None:
+            # a vertex of its own, which is not looked up by its coordinates
+            k = len(self.xs)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.zs.append(0.5 * (self.zs[i] + self.zs[j]))
+        return k
+
+    def mesh_line(self, line):
+        """
+        Returns the lists of defined points along a line of vertices,
+        including the midpoints of the edges which were split.
+        """
+        points = [line[0]]
+        for j in line[1:]:
+            stack = [j]
+            while stack:
+                i, k = points[-1], stack[-1]
+                if ((i, k) if i < k else (k, i)) in self.split_edges:
+                    stack.append(
+                        self.index[
+                            (
+                                0.5 * (self.xs[i] + self.xs[k]),
+                                0.5 * (self.ys[i] + self.ys[k]),
+                            )
+                        ]
+                    )
+                else:
+                    points.append(stack.pop())
+        zs = self.zs
+        return [
+            numpy.array([(self.xs[i], self.ys[i], zs[i]) for i in group])
+            for undefined, group in itertools.groupby(points, lambda i: isnan(zs[i]))
+            if not undefined
+        ]
+
+
 class _Plot3D(Builtin):
     messages = {
         "invmaxrec": (
@@ -1708,347 +1980,105 @@ class _Plot3D(Builtin):
 
         # Plot the functions
         graphics = []
+        numx = plotpoints[0] * 1.0
+        numy = plotpoints[1] * 1.0
         for indx, f in enumerate(functions):
-            stored = {}
-
-            cf = compile_quiet_function(
-                f, [x.get_name(), y.get_name()], evaluation, False
+            surface = _Surface(
+                compile_quiet_batch_function(
+                    f, [x.get_name(), y.get_name()], evaluation, False
+                )
             )
 
-            def eval_f(x_value, y_value):
-                try:
-                    return stored[(x_value, y_value)]
-                except KeyError:
-                    value = cf(x_value, y_value)
-                    if value is not None:
-                        value = float(value)
-                    stored[(x_value, y_value)] = value
-                    return value
-
-            triangles = []
-
-            split_edges = set([])  # subdivided edges
-
-            def triangle(x1, y1, x2, y2, x3, y3, depth=0):
-                v1, v2, v3 = eval_f(x1, y1), eval_f(x2, y2), eval_f(x3, y3)
-
-                if (v1 is v2 is v3 is None) and (depth > max_depth // 2):
-                    # fast finish because the entire region is undefined but
-                    # recurse 'a little' to avoid missing well defined regions
-                    return
-                elif v1 is None or v2 is None or v3 is None:
-                    # 'triforce' pattern recursion to find the edge of defined region
-                    #         1
-                    #         /\
-                    #      4 /__\ 6
-                    #       /\  /\
-                    #      /__\/__\
-                    #     2   5    3
-                    if depth < max_depth:
-                        x4, y4 = 0.5 * (x1 + x2), 0.5 * (y1 + y2)
-                        x5, y5 = 0.5 * (x2 + x3), 0.5 * (y2 + y3)
-                        x6, y6 = 0.5 * (x1 + x3), 0.5 * (y1 + y3)
-                        split_edges.add(
-                            ((x1, y1), (x2, y2))
-                            if (x2, y2) > (x1, y1)
-                            else ((x2, y2), (x1, y1))
-                        )
-                        split_edges.add(
-                            ((x2, y2), (x3, y3))
-                            if (x3, y3) > (x2, y2)
-                            else ((x3, y3), (x2, y2))
-                        )
-                        split_edges.add(
-                            ((x1, y1), (x3, y3))
-                            if (x3, y3) > (x1, y1)
-                            else ((x3, y3), (x1, y1))
-                        )
-                        triangle(x1, y1, x4, y4, x6, y6, depth + 1)
-                        triangle(x4, y4, x2, y2, x5, y5, depth + 1)
-                        triangle(x6, y6, x5, y5, x3, y3, depth + 1)
-                        triangle(x4, y4, x5, y5, x6, y6, depth + 1)
-                    return
-                triangles.append(sorted(((x1, y1, v1), (x2, y2, v2), (x3, y3, v3))))
-
             # linear (grid) sampling
-            numx = plotpoints[0] * 1.0
-            numy = plotpoints[1] * 1.0
-            for xi in range(plotpoints[0]):
-                for yi in range(plotpoints[1]):
-                    # Decide which way to break the square grid into triangles
-                    # by looking at diagonal lengths.
-                    #
-                    # 3___4        3___4
-                    # |\  |        |  /|
-                    # | \ | versus | / |
-                    # |__\|        |/__|
-                    # 1   2        1   2
-                    #
-                    # Approaching the boundary of the well defined region is
-                    # important too. Use first stategy if 1 or 4 are undefined
-                    # and stategy 2 if either 2 or 3 are undefined.
-                    #
-                    (x1, x2, x3, x4) = (
-                        xstart + value * (xstop - xstart)
-                        for value in (
-                            xi / numx,
-                            (xi + 1) / numx,
-                            xi / numx,
-                            (xi + 1) / numx,
+            grid = numpy.array(
+                [
+                    [
+                        surface.vertex(
+                            xstart + xi / numx * (xstop - xstart),
+                            ystart + yi / numy * (ystop - ystart),
                         )
-                    )
-                    (y1, y2, y3, y4) = (
-                        ystart + value * (ystop - ystart)
-                        for value in (
-                            yi / numy,
-                            yi / numy,
-                            (yi + 1) / numy,
-                            (yi + 1) / numy,
-                        )
-                    )
+                        for yi in range(plotpoints[1] + 1)
+                    ]
+                    for xi in range(plotpoints[0] + 1)
+                ]
+            )
+            zs = surface.evaluate()
 
-                    v1 = eval_f(x1, y1)
-                    v2 = eval_f(x2, y2)
-                    v3 = eval_f(x3, y3)
-                    v4 = eval_f(x4, y4)
-
-                    if v1 is None or v4 is None:
-                        triangle(x1, y1, x2, y2, x3, y3)
-                        triangle(x4, y4, x3, y3, x2, y2)
-                    elif v2 is None or v3 is None:
-                        triangle(x2, y2, x1, y1, x4, y4)
-                        triangle(x3, y3, x4, y4, x1, y1)
-                    else:
-                        if abs(v3 - v2) > abs(v4 - v1):
-                            triangle(x2, y2, x1, y1, x4, y4)
-                            triangle(x3, y3, x4, y4, x1, y1)
-                        else:
-                            triangle(x1, y1, x2, y2, x3, y3)
-                            triangle(x4, y4, x3, y3, x2, y2)
+            # Decide which way to break the square grid into triangles
+            # by looking at diagonal lengths.
+            #
+            # 3___4        3___4
+            # |\  |        |  /|
+            # | \ | versus | / |
+            # |__\|        |/__|
+            # 1   2        1   2
+            #
+            # Approaching the boundary of the well defined region is
+            # important too. Use first stategy if 1 or 4 are undefined
+            # and stategy 2 if either 2 or 3 are undefined.
+            i1, i2 = grid[:-1, :-1].ravel(), grid[1:, :-1].ravel()
+            i3, i4 = grid[:-1, 1:].ravel(), grid[1:, 1:].ravel()
+            z1, z2, z3, z4 = zs[i1], zs[i2], zs[i3], zs[i4]
+            with numpy.errstate(invalid="ignore"):
+                first = (
+                    numpy.isnan(z1)
+                    | numpy.isnan(z4)
+                    | ~(
+                        numpy.isnan(z2)
+                        | numpy.isnan(z3)
+                        | (abs(z3 - z2) > abs(z4 - z1))
+                    )
+                )
+            triangles = numpy.concatenate(
+                [
+                    numpy.stack([i1, i2, i3], axis=1)[first],
+                    numpy.stack([i4, i3, i2], axis=1)[first],
+                    numpy.stack([i2, i1, i4], axis=1)[~first],
+                    numpy.stack([i3, i4, i1], axis=1)[~first],
+                ]
+            )
+            triangles = surface.refine(triangles, 0, max_depth)
 
             # adaptive resampling
-            # TODO: optimise this
             # Cos of the maximum angle between successive line segments
             ang_thresh = cos(20 * pi / 180)
             for depth in range(1, max_depth):
-                needs_removal = set([])
-                lent = len(triangles)  # number of initial triangles
-                for i1 in range(lent):
-                    for i2 in range(lent):
-                        # find all edge pairings
-                        if i1 == i2:
-                            continue
-                        t1 = triangles[i1]
-                        t2 = triangles[i2]
-
-                        edge_pairing = (
-                            (t1[0], t1[1]) == (t2[0], t2[1])
-                            or (t1[0], t1[1]) == (t2[1], t2[2])
-                            or (t1[0], t1[1]) == (t2[0], t2[2])
-                            or (t1[1], t1[2]) == (t2[0], t2[1])
-                            or (t1[1], t1[2]) == (t2[1], t2[2])
-                            or (t1[1], t1[2]) == (t2[0], t2[2])
-                            or (t1[0], t1[2]) == (t2[0], t2[1])
-                            or (t1[0], t1[2]) == (t2[1], t2[2])
-                            or (t1[0], t1[2]) == (t2[0], t2[2])
-                        )
-                        if not edge_pairing:
-                            continue
-                        v1 = [t1[1][i] - t1[0][i] for i in range(3)]
-                        w1 = [t1[2][i] - t1[0][i] for i in range(3)]
-                        v2 = [t2[1][i] - t2[0][i] for i in range(3)]
-                        w2 = [t2[2][i] - t2[0][i] for i in range(3)]
-                        n1 = (  # surface normal for t1
-                            (v1[1] * w1[2]) - (v1[2] * w1[1]),
-                            (v1[2] * w1[0]) - (v1[0] * w1[2]),
-                            (v1[0] * w1[1]) - (v1[1] * w1[0]),
-                        )
-                        n2 = (  # surface normal for t2
-                            (v2[1] * w2[2]) - (v2[2] * w2[1]),
-                            (v2[2] * w2[0]) - (v2[0] * w2[2]),
-                            (v2[0] * w2[1]) - (v2[1] * w2[0]),
-                        )
-                        try:
-                            angle = (
-                                n1[0] * n2[0] + n1[1] * n2[1] + n1[2] * n2[2]
-                            ) / sqrt(
-                                (n1[0] ** 2 + n1[1] ** 2 + n1[2] ** 2)
-                                * (n2[0] ** 2 + n2[1] ** 2 + n2[2] ** 2)
-                            )
-                        except ZeroDivisionError:
-                            angle = 0.0
-                        if abs(angle) < ang_thresh:
-                            for i, t in ((i1, t1), (i2, t2)):
-                                # subdivide
-                                x1, y1 = t[0][0], t[0][1]
-                                x2, y2 = t[1][0], t[1][1]
-                                x3, y3 = t[2][0], t[2][1]
-                                x4, y4 = 0.5 * (x1 + x2), 0.5 * (y1 + y2)
-                                x5, y5 = 0.5 * (x2 + x3), 0.5 * (y2 + y3)
-                                x6, y6 = 0.5 * (x1 + x3), 0.5 * (y1 + y3)
-                                needs_removal.add(i)
-                                split_edges.add(
-                                    ((x1, y1), (x2, y2))
-                                    if (x2, y2) > (x1, y1)
-                                    else ((x2, y2), (x1, y1))
-                                )
-                                split_edges.add(
-                                    ((x2, y2), (x3, y3))
-                                    if (x3, y3) > (x2, y2)
-                                    else ((x3, y3), (x2, y2))
-                                )
-                                split_edges.add(
-                                    ((x1, y1), (x3, y3))
-                                    if (x3, y3) > (x1, y1)
-                                    else ((x3, y3), (x1, y1))
-                                )
-                                triangle(x1, y1, x4, y4, x6, y6, depth=depth)
-                                triangle(x2, y2, x4, y4, x5, y5, depth=depth)
-                                triangle(x3, y3, x5, y5, x6, y6, depth=depth)
-                                triangle(x4, y4, x5, y5, x6, y6, depth=depth)
-                # remove subdivided triangles which have been divided
-                triangles = [
-                    t for i, t in enumerate(triangles) if i not in needs_removal
-                ]
+                bent = surface.bent(triangles, ang_thresh)
+                if not bent.any():
+                    break
+                children = surface.subdivide(triangles[bent])
+                triangles = numpy.concatenate(
+                    [triangles[~bent], surface.refine(children, depth, max_depth)]
+                )
 
             # fix up subdivided edges
-            #
-            # look at every triangle and see if its edges need updating.
-            # depending on how many edges require subdivision we proceede with
-            # one of two subdivision strategies
-            #
-            # TODO possible optimisation: don't look at every triangle again
-            made_changes = True
-            while made_changes:
-                made_changes = False
-                new_triangles = []
-                for i, t in enumerate(triangles):
-                    new_points = []
-                    if ((t[0][0], t[0][1]), (t[1][0], t[1][1])) in split_edges:
-                        new_points.append([0, 1])
-                    if ((t[1][0], t[1][1]), (t[2][0], t[2][1])) in split_edges:
-                        new_points.append([1, 2])
-                    if ((t[0][0], t[0][1]), (t[2][0], t[2][1])) in split_edges:
-                        new_points.append([0, 2])
-
-                    if len(new_points) == 0:
-                        continue
-                    made_changes = True
-                    # 'triforce' subdivision
-                    #         1
-                    #         /\
-                    #      4 /__\ 6
-                    #       /\  /\
-                    #      /__\/__\
-                    #     2   5    3
-                    # if less than three edges require subdivision bisect them
-                    # anyway but fake their values by averaging
-                    x4 = 0.5 * (t[0][0] + t[1][0])
-                    y4 = 0.5 * (t[0][1] + t[1][1])
-                    v4 = stored.get((x4, y4), 0.5 * (t[0][2] + t[1][2]))
-
-                    x5 = 0.5 * (t[1][0] + t[2][0])
-                    y5 = 0.5 * (t[1][1] + t[2][1])
-                    v5 = stored.get((x5, y5), 0.5 * (t[1][2] + t[2][2]))
-
-                    x6 = 0.5 * (t[0][0] + t[2][0])
-                    y6 = 0.5 * (t[0][1] + t[2][1])
-                    v6 = stored.get((x6, y6), 0.5 * (t[0][2] + t[2][2]))
-
-                    if not (v4 is None or v6 is None):
-                        new_triangles.append(sorted((t[0], (x4, y4, v4), (x6, y6, v6))))
-                    if not (v4 is None or v5 is None):
-                        new_triangles.append(sorted((t[1], (x4, y4, v4), (x5, y5, v5))))
-                    if not (v5 is None or v6 is None):
-                        new_triangles.append(sorted((t[2], (x5, y5, v5), (x6, y6, v6))))
-                    if not (v4 is None or v5 is None or v6 is None):
-                        new_triangles.append(
-                            sorted(((x4, y4, v4), (x5, y5, v5), (x6, y6, v6)))
-                        )
-                    triangles[i] = None
-
-                triangles.extend(new_triangles)
-                triangles = [t for t in triangles if t is not None]
+            triangles = surface.fix_split_edges(triangles)
 
             # add the mesh
             mesh_points = []
             if mesh == "System`Full":
-                for xi in range(plotpoints[0] + 1):
-                    xval = xstart + xi / numx * (xstop - xstart)
-                    mesh_row = []
-                    for yi in range(plotpoints[1] + 1):
-                        yval = ystart + yi / numy * (ystop - ystart)
-                        z = stored[(xval, yval)]
-                        mesh_row.append((xval, yval, z))
-                    mesh_points.append(mesh_row)
-
-                for yi in range(plotpoints[1] + 1):
-                    yval = ystart + yi / numy * (ystop - ystart)
-                    mesh_col = []
-                    for xi in range(plotpoints[0] + 1):
-                        xval = xstart + xi / numx * (xstop - xstart)
-                        z = stored[(xval, yval)]
-                        mesh_col.append((xval, yval, z))
-                    mesh_points.append(mesh_col)
-
-                # handle edge subdivisions
-                made_changes = True
-                while made_changes:
-                    made_changes = False
-                    for mesh_line in mesh_points:
-                        i = 0
-                        while i < len(mesh_line) - 1:
-                            x1, y1, v1 = mesh_line[i]
-                            x2, y2, v2 = mesh_line[i + 1]
-                            key = (
-                                ((x1, y1), (x2, y2))
-                                if (x2, y2) > (x1, y1)
-                                else ((x2, y2), (x1, y1))
-                            )
-                            if key in split_edges:
-                                x3 = 0.5 * (x1 + x2)
-                                y3 = 0.5 * (y1 + y2)
-                                v3 = stored[(x3, y3)]
-                                mesh_line.insert(i + 1, (x3, y3, v3))
-                                made_changes = True
-                                i += 1
-                            i += 1
-
-                # handle missing regions
-                old_meshpoints, mesh_points = mesh_points, []
-                for mesh_line in old_meshpoints:
-                    mesh_points.extend(
-                        [
-                            sorted(g)
-                            for k, g in itertools.groupby(
-                                mesh_line, lambda x: x[2] is None
-                            )
-                        ]
-                    )
-                mesh_points = [
-                    mesh_line
-                    for mesh_line in mesh_points
-                    if not any(x[2] is None for x in mesh_line)
-                ]
+                for line in list(grid) + list(grid.T):
+                    mesh_points.extend(surface.mesh_line(line.tolist()))
             elif mesh == "System`All":
-                mesh_points = set([])
-                for t in triangles:
-                    mesh_points.add((t[0], t[1]) if t[1] > t[0] else (t[1], t[0]))
-                    mesh_points.add((t[1], t[2]) if t[2] > t[1] else (t[2], t[1]))
-                    mesh_points.add((t[0], t[2]) if t[2] > t[0] else (t[2], t[0]))
-                mesh_points = list(mesh_points)
+                keys = numpy.unique(surface.edge_keys(triangles))
+                n = len(surface.xs)
+                vertices = numpy.stack([surface.xs, surface.ys, surface.zs], axis=1)
+                if len(keys):
+                    mesh_points.append(
+                        numpy.stack([vertices[keys // n], vertices[keys % n]], axis=1)
+                    )
 
             # find the max and min height
-            v_min = v_max = None
-            for t in triangles:
-                for tx, ty, v in t:
-                    if v_min is None or v < v_min:
-                        v_min = v
-                    if v_max is None or v > v_max:
-                        v_max = v
+            points = numpy.stack([surface.xs, surface.ys, surface.zs], axis=1)[
+                triangles
+            ]
+            if len(points):
+                v_min, v_max = points[:, :, 2].min(), points[:, :, 2].max()
+            else:
+                v_min = v_max = None
             graphics.extend(
                 self.construct_graphics(
-                    triangles, mesh_points, v_min, v_max, options, evaluation
+                    points, mesh_points, v_min, v_max, options, evaluation
                 )
             )
         return self.final_graphics(graphics, options)
@@ -2129,8 +2159,7 @@ class Plot(_Plot):
                 x_range = [start, stop]
         return x_range, y_range
 
-    def eval_f(self, f, x_value):
-        value = f(x_value)
+    def get_point(self, x_value, value):
         if value is not None:
             return (x_value, value)
 
@@ -2190,8 +2219,7 @@ class ParametricPlot(_Plot):
                 x_range, y_range = plotrange
         return x_range, y_range
 
-    def eval_f(self, f, x_value):
-        value = f(x_value)
+    def get_point(self, x_value, value):
         if value is not None and len(value) == 2:
             return value
 
@@ -2261,8 +2289,7 @@ class PolarPlot(_Plot):
                 x_range, y_range = plotrange
         return x_range, y_range
 
-    def eval_f(self, f, x_value):
-        value = f(x_value)
+    def get_point(self, x_value, value):
         if value is not None:
             return (value * cos(x_value), value * sin(x_value))
 
@@ -2423,32 +2450,13 @@ class Plot3D(_Plot3D):
     def construct_graphics(
         self, triangles, mesh_points, v_min, v_max, options, evaluation
     ):
+        # all triangles make up one Polygon, and the coordinates stay packed
         graphics = []
-        for p1, p2, p3 in triangles:
-            graphics.append(
-                Expression(
-                    "Polygon",
-                    Expression(
-                        "List",
-                        Expression(SymbolList, *p1),
-                        Expression(SymbolList, *p2),
-                        Expression(SymbolList, *p3),
-                    ),
-                )
-            )
+        if len(triangles):
+            graphics.append(Expression("Polygon", PackedArray(triangles)))
         # Add the Grid
-        for xi in range(len(mesh_points)):
-            line = []
-            for yi in range(len(mesh_points[xi])):
-                line.append(
-                    Expression(
-                        "List",
-                        mesh_points[xi][yi][0],
-                        mesh_points[xi][yi][1],
-                        mesh_points[xi][yi][2],
-                    )
-                )
-            graphics.append(Expression("Line", Expression(SymbolList, *line)))
+        for line in mesh_points:
+            graphics.append(Expression("Line", PackedArray(line)))
         return graphics
 
     def final_graphics(self, graphics, options):
@@ -2531,7 +2539,7 @@ class DensityPlot(_Plot3D):
             color_function_max = color_function.leaves[2].leaves[1].round_to_float()
 
         color_function_scaling = color_function_scaling.is_true()
-        v_range = v_max - v_min
+        v_range = 0 if v_min is None else v_max - v_min
 
         if v_range == 0:
             v_range = 1
@@ -2547,10 +2555,8 @@ class DensityPlot(_Plot3D):
         ):
             color_function_range = color_function_max - color_function_min
 
-        colors = {}
-
-        def eval_color(x, y, v):
-            v_scaled = (v - v_min) / v_range
+        # Calculate 100 different shades max.
+        def eval_color(v_scaled):
             if (
                 color_function_scaling
                 and color_function_min is not None  # noqa
@@ -2558,49 +2564,39 @@ class DensityPlot(_Plot3D):
             ):
                 v_color_scaled = color_function_min + v_scaled * color_function_range
             else:
-                v_color_scaled = v
+                v_color_scaled = v_min + v_scaled * v_range
+            return Expression(color_func, Real(v_color_scaled)).evaluate(evaluation)
 
-            # Calculate and store 100 different shades max.
-            v_lookup = int(v_scaled * 100 + 0.5)
-
-            value = colors.get(v_lookup)
-            if value is None:
-                value = Expression(color_func, Real(v_color_scaled))
-                value = value.evaluate(evaluation)
-                colors[v_lookup] = value
-            return value
-
-        points = []
-        vertex_colors = []
         graphics = []
-        for p in triangles:
-            points.append(
-                Expression(SymbolList, *(Expression(SymbolList, *x[:2]) for x in p))
+        if len(triangles):
+            # the colors of the shades are shared by the vertices
+            shades = (
+                ((triangles[:, :, 2] - v_min) / v_range * 100 + 0.5)
+                .astype(int)
+                .tolist()
             )
-            vertex_colors.append(Expression(SymbolList, *(eval_color(*x) for x in p)))
-
-        graphics.append(
-            Expression(
-                "Polygon",
-                Expression(SymbolList, *points),
+            colors = {}
+            for shade in set(itertools.chain.from_iterable(shades)):
+                colors[shade] = eval_color(shade / 100.0)
+            vertex_colors = [
+                Expression(SymbolList, *[colors[shade] for shade in triangle])
+                for triangle in shades
+            ]
+            graphics.append(
                 Expression(
-                    "Rule",
-                    Symbol("VertexColors"),
-                    Expression(SymbolList, *vertex_colors),
-                ),
+                    "Polygon",
+                    PackedArray(triangles[:, :, :2]),
+                    Expression(
+                        "Rule",
+                        Symbol("VertexColors"),
+                        Expression(SymbolList, *vertex_colors),
+                    ),
+                )
             )
-        )
 
         # add mesh
-        for xi in range(len(mesh_points)):
-            line = []
-            for yi in range(len(mesh_points[xi])):
-                line.append(
-                    Expression(
-                        SymbolList, mesh_points[xi][yi][0], mesh_points[xi][yi][1]
-                    )
-                )
-            graphics.append(Expression("Line", Expression(SymbolList, *line)))
+        for line in mesh_points:
+            graphics.append(Expression("Line", PackedArray(line[..., :2])))
 
         return graphics
 
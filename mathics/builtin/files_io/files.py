@@ -8,9 +8,11 @@ File and Stream Operations
 import io
 import math
 import mpmath
+import numpy
 import os
 import struct
 import sympy
+import sys
 import tempfile
 
 from io import BytesIO
@@ -31,10 +33,13 @@ from mathics.core.expression import (
     Expression,
     Integer,
     MachineReal,
+    PackedArray,
     Real,
     String,
     Symbol,
     SymbolFailed,
+    SymbolInfinity,
+    SymbolList,
     SymbolNull,
     SymbolTrue,
     from_mpmath,
@@ -1076,6 +1081,152 @@ class _BinaryFormat(object):
         s.write(struct.pack("QQ", a, b))
 
 
+# the NumPy types of the fixed-width binary formats, without byte ordering
+_binary_dtypes = {
+    "Byte": "u1",
+    "Integer8": "i1",
+    "Integer16": "i2",
+    "Integer32": "i4",
+    "Integer64": "i8",
+    "UnsignedInteger8": "u1",
+    "UnsignedInteger16": "u2",
+    "UnsignedInteger32": "u4",
+    "UnsignedInteger64": "u8",
+    "Real32": "f4",
+    "Real64": "f8",
+    "Complex64": "c8",
+    "Complex128": "c16",
+}
+
+
+# the widths of the binary formats of numbers which depend on the byte ordering
+_binary_widths = {t: numpy.dtype(code).itemsize for t, code in _binary_dtypes.items()}
+_binary_widths.update(
+    {
+        "Integer24": 3,
+        "Integer128": 16,
+        "UnsignedInteger24": 3,
+        "UnsignedInteger128": 16,
+        "Real128": 16,
+        "Complex256": 32,
+    }
+)
+
+
+def _byte_ordering(name, options, evaluation):
+    "Returns the value of the ByteOrdering option, or None if it is invalid."
+    value = options["System`ByteOrdering"].evaluate(evaluation)
+    byte_ordering = value.get_int_value()
+    if byte_ordering not in (-1, 1):
+        evaluation.message(name, "bytord", value)
+        return None
+    return byte_ordering
+
+
+def _native_byte_ordering(byte_ordering):
+    return byte_ordering == (-1 if sys.byteorder == "little" else 1)
+
+
+def _byte_swap(data, t):
+    "Returns the bytes of a number of the format t in the other byte ordering."
+    if t.startswith("Complex"):
+        # the real and imaginary part are swapped separately
+        half = len(data) // 2
+        return data[:half][::-1] + data[half:][::-1]
+    return data[::-1]
+
+
+def _binary_dtype(types, byte_ordering, records):
+    """
+    Returns the NumPy type of a record of numbers of the given formats, or
+    None unless all formats have fixed width.
+    """
+    if not all(t in _binary_dtypes for t in types):
+        return None
+    order = "<" if byte_ordering == -1 else ">"
+    codes = [order + _binary_dtypes[t] for t in types]
+    if not records:
+        return numpy.dtype(codes[0])
+    if len(set(codes)) == 1:
+        return numpy.dtype((codes[0], len(codes)))
+    return numpy.dtype([("f%d" % i, code) for i, code in enumerate(codes)])
+
+
+def _binary_numbers(array, t):
+    "Returns the numbers of a one-dimensional array read in the format t."
+    if t.startswith("Real"):
+        return [_BinaryFormat._IEEE_real(x) for x in array.tolist()]
+    if t.startswith("Complex"):
+        return [_BinaryFormat._IEEE_cmplx(x.real, x.imag) for x in array.tolist()]
+    return [Integer(x) for x in array.tolist()]
+
+
+def _binary_list(array, types):
+    """
+    Returns the numbers of an array of the type given by _binary_dtype as a
+    List, which is packed unless it contains infinities, NaNs or unsigned
+    integers beyond the range of machine integers.
+    """
+    if array.dtype.names is None:
+        if array.size:
+            try:
+                return PackedArray(array)
+            except OverflowError:
+                pass
+        if array.ndim == 1:
+            return Expression(SymbolList, *_binary_numbers(array, types[0]))
+        columns = [
+            _binary_numbers(array[:, i], types[0]) for i in range(array.shape[1])
+        ]
+    else:
+        columns = [
+            _binary_numbers(array[name], t) for name, t in zip(array.dtype.names, types)
+        ]
+    return Expression(
+        SymbolList, *[Expression(SymbolList, *record) for record in zip(*columns)]
+    )
+
+
+def _binary_bytes(b, t, byte_ordering):
+    """
+    Returns the bytes of the numbers in the List b in the fixed-width format
+    t, or None unless all of them can be converted at once.
+    """
+    array = b.get_array() if isinstance(b, PackedArray) else None
+    if array is None:
+        leaves = b.leaves
+        if all(isinstance(leaf, Integer) for leaf in leaves):
+            values = [leaf.get_int_value() for leaf in leaves]
+        elif all(isinstance(leaf, MachineReal) for leaf in leaves):
+            values = [leaf.value for leaf in leaves]
+        else:
+            return None
+        if not values:
+            return b""
+        array = numpy.array(values)
+    if array.ndim != 1:
+        return None
+
+    kind = array.dtype.kind
+    if t.startswith("Real"):
+        compatible = kind == "f"
+    elif t.startswith("Complex"):
+        compatible = kind in "iufc"
+    else:
+        compatible = kind in "iu"
+    if not compatible:
+        return None
+
+    dtype = numpy.dtype(("<" if byte_ordering == -1 else ">") + _binary_dtypes[t])
+    if kind in "iu" and dtype.kind in "iu":
+        limits = numpy.iinfo(dtype)
+        if array.min() < limits.min or array.max() > limits.max:
+            return None
+    with numpy.errstate(over="ignore"):
+        # like struct, numbers too large for single precision become infinite
+        return array.astype(dtype).tobytes()
+
+
 class BinaryWrite(Builtin):
     """
     <dl>
@@ -1308,16 +1459,22 @@ class BinaryWrite(Builtin):
 
     messages = {
         "writex": "`1`.",
+        "nocoerce": "`1` cannot be coerced to the specified type.",
+        "bytord": "ByteOrdering -> `1` should be 1 or -1.",
+    }
+
+    options = {
+        "ByteOrdering": "$ByteOrdering",
     }
 
     writers = _BinaryFormat.get_writers()
 
-    def apply_notype(self, name, n, b, evaluation):
-        "BinaryWrite[OutputStream[name_, n_], b_]"
-        return self.apply(name, n, b, None, evaluation)
+    def apply_notype(self, name, n, b, evaluation, options):
+        "BinaryWrite[OutputStream[name_, n_], b_, OptionsPattern[BinaryWrite]]"
+        return self.apply(name, n, b, None, evaluation, options)
 
-    def apply(self, name, n, b, typ, evaluation):
-        "BinaryWrite[OutputStream[name_, n_], b_, typ_]"
+    def apply(self, name, n, b, typ, evaluation, options):
+        "BinaryWrite[OutputStream[name_, n_], b_, typ_?NotOptionQ, OptionsPattern[BinaryWrite]]"
 
         channel = Expression("OutputStream", name, n)
 
@@ -1339,12 +1496,6 @@ class BinaryWrite(Builtin):
             evaluation.message("BinaryWrite", "openr", channel)
             return expr
 
-        # Check b
-        if b.has_form("List", None):
-            pyb = b.leaves
-        else:
-            pyb = [b]
-
         # Check Type
         if typ.has_form("List", None):
             types = typ.get_leaves()
@@ -1359,6 +1510,25 @@ class BinaryWrite(Builtin):
             evaluation.message("BinaryRead", "format", typ)
             return expr
 
+        byte_ordering = _byte_ordering("BinaryWrite", options, evaluation)
+        if byte_ordering is None:
+            return expr
+        swap = not _native_byte_ordering(byte_ordering)
+
+        # Check b
+        if b.has_form("List", None):
+            # write a list of numbers of one fixed-width type at once
+            data = None
+            if len(types) == 1 and types[0] in _binary_dtypes:
+                data = _binary_bytes(b, types[0], byte_ordering)
+            if data is None:
+                pyb = b.leaves
+            else:
+                stream.io.write(data)
+                pyb = []
+        else:
+            pyb = [b]
+
         # Write to stream
         i = 0
         while i < len(pyb):
@@ -1422,7 +1592,12 @@ class BinaryWrite(Builtin):
                 return evaluation.message("BinaryWrite", "nocoerce", b)
 
             try:
-                self.writers[t](stream.io, x)
+                if swap and t in _binary_widths:
+                    data = BytesIO()
+                    self.writers[t](data, x)
+                    stream.io.write(_byte_swap(data.getvalue(), t))
+                else:
+                    self.writers[t](stream.io, x)
             except struct.error:
                 return evaluation.message("BinaryWrite", "nocoerce", b)
             i += 1
@@ -1729,6 +1904,168 @@ class BinaryRead(Builtin):
                 return result[0]
 
 
+class BinaryReadList(Builtin):
+    """
+    <dl>
+    <dt>'BinaryReadList["$file$"]'
+      <dd>reads all bytes of a file as integers from 0 to 255.
+    <dt>'BinaryReadList["$file$", $type$]'
+      <dd>reads all objects of the specified type from a file.
+    <dt>'BinaryReadList["$file$", {$type1$, $type2$, ...}]'
+      <dd>reads all records of objects of the specified types.
+    <dt>'BinaryReadList["$file$", $type$, $n$]'
+      <dd>reads the first $n$ objects or records.
+    <dt>'BinaryReadList[$stream$, ...]'
+      <dd>reads from an input stream opened with 'BinaryFormat -> True'.
+    </dl>
+
+    Numbers of fixed width, from "Integer8" to "Integer64", "UnsignedInteger8"
+    to "UnsignedInteger64", "Real32", "Real64", "Complex64" and "Complex128",
+    are read all at once into a packed array.
+
+    >> strm = OpenWrite[BinaryFormat -> True];
+    >> BinaryWrite[strm, Range[6], "Integer16"];
+    >> file = Close[strm];
+    >> BinaryReadList[file, "Integer16"]
+     = {1, 2, 3, 4, 5, 6}
+    >> BinaryReadList[file, {"Integer16", "Integer32"}]
+     = {{1, 196610}, {4, 393221}}
+    >> BinaryReadList[file, "Integer16", 2]
+     = {1, 2}
+    >> BinaryReadList[file, "Integer16", ByteOrdering -> 1]
+     = {256, 512, 768, 1024, 1280, 1536}
+
+    The binary types are also formats for 'Import':
+    >> Import[file, "Integer16"]
+     = {1, 2, 3, 4, 5, 6}
+
+    Reading a stream continues where the previous read stopped:
+    >> strm = OpenRead[file, BinaryFormat -> True];
+    >> BinaryReadList[strm, "Integer32", 2]
+     = {131073, 262147}
+    >> BinaryReadList[strm, "Byte"]
+     = {5, 0, 6, 0}
+    >> Close[strm];
+
+    #> BinaryReadList[file, {"Integer16", "Byte"}]
+     = {{1, 2}, {768, 0}, {4, 5}, {1536, 0}}
+    #> BinaryReadList[file, "Integer24"]
+     = {131073, 768, 327684, 1536}
+    #> BinaryReadList[file, "Real128"]
+     = {}
+    #> BinaryReadList["data.bin", "Integer16", -1]
+     : Non-negative machine-sized integer expected at position 3 in BinaryReadList[data.bin, Integer16, -1].
+     = BinaryReadList[data.bin, Integer16, -1]
+    #> BinaryReadList[file, "Real16"]
+     : Real16 is not a recognized binary format.
+     = BinaryReadList[..., Real16]
+    #> BinaryReadList["nonexistent.bin"]
+     : Cannot open nonexistent.bin.
+     = $Failed
+    #> DeleteFile[file];
+    """
+
+    messages = {
+        "format": "`1` is not a recognized binary format.",
+        "bfmt": "The stream `1` has been opened with BinaryFormat -> False and cannot be used with binary data.",
+        "intnm": (
+            "Non-negative machine-sized integer expected at " "position 3 in `1`."
+        ),
+        "bytord": "ByteOrdering -> `1` should be 1 or -1.",
+    }
+
+    options = {
+        "ByteOrdering": "$ByteOrdering",
+    }
+
+    readers = _BinaryFormat.get_readers()
+
+    def apply_bytes(self, file, evaluation, options):
+        "BinaryReadList[file_, OptionsPattern[BinaryReadList]]"
+        return self.apply(file, String("Byte"), SymbolInfinity, evaluation, options)
+
+    def apply_all(self, file, typ, evaluation, options):
+        "BinaryReadList[file_, typ_?NotOptionQ, OptionsPattern[BinaryReadList]]"
+        return self.apply(file, typ, SymbolInfinity, evaluation, options)
+
+    def apply(self, file, typ, n, evaluation, options):
+        "BinaryReadList[file_, typ_?NotOptionQ, n_?NotOptionQ, OptionsPattern[BinaryReadList]]"
+
+        expr = Expression("BinaryReadList", file, typ, n)
+
+        if n == SymbolInfinity:
+            count = None
+        else:
+            count = n.get_int_value()
+            if count is None or count < 0:
+                evaluation.message("BinaryReadList", "intnm", expr)
+                return
+        if typ.has_form("List", None):
+            types = [t.get_string_value() for t in typ.leaves]
+        else:
+            types = [typ.get_string_value()]
+        if not types or not all(t in self.readers for t in types):
+            evaluation.message("BinaryReadList", "format", typ)
+            return
+        byte_ordering = _byte_ordering("BinaryReadList", options, evaluation)
+        if byte_ordering is None:
+            return
+
+        if isinstance(file, String):
+            path = path_search(file.get_string_value())
+            if path is None or not osp.isfile(path):
+                evaluation.message("General", "noopen", file)
+                return SymbolFailed
+            with open(path, "rb") as f:
+                return self.read(f, types, typ, count, byte_ordering)
+        elif file.has_form("InputStream", 2):
+            stream = stream_manager.lookup_stream(file.leaves[1].get_int_value())
+            if stream is None or stream.io.closed:
+                evaluation.message("General", "openx", file)
+                return
+            if stream.mode not in ["rb"]:
+                evaluation.message("BinaryReadList", "bfmt", file)
+                return
+            return self.read(stream.io, types, typ, count, byte_ordering)
+        else:
+            evaluation.message("General", "stream", file)
+
+    def read(self, f, types, typ, count, byte_ordering):
+        records = typ.has_form("List", None)
+        dtype = _binary_dtype(types, byte_ordering, records)
+        if dtype is not None:
+            # read the whole data at once, without going past the last
+            # complete record
+            size = -1 if count is None else count * dtype.itemsize
+            data = f.read(size)
+            incomplete = len(data) % dtype.itemsize
+            if incomplete:
+                f.seek(-incomplete, io.SEEK_CUR)
+            array = numpy.frombuffer(data, dtype, len(data) // dtype.itemsize)
+            return _binary_list(array, types)
+
+        swap = not _native_byte_ordering(byte_ordering)
+        result = []
+        while count is None or len(result) < count:
+            start = f.tell()
+            try:
+                record = [self.read_binary(f, t, swap) for t in types]
+            except struct.error:
+                f.seek(start)
+                break
+            result.append(Expression(SymbolList, *record) if records else record[0])
+        return Expression(SymbolList, *result)
+
+    def read_binary(self, f, t, swap):
+        if swap and t in _binary_widths:
+            size = _binary_widths[t]
+            data = f.read(size)
+            if len(data) < size:
+                raise struct.error
+            f = BytesIO(_byte_swap(data, t))
+        return self.readers[t](f)
+
+
 class WriteString(Builtin):
     """
     <dl>
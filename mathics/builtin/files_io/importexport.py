@@ -8,6 +8,8 @@ from mathics.version import __version__  # noqa used in loading to check consist
 
 from mathics.core.expression import (
     ByteArrayAtom,
+    MachineReal,
+    PackedArray,
     SymbolList,
     SymbolRule,
     Expression,
@@ -28,9 +30,14 @@ from mathics.builtin.base import (
 )
 
 from mathics.builtin.pymimesniffer import magic
+from mathics.builtin.strings import to_python_encoding
+import csv
+import math
 import mimetypes
+import numpy
+import re
 import sys
-from itertools import chain
+from itertools import chain, islice
 
 try:
     import urllib.request as urllib2
@@ -928,6 +935,182 @@ def _importer_exporter_options(
     return stream_options, custom_options
 
 
+def _has_rows_option(available_options):
+    return available_options is not None and any(
+        name.get_string_value() == "Rows" for name in available_options.leaves
+    )
+
+
+# the number of records whose numbers are parsed at a time
+_TABLE_CHUNK_SIZE = 10000
+
+_integer_field = re.compile(r"[ \t]*[+-]?\d+[ \t]*")
+_real_field = re.compile(r"[ \t]*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?[ \t]*")
+# a character that no number in a field has, and a line without a real
+_non_numeric = re.compile(r"[^0-9eE.+\- \t\n]")
+_not_real = re.compile(r"^[^.eE\n]*$", re.MULTILINE)
+
+_table_atoms = {int: Integer, float: MachineReal, str: String}
+
+
+def _parse_field(field):
+    if _integer_field.fullmatch(field):
+        return int(field)
+    if _real_field.fullmatch(field):
+        value = float(field)
+        if math.isfinite(value):
+            return value
+    return field
+
+
+def _parse_column(fields):
+    """
+    Parses the numbers in a column of fields. Returns an array if all of
+    them are machine integers or all of them are machine reals, otherwise
+    a list of ints, floats and strs.
+    """
+    text = "\n".join(fields)
+    if not _non_numeric.search(text) and text.count("\n") == len(fields) - 1:
+        # with these characters only, float and int accept just the fields
+        # that the patterns above match
+        try:
+            if not ("." in text or "e" in text or "E" in text):
+                values = numpy.array(list(map(int, fields)), dtype=numpy.int64)
+            elif not _not_real.search(text):
+                values = numpy.array(list(map(float, fields)))
+            else:
+                values = None
+            if values is not None and numpy.isfinite(values).all():
+                return values
+        except (ValueError, OverflowError):
+            pass
+    return [_parse_field(field) for field in fields]
+
+
+def _values(column):
+    return column.tolist() if isinstance(column, numpy.ndarray) else column
+
+
+def _join_column(parts):
+    if all(isinstance(part, numpy.ndarray) for part in parts):
+        if len(set(part.dtype for part in parts)) == 1:
+            return numpy.concatenate(parts)
+    return list(chain.from_iterable(_values(part) for part in parts))
+
+
+def _parse_table(records) -> Expression:
+    """
+    Returns the List of records, with the numbers in their fields parsed.
+    The records are parsed in chunks, column by column where they have the
+    same length. A table of machine integers or machine reals only is a
+    PackedArray.
+    """
+    # the columns, or else the rows of each chunk
+    chunks = []
+    while True:
+        chunk = list(islice(records, _TABLE_CHUNK_SIZE))
+        if not chunk:
+            break
+        width = len(chunk[0])
+        if width and all(len(record) == width for record in chunk):
+            chunks.append(
+                ("columns", [_parse_column(fields) for fields in zip(*chunk)])
+            )
+        else:
+            chunks.append(
+                (
+                    "rows",
+                    [[_parse_field(field) for field in record] for record in chunk],
+                )
+            )
+
+    if chunks and len(set((kind, len(parts)) for kind, parts in chunks)) == 1:
+        kind, parts = chunks[0]
+        if kind == "columns":
+            columns = [
+                _join_column([parts[index] for kind, parts in chunks])
+                for index in range(len(parts))
+            ]
+            if all(isinstance(column, numpy.ndarray) for column in columns):
+                if len(set(column.dtype for column in columns)) == 1:
+                    return PackedArray(numpy.column_stack(columns))
+            chunks = [("columns", columns)]
+
+    rows = chain.from_iterable(
+        zip(*map(_values, parts)) if kind == "columns" else parts
+        for kind, parts in chunks
+    )
+    return Expression(
+        SymbolList,
+        *[
+            Expression(SymbolList, *[_table_atoms[type(value)](value) for value in row])
+            for row in rows
+        ]
+    )
+
+
+def _row_selection(spec):
+    """
+    Returns the rows selected by the part specification spec as a slice or
+    a list of 0-based indices, or None if spec selects no rows.
+    """
+
+    def index(n, stop=False):
+        n = n.get_int_value()
+        if n is None or n == 0:
+            raise ValueError
+        if stop:
+            return n if n > 0 else (n + 1 or None)
+        return n - 1 if n > 0 else n
+
+    try:
+        if spec == Symbol("All"):
+            return slice(None)
+        elif isinstance(spec, Integer):
+            return [index(spec)]
+        elif spec.has_form("Span", 2, 3):
+            start, stop = spec.leaves[:2]
+            step = spec.leaves[2].get_int_value() if len(spec.leaves) == 3 else 1
+            if step is None or step <= 0:
+                return None
+            return slice(
+                None if start == Symbol("All") else index(start),
+                None if stop == Symbol("All") else index(stop, True),
+                step,
+            )
+        elif spec.has_form("List", None):
+            return [index(leaf) for leaf in spec.leaves]
+    except ValueError:
+        pass
+    return None
+
+
+def _select_records(records, selection):
+    """
+    Returns the records in the selection, reading no further than the last
+    one unless the selection counts from the end. Raises an IndexError if
+    one of the selected records does not exist.
+    """
+    if isinstance(selection, slice):
+        start, stop, step = selection.start, selection.stop, selection.step
+        if (start or 0) >= 0 and (stop or 0) >= 0:
+            return islice(records, start, stop, step)
+        return iter(list(records)[selection])
+    if all(index >= 0 for index in selection):
+        wanted = set(selection)
+        read = {
+            index: record
+            for index, record in enumerate(islice(records, max(selection) + 1))
+            if index in wanted
+        }
+    else:
+        read = list(records)
+    try:
+        return iter([read[index] for index in selection])
+    except KeyError:
+        raise IndexError
+
+
 class ImportFormats(Predefined):
     """
     <dl>
@@ -1180,6 +1363,98 @@ class RegisterExport(Builtin):
         return Symbol("Null")
 
 
+class _TableImport(Builtin):
+    # imports the Data, Grid and ColumnLabels elements of a table in a file.
+    # Without header lines, the column labels are taken from the first row.
+
+    context = "System`Convert`TableDump`"
+
+    def apply(self, filename, evaluation, options):
+        "%(name)s[filename_String, OptionsPattern[]]"
+        encoding = self.get_option(options, "CharacterEncoding", evaluation)
+        separators = self.get_option(options, "FieldSeparators", evaluation)
+        skip_lines = self.get_option(options, "SkipLines", evaluation).get_int_value()
+        header_lines = self.get_option(
+            options, "HeaderLines", evaluation
+        ).get_int_value()
+        rows = self.get_option(options, "Rows", evaluation)
+
+        py_encoding = to_python_encoding(encoding.get_string_value())
+        if py_encoding is None:
+            evaluation.message("General", "charcode", encoding)
+            return SymbolFailed
+        if isinstance(separators, String):
+            separators = [separators.get_string_value()]
+        else:
+            separators = [
+                separator.get_string_value() for separator in separators.leaves
+            ]
+        if not (skip_lines is not None and skip_lines >= 0):
+            evaluation.message("Import", "intnn")
+            return SymbolFailed
+        if not (header_lines is not None and header_lines >= 0):
+            evaluation.message("Import", "intnn")
+            return SymbolFailed
+        selection = _row_selection(rows)
+        if selection is None:
+            evaluation.message("Import", "rows", rows)
+            return SymbolFailed
+
+        with open(filename.get_string_value(), encoding=py_encoding, newline="") as f:
+            if len(separators) == 1 and len(separators[0]) == 1:
+                records = csv.reader(f, delimiter=separators[0])
+            else:
+                # csv only splits at single characters, and does not quote then
+                pattern = re.compile("|".join(map(re.escape, separators)))
+                records = (pattern.split(line.rstrip("\r\n")) for line in f)
+            for _ in islice(records, skip_lines):
+                pass
+            labels = list(islice(records, header_lines))
+            if not labels:
+                first = next(records, None)
+                if first is not None:
+                    labels = [first]
+                    records = chain(labels, records)
+            try:
+                data = _parse_table(_select_records(records, selection))
+            except IndexError:
+                evaluation.message("Import", "rows", rows)
+                return SymbolFailed
+
+        if isinstance(rows, Integer):
+            data = data.leaves[0]
+        return Expression(
+            SymbolList,
+            Expression(SymbolRule, String("Data"), data),
+            Expression(SymbolRule, String("Grid"), Expression("Grid", data)),
+            Expression(
+                SymbolRule,
+                String("ColumnLabels"),
+                from_python(labels[-1] if labels else []),
+            ),
+        )
+
+
+class ImportCSV(_TableImport):
+    options = {
+        "CharacterEncoding": "$CharacterEncoding",
+        "FieldSeparators": '","',
+        "HeaderLines": "0",
+        "SkipLines": "0",
+        "Rows": "All",
+    }
+
+
+class ImportTSV(_TableImport):
+    options = {
+        "CharacterEncoding": "$CharacterEncoding",
+        "FieldSeparators": '"\t"',
+        "HeaderLines": "0",
+        "SkipLines": "0",
+        "Rows": "All",
+    }
+
+
 class URLFetch(Builtin):
     """
     <dl>
@@ -1270,6 +1545,8 @@ class Import(Builtin):
       <dd>imports data from a file.
     <dt>'Import["$file$", $elements$]'
       <dd>imports the specified elements from a file.
+    <dt>'Import["$file$", {"$element$", $rows$, ...}]'
+      <dd>imports the parts of an element given by the part specifications, like 'Part'. Tables like CSV files are read only up to the last of the $rows$.
     <dt>'Import["http://$url$", ...]' and 'Import["ftp://$url$", ...]'
       <dd>imports from a URL.
     </dl>
@@ -1283,13 +1560,28 @@ class Import(Builtin):
 
     ## CSV
     #> Import["ExampleData/numberdata.csv", "Elements"]
-     = {Data, Grid}
+     = {ColumnLabels, Data, Grid}
     #> Import["ExampleData/numberdata.csv", "Data"]
-    = {{0.88, 0.60, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+    = {{0.88, 0.6, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
     #> Import["ExampleData/numberdata.csv"]
-    = {{0.88, 0.60, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+    = {{0.88, 0.6, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
     #> Import["ExampleData/numberdata.csv", "FieldSeparators" -> "."]
     = {{0, 88,0, 60,0, 94}, {0, 76,0, 19,0, 51}, {0, 97,0, 04,0, 26}, {0, 33,0, 74,0, 79}, {0, 42,0, 64,0, 56}}
+    #> Import["ExampleData/numberdata.csv", {"Data", 2 ;; 3}]
+     = {{0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}}
+    #> Import["ExampleData/numberdata.csv", {"Data", -1, 2}]
+     = 0.64
+    #> Import["ExampleData/numberdata.csv", "Data", "SkipLines" -> 1, "HeaderLines" -> 1]
+     = {{0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+    #> Import["ExampleData/numberdata.csv", "ColumnLabels", "HeaderLines" -> 1]
+     = {0.88, 0.60, 0.94}
+    #> Import["ExampleData/numberdata.csv", "ColumnLabels"]
+     = {0.88, 0.60, 0.94}
+    #> Import["ExampleData/numberdata.csv", "ColumnLabels", "SkipLines" -> 2]
+     = {0.97, 0.04, 0.26}
+    #> Import["ExampleData/numberdata.csv", {"Data", 9}]
+     : Cannot import the rows 9.
+     = $Failed
 
     ## Text
     >> Import["ExampleData/ExampleData.txt", "Elements"]
@@ -1317,6 +1609,7 @@ class Import(Builtin):
         "noelem": ("The Import element `1` is not present when importing as `2`."),
         "fmtnosup": "`1` is not a supported Import format.",
         "emptyfch": "Function Channel not defined.",
+        "rows": "Cannot import the rows `1`.",
     }
 
     rules = {
@@ -1368,10 +1661,21 @@ class Import(Builtin):
         current_predetermined_out = evaluation.predetermined_out
         # Check elements
         if elements.has_form("List", None):
-            elements = elements.get_leaves()
+            elements = list(elements.get_leaves())
         else:
             elements = [elements]
 
+        # trailing part specifications, as in {"Data", 1 ;; 10, 2}, select
+        # parts of the element like Part
+        parts = []
+        while elements and not isinstance(elements[-1], String):
+            parts.insert(0, elements.pop())
+
+        def select_parts(result):
+            if parts:
+                return Expression("Part", result, *parts).evaluate(evaluation)
+            return result
+
         for el in elements:
             if not isinstance(el, String):
 
@@ -1402,6 +1706,13 @@ class Import(Builtin):
             importer_options.get("System`Options"), options, "System`Import", evaluation
         )
 
+        if parts and _has_rows_option(importer_options.get("System`Options")):
+            # the importer only reads the rows selected by the first part
+            rows = parts.pop(0)
+            custom_options.append(Expression(SymbolRule, String("Rows"), rows))
+            if parts and not isinstance(rows, Integer):
+                parts.insert(0, Symbol("All"))
+
         function_channels = importer_options.get("System`FunctionChannels")
 
         if function_channels is None:
@@ -1428,9 +1739,11 @@ class Import(Builtin):
                     stream = Expression("OpenWrite").evaluate(evaluation)
                     findfile = stream.leaves[0]
                     if not data is None:
-                        Expression("WriteString", data).evaluate(evaluation)
+                        Expression("WriteString", stream, data).evaluate(evaluation)
                     else:
-                        Expression("WriteString", String("")).evaluate(evaluation)
+                        Expression("WriteString", stream, String("")).evaluate(
+                            evaluation
+                        )
                     Expression("Close", stream).evaluate(evaluation)
                     stream = None
                 tmp = Expression(tmp_function, findfile, *joined_options).evaluate(
@@ -1457,6 +1770,9 @@ class Import(Builtin):
                 # TODO message
                 evaluation.predetermined_out = current_predetermined_out
                 return SymbolFailed
+            if not tmp.has_form("List", None):
+                evaluation.predetermined_out = current_predetermined_out
+                return None
             tmp = tmp.get_leaves()
             if not all(expr.has_form("Rule", None) for expr in tmp):
                 evaluation.predetermined_out = current_predetermined_out
@@ -1495,7 +1811,7 @@ class Import(Builtin):
                     evaluation.predetermined_out = current_predetermined_out
                     return SymbolFailed
                 evaluation.predetermined_out = current_predetermined_out
-                return result
+                return select_parts(result)
         else:
             assert len(elements) == 1
             el = elements[0]
@@ -1523,7 +1839,7 @@ class Import(Builtin):
                         return SymbolFailed
                     if len(list(result.keys())) == 1 and list(result.keys())[0] == el:
                         evaluation.predetermined_out = current_predetermined_out
-                        return list(result.values())[0]
+                        return select_parts(list(result.values())[0])
                 elif el in posts.keys():
                     # TODO: allow use of conditionals
                     result = get_results(posts[el])
@@ -1538,7 +1854,7 @@ class Import(Builtin):
                             return SymbolFailed
                     if el in defaults.keys():
                         evaluation.predetermined_out = current_predetermined_out
-                        return defaults[el]
+                        return select_parts(defaults[el])
                     else:
                         evaluation.message(
                             "Import", "noelem", from_python(el), from_python(filetype)
@@ -1568,15 +1884,19 @@ class ImportString(Import):
     #> ImportString[datastring, "Elements"]
      = {Data, Lines, Plaintext, String, Words}
     #> ImportString[datastring, {"CSV","Elements"}]
-     = {Data, Grid}
+     = {ColumnLabels, Data, Grid}
     #> ImportString[datastring, {"CSV", "Data"}]
-    = {{0.88,  0.60,  0.94}, {.076,  0.19,  .51}, {0.97,  0.04,  .26}}
+     = {{0.88, 0.6, 0.94}, {0.076, 0.19, 0.51}, {0.97, 0.04, 0.26}}
     #> ImportString[datastring]
     = 0.88, 0.60, 0.94
     .  .076, 0.19, .51
     .  0.97, 0.04, .26
     #> ImportString[datastring, "CSV","FieldSeparators" -> "."]
-    = {{0, 88, 0, 60, 0, 94}, {076, 0, 19, , 51}, {0, 97, 0, 04, , 26}}
+     = {{0, 88, 0, 60, 0, 94}, {, 076, 0, 19, , 51}, {0, 97, 0, 04, , 26}}
+    #> ImportString["name,count\\n\\"Smith, J.\\",3\\n\\"Doe, A.\\",x", "CSV", "HeaderLines" -> 1]
+     = {{Smith, J., 3}, {Doe, A., x}}
+    #> ImportString["1\\t2\\n3\\t4.5", "TSV"]
+     = {{1, 2}, {3, 4.5}}
 
     ## Text
     >> str = "Hello!\\n    This is a testing text\\n";
@@ -6,6 +6,8 @@ Constructing Lists
 Functions for constructing lists of various sizes and structure.
 """
 
+import numpy
+
 from itertools import permutations
 
 from mathics.version import __version__  # noqa used in loading to check consistency.
@@ -20,8 +22,11 @@ from mathics.builtin.lists import (
 from mathics.core.convert import from_sympy
 
 from mathics.core.expression import (
+    Complex,
     Expression,
     Integer,
+    MachineReal,
+    PackedArray,
     SymbolList,
     structure,
 )
@@ -123,13 +128,42 @@ class ConstantArray(Builtin):
      = {a, a, a}
     >> ConstantArray[a, {2, 3}]
      = {{a, a, a}, {a, a, a}}
+
+    #> ConstantArray[0, {2, 0}]
+     = {{}, {}}
+    #> ConstantArray[1.5 - I, 2]
+     = {1.5 - 1. I, 1.5 - 1. I}
     """
 
     rules = {
-        "ConstantArray[c_, dims_]": "Apply[Table[c, ##]&, List /@ dims]",
         "ConstantArray[c_, n_Integer]": "ConstantArray[c, {n}]",
     }
 
+    def apply(self, c, dims, evaluation):
+        "ConstantArray[c_, dims_]"
+        if dims.has_form("List", 1, None) and all(
+            isinstance(dim, Integer) and 0 < dim.value for dim in dims.leaves
+        ):
+            shape = [dim.value for dim in dims.leaves]
+            if isinstance(c, Integer) and -(2 ** 63) <= c.value < 2 ** 63:
+                return PackedArray(numpy.full(shape, c.value, dtype=numpy.int64))
+            elif isinstance(c, MachineReal):
+                return PackedArray(numpy.full(shape, c.value))
+            elif (
+                isinstance(c, Complex)
+                and isinstance(c.real, MachineReal)
+                and isinstance(c.imag, MachineReal)
+            ):
+                value = complex(c.real.value, c.imag.value)
+                return PackedArray(numpy.full(shape, value))
+        return Expression(
+            "Apply",
+            Expression(
+                "Function", Expression("Table", c, Expression("SlotSequence", 1))
+            ),
+            Expression("Map", SymbolList, dims),
+        )
+
 
 class Normal(Builtin):
     """
@@ -168,6 +202,26 @@ class Range(Builtin):
     def apply(self, imin, imax, di, evaluation):
         "Range[imin_?RealNumberQ, imax_?RealNumberQ, di_?RealNumberQ]"
 
+        if (
+            isinstance(imin, Integer)
+            and isinstance(imax, Integer)
+            and isinstance(di, Integer)
+            and di.value > 0
+        ):
+            values = range(imin.value, imax.value + 1, di.value)
+            int64 = numpy.iinfo(numpy.int64)
+            if (
+                values
+                and int64.min <= values[0]
+                and values[-1] <= int64.max
+                and values.step <= int64.max
+            ):
+                # int64 arithmetic wraps around, so the elements come out
+                # right even if the offsets from the first one overflow
+                steps = numpy.arange(len(values), dtype=numpy.int64)
+                return PackedArray(values[0] + steps * numpy.int64(values.step))
+            return Expression(SymbolList, *[Integer(i) for i in values])
+
         imin = imin.to_sympy()
         imax = imax.to_sympy()
         di = di.to_sympy()
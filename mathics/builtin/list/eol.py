@@ -35,6 +35,7 @@ from mathics.core.expression import (
     Expression,
     Integer,
     Integer0,
+    PackedArray,
     Symbol,
     SymbolFailed,
     SymbolList,
@@ -702,6 +703,8 @@ class Length(Builtin):
 
         if expr.is_atom():
             return Integer0
+        elif isinstance(expr, PackedArray) and expr.get_array() is not None:
+            return Integer(len(expr.get_array()))
         else:
             return Integer(len(expr.leaves))
 
@@ -890,7 +893,7 @@ class Part(Builtin):
     def apply(self, list, i, evaluation):
         "Part[list_, i___]"
 
-        if list == SymbolFailed:
+        if SymbolFailed.sameQ(list):
             return
         indices = i.get_sequence()
         # How to deal with ByteArrays
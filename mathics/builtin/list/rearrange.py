@@ -24,6 +24,7 @@ from mathics.core.expression import (
     Expression,
     Integer,
     SymbolList,
+    sort_key,
     structure,
 )
 
@@ -211,7 +212,7 @@ class _SetOperation(Builtin):
                 functools.reduce(getattr(set, self._operation), map(set, operands))
             )
 
-        return Expression(seq[0].get_head(), *sorted(items))
+        return Expression(seq[0].get_head(), *sorted(items, key=sort_key))
 
 
 class _TallyBin:
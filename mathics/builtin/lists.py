@@ -5,6 +5,7 @@ List Functions - Miscellaneous
 """
 
 import heapq
+import numpy
 import sympy
 
 from collections import defaultdict
@@ -50,6 +51,7 @@ from mathics.core.expression import (
     Integer,
     Integer0,
     Number,
+    PackedArray,
     Real,
     String,
     Symbol,
@@ -60,6 +62,7 @@ from mathics.core.expression import (
     SymbolN,
     SymbolRule,
     SymbolSequence,
+    from_numpy,
     from_python,
     machine_precision,
     min_prec,
@@ -773,7 +776,9 @@ def set_part(varlist, indices, newval):
                     part = cur._leaves[pos]
             except IndexError:
                 raise PartRangeError
-            return rec(part, rest[1:])
+            rec(part, rest[1:])
+            # the cache of cur describes the replaced part
+            cur.clear_cache()
         elif len(rest) == 1:
             pos = rest[0]
             if cur.is_atom():
@@ -807,7 +812,7 @@ def _parts_all_selector():
     return select
 
 
-def _parts_span_selector(pspec):
+def _span_bounds(pspec):
     if len(pspec.leaves) > 3:
         raise MessageException("Part", "span", pspec)
     start = 1
@@ -832,6 +837,12 @@ def _parts_span_selector(pspec):
     if start is None or step is None:
         raise MessageException("Part", "span", pspec)
 
+    return start, stop, step
+
+
+def _parts_span_selector(pspec):
+    start, stop, step = _span_bounds(pspec)
+
     def select(inner):
         if inner.is_atom():
             raise MessageException("Part", "partd")
@@ -926,9 +937,85 @@ def _parts(items, selectors, evaluation, assignment=False):
     return list(_list_parts([items], list(selectors), heads, evaluation, assignment))[0]
 
 
+def _packed_part_index(index, length, assignment):
+    # the NumPy index for the Part specification 'index' on an axis of the
+    # given length, or None if NumPy would not handle 'index' the same way.
+    # assignments need indices that select a view of the array, so lists of
+    # positions are only used when reading parts.
+    if isinstance(index, Integer):
+        position = index.value
+        if 1 <= position <= length:
+            return position - 1
+        elif -length <= position <= -1:
+            return position
+    elif index.get_name() == "System`All":
+        return slice(None)
+    elif index.has_form("Span", None):
+        try:
+            start, stop, step = _span_bounds(index)
+        except MessageException:
+            return None
+        return python_seq(start, stop, step, length)
+    elif assignment:
+        return None
+    elif isinstance(index, PackedArray) and index.get_array() is not None:
+        positions = index.get_array()
+        if positions.ndim == 1 and positions.dtype.kind == "i":
+            if positions.size == 0 or (
+                -length <= positions.min()
+                and positions.max() <= length
+                and positions.all()
+            ):
+                return numpy.where(positions > 0, positions - 1, positions)
+    elif index.has_form("List", None):
+        positions = [
+            _packed_part_index(leaf, length, assignment)
+            if isinstance(leaf, Integer)
+            else None
+            for leaf in index.leaves
+        ]
+        if None not in positions:
+            return numpy.array(positions, dtype=numpy.intp)
+    return None
+
+
+def _packed_parts(packed, indices, assign_list):
+    # Part of a PackedArray taken or assigned on its array, or None if that
+    # is not possible
+    array = packed.get_array()
+    if array is None:
+        return None
+    assignment = assign_list is not None
+    key = []
+    part = array
+    axis = 0
+    for index in indices:
+        if axis >= part.ndim:
+            return None
+        numpy_index = _packed_part_index(index, part.shape[axis], assignment)
+        if numpy_index is None:
+            return None
+        # applying the indices one at a time, lists of positions select
+        # along their own axis instead of being broadcast together
+        part = part[(slice(None),) * axis + (numpy_index,)]
+        key.append(numpy_index)
+        if not isinstance(numpy_index, int):
+            axis += 1
+    if assignment:
+        return packed.updated(tuple(key), assign_list)
+    return from_numpy(part)
+
+
 def walk_parts(list_of_list, indices, evaluation, assign_list=None):
     walk_list = list_of_list[0]
 
+    indices = [index.evaluate(evaluation) for index in indices]
+
+    if isinstance(walk_list, PackedArray):
+        result = _packed_parts(walk_list, indices, assign_list)
+        if result is not None:
+            return result
+
     if assign_list is not None:
         # this double copying is needed to make the current logic in
         # the assign_list and its access to original work.
@@ -940,8 +1027,6 @@ def walk_parts(list_of_list, indices, evaluation, assign_list=None):
         walk_list = walk_list.copy()
         walk_list.set_positions()
 
-    indices = [index.evaluate(evaluation) for index in indices]
-
     try:
         result = _parts(
             walk_list, _part_selectors(indices), evaluation, assign_list is not None
@@ -230,6 +230,7 @@ class ArcCos(_MPMathFunction):
 
     sympy_name = "acos"
     mpmath_name = "acos"
+    numpy_name = "arccos"
 
     rules = {
         "Derivative[1][ArcCos]": "-1/Sqrt[1-#^2]&",
@@ -258,6 +259,7 @@ class ArcCosh(_MPMathFunction):
 
     sympy_name = "acosh"
     mpmath_name = "acosh"
+    numpy_name = "arccosh"
 
     rules = {
         "Derivative[1][ArcCosh]": "1/(Sqrt[#-1]*Sqrt[#+1])&",
@@ -449,6 +451,7 @@ class ArcSin(_MPMathFunction):
 
     sympy_name = "asin"
     mpmath_name = "asin"
+    numpy_name = "arcsin"
 
     rules = {
         "Derivative[1][ArcSin]": "1/Sqrt[1-#^2]&",
@@ -474,6 +477,7 @@ class ArcSinh(_MPMathFunction):
 
     sympy_name = "asinh"
     mpmath_name = "asinh"
+    numpy_name = "arcsinh"
 
     rules = {
         "Derivative[1][ArcSinh]": "1/Sqrt[1+#^2]&",
@@ -515,6 +519,7 @@ class ArcTan(_MPMathFunction):
 
     sympy_name = "atan"
     mpmath_name = "atan"
+    numpy_name = "arctan"
 
     rules = {
         "ArcTan[1]": "Pi/4",
@@ -568,6 +573,7 @@ class Cos(_MPMathFunction):
     """
 
     mpmath_name = "cos"
+    numpy_name = "cos"
 
     rules = {
         "Cos[Pi]": "-1",
@@ -590,6 +596,7 @@ class Cosh(_MPMathFunction):
     """
 
     mpmath_name = "cosh"
+    numpy_name = "cosh"
 
     rules = {
         "Derivative[1][Cosh]": "Sinh[#]&",
@@ -714,6 +721,8 @@ class Exp(_MPMathFunction):
      = Overflow[]
     """
 
+    numpy_name = "exp"
+
     rules = {
         "Exp[x_]": "E ^ x",
         "Derivative[1][Exp]": "Exp",
@@ -793,6 +802,7 @@ class Log(_MPMathFunction):
 
     nargs = 2
     mpmath_name = "log"
+    numpy_name = "log"
     sympy_name = "log"
 
     rules = {
@@ -813,6 +823,10 @@ class Log(_MPMathFunction):
     def get_mpmath_function(self, args):
         return lambda base, x: mpmath.log(x, base)
 
+    def accepts_machine_arrays(self, arrays, inexact) -> bool:
+        # only the natural logarithm Log[z] is computed by numpy
+        return len(arrays) == 1 and inexact[0]
+
 
 class Log2(Builtin):
     """
@@ -998,6 +1012,7 @@ class Sin(_MPMathFunction):
     """
 
     mpmath_name = "sin"
+    numpy_name = "sin"
 
     rules = {
         "Sin[Pi]": "0",
@@ -1020,6 +1035,7 @@ class Sinh(_MPMathFunction):
     """
 
     mpmath_name = "sinh"
+    numpy_name = "sinh"
 
     rules = {
         "Derivative[1][Sinh]": "Cosh[#]&",
@@ -1043,6 +1059,7 @@ class Tan(_MPMathFunction):
     """
 
     mpmath_name = "tan"
+    numpy_name = "tan"
 
     rules = {
         "Tan[(1/2) * Pi]": "ComplexInfinity",
@@ -1063,6 +1080,7 @@ class Tanh(_MPMathFunction):
     """
 
     mpmath_name = "tanh"
+    numpy_name = "tanh"
 
     rules = {
         "Derivative[1][Tanh]": "Sech[#1]^2&",
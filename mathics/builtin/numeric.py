@@ -49,6 +49,7 @@ from mathics.core.expression import (
     SymbolTrue,
     SymbolList,
     SymbolN,
+    PackedArray,
     from_python,
 )
 from mathics.core.convert import from_sympy
@@ -185,6 +186,13 @@ class N(Builtin):
         except PrecisionValueError:
             return
 
+        if d is None and isinstance(expr, PackedArray):
+            array = expr.get_array()
+            if array is not None:
+                if array.dtype.kind == "i":
+                    return PackedArray(array.astype(np.float64))
+                return expr
+
         if expr.get_head_name() in ("System`List", "System`Rule"):
             return Expression(
                 expr.head,
@@ -239,7 +247,7 @@ def _scipy_interface(integrator, options_map, mandatory=None, adapt_func=None):
     functions, adapting the parameters.
     """
 
-    def _scipy_proxy_func_filter(fun, a, b, **opts):
+    def _scipy_proxy_func_filter(fun, *args, **opts):
         native_opts = {}
         if mandatory:
             native_opts.update(mandatory)
@@ -249,9 +257,9 @@ def _scipy_interface(integrator, options_map, mandatory=None, adapt_func=None):
                 if native_opt[1]:
                     val = native_opt[1](val)
                 native_opts[native_opt[0]] = val
-        return adapt_func(integrator(fun, a, b, **native_opts))
+        return adapt_func(integrator(fun, *args, **native_opts))
 
-    def _scipy_proxy_func(fun, a, b, **opts):
+    def _scipy_proxy_func(fun, *args, **opts):
         native_opts = {}
         if mandatory:
             native_opts.update(mandatory)
@@ -261,7 +269,7 @@ def _scipy_interface(integrator, options_map, mandatory=None, adapt_func=None):
                 if native_opt[1]:
                     val = native_opt[1](val)
                 native_opts[native_opt[0]] = val
-        return integrator(fun, a, b, **native_opts)
+        return integrator(fun, *args, **native_opts)
 
     return _scipy_proxy_func_filter if adapt_func else _scipy_proxy_func
 
@@ -379,6 +387,389 @@ def _fubini(func, ranges, **opts):
         return val
 
 
+def _lambdify(expr, arg_names, expect_list):
+    """
+    Returns a NumPy function of arrays of the arguments for the expression,
+    or None if it has no equivalent in NumPy.
+    """
+    if expect_list:
+        if not expr.has_form("List", None):
+            return None
+        exprs = expr.leaves
+    else:
+        exprs = [expr]
+    sympy_args = [Symbol(arg_name).to_sympy() for arg_name in arg_names]
+    sympy_exprs = []
+    for leaf in exprs:
+        sympy_expr = leaf.to_sympy()
+        # other symbols may have values, and unknown functions may have
+        # definitions, which only an evaluation gives
+        if sympy_expr is None or not sympy_expr.free_symbols <= set(sympy_args):
+            return None
+        sympy_exprs.append(sympy_expr)
+    try:
+        return sympy.lambdify(
+            sympy_args, sympy_exprs if expect_list else sympy_exprs[0], "numpy"
+        )
+    except Exception:
+        return None
+
+
+def _batch_function(expr, arg_names, evaluation):
+    """
+    Returns a function of arrays of values of the arguments, which gives the
+    array of values of expr at these points, or None if expr can't be
+    compiled. Evaluates whole arrays with NumPy or a Listable compiled
+    function where possible, and one point at a time otherwise.
+    """
+    array_f = _lambdify(expr, arg_names, False)
+    if array_f is None:
+        try:
+            from mathics.builtin.compile import (
+                _compile,
+                CompileArg,
+                CompileError,
+                real_type,
+            )
+
+            array_f = _compile(
+                expr,
+                [CompileArg(arg_name, real_type) for arg_name in arg_names],
+                listable=True,
+            )
+        except (ImportError, CompileError):
+            pass
+
+    def pointwise_f():
+        args = Expression(SymbolList, *[Symbol(arg_name) for arg_name in arg_names])
+        compiled = Expression("Compile", args, expr).evaluate(evaluation)
+        if len(compiled.leaves) < 3:
+            return None
+        cfunc = compiled.leaves[2].cfunc
+
+        def array_f(*arrays):
+            points = zip(*[array.ravel().tolist() for array in arrays])
+            values = [cfunc(*point) for point in points]
+            return np.array(
+                [
+                    value if isinstance(value, (int, float, complex)) else np.nan
+                    for value in values
+                ]
+            ).reshape(arrays[0].shape)
+
+        return array_f
+
+    if array_f is None:
+        array_f = pointwise_f()
+        if array_f is None:
+            return None
+        pointwise_f = None
+
+    def complex_values(values, arrays):
+        # values that are not real, e.g. those of Sqrt[x - 1] for x < 1, are
+        # NaN in real arithmetic, and are evaluated again without it
+        missing = np.isnan(values)
+        if not missing.any():
+            return values
+        values = values.astype(complex)
+        points = zip(*[array[missing].tolist() for array in arrays])
+        values[missing] = [
+            _complex_value(expr, arg_names, point, evaluation) for point in points
+        ]
+        return values
+
+    def batch_f(*args):
+        nonlocal array_f, pointwise_f
+        arrays = np.broadcast_arrays(*[np.asarray(arg, dtype=float) for arg in args])
+        with np.errstate(all="ignore"):
+            if pointwise_f is not None:
+                try:
+                    values = array_f(*arrays)
+                except Exception:
+                    # e.g. a function NumPy doesn't have, or a failure in
+                    # the compiled code
+                    array_f, pointwise_f = pointwise_f(), None
+                    if array_f is None:
+                        raise
+                    values = array_f(*arrays)
+            else:
+                values = array_f(*arrays)
+            values = np.broadcast_to(values, arrays[0].shape)
+            if values.dtype.kind == "f":
+                values = complex_values(values, arrays)
+            return values
+
+    return batch_f
+
+
+def _complex_value(expr, arg_names, point, evaluation):
+    """
+    Returns the value of expr at the point, evaluated numerically without
+    compilation, or NaN if it is not a number.
+    """
+    values = {name: MachineReal(x) for name, x in zip(arg_names, point)}
+    value = Expression(SymbolN, expr.replace_vars(values)).evaluate(evaluation)
+    if isinstance(value, Number):
+        return value.to_python(n_evaluation=evaluation)
+    return np.nan
+
+
+def _scalar_function(batch_f):
+    """Adapts a function of arrays to the methods which pass numbers."""
+    return lambda *args: batch_f(*args).item()
+
+
+def _transformed_function(batch_f, coordtransform):
+    """
+    Returns the integrand in the coordinates u of coordtransform, a list of
+    pairs of functions x(u) and dx/du or None for unchanged coordinates.
+    """
+
+    def transformed_f(*args):
+        coords = [
+            transform[0](arg) if transform else arg
+            for arg, transform in zip(args, coordtransform)
+        ]
+        value = batch_f(*coords)
+        for arg, transform in zip(args, coordtransform):
+            if transform:
+                value = value * transform[1](arg)
+        return value
+
+    return transformed_f
+
+
+# Nodes of the 15 point Kronrod rule on [-1, 1], and its weights and those of
+# the 7 point Gauss rule at the odd numbered nodes.
+_kronrod_nodes = np.array(
+    [
+        0.991455371120812639206854697526329,
+        0.949107912342758524526189684047851,
+        0.864864423359769072789712788640926,
+        0.741531185599394439863864773280788,
+        0.586087235467691130294144845693013,
+        0.405845151377397166906606412076961,
+        0.207784955007898467600689403773245,
+    ]
+)
+_kronrod_nodes = np.concatenate([-_kronrod_nodes, [0.0], _kronrod_nodes[::-1]])
+_kronrod_weights = np.array(
+    [
+        0.022935322010529224963732008058970,
+        0.063092092629978553290700663189204,
+        0.104790010322250183839876322541518,
+        0.140653259715525918745189590510238,
+        0.169004726639267902826583426598550,
+        0.190350578064785409913256402421014,
+        0.204432940075298892414161999234649,
+    ]
+)
+_kronrod_weights = np.concatenate(
+    [_kronrod_weights, [0.209482141084727828012999174891714], _kronrod_weights[::-1]]
+)
+_gauss_weights = np.array(
+    [
+        0.129484966168869693270611432679082,
+        0.279705391489276667901467771423780,
+        0.381830050505118944950369775488975,
+    ]
+)
+_gauss_weights = np.concatenate(
+    [
+        [0.0],
+        np.stack([_gauss_weights, np.zeros(3)], axis=1).ravel(),
+        [0.417959183673469387755102040816327],
+        np.stack([np.zeros(3), _gauss_weights[::-1]], axis=1).ravel(),
+        [0.0],
+    ]
+)
+
+# the number of nodes evaluated in one step of the adaptive cubature
+_max_cubature_nodes = 2 ** 22
+
+
+def _contract(values, weights):
+    """Sums the trailing axes of values with the given weights."""
+    for weight in reversed(weights):
+        values = values @ weight
+    return values
+
+
+def _gauss_kronrod_cubature(f, ranges, **opts):
+    """
+    Globally adaptive cubature with the tensor product of the 15 point Kronrod
+    rule, using the 7 point Gauss rule for the error estimate. f is a function
+    of arrays. Each step evaluates all the regions which are not yet accurate
+    enough in one call, and bisects them along the coordinate with the largest
+    error. Returns None if the integral doesn't converge within maxrec steps.
+    """
+    tol = opts.get("tol")
+    if not tol:
+        tol = 1.0e-10
+    maxrec = opts.get("maxrec")
+    if not maxrec:
+        maxrec = 10
+    dim = len(ranges)
+    lower = np.array([[a for a, b in ranges]], dtype=float)
+    upper = np.array([[b for a, b in ranges]], dtype=float)
+    total_volume = abs(np.prod(upper - lower))
+    max_regions = max(_max_cubature_nodes // 15 ** dim, 2)
+
+    result = 0.0
+    error = 0.0
+    for depth in range(maxrec + 1):
+        center = 0.5 * (lower + upper)
+        half = 0.5 * (upper - lower)
+        coords = []
+        for i in range(dim):
+            shape = (-1,) + (1,) * dim
+            node_shape = [1] * (dim + 1)
+            node_shape[i + 1] = 15
+            coords.append(
+                center[:, i].reshape(shape)
+                + half[:, i].reshape(shape) * _kronrod_nodes.reshape(node_shape)
+            )
+        coords = np.broadcast_arrays(*coords)
+        values = f(*coords)
+        if not np.isfinite(values).all():
+            return None
+
+        jacobian = np.prod(half, axis=1)
+        kronrod = _contract(values, [_kronrod_weights] * dim) * jacobian
+        errors = abs(kronrod - _contract(values, [_gauss_weights] * dim) * jacobian)
+
+        estimate = result + kronrod.sum()
+        goal = max(tol, tol * abs(estimate))
+        if error + errors.sum() <= goal:
+            return (estimate, error + errors.sum())
+        if depth == maxrec:
+            return None
+
+        # regions with more than their share of the error are bisected
+        share = goal * abs(np.prod(2 * half, axis=1)) / total_volume
+        split = np.nonzero(errors > share)[0]
+        if len(split) > max_regions // 2:
+            split = split[np.argsort(errors[split])[-(max_regions // 2) :]]
+        done = np.ones(len(errors), dtype=bool)
+        done[split] = False
+        result += kronrod[done].sum()
+        error += errors[done].sum()
+
+        axis_errors = np.stack(
+            [
+                abs(
+                    _contract(
+                        values[split],
+                        [
+                            _gauss_weights if j == i else _kronrod_weights
+                            for j in range(dim)
+                        ],
+                    )
+                    * jacobian[split]
+                    - kronrod[split]
+                )
+                for i in range(dim)
+            ],
+            axis=1,
+        )
+        axis = np.argmax(axis_errors, axis=1)
+        rows = np.arange(len(split))
+        lower, upper = lower[split], upper[split]
+        middle = center[split, axis]
+        left_upper = upper.copy()
+        left_upper[rows, axis] = middle
+        right_lower = lower.copy()
+        right_lower[rows, axis] = middle
+        lower = np.concatenate([lower, right_lower])
+        upper = np.concatenate([left_upper, upper])
+
+
+@lru_cache(maxsize=64)
+def _gauss_legendre_rule(level):
+    """Nodes and weights of the Gauss-Legendre rule of the given level."""
+    return np.polynomial.legendre.leggauss(2 * level - 1)
+
+
+def _compositions(total, parts):
+    """Generates the tuples of parts positive integers with the given sum."""
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(1, total - parts + 2):
+        for rest in _compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+
+def _sparse_grid_cubature(f, ranges, **opts):
+    """
+    Smolyak sparse grid cubature with Gauss-Legendre rules. f is a function of
+    arrays, and all the nodes of one level are evaluated in one call. The
+    level is raised until two consecutive levels agree, at most maxrec times.
+    Returns None if they don't.
+    """
+    tol = opts.get("tol")
+    if not tol:
+        tol = 1.0e-10
+    maxrec = opts.get("maxrec")
+    if not maxrec:
+        maxrec = 10
+    dim = len(ranges)
+    lower = np.array([a for a, b in ranges], dtype=float)
+    upper = np.array([b for a, b in ranges], dtype=float)
+    center = 0.5 * (lower + upper)
+    half = 0.5 * (upper - lower)
+
+    previous = None
+    for level in range(1, maxrec + 2):
+        nodes = []
+        weights = []
+        # the combination technique: a sum of small tensor product rules
+        for total in range(max(dim, level), level + dim):
+            coefficient = (-1) ** (level + dim - 1 - total) * int(
+                sympy.binomial(dim - 1, level + dim - 1 - total)
+            )
+            for levels in _compositions(total, dim):
+                rules = [_gauss_legendre_rule(k) for k in levels]
+                grid = np.meshgrid(*[rule[0] for rule in rules], indexing="ij")
+                nodes.append(np.stack([axis.ravel() for axis in grid], axis=1))
+                grid = np.meshgrid(*[rule[1] for rule in rules], indexing="ij")
+                weights.append(coefficient * np.prod(grid, axis=0).ravel())
+        nodes, inverse = np.unique(np.concatenate(nodes), axis=0, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), np.concatenate(weights))
+        coords = center + half * nodes
+        values = f(*coords.T)
+        if not np.isfinite(values).all():
+            return None
+        estimate = weights @ values * np.prod(half)
+        if previous is not None and level > 2:
+            error = abs(estimate - previous)
+            if error <= max(tol, tol * abs(estimate)):
+                return (estimate, error)
+        previous = estimate
+    return None
+
+
+def _automatic_method(integrator):
+    """
+    Returns a multidimensional method, which uses integrator for one
+    dimensional integrals. Multiple integrals use vectorized cubature, and
+    nested integrator where this doesn't converge.
+    """
+
+    def automatic(f, ranges, **opts):
+        if len(ranges) > 1:
+            if len(ranges) <= 3:
+                val = _gauss_kronrod_cubature(f, ranges, **opts)
+            else:
+                val = _sparse_grid_cubature(f, ranges, **opts)
+            if val is not None:
+                return val
+            return _fubini(_scalar_function(f), ranges, integrator=integrator, **opts)
+        return integrator(_scalar_function(f), *ranges[0], **opts)
+
+    return automatic
+
+
 class NIntegrate(Builtin):
     """
     <dl>
@@ -397,7 +788,6 @@ class NIntegrate(Builtin):
      = 2.50663
 
     >> Table[1./NIntegrate[x^k,{x,0,1},Tolerance->1*^-6], {k,0,6}]
-     : The specified method failed to return a number. Falling back into the internal evaluator.
      = {1., 2., 3., 4., 5., 6., 7.}
 
     >> NIntegrate[1 / z, {z, -1 - I, 1 - I, 1 + I, -1 + I, -1 - I}, Tolerance->1.*^-4]
@@ -413,6 +803,23 @@ class NIntegrate(Builtin):
     >> NIntegrate[x * y,{x, 0, 1}, {y, 0, 1}]
      = 0.25
 
+    Integrands can have complex values:
+    >> NIntegrate[Sqrt[x - 2], {x, 0, 1}, Method -> "Internal"]
+     = 0. + 1.21895 I
+    #> NIntegrate[f[x], {x, 0, 1}, Method -> "Internal"]
+     : The integrand f[x] has evaluated to non-numerical values for all sampling points in the region with boundaries {{x, 0, 1}}
+     = NIntegrate[f[x], {x, 0, 1}, Method -> Internal]
+
+    Multiple integrals are computed by vectorized cubature, which evaluates
+    the integrand at all the nodes of a step at once. 'Method -> "GaussKronrod"'
+    bisects the regions of a tensor product rule adaptively, and
+    'Method -> "SparseGrid"' uses Smolyak sparse grids, which need much fewer
+    nodes in higher dimensions:
+    >> NIntegrate[Sin[x y z], {x, 0, 3}, {y, 0, 3}, {z, 0, 3}]
+     = 7.08878
+    >> NIntegrate[Exp[-x^2 - y^2 - z^2 - w^2], {x, 0, 1}, {y, 0, 1}, {z, 0, 1}, {w, 0, 1}, Method -> "SparseGrid"]
+     = 0.311081
+
     """
 
     messages = {
@@ -446,13 +853,16 @@ class NIntegrate(Builtin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.methods["Internal"] = (_internal_adaptative_simpsons_rule, False)
+        self.methods["GaussKronrod"] = (_gauss_kronrod_cubature, True)
+        self.methods["SparseGrid"] = (_sparse_grid_cubature, True)
         try:
             from scipy.integrate import romberg, quad, nquad
 
+            nquad = _scipy_interface(
+                nquad, {}, {"full_output": 1}, lambda res: (res[0], res[1])
+            )
             self.methods["NQuadrature"] = (
-                _scipy_interface(
-                    nquad, {}, {"full_output": 1}, lambda res: (res[0], res[1])
-                ),
+                lambda f, ranges, **opts: nquad(_scalar_function(f), ranges, **opts),
                 True,
             )
             self.methods["Quadrature"] = (
@@ -476,9 +886,15 @@ class NIntegrate(Builtin):
                 ),
                 False,
             )
-            self.methods["Automatic"] = self.methods["Quadrature"]
+            self.methods["Automatic"] = (
+                _automatic_method(self.methods["Quadrature"][0]),
+                True,
+            )
         except Exception:
-            self.methods["Automatic"] = self.methods["Internal"]
+            self.methods["Automatic"] = (
+                _automatic_method(_internal_adaptative_simpsons_rule),
+                True,
+            )
             self.methods["Simpson"] = self.methods["Internal"]
 
         self.messages["bdmtd"] = (
@@ -549,6 +965,7 @@ class NIntegrate(Builtin):
         else:
             is_multidimensional = False
 
+        boundaries = Expression(SymbolList, *domain.get_sequence())
         domain = self.decompose_domain(domain, evaluation)
         if not domain:
             return
@@ -562,13 +979,11 @@ class NIntegrate(Builtin):
             evaluation.message("NIntegrate", "cmpint")
             return
 
-        intvars = Expression(SymbolList, *coords)
-        integrand = Expression("Compile", intvars, func).evaluate(evaluation)
-
-        if len(integrand.leaves) >= 3:
-            integrand = integrand.leaves[2].cfunc
-        else:
-            evaluation.message("inumer", func, domain)
+        integrand = _batch_function(
+            func, [coord.get_name() for coord in coords], evaluation
+        )
+        if integrand is None:
+            evaluation.message("NIntegrate", "inumr", func, boundaries)
             return
         results = []
         for subdomain in product(*[axis[1] for axis in domain]):
@@ -607,7 +1022,10 @@ class NIntegrate(Builtin):
                         b = b.value
                         subdomain2.append([machine_epsilon, 1.0])
                         coordtransform.append(
-                            (lambda u: b - z + z / u, lambda u: -z * u ** (-2.0))
+                            (
+                                lambda u, b=b, z=z: b - z + z / u,
+                                lambda u, z=z: -z * u ** (-2.0),
+                            )
                         )
                 elif b.get_head_name() == "System`DirectedInfinity":
                     if not a.is_numeric():
@@ -617,7 +1035,10 @@ class NIntegrate(Builtin):
                     z = b.leaves[0].value
                     subdomain2.append([machine_epsilon, 1.0])
                     coordtransform.append(
-                        (lambda u: a - z + z / u, lambda u: z * u ** (-2.0))
+                        (
+                            lambda u, a=a, z=z: a - z + z / u,
+                            lambda u, z=z: z * u ** (-2.0),
+                        )
                     )
                 elif a.is_numeric() and b.is_numeric():
                     a = Expression(SymbolN, a).evaluate(evaluation).value
@@ -634,17 +1055,7 @@ class NIntegrate(Builtin):
                 continue
 
             if any(coordtransform):
-                func2 = lambda *u: (
-                    integrand(
-                        *[
-                            x[0](u[i]) if x else u[i]
-                            for i, x in enumerate(coordtransform)
-                        ]
-                    )
-                    * np.prod(
-                        [jac[1](u[i]) for i, jac in enumerate(coordtransform) if jac]
-                    )
-                )
+                func2 = _transformed_function(integrand, coordtransform)
             opts = {
                 "acur": accuracy,
                 "tol": tolerance,
@@ -652,15 +1063,19 @@ class NIntegrate(Builtin):
             }
             opts.update(method_options)
             try:
-                if len(subdomain2) > 1:
-                    if is_multidimensional:
-                        nintegrate_method(func2, subdomain2, **opts)
-                    else:
-                        val = _fubini(
-                            func2, subdomain2, integrator=nintegrate_method, **opts
-                        )
+                if is_multidimensional:
+                    val = nintegrate_method(func2, subdomain2, **opts)
+                elif len(subdomain2) > 1:
+                    val = _fubini(
+                        _scalar_function(func2),
+                        subdomain2,
+                        integrator=nintegrate_method,
+                        **opts,
+                    )
                 else:
-                    val = nintegrate_method(func2, *(subdomain2[0]), **opts)
+                    val = nintegrate_method(
+                        _scalar_function(func2), *(subdomain2[0]), **opts
+                    )
             except Exception:
                 val = None
 
@@ -668,20 +1083,23 @@ class NIntegrate(Builtin):
                 evaluation.message("NIntegrate", "mtdfail")
                 if len(subdomain2) > 1:
                     val = _fubini(
-                        func2,
+                        _scalar_function(func2),
                         subdomain2,
                         integrator=_internal_adaptative_simpsons_rule,
                         **opts,
                     )
                 else:
                     val = _internal_adaptative_simpsons_rule(
-                        func2, *(subdomain2[0]), **opts
+                        _scalar_function(func2), *(subdomain2[0]), **opts
                     )
             results.append(val)
 
         result = sum([r[0] for r in results])
         # error = sum([r[1] for r in results]) -> use it when accuracy
         #                                         be implemented...
+        if not np.isfinite(result):
+            evaluation.message("NIntegrate", "inumr", func, boundaries)
+            return
         return from_python(result)
 
 
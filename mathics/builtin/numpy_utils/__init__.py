@@ -38,3 +38,5 @@ is_numpy_available = numpy_layer.is_numpy_available
 allclose = numpy_layer.allclose
 errstate = numpy_layer.errstate
 instantiate_elements = numpy_layer.instantiate_elements
+machine_array = numpy_layer.machine_array
+apply_machine_ufunc = numpy_layer.apply_machine_ufunc
@@ -5,7 +5,15 @@
 A couple of helper functions for doing numpy-like stuff with numpy.
 """
 
-from mathics.core.expression import Expression
+from mathics.core.expression import (
+    Complex,
+    Expression,
+    Integer,
+    MachineReal,
+    PackedArray,
+    Real,
+    from_numpy,
+)
 from functools import reduce
 import numpy
 import ast
@@ -148,11 +156,20 @@ def errstate(**kwargs):
     return numpy.errstate(**kwargs)
 
 
+# kinds of numpy arrays whose elements instantiate_elements() can keep in a
+# PackedArray, by element constructor
+_packed_kinds = {Integer: "biu", MachineReal: "f", Real: "f"}
+
+
 def instantiate_elements(a, new_element, d=1):
     # given a numpy array 'a' and a python element constructor 'new_element', generate a python array of the
     # same shape as 'a' with python elements constructed through 'new_element'. 'new_element' will get called
     # if an array of dimension 'd' is reached.
 
+    if d == 1 and a.ndim > 0 and new_element in _packed_kinds:
+        if a.dtype.kind in _packed_kinds[new_element]:
+            return PackedArray(a)
+
     if len(a.shape) == d:
         leaves = [new_element(x) for x in a]
     else:
@@ -160,6 +177,107 @@ def instantiate_elements(a, new_element, d=1):
     return Expression("List", *leaves)
 
 
+# integers beyond this magnitude are not represented exactly as machine reals
+_max_machine_integer = 2 ** 53
+
+
+def machine_array(expr):
+    # convert a machine number or a rectangular List of machine numbers,
+    # integers and complex numbers into a numpy array. returns a pair of the
+    # array and whether all of its elements are inexact, or None if 'expr'
+    # has any other form. the array of a PackedArray is returned as it is and
+    # must not be changed.
+
+    if isinstance(expr, PackedArray):
+        array = expr.get_array()
+        if array is not None:
+            if array.dtype.kind in "fc":
+                return array, True
+            if array.size and numpy.abs(array).max() > _max_machine_integer:
+                return None
+            return array, False
+
+    shape = []
+    leaves = [expr]
+    while leaves and leaves[0].get_head_name() == "System`List":
+        dim = len(leaves[0]._leaves)
+        level = []
+        for leaf in leaves:
+            if leaf.get_head_name() != "System`List" or len(leaf._leaves) != dim:
+                return None
+            level.extend(leaf._leaves)
+        shape.append(dim)
+        leaves = level
+
+    values = []
+    inexact = True
+    dtype = float
+    for leaf in leaves:
+        if isinstance(leaf, MachineReal):
+            values.append(leaf.value)
+        elif isinstance(leaf, Integer):
+            if not -_max_machine_integer <= leaf.value <= _max_machine_integer:
+                return None
+            values.append(leaf.value)
+            inexact = False
+        elif isinstance(leaf, Complex):
+            parts = (leaf.real, leaf.imag)
+            if all(isinstance(part, MachineReal) for part in parts):
+                values.append(complex(leaf.real.value, leaf.imag.value))
+            elif all(isinstance(part, Integer) for part in parts):
+                if not all(
+                    -_max_machine_integer <= part.value <= _max_machine_integer
+                    for part in parts
+                ):
+                    return None
+                values.append(complex(leaf.real.value, leaf.imag.value))
+                inexact = False
+            else:
+                return None
+            dtype = complex
+        else:
+            return None
+
+    return numpy.array(values, dtype=dtype).reshape(shape), inexact
+
+
+def apply_machine_ufunc(name, arrays):
+    # apply the numpy ufunc 'name' to arrays returned by machine_array() and
+    # return the result as a PackedArray. arrays are combined the way
+    # Listable threads over lists, i.e. a list of lower rank is matched
+    # against the outermost dimensions of the others. binary ufuncs are
+    # folded over more than two arrays. returns None if the arrays don't
+    # match or the result is not a list of finite machine numbers.
+
+    ufunc = getattr(numpy, name, None)
+    if not isinstance(ufunc, numpy.ufunc):
+        # numpy_name may also name a plain numpy function, like "angle"
+        return None
+    if not arrays or (ufunc.nin == 1 and len(arrays) != 1):
+        return None
+
+    shape = max((a.shape for a in arrays), key=len)
+    if not shape:
+        return None
+    broadcast = []
+    for a in arrays:
+        if a.shape != shape[: a.ndim]:
+            return None
+        broadcast.append(a.reshape(a.shape + (1,) * (len(shape) - a.ndim)))
+
+    with numpy.errstate(all="ignore"):
+        if ufunc.nin == 1:
+            result = ufunc(broadcast[0])
+        else:
+            result = reduce(ufunc, broadcast)
+        if not numpy.isfinite(result).all():
+            return None
+        # mpmath has no negative zero
+        result = result + 0.0
+
+    return from_numpy(result)
+
+
 #
 # CONDITIONALS AND PROGRAM FLOW
 #
@@ -192,6 +192,15 @@ def instantiate_elements(a, new_element, d=1):
     return Expression("List", *leaves)
 
 
+def machine_array(expr):
+    # machine arithmetic on whole lists needs numpy, see with_numpy.py
+    return None
+
+
+def apply_machine_ufunc(name, arrays):
+    return None
+
+
 #
 # CONDITIONALS AND PROGRAM FLOW
 #
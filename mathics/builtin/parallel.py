@@ -0,0 +1,518 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel Computing
+
+Parallel functions split a computation into independent parts, which are evaluated by a pool of worker processes, the parallel kernels. Each kernel has its own definitions: the definitions of the symbols a computation depends on are sent to the kernels along with it.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import os
+import pickle
+import threading
+import weakref
+
+from mathics.version import __version__  # noqa used in loading to check consistency.
+
+from mathics.builtin.base import Builtin, Predefined
+from mathics.builtin.scoping import dynamic_scoping
+from mathics.core.expression import (
+    Expression,
+    Integer,
+    PackedArray,
+    Symbol,
+    SymbolList,
+    SymbolNull,
+)
+
+
+# In a kernel process: the evaluation that computations are run in, and the
+# names of the user definitions sent to the kernel.
+_kernel = None
+_installed = set()
+
+
+def _start_kernel():
+    global _kernel
+    from mathics import settings
+    from mathics.core.definitions import Definitions
+    from mathics.core.evaluation import Evaluation
+    from mathics.core.snapshot import get_snapshot_filename
+
+    definitions = Definitions(
+        add_builtin=True,
+        builtin_filename=get_snapshot_filename(settings.BUILTIN_SNAPSHOT),
+    )
+    _kernel = Evaluation(definitions=definitions, catch_interrupt=False)
+
+
+def _run_chunk(user_definitions, expr, names, items):
+    """
+    Runs in a kernel. Installs the pickled dict of user definitions, then
+    evaluates the expressions items or, if names is given, evaluates expr
+    with the symbols names bound to each tuple of values in items, like
+    Table does. Returns the results together with the messages and prints
+    issued meanwhile.
+    """
+    evaluation = _kernel
+    definitions = evaluation.definitions
+    user = pickle.loads(user_definitions)
+    for name in _installed - set(user):
+        if name in definitions.user:
+            definitions.reset_user_definition(name)
+    for name, definition in user.items():
+        definitions.add_user_definition(name, definition)
+    _installed.clear()
+    _installed.update(user)
+
+    results = []
+    try:
+        if names is None:
+            for item in items:
+                results.append(item.evaluate(evaluation))
+        else:
+            for values in items:
+                results.append(
+                    dynamic_scoping(expr.evaluate, dict(zip(names, values)), evaluation)
+                )
+    finally:
+        out = evaluation.out
+        evaluation.out = []
+    return results, out
+
+
+# The pool of kernels, started on first use.
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def kernel_pool(count=None):
+    "Returns the pool of kernels and their number."
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None:
+            _pool_size = count or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size, initializer=_start_kernel
+            )
+        return _pool, _pool_size
+
+
+def close_kernels() -> int:
+    "Shuts down the pool of kernels. Returns the number of kernels closed."
+    global _pool, _pool_size
+    with _pool_lock:
+        pool, count = _pool, _pool_size
+        _pool, _pool_size = None, 0
+    if pool is not None:
+        pool.shutdown(wait=True)
+    return count
+
+
+# names of the symbols given to DistributeDefinitions, per Definitions
+_distributed = weakref.WeakKeyDictionary()
+
+
+def _add_symbol_names(expr, names) -> None:
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if expr.is_atom():
+            name = expr.get_name()
+            if name:
+                names.add(name)
+        elif not isinstance(expr, PackedArray) or expr.get_array() is None:
+            stack.append(expr.get_head())
+            stack.extend(expr.get_leaves())
+
+
+def _user_definitions(definitions, exprs) -> bytes:
+    """
+    Pickles the user definitions of the symbols in exprs and of the symbols
+    given to DistributeDefinitions, and of the symbols these definitions
+    refer to in turn. System symbols are left out.
+    """
+    from mathics.core.rules import Rule
+
+    pending = set(_distributed.get(definitions, ()))
+    for expr in exprs:
+        _add_symbol_names(expr, pending)
+    user = {}
+    while pending:
+        name = pending.pop()
+        if name in user or name.startswith("System`"):
+            continue
+        definition = definitions.user.get(name)
+        if definition is None:
+            continue
+        user[name] = definition
+        values = [
+            definition.ownvalues,
+            definition.downvalues,
+            definition.subvalues,
+            definition.upvalues,
+            definition.nvalues,
+            definition.defaultvalues,
+        ]
+        values.extend(definition.formatvalues.values())
+        for rules in values:
+            for rule in rules:
+                _add_symbol_names(rule.pattern.expr, pending)
+                if isinstance(rule, Rule):
+                    _add_symbol_names(rule.replace, pending)
+    return pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+
+
+def _chunks(items, method, count):
+    if method == "FinestGrained":
+        size = 1
+    elif method == "CoarsestGrained":
+        size = -(-len(items) // count)
+    else:
+        # a few parts per kernel even out differences in their run times
+        size = -(-len(items) // (4 * count))
+    size = max(size, 1)
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+class ParallelFailure(Exception):
+    pass
+
+
+def parallel_evaluate(evaluation, items, method, expr=None, names=None):
+    """
+    Evaluates the expressions items or, if names is given, expr with the
+    symbols names bound to each tuple of values in items, on the parallel
+    kernels. Messages issued by the kernels are issued in evaluation.
+    Raises ParallelFailure if the computation cannot be sent to the kernels
+    or the kernels fail.
+    """
+    if not items:
+        return []
+    exprs = list(items) if names is None else [expr]
+    try:
+        user_definitions = _user_definitions(evaluation.definitions, exprs)
+        pool, count = kernel_pool()
+        futures = [
+            pool.submit(_run_chunk, user_definitions, expr, names, chunk)
+            for chunk in _chunks(items, method, count)
+        ]
+    except (pickle.PicklingError, TypeError, ValueError, AttributeError, RuntimeError):
+        raise ParallelFailure
+
+    results = []
+    try:
+        for future in futures:
+            while True:
+                try:
+                    chunk_results, out = future.result(timeout=0.1)
+                    break
+                except TimeoutError:
+                    evaluation.check_stopped()
+            for item in out:
+                evaluation.out.append(item)
+                evaluation.output.out(item)
+            results.extend(chunk_results)
+    except BrokenProcessPool:
+        # a kernel that died takes the pool down with it
+        close_kernels()
+        raise ParallelFailure
+    except (pickle.PicklingError, TypeError, ValueError, AttributeError):
+        # the items or results cannot be pickled
+        raise ParallelFailure
+    finally:
+        for future in futures:
+            future.cancel()
+    return results
+
+
+class _ParallelFunction(Builtin):
+    options = {"Method": "Automatic"}
+
+    messages = {
+        "nopar1": "`1` cannot be parallelized; proceeding with sequential evaluation.",
+    }
+
+    # the name of the sequential counterpart
+    sequential = None
+
+    def get_method(self, options, evaluation) -> str:
+        method = self.get_option(options, "Method", evaluation)
+        if method is None:
+            return "Automatic"
+        return method.get_string_value() or method.get_name()
+
+    def run_sequential(self, leaves, evaluation):
+        "Evaluates the sequential counterpart with the given leaves."
+        expr = Expression(self.sequential, *leaves)
+        evaluation.message(self.get_name(), "nopar1", expr)
+        return expr.evaluate(evaluation)
+
+
+def _leaves_at(expr, depth, items):
+    # the leaves of the nested Lists expr at the given depth
+    if depth == 0:
+        items.append(expr)
+        return True
+    if not expr.has_form("List", None):
+        return False
+    return all(_leaves_at(leaf, depth - 1, items) for leaf in expr.leaves)
+
+
+def _restructure(expr, depth, results):
+    # expr with its leaves at the given depth replaced by results
+    if depth == 0:
+        return next(results)
+    return Expression(
+        SymbolList, *[_restructure(leaf, depth - 1, results) for leaf in expr.leaves]
+    )
+
+
+class _ParallelIteration(_ParallelFunction):
+    attributes = ("HoldAll", "Protected")
+
+    def get_result(self, grid, depth, results, evaluation):
+        raise NotImplementedError
+
+    def apply(self, expr, iterators, evaluation, options):
+        "%(name)s[expr_, iterators__List, OptionsPattern[%(name)s]]"
+        iterators = iterators.get_sequence()
+
+        # the values of the iterator variables, computed by Table
+        names = [
+            iterator.leaves[0].get_name()
+            for iterator in iterators
+            if len(iterator.leaves) > 1 and iterator.leaves[0].get_name()
+        ]
+        grid = Expression(
+            "Quiet",
+            Expression(
+                "Table", Expression(SymbolList, *map(Symbol, names)), *iterators
+            ),
+        ).evaluate(evaluation)
+        values = []
+        if not _leaves_at(grid, len(iterators), values):
+            return self.run_sequential([expr] + iterators, evaluation)
+        values = [tuple(value.leaves) for value in values]
+
+        method = self.get_method(options, evaluation)
+        try:
+            results = parallel_evaluate(evaluation, values, method, expr, names)
+        except ParallelFailure:
+            return self.run_sequential([expr] + iterators, evaluation)
+        return self.get_result(grid, len(iterators), results, evaluation)
+
+
+class ParallelTable(_ParallelIteration):
+    """
+    <dl>
+      <dt>'ParallelTable[$expr$, {$i$, $n$}]'
+      <dd>evaluates $expr$ for $i$ from 1 to $n$ in parallel and returns the list of the results.
+
+      <dt>'ParallelTable[$expr$, $iter1$, $iter2$, ...]'
+      <dd>takes the same iterators as 'Table'.
+    </dl>
+
+    The iterations are split up among the kernels. 'Method' is "CoarsestGrained" for one part per kernel, or "FinestGrained" for one part per iteration:
+    >> ParallelTable[i ^ 2, {i, 5}, Method -> "FinestGrained"]
+     = {1, 4, 9, 16, 25}
+
+    >> ParallelTable[i + j, {i, 3}, {j, i}]
+     = {{2}, {3, 4}, {4, 5, 6}}
+
+    Definitions used by the expression are sent to the kernels:
+    >> square[x_] := x ^ 2
+    >> ParallelTable[square[i], {i, {a, b}}]
+     = {a ^ 2, b ^ 2}
+
+    Iterators that do not have a fixed number of iterations cannot be parallelized:
+    >> ParallelTable[i, {i, n}]
+     : Table[i, {i, n}] cannot be parallelized; proceeding with sequential evaluation.
+     : Iterator does not have appropriate bounds.
+     = Table[i, {i, n}]
+    """
+
+    sequential = "Table"
+
+    def get_result(self, grid, depth, results, evaluation):
+        return _restructure(grid, depth, iter(results))
+
+
+class ParallelSum(_ParallelIteration):
+    """
+    <dl>
+      <dt>'ParallelSum[$expr$, {$i$, $imin$, $imax$}]'
+      <dd>sums up $expr$ for $i$ from $imin$ to $imax$ in parallel.
+
+      <dt>'ParallelSum[$expr$, $iter1$, $iter2$, ...]'
+      <dd>takes the same iterators as 'Sum'.
+    </dl>
+
+    >> ParallelSum[1 / i ^ 2, {i, 10}]
+     = 1968329 / 1270080
+    >> ParallelSum[i j, {i, 3}, {j, 3}]
+     = 36
+    """
+
+    sequential = "Sum"
+
+    def get_result(self, grid, depth, results, evaluation):
+        return Expression("Plus", *results).evaluate(evaluation)
+
+
+class ParallelDo(_ParallelIteration):
+    """
+    <dl>
+      <dt>'ParallelDo[$expr$, {$i$, $n$}]'
+      <dd>evaluates $expr$ for $i$ from 1 to $n$ in parallel.
+
+      <dt>'ParallelDo[$expr$, $iter1$, $iter2$, ...]'
+      <dd>takes the same iterators as 'Do'.
+    </dl>
+
+    The kernels print and issue messages in the session:
+    >> ParallelDo[Print[i], {i, 3}]
+     | 1
+     | 2
+     | 3
+
+    Assignments are made in the kernels, not in the session:
+    >> x = 0; ParallelDo[x = i, {i, 3}]; x
+     = 0
+    """
+
+    sequential = "Do"
+
+    def get_result(self, grid, depth, results, evaluation):
+        return SymbolNull
+
+
+class ParallelMap(_ParallelFunction):
+    """
+    <dl>
+      <dt>'ParallelMap[$f$, $expr$]'
+      <dd>applies $f$ to each element of $expr$ in parallel.
+    </dl>
+
+    >> ParallelMap[f, {1, 2, 3}]
+     = {f[1], f[2], f[3]}
+    >> ParallelMap[PrimeQ, 2 ^ Range[20] - 1]
+     = {False, True, True, False, True, False, True, False, False, False, False, False, True, False, False, False, True, False, True, False}
+
+    The head of $expr$ is kept:
+    >> ParallelMap[#^2 &, a + b + c]
+     = a ^ 2 + b ^ 2 + c ^ 2
+
+    #> ParallelMap[f, 7]
+     = 7
+    """
+
+    sequential = "Map"
+
+    def apply(self, f, expr, evaluation, options):
+        "ParallelMap[f_, expr_, OptionsPattern[ParallelMap]]"
+        if expr.is_atom():
+            return expr
+        items = [Expression(f, leaf) for leaf in expr.leaves]
+        method = self.get_method(options, evaluation)
+        try:
+            results = parallel_evaluate(evaluation, items, method)
+        except ParallelFailure:
+            return self.run_sequential((f, expr), evaluation)
+        return Expression(expr.get_head(), *results)
+
+
+class DistributeDefinitions(Builtin):
+    """
+    <dl>
+      <dt>'DistributeDefinitions[$s1$, $s2$, ...]'
+      <dd>sends the definitions of the symbols $si$ to the parallel kernels with every parallel computation.
+    </dl>
+
+    Parallel computations send the definitions of the symbols they use by themselves. Symbols that are only referred to indirectly, e.g. through 'ToExpression', have to be distributed:
+    >> h[x_] := x + 1
+    >> DistributeDefinitions[h]
+     = {h}
+    >> ParallelTable[ToExpression["h"][i], {i, 3}]
+     = {2, 3, 4}
+    """
+
+    attributes = ("HoldAll", "Protected")
+
+    def apply(self, symbols, evaluation):
+        "DistributeDefinitions[symbols___]"
+        definitions = evaluation.definitions
+        names = _distributed.setdefault(definitions, set())
+        result = []
+        for symbol in symbols.get_sequence():
+            name = symbol.get_name() or symbol.get_string_value()
+            if not name:
+                continue
+            name = definitions.lookup_name(name)
+            names.add(name)
+            result.append(Symbol(name))
+        return Expression(SymbolList, *result)
+
+
+class LaunchKernels(Builtin):
+    """
+    <dl>
+      <dt>'LaunchKernels[]'
+      <dd>starts one parallel kernel per processor, if no kernels are running.
+
+      <dt>'LaunchKernels[$n$]'
+      <dd>starts $n$ parallel kernels, replacing the running ones.
+    </dl>
+
+    Parallel computations launch the kernels as needed. 'LaunchKernels' returns the number of kernels:
+    >> LaunchKernels[2]
+     = 2
+    >> $KernelCount
+     = 2
+    """
+
+    def apply_0(self, evaluation):
+        "LaunchKernels[]"
+        return Integer(kernel_pool()[1])
+
+    def apply_1(self, n, evaluation):
+        "LaunchKernels[n_Integer]"
+        count = n.get_int_value()
+        if count < 1:
+            return
+        if _pool_size != count:
+            close_kernels()
+        return Integer(kernel_pool(count)[1])
+
+
+class CloseKernels(Builtin):
+    """
+    <dl>
+      <dt>'CloseKernels[]'
+      <dd>shuts down the parallel kernels and returns their number.
+    </dl>
+
+    >> CloseKernels[]
+     = ...
+    >> $KernelCount
+     = 0
+    """
+
+    def apply(self, evaluation):
+        "CloseKernels[]"
+        return Integer(close_kernels())
+
+
+class KernelCount(Predefined):
+    """
+    <dl>
+      <dt>'$KernelCount'
+      <dd>is the number of running parallel kernels.
+    </dl>
+    """
+
+    name = "$KernelCount"
+
+    def evaluate(self, evaluation):
+        return Integer(_pool_size)
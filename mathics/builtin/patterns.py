@@ -53,7 +53,7 @@ from mathics.core.expression import (
     SymbolList,
     SymbolTrue,
 )
-from mathics.core.rules import Rule
+from mathics.core.rules import DispatchRules, Rule
 from mathics.core.pattern import Pattern, StopGenerator
 
 
@@ -107,6 +107,8 @@ class RuleDelayed(BinaryOperator):
 
 
 def create_rules(rules_expr, expr, name, evaluation, extra_args=[]):
+    if isinstance(rules_expr, DispatchRules):
+        return rules_expr, False
     if rules_expr.has_form("Dispatch", None):
         rules_expr = rules_expr.leaves[0]
     if rules_expr.has_form("List", None):
@@ -270,6 +272,9 @@ class ReplaceAll(BinaryOperator):
     #> a + b /. x_ + y_ -> {x, y}
      = {a, b}
 
+    #> m = {{{1}}, {{2}}}; m[[1, 1, 1]] = a; m /. a -> 0
+     = {{{0}}, {{2}}}
+
     ReplaceAll replaces the shallowest levels first:
     >> ReplaceAll[x[1], {x[1] -> y, 1 -> 2}]
      = y
@@ -504,24 +509,24 @@ class PatternTest(BinaryOperator, PatternObject):
                 return builtin.test(candidate)
         return None
 
+    def passes_test(self, expression, evaluation):
+        for item in expression.get_sequence():
+            item = item.evaluate(evaluation)
+            quick_test = self.quick_pattern_test(item, self.test_name, evaluation)
+            if quick_test is not None:
+                if not quick_test:
+                    return False
+            else:
+                test_expr = Expression(self.test, item)
+                test_value = test_expr.evaluate(evaluation)
+                if not test_value.is_true():
+                    return False
+        return True
+
     def match(self, yield_func, expression, vars, evaluation, **kwargs):
         # for vars_2, rest in self.pattern.match(expression, vars, evaluation):
         def yield_match(vars_2, rest):
-            items = expression.get_sequence()
-            for item in items:
-                item = item.evaluate(evaluation)
-                quick_test = self.quick_pattern_test(item, self.test_name, evaluation)
-                if quick_test is not None:
-                    if not quick_test:
-                        break
-                        # raise StopGenerator
-                else:
-                    test_expr = Expression(self.test, item)
-                    test_value = test_expr.evaluate(evaluation)
-                    if not test_value.is_true():
-                        break
-                        # raise StopGenerator
-            else:
+            if self.passes_test(expression, evaluation):
                 yield_func(vars_2, None)
 
         # try:
@@ -529,6 +534,19 @@ class PatternTest(BinaryOperator, PatternObject):
         # except StopGenerator:
         #    pass
 
+    def compile_matcher(self, heads):
+        pattern_matcher = self.pattern.compile_matcher(heads)
+        if pattern_matcher is None:
+            return None
+
+        def matcher(expression, vars, evaluation):
+            vars = pattern_matcher(expression, vars, evaluation)
+            if vars is not None and self.passes_test(expression, evaluation):
+                return vars
+            return None
+
+        return matcher
+
     def get_match_count(self, vars={}):
         return self.pattern.get_match_count(vars)
 
@@ -753,6 +771,9 @@ class HoldPattern(PatternObject):
         #     yield new_vars, rest
         self.pattern.match(yield_func, expression, vars, evaluation)
 
+    def compile_matcher(self, heads):
+        return self.pattern.compile_matcher(heads)
+
 
 class Pattern_(PatternObject):
     """
@@ -854,6 +875,24 @@ class Pattern_(PatternObject):
             if existing.sameQ(expression):
                 yield_func(vars, None)
 
+    def compile_matcher(self, heads):
+        pattern_matcher = self.pattern.compile_matcher(heads)
+        if pattern_matcher is None:
+            return None
+        varname = self.varname
+
+        def matcher(expression, vars, evaluation):
+            existing = vars.get(varname, None)
+            if existing is None:
+                new_vars = vars.copy()
+                new_vars[varname] = expression
+                return pattern_matcher(expression, new_vars, evaluation)
+            elif existing.sameQ(expression):
+                return vars
+            return None
+
+        return matcher
+
     def get_match_candidates(self, leaves, expression, attributes, evaluation, vars={}):
         existing = vars.get(self.varname, None)
         if existing is None:
@@ -1049,6 +1088,18 @@ class Blank(_Blank):
             else:
                 yield_func(vars, None)
 
+    def compile_matcher(self, heads):
+        head = self.head
+
+        def matcher(expression, vars, evaluation):
+            if expression.has_form("Sequence", 0):
+                return None
+            if head is None or expression.get_head().sameQ(head):
+                return vars
+            return None
+
+        return matcher
+
 
 class BlankSequence(_Blank):
     """
@@ -1348,6 +1399,22 @@ class Condition(BinaryOperator, PatternObject):
 
         self.pattern.match(yield_match, expression, vars, evaluation)
 
+    def compile_matcher(self, heads):
+        pattern_matcher = self.pattern.compile_matcher(heads)
+        if pattern_matcher is None:
+            return None
+        test = self.test
+
+        def matcher(expression, vars, evaluation):
+            vars = pattern_matcher(expression, vars, evaluation)
+            if vars is not None:
+                test_result = test.replace_vars(vars).evaluate(evaluation)
+                if test_result.is_true():
+                    return vars
+            return None
+
+        return matcher
+
 
 class OptionsPattern(PatternObject):
     """
@@ -1477,21 +1544,60 @@ class Dispatch(Builtin):
     """
     <dl>
     <dt>'Dispatch[$rulelist$]'
-        <dd>Introduced for compatibility. Currently, it just return $rulelist$.
-            In the future, it should return an optimized DispatchRules atom,
-            containing an optimized set of rules.
+        <dd>generates an optimized dispatch table representation of $rulelist$,
+        which can be used in 'Replace', 'ReplaceAll', 'ReplaceRepeated' and
+        'ReplaceList'.
     </dl>
 
+    Rules are indexed by the head, the number of arguments and the literal
+    value of their left-hand side, so that only the rules that might match
+    are tried against each subexpression:
+    >> d = Dispatch[{a -> 1, b -> 2, f[x_] -> x}]
+     = Dispatch[{a -> 1, b -> 2, f[x_] -> x}]
+    >> {a, b, c, f[3]} /. d
+     = {1, 2, c, 3}
+    >> Head[d]
+     = Dispatch
+
+    Rules are still tried in the order in which they were given:
+    >> {f[1], f[2]} /. Dispatch[{f[_Integer] -> i, f[1] -> one}]
+     = {i, i}
+
+    Large tables of literal rules are looked up without trying each rule:
+    >> table = Dispatch[Table[g[k] -> k^2, {k, 1000}]];
+    >> Total[Table[g[k], {k, 1000}] /. table]
+     = 333833500
+
+    #> Replace[b, d]
+     = 2
+    #> ReplaceList[f[5], d]
+     = {5}
+    #> a + b + c //. Dispatch[{a -> b, b -> c}]
+     = 3 c
+    #> Dispatch[{a -> 1, b}]
+     : b is not a valid rule or list of rules.
+     = Dispatch[{a -> 1, b}]
+    #> Clear[d, table]
     """
 
-    def apply_stub(self, rules, evaluation):
+    messages = {
+        "invrpl": "`1` is not a valid rule or list of rules.",
+    }
+
+    rules = {
+        "Dispatch[rule:(_Rule|_RuleDelayed)]": "Dispatch[{rule}]",
+    }
+
+    def apply_create(self, rules, evaluation):
         """Dispatch[rules_List]"""
-        # TODO:
-        # The next step would be to enlarge this method, in order to
-        # check that all the elements in x are rules, eliminate redundancies
-        # in the list, and sort the list in a way that increases efficiency.
-        # A second step would be to implement an ``Atom`` class containing the
-        # compiled patters, and modify Replace and ReplaceAll to handle this
-        # kind of objects.
-        #
-        return rules
+        compiled = []
+        for rule in rules.leaves:
+            if not rule.has_form(("Rule", "RuleDelayed"), 2):
+                evaluation.message("Dispatch", "invrpl", rule)
+                return
+            try:
+                compiled.append(Rule(rule.leaves[0], rule.leaves[1]))
+            except PatternError:
+                evaluation.message("Dispatch", "invrpl", rule)
+                return
+        return DispatchRules(rules, compiled, evaluation)
@@ -17,6 +17,7 @@ from mathics.builtin.base import Builtin, BinaryOperator
 from mathics.core.expression import (
     Expression,
     Symbol,
+    SymbolNull,
     from_python,
     SymbolTrue,
     SymbolFalse,
@@ -87,14 +88,14 @@ class CompoundExpression(BinaryOperator):
         "CompoundExpression[expr___]"
 
         items = expr.get_sequence()
-        result = Symbol("Null")
+        result = SymbolNull
         for expr in items:
             prev_result = result
             result = expr.evaluate(evaluation)
 
             # `expr1; expr2;` returns `Null` but assigns `expr2` to `Out[n]`.
             # even stranger `CompoundExpresion[expr1, Null, Null]` assigns `expr1` to `Out[n]`.
-            if result == Symbol("Null") and prev_result != Symbol("Null"):
+            if SymbolNull.sameQ(result) and not SymbolNull.sameQ(prev_result):
                 evaluation.predetermined_out = prev_result
 
         return result
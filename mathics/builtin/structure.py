@@ -24,6 +24,7 @@ from mathics.core.expression import (
     Integer0,
     Integer1,
     Rational,
+    sort_key,
     strip_context,
 )
 from mathics.core.rules import Pattern
@@ -81,7 +82,7 @@ class Sort(Builtin):
         if list.is_atom():
             evaluation.message("Sort", "normal")
         else:
-            new_leaves = sorted(list.leaves)
+            new_leaves = sorted(list.leaves, key=sort_key)
             return list.restructure(list.head, new_leaves, evaluation)
 
     def apply_predicate(self, list, p, evaluation):
@@ -305,7 +306,7 @@ class OrderedQ(Builtin):
     def apply(self, e1, e2, evaluation):
         "OrderedQ[e1_, e2_]"
 
-        if e1 <= e2:
+        if sort_key(e1) <= sort_key(e2):
             return SymbolTrue
         else:
             return SymbolFalse
@@ -334,9 +335,10 @@ class Order(Builtin):
 
     def apply(self, x, y, evaluation):
         "Order[x_, y_]"
-        if x < y:
+        x_key, y_key = sort_key(x), sort_key(y)
+        if x_key < y_key:
             return Integer1
-        elif x > y:
+        elif x_key > y_key:
             return Integer(-1)
         else:
             return Integer0
@@ -1298,8 +1300,10 @@ class Operate(Builtin):
 
         expr = expr.copy()
         e = expr
+        path = []
 
         for i in range(1, head_depth):
+            path.append(e)
             e = e.head
             if e.is_atom():
                 # n is higher than the depth of heads in expr: return
@@ -1310,6 +1314,9 @@ class Operate(Builtin):
         # to apply p to. Python's reference semantics mean that this
         # assignment modifies expr as well.
         e.set_head(Expression(p, e.head))
+        # the caches of the enclosing expressions describe the old head
+        for outer in path:
+            outer.clear_cache()
 
         return expr
 
@@ -13,18 +13,23 @@ import re
 import subprocess
 
 from mathics.version import __version__
+from mathics.core import profiling
 from mathics.core.expression import (
     Expression,
     Integer,
     Integer0,
     Real,
     String,
+    Symbol,
+    SymbolAborted,
     SymbolFailed,
     SymbolList,
     SymbolRule,
+    allocated_bytes,
     strip_context,
 )
 from mathics.builtin.base import Builtin, Predefined
+from mathics.core.evaluation import MemoryInterrupt
 from mathics import version_string
 from mathics.builtin.strings import to_regex
 
@@ -545,7 +550,7 @@ class MemoryInUse(Builtin):
     """
     <dl>
       <dt>'MemoryInUse[]'
-      <dd>Returns the amount of memory used by the definitions object.
+      <dd>Returns the number of bytes of memory used by this process or, where the operating system doesn't tell, by the definitions object.
     </dl>
 
     >> MemoryInUse[]
@@ -554,11 +559,29 @@ class MemoryInUse(Builtin):
 
     def apply_0(self, evaluation) -> Integer:
         """MemoryInUse[]"""
+        # the resident memory of the process is a constant time lookup
+        if have_psutil:
+            return Integer(psutil.Process().memory_info().rss)
+        try:
+            with open("/proc/self/statm") as statm:
+                pages = int(statm.read().split()[1])
+            return Integer(pages * os.sysconf("SC_PAGE_SIZE"))
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        from mathics.builtin.structure import bytecount_support
+
+        definitions = evaluation.definitions
+        if bytecount_support:
+            # like ByteCount, this follows the __slots__ of expressions
+            from mathics.builtin.structure import count_bytes
+
+            return Integer(count_bytes(definitions))
+
         # Partially borrowed from https://code.activestate.com/recipes/577504/
         from itertools import chain
         from sys import getsizeof
 
-        definitions = evaluation.definitions
         seen = set()
         default_size = getsizeof(0)
         handlers = {
@@ -583,32 +606,182 @@ class MemoryInUse(Builtin):
         return Integer(sizeof(definitions))
 
 
+class MemoryConstrained(Builtin):
+    """
+    <dl>
+      <dt>'MemoryConstrained[$expr$, $b$]'
+      <dd>evaluates $expr$, stopping if more than $b$ bytes of memory are requested.
+      <dt>'MemoryConstrained[$expr$, $b$, $failexpr$]'
+      <dd>returns $failexpr$ if the memory constraint is not met.
+    </dl>
+
+    The memory counted is an estimate of the memory allocated for the expressions created while evaluating $expr$, whether or not it is released again.
+    >> MemoryConstrained[Table[i, {i, 10^6}], 10^5]
+     = $Aborted
+    >> MemoryConstrained[Table[i, {i, 10^6}], 10^5, tooBig]
+     = tooBig
+    >> MemoryConstrained[Range[5], 10^5]
+     = {1, 2, 3, 4, 5}
+
+    Arrays allocated at once are counted as well:
+    >> MemoryConstrained[Range[10^6], 10^3]
+     = $Aborted
+    #> MemoryConstrained[ConstantArray[0., 10^6], 10^3, tooBig]
+     = tooBig
+
+    #> MemoryConstrained[x, Infinity]
+     = x
+    #> MemoryConstrained[x, -1]
+     : Number of bytes -1 is not a positive machine-sized integer or Infinity.
+     = MemoryConstrained[x, -1]
+    """
+
+    attributes = ("HoldAll", "Protected")
+    messages = {
+        "memc": "Number of bytes `1` is not a positive machine-sized integer or Infinity.",
+    }
+
+    def apply_2(self, expr, b, evaluation):
+        "MemoryConstrained[expr_, b_]"
+        return self.apply_3(expr, b, SymbolAborted, evaluation)
+
+    def apply_3(self, expr, b, failexpr, evaluation):
+        "MemoryConstrained[expr_, b_, failexpr_]"
+        b = b.evaluate(evaluation)
+        if b.sameQ(Expression("DirectedInfinity", Integer(1))):
+            return expr.evaluate(evaluation)
+        nbytes = b.get_int_value()
+        if nbytes is None or nbytes <= 0:
+            evaluation.message("MemoryConstrained", "memc", b)
+            return
+        limit = evaluation.push_memory_limit(nbytes)
+        try:
+            result = expr.evaluate(evaluation)
+            # the limit is otherwise only checked between evaluation steps,
+            # which misses a single step allocating a large array
+            if allocated_bytes() < limit:
+                return result
+        except MemoryInterrupt:
+            # the limit of an enclosing MemoryConstrained was exceeded
+            if allocated_bytes() < limit:
+                raise
+        finally:
+            evaluation.pop_memory_limit()
+        return failexpr.evaluate(evaluation)
+
+
 class Share(Builtin):
     """
     <dl>
       <dt>'Share[]'
-      <dd>Tries to reduce the amount of memory required to store definitions, by reducing duplicated definitions.
-          Now it just do nothing.
+      <dd>tries to reduce the amount of memory required to store definitions, by storing equal subexpressions of their values only once. It returns the number of bytes saved.
       <dt>'Share[Symbol]'
-      <dd>Tries to reduce the amount of memory required to store definitions associated to $Symbol$.
+      <dd>does the same for the definitions associated to $Symbol$.
     </dl>
 
     >> Share[]
      = ...
+
+    >> list = Table[{i, {x, y}}, {i, 1000}];
+    >> Share[list] > 0
+     = True
+    The values are the same as before:
+    >> list[[{1, -1}]]
+     = {{1, {x, y}}, {1000, {x, y}}}
+
+    #> Share[list]
+     = 0
     """
 
+    attributes = ("HoldAll", "Protected")
+
     def apply_0(self, evaluation) -> Integer:
         """Share[]"""
-        # TODO: implement a routine that swap all the definitions,
-        # collecting repeated symbols and expressions, and then
-        # remplace them by references.
-        # Return the amount of memory recovered.
-        return Integer0
+        return Integer(evaluation.definitions.share())
 
     def apply_1(self, symbol, evaluation) -> Integer:
         """Share[symbol_Symbol]"""
-        # TODO: implement a routine that swap all the definitions,
-        # collecting repeated symbols and expressions, and then
-        # remplace them by references.
-        # Return the amount of memory recovered.
-        return Integer0
+        return Integer(evaluation.definitions.share([symbol.get_name()]))
+
+
+class EvaluationProfile(Builtin):
+    """
+    <dl>
+    <dt>'EvaluationProfile[$expr$]'
+      <dd>evaluates $expr$, prints a ranked report of the evaluation and returns the result.
+    <dt>'EvaluationProfile[$expr$, "$stat$"]'
+      <dd>gives a list of the statistic $stat$ of the evaluation and the result.
+    </dl>
+
+    The report ranks the heads of the evaluated expressions by count, the builtin methods by time, the definitions by the number of rules tried, and gives the time spent converting to and from SymPy. The statistics are:
+    <dl>
+    <dt>"HeadCounts"
+      <dd>a list of rules from heads to their evaluation counts.
+    <dt>"RuleMatches"
+      <dd>a list of rules from symbols to the numbers of rules of their definition that were tried and matched.
+    <dt>"BuiltinTimes"
+      <dd>a list of rules from builtin methods to their number of calls, their time and their time without the builtin methods they call.
+    <dt>"SymPyTime"
+      <dd>the number of conversions to and from SymPy and their time.
+    </dl>
+
+    >> fib[0] = 0; fib[1] = 1; fib[n_] := fib[n - 1] + fib[n - 2];
+    >> {counts, result} = EvaluationProfile[fib[10], "HeadCounts"];
+    >> result
+     = 55
+    >> fib /. counts
+     = 177
+    >> fib /. First[EvaluationProfile[fib[10], "RuleMatches"]]
+     = {177, 177}
+
+    #> EvaluationProfile[1 + 1, "Timing"]
+     : Timing is not a known statistic of EvaluationProfile.
+     = EvaluationProfile[1 + 1, Timing]
+    #> ClearAll[fib];
+    """
+
+    attributes = ("HoldFirst", "Protected")
+
+    messages = {
+        "stat": "`1` is not a known statistic of EvaluationProfile.",
+    }
+
+    def apply(self, expr, evaluation):
+        "EvaluationProfile[expr_]"
+        with profiling.EvaluationProfile() as profile:
+            result = expr.evaluate(evaluation)
+        evaluation.print_out(String(profile.report()))
+        return result
+
+    def apply_stat(self, expr, stat, evaluation):
+        "EvaluationProfile[expr_, stat_String]"
+        stat = stat.get_string_value()
+        if stat not in ("HeadCounts", "RuleMatches", "BuiltinTimes", "SymPyTime"):
+            return evaluation.message("EvaluationProfile", "stat", stat)
+        with profiling.EvaluationProfile() as profile:
+            result = expr.evaluate(evaluation)
+
+        if stat == "HeadCounts":
+            data = [
+                Expression(SymbolRule, Symbol(name), count)
+                for name, count in profile.get_head_counts()
+                if name
+            ]
+        elif stat == "RuleMatches":
+            data = [
+                Expression(SymbolRule, Symbol(name), Expression(SymbolList, *counts))
+                for name, *counts in profile.get_rule_matches()
+                if name
+            ]
+        elif stat == "BuiltinTimes":
+            data = [
+                Expression(SymbolRule, String(key), Expression(SymbolList, *times))
+                for key, *times in profile.get_builtin_times()
+            ]
+        else:
+            return Expression(
+                SymbolList,
+                Expression(SymbolList, profile.sympy_calls, profile.sympy_time),
+                result,
+            )
+        return Expression(SymbolList, Expression(SymbolList, *data), result)
@@ -10,16 +10,21 @@ There are many types of tensors, including scalars and vectors (which are the si
 Mathics represents tensors of vectors and matrices as lists; tensors of any rank can be handled.
 """
 
+import numpy
+
 from mathics.version import __version__  # noqa used in loading to check consistency.
 
 from mathics.builtin.base import Builtin, BinaryOperator
+from mathics.builtin.numpy_utils import machine_array
 from mathics.core.expression import (
     Expression,
     Integer,
     Integer0,
     String,
+    Symbol,
     SymbolTrue,
     SymbolFalse,
+    from_numpy,
 )
 from mathics.core.rules import Pattern
 
@@ -224,15 +229,37 @@ class Dot(BinaryOperator):
      = {{a r + b t, a s + b u}, {c r + d t, c s + d u}}
     >> a . b
      = a . b
+
+    Vectors and matrices of machine numbers are multiplied in one go:
+    >> {{1., 2.}, {3., 4.}} . {5, 6}
+     = {17., 39.}
+    #> {1, 2} . {{1., I}, {2., 0.}}
+     = {5., 0. + 1. I}
     """
 
     operator = "."
     precedence = 490
     attributes = ("Flat", "OneIdentity")
 
-    rules = {
-        "Dot[a_List, b_List]": "Inner[Times, a, b, Plus]",
-    }
+    def apply(self, a, b, evaluation):
+        "Dot[a_List, b_List]"
+        machine_a = machine_array(a)
+        machine_b = machine_array(b)
+        if machine_a is not None and machine_b is not None:
+            (array_a, inexact_a), (array_b, inexact_b) = machine_a, machine_b
+            if (
+                (inexact_a or inexact_b)
+                and array_a.ndim in (1, 2)
+                and array_b.ndim in (1, 2)
+                and array_a.size
+                and array_a.shape[-1] == array_b.shape[0]
+            ):
+                with numpy.errstate(all="ignore"):
+                    # mpmath has no negative zero
+                    result = numpy.dot(array_a, array_b) + 0.0
+                if numpy.isfinite(result).all():
+                    return from_numpy(result)
+        return Expression("Inner", Symbol("Times"), a, b, Symbol("Plus"))
 
 
 class Inner(Builtin):
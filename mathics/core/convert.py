@@ -8,6 +8,8 @@ Conversion to SymPy is handled directly in BaseExpression descendants.
 
 import sympy
 
+from mathics.core import profiling
+
 sympy_symbol_prefix = "_Mathics_User_"
 sympy_slot_prefix = "_Mathics_Slot_"
 
@@ -111,6 +113,7 @@ class SympyPrime(sympy.Function):
                 pass
 
 
+@profiling.sympy_conversion
 def from_sympy(expr):
     from mathics.builtin import sympy_to_mathics
     from mathics.core.expression import (
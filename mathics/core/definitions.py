@@ -5,20 +5,30 @@ import pickle
 
 import os
 import base64
+import math
 import re
 import bisect
+import sys
 
 from collections import defaultdict
 
 import typing
 
 from mathics.core.expression import (
+    Complex,
     Expression,
+    Integer,
+    MachineReal,
+    PackedArray,
+    PrecisionReal,
+    Rational,
+    Real,
     Symbol,
     String,
     fully_qualified_symbol_name,
     strip_context,
 )
+from mathics.core.rules import _NON_STRUCTURAL_ATTRIBUTES, _is_literal
 from mathics_scanner.tokeniser import full_names_pattern
 
 type_compiled_pattern = type(re.compile("a.a"))
@@ -71,6 +81,11 @@ class PyMathicsLoadException(Exception):
         self.module = module
 
 
+# Number of changes kept in the change log of Definitions; older changes are
+# looked up per symbol.
+MAX_CHANGE_LOG = 10000
+
+
 class Definitions(object):
     def __init__(
         self, add_builtin=False, builtin_filename=None, extension_modules=[]
@@ -83,56 +98,73 @@ class Definitions(object):
         self.lookup_cache = {}
         self.proxy = defaultdict(set)
         self.now = 0  # increments whenever something is updated
+        self.changed_at = {}  # name -> time of the last change to its definition
+        self.all_changed_at = 0  # time of the last change to all definitions
+        self.reset_change_log()
         self._packages = []
 
         if add_builtin:
-            from mathics.builtin import modules, contribute
-            from mathics.settings import ROOT_DIR
+            from mathics.core.snapshot import (
+                SnapshotDefinitions,
+                load_snapshot,
+                save_snapshot,
+            )
 
-            loaded = False
+            snapshot = None
             if builtin_filename is not None:
-                builtin_dates = [get_file_time(module.__file__) for module in modules]
-                builtin_time = max(builtin_dates)
-                if get_file_time(builtin_filename) > builtin_time:
-                    builtin_file = open(builtin_filename, "rb")
-                    self.builtin = pickle.load(builtin_file)
-                    loaded = True
-            if not loaded:
-                contribute(self)
-                for module in extension_modules:
-                    try:
-                        self.load_pymathics_module(module, remove_on_quit=False)
-                    except PyMathicsLoadException:
-                        raise
-                    except ImportError:
-                        raise
-
+                snapshot = load_snapshot(builtin_filename)
+            if snapshot is not None:
+                snapshot.install()
+                self.builtin = SnapshotDefinitions(snapshot)
+                self.now = snapshot.now
+                self.reset_change_log()
+            else:
+                self.load_builtins()
                 if builtin_filename is not None:
-                    builtin_file = open(builtin_filename, "wb")
-                    pickle.dump(self.builtin, builtin_file, -1)
-
-            autoload_files(self, ROOT_DIR, "autoload")
-
-            # Move any user definitions created by autoloaded files to
-            # builtins, and clear out the user definitions list. This
-            # means that any autoloaded definitions become shared
-            # between users and no longer disappear after a Quit[].
-            #
-            # Autoloads that accidentally define a name in Global`
-            # could cause confusion, so check for this.
-            #
-            for name in self.user:
-                if name.startswith("Global`"):
-                    raise ValueError("autoload defined %s." % name)
-
-            self.builtin.update(self.user)
-            self.user = {}
+                    try:
+                        save_snapshot(builtin_filename, self)
+                    except OSError:
+                        # not being able to write the snapshot only costs
+                        # time on the next start
+                        pass
+
+            for module in extension_modules:
+                self.load_pymathics_module(module, remove_on_quit=False)
             self.clear_cache()
 
-        # FIXME load dynamically as we do other things
-        import mathics.format.asy  # noqa
-        import mathics.format.json  # noqa
-        import mathics.format.svg  # noqa
+        # the formatters of mathics.format are imported when they are first
+        # looked up, see mathics.core.formatter.lookup_method
+
+    def load_builtins(self) -> None:
+        """
+        Contributes the builtins and loads the autoloaded packages.
+
+        This imports every builtin module: which names are System` symbols
+        is only known once all Builtin classes are there, and the autoloaded
+        packages use builtins from all over. Only a snapshot, which records
+        where each builtin is defined, lets them be imported on demand.
+        """
+        from mathics.builtin import contribute
+        from mathics.settings import ROOT_DIR
+
+        contribute(self)
+        autoload_files(self, ROOT_DIR, "autoload")
+
+        # Move any user definitions created by autoloaded files to
+        # builtins, and clear out the user definitions list. This
+        # means that any autoloaded definitions become shared
+        # between users and no longer disappear after a Quit[].
+        #
+        # Autoloads that accidentally define a name in Global`
+        # could cause confusion, so check for this.
+        #
+        for name in self.user:
+            if name.startswith("Global`"):
+                raise ValueError("autoload defined %s." % name)
+
+        self.builtin.update(self.user)
+        self.user = {}
+        self.clear_cache()
 
     def load_pymathics_module(self, module, remove_on_quit=True):
         """
@@ -192,13 +224,11 @@ class Definitions(object):
         return loaded_module
 
     def clear_pymathics_modules(self):
-        from mathics.builtin import builtins, builtins_by_module
+        from mathics.builtin import builtins_by_module
 
         for key in list(builtins_by_module.keys()):
             if not key.startswith("mathics."):
                 del builtins_by_module[key]
-        for key in self.pymathics:
-            del self.pymathics[key]
 
         self.pymathics = {}
         return None
@@ -237,21 +267,47 @@ class Definitions(object):
         for k in self.proxy.pop(tail, []):
             definitions_cache.pop(k, None)
 
-    def has_changed(self, maximum, symbols):
-        # timestamp for the most recently changed part of a given expression.
-        for name in symbols:
-            symb = self.get_definition(name, only_if_exists=True)
-            if symb is None:
-                # symbol doesn't exist so it was never changed
-                pass
-            else:
-                changed = getattr(symb, "changed", None)
-                if changed is None:
-                    # must be system symbol
-                    symb.changed = 0
-                elif changed > maximum:
-                    return True
+    def reset_change_log(self) -> None:
+        """
+        Starts a new change log at the current time. Earlier changes are
+        still found per symbol in changed_at.
+        """
+        # names of the symbols changed at the times
+        # change_log_start + 1, change_log_start + 2, ..., now
+        self.change_log = []
+        self.change_log_start = self.now
+
+    def log_change(self, name) -> None:
+        """Records that the definition of name changed at the current time."""
+        self.changed_at[name] = self.now
+        if len(self.change_log) >= MAX_CHANGE_LOG:
+            self.change_log = []
+            self.change_log_start = self.now - 1
+        self.change_log.append(name)
+
+    def log_global_change(self) -> None:
+        """Records a change that may affect the definition of any symbol."""
+        self.now += 1
+        self.all_changed_at = self.now
+        self.reset_change_log()
 
+    def has_changed(self, maximum, symbols) -> bool:
+        """
+        Returns whether the definition of any of the names in the set
+        symbols has changed after the time maximum.
+        """
+        if maximum >= self.now:
+            return False
+        if maximum < self.all_changed_at:
+            return True
+        start = self.change_log_start
+        if maximum >= start and self.now - maximum < len(symbols):
+            # few changes since maximum: check them against symbols
+            return not symbols.isdisjoint(self.change_log[maximum - start :])
+        changed_at = self.changed_at
+        for name in symbols:
+            if changed_at.get(name, 0) > maximum:
+                return True
         return False
 
     def get_current_context(self):
@@ -561,13 +617,15 @@ class Definitions(object):
     def mark_changed(self, definition) -> None:
         self.now += 1
         definition.changed = self.now
+        self.log_change(definition.name)
 
     def reset_user_definition(self, name) -> None:
         assert not isinstance(name, Symbol)
         fullname = self.lookup_name(name)
         del self.user[fullname]
         self.clear_cache(fullname)
-        # TODO fix changed
+        self.now += 1
+        self.log_change(fullname)
 
     def add_user_definition(self, name, definition) -> None:
         assert not isinstance(name, Symbol)
@@ -646,10 +704,33 @@ class Definitions(object):
     def get_options(self, name):
         return self.get_definition(self.lookup_name(name)).options
 
+    def share(self, names=None) -> int:
+        """
+        Stores structurally equal subexpressions of the values of the user
+        definitions of names (all by default) only once, and returns an
+        estimate of the number of bytes this frees.
+        """
+        if names is None:
+            names = list(self.user.keys())
+        sharer = ExpressionSharer()
+        for name in names:
+            definition = self.user.get(name)
+            if definition is None:
+                continue
+            for values in (
+                definition.ownvalues,
+                definition.downvalues,
+                definition.subvalues,
+                definition.upvalues,
+            ):
+                for rule in values:
+                    sharer.share_rule(rule)
+        return sharer.reclaimed
+
     def reset_user_definitions(self) -> None:
         self.user = {}
         self.clear_cache()
-        # TODO changed
+        self.log_global_change()
 
     def get_user_definitions(self):
         return base64.encodebytes(pickle.dumps(self.user, protocol=2)).decode("ascii")
@@ -660,6 +741,7 @@ class Definitions(object):
         else:
             self.user = {}
         self.clear_cache()
+        self.log_global_change()
 
     def get_ownvalue(self, name):
         ownvalues = self.get_definition(self.lookup_name(name)).ownvalues
@@ -746,14 +828,263 @@ def get_tag_position(pattern, name) -> typing.Optional[str]:
         return None
 
 
-def insert_rule(values, rule) -> None:
-    for index, existing in enumerate(values):
-        if existing.pattern.sameQ(rule.pattern):
-            del values[index]
-            break
-    # use insort_left to guarantee that if equal rules exist, newer rules will
+def insert_rule(values, rule, index=None):
+    """
+    Inserts rule into the sorted list values, replacing an existing rule with
+    the same pattern. If a LiteralRulesIndex for values is given, it is kept
+    up to date and returned; None is returned if it has to be rebuilt.
+    """
+    position = None
+    if index is not None and index.is_literal(rule.pattern.expr):
+        # the index finds an existing literal rule and its position without
+        # comparing against every rule.
+        existing = index.find(rule.pattern.expr)
+        if existing is not None:
+            position = index.position(values, existing)
+    else:
+        for i, existing in enumerate(values):
+            if existing.pattern.sameQ(rule.pattern):
+                position = i
+                break
+    if position is not None:
+        del values[position]
+        if index is not None and not index.remove(existing, position):
+            index = None
+    # use bisect_left to guarantee that if equal rules exist, newer rules will
     # get higher precedence by being inserted before them. see DownValues[].
-    bisect.insort_left(values, rule)
+    position = bisect.bisect_left(values, rule)
+    values.insert(position, rule)
+    if index is not None and not index.insert(rule, position):
+        index = None
+    return index
+
+
+def _add_nested_heads(expr, heads) -> None:
+    for leaf in expr.get_leaves():
+        if not leaf.is_atom():
+            heads.add(leaf.get_head_name())
+            _add_nested_heads(leaf, heads)
+
+
+class LiteralRulesIndex(object):
+    """
+    Hash index over the rules of a values list whose left-hand side is
+    literal (see mathics.core.rules._is_literal), like the f[17] rules that
+    memoized functions f[n_] := f[n] = ... build up.
+
+    Literal rules are looked up by the hash of their left-hand side; the
+    remaining "general" rules are kept in their original order. A literal
+    rule which comes before all general rules in the values list can be
+    tried first, the general rules have to be tried after it. If a general
+    rule precedes it, we fall back to trying all rules in order.
+
+    Whether a left-hand side is literal depends on the attributes of the
+    heads nested in it, so the index is outdated once the definition of one
+    of these heads changes.
+    """
+
+    def __init__(self, values, definitions):
+        self.definitions = definitions
+        self.time = definitions.now
+        self.heads = set()  # names of the heads nested in literal rules
+        self.literals = {}  # hash(lhs) -> [[rule, before_general], ...]
+        self.general = []
+        self.first_general = None  # position of the first general rule
+        # insert_rule puts a rule before the rules with an equal sort key,
+        # so values is ordered by (sort key, -age), which lets position()
+        # bisect it.
+        self.ages = {}  # id(rule) -> age
+        self.next_age = len(values)
+        for position, rule in enumerate(values):
+            self.ages[id(rule)] = self.next_age - position
+            if self.is_literal(rule.pattern.expr):
+                self._add_literal(rule, self.first_general is None)
+            else:
+                if self.first_general is None:
+                    self.first_general = position
+                self.general.append(rule)
+
+    def is_literal(self, lhs) -> bool:
+        "Whether lhs only matches expressions that are SameQ to it."
+        if not _is_literal(lhs, self.definitions):
+            return False
+        _add_nested_heads(lhs, self.heads)
+        return True
+
+    def is_outdated(self) -> bool:
+        return bool(self.heads) and self.definitions.has_changed(self.time, self.heads)
+
+    def _add_literal(self, rule, before_general):
+        entries = self.literals.setdefault(hash(rule.pattern.expr), [])
+        entries.append([rule, before_general])
+
+    def _entries(self, expr):
+        try:
+            return self.literals.get(hash(expr))
+        except (TypeError, NotImplementedError):
+            return None
+
+    def find(self, lhs):
+        "Returns the literal rule with left-hand side lhs, if any."
+        for existing, before_general in self._entries(lhs) or ():
+            if existing.pattern.expr.sameQ(lhs):
+                return existing
+        return None
+
+    def position(self, values, rule) -> int:
+        "Returns the position of rule in values."
+        ages = self.ages
+        key = (rule.get_sort_key(), -ages[id(rule)])
+        lo, hi = 0, len(values)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = values[mid]
+            if (other.get_sort_key(), -ages.get(id(other), 0)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(values) and values[lo] is rule:
+            return lo
+        # values is not sorted, e.g. after DownValues[f] = {...}
+        for i, other in enumerate(values):
+            if other is rule:
+                return i
+
+    def insert(self, rule, position) -> bool:
+        """
+        Records that rule was inserted at position. Returns False if the
+        index can't be updated incrementally and has to be rebuilt.
+        """
+        if not self.is_literal(rule.pattern.expr):
+            return False
+        self.next_age += 1
+        self.ages[id(rule)] = self.next_age
+        if self.first_general is None:
+            self._add_literal(rule, True)
+        elif position <= self.first_general:
+            self._add_literal(rule, True)
+            self.first_general += 1
+        else:
+            self._add_literal(rule, False)
+        return True
+
+    def remove(self, rule, position) -> bool:
+        """
+        Records that rule was removed from position. Returns False if the
+        index can't be updated incrementally and has to be rebuilt.
+        """
+        entries = self._entries(rule.pattern.expr)
+        if not entries:
+            return False
+        for i, entry in enumerate(entries):
+            if entry[0] is rule:
+                del entries[i]
+                break
+        else:
+            return False
+        if not entries:
+            del self.literals[hash(rule.pattern.expr)]
+        del self.ages[id(rule)]
+        if self.first_general is not None and position < self.first_general:
+            self.first_general -= 1
+        return True
+
+    def get_rules(self, values, expression):
+        "Returns the rules of values that might match expression, in order."
+        if not self.literals:
+            return self.general
+        for rule, before_general in self._entries(expression) or ():
+            if rule.pattern.expr.sameQ(expression):
+                if before_general:
+                    return [rule] + self.general
+                return values
+        return self.general
+
+
+class ExpressionSharer(object):
+    """
+    Hash-consing of expressions: share(expr) replaces the subexpressions of
+    expr by the first instance of the same structure this sharer has seen,
+    so that equal parts of different expressions are stored only once.
+
+    Subexpressions are shared bottom-up. Once the leaves of an expression
+    are shared instances, it is identified by the ids of its head and
+    leaves, which spares comparing whole subtrees. The leaves are replaced
+    in place, since the new leaves are SameQ to the old ones.
+
+    reclaimed estimates the bytes freed by dropping the replaced instances,
+    assuming they are not referenced elsewhere.
+    """
+
+    def __init__(self):
+        self.instances = {}  # key -> shared instance
+        self.seen = {}  # id(expr) -> (expr, shared instance)
+        self.reclaimed = 0
+
+    def share(self, expr):
+        seen = self.seen.get(id(expr))
+        if seen is not None:
+            return seen[1]
+        if type(expr) is Symbol and expr.sympy_dummy is None:
+            # the interned instance
+            shared = Symbol(expr.name)
+        else:
+            key = self._key(expr)
+            if key is None:
+                shared = expr
+            else:
+                shared = self.instances.setdefault(key, expr)
+        if shared is not expr:
+            self.reclaimed += sys.getsizeof(expr)
+            if type(expr) is Expression:
+                self.reclaimed += sys.getsizeof(expr._leaves)
+        self.seen[id(expr)] = (expr, shared)
+        return shared
+
+    def _key(self, expr):
+        typ = type(expr)
+        if typ is Expression:
+            head = self.share(expr._head)
+            leaves = tuple(self.share(leaf) for leaf in expr._leaves)
+            if head is not expr._head or any(
+                new is not old for new, old in zip(leaves, expr._leaves)
+            ):
+                expr._head = head
+                expr._leaves = leaves
+                if expr._cache is not None:
+                    # the cached sort key refers to the replaced instances
+                    expr._cache.sort_key = None
+            return (typ, id(head)) + tuple(id(leaf) for leaf in leaves)
+        elif typ is PackedArray:
+            array = expr.get_array()
+            if array is None:
+                return None
+            return (typ, array.dtype.str, array.shape, array.tobytes())
+        elif typ in (Integer, Rational, String):
+            return (typ, expr.value)
+        elif typ is MachineReal:
+            # 0. and -0. are SameQ, but not the same
+            return (typ, expr.value, math.copysign(1.0, expr.value))
+        elif typ is PrecisionReal:
+            return (typ, expr.value._mpf_, expr.value._prec)
+        elif typ is Complex:
+            real = self.share(expr.real)
+            imag = self.share(expr.imag)
+            return (typ, id(real), id(imag))
+        return None
+
+    def share_rule(self, rule) -> None:
+        from mathics.core.pattern import Pattern
+        from mathics.core.rules import Rule
+
+        reclaimed = self.reclaimed
+        lhs = self.share(rule.pattern.expr)
+        if lhs is not rule.pattern.expr or self.reclaimed != reclaimed:
+            # the pattern objects refer to the replaced subexpressions
+            rule.pattern = Pattern.create(lhs)
+            rule._matcher = None
+        if isinstance(rule, Rule):
+            rule.replace = self.share(rule.replace)
 
 
 class Definition(object):
@@ -828,9 +1159,38 @@ class Definition(object):
         else:
             setattr(self, "%svalues" % pos, rules)
 
+    @property
+    def downvalues(self):
+        return self._downvalues
+
+    @downvalues.setter
+    def downvalues(self, values):
+        self._downvalues = values
+        self._downvalues_index = None  # rebuilt on demand
+
+    def get_downvalues_for(self, expression, definitions):
+        """
+        Returns the downvalues that might match expression, in the order in
+        which they have to be tried. Fully literal rules like f[17] are
+        found through a hash index instead of trying them one by one.
+        """
+        values = self._downvalues
+        if len(values) < 2 or self.attributes & _NON_STRUCTURAL_ATTRIBUTES:
+            return values
+        index = self._downvalues_index
+        if index is None or index.definitions is not definitions or index.is_outdated():
+            index = self._downvalues_index = LiteralRulesIndex(values, definitions)
+        return index.get_rules(values, expression)
+
     def add_rule_at(self, rule, position) -> bool:
         values = self.get_values_list(position)
-        insert_rule(values, rule)
+        if position == "down":
+            index = self._downvalues_index
+            if index is not None and index.is_outdated():
+                index = None
+            self._downvalues_index = insert_rule(values, rule, index)
+        else:
+            insert_rule(values, rule)
         return True
 
     def add_rule(self, rule) -> bool:
@@ -846,9 +1206,32 @@ class Definition(object):
             for index, existing in enumerate(values):
                 if existing.pattern.expr.sameQ(lhs):
                     del values[index]
+                    if position == "down" and self._downvalues_index is not None:
+                        if not self._downvalues_index.remove(existing, index):
+                            self._downvalues_index = None
                     return True
         return False
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_downvalues_index"] = None
+        # Builtin instances are pickled by name: they have to be the
+        # instances registered in mathics.builtin.
+        if getattr(self.builtin, "get_name", None) is not None:
+            state["builtin"] = self.builtin.get_name()
+        return state
+
+    def __setstate__(self, state):
+        # definitions pickled before downvalues became a property
+        if "downvalues" in state:
+            state["_downvalues"] = state.pop("downvalues")
+            state["_downvalues_index"] = None
+        if isinstance(state.get("builtin"), str):
+            from mathics.core.rules import lookup_builtin
+
+            state["builtin"] = lookup_builtin(state["builtin"])
+        self.__dict__.update(state)
+
     def __repr__(self) -> str:
         s = "<Definition: name: {}, downvalues: {}, formats: {}, attributes: {}>".format(
             self.name, self.downvalues, self.formatvalues, self.attributes
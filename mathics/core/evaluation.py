@@ -6,7 +6,8 @@ from queue import Queue
 
 import os
 import sys
-from threading import Thread, stack_size as set_thread_stack_size
+import time
+from threading import Thread, local, stack_size as set_thread_stack_size
 
 from typing import Tuple
 
@@ -14,11 +15,14 @@ from mathics_scanner import TranslateError
 
 from mathics import settings
 from mathics.core.expression import (
+    allocated_bytes,
     ensure_context,
     KeyComparable,
     SymbolAborted,
     SymbolList,
     SymbolNull,
+    start_counting_allocations,
+    stop_counting_allocations,
 )
 
 FORMATS = [
@@ -46,6 +50,10 @@ class TimeoutInterrupt(EvaluationInterrupt):
     pass
 
 
+class MemoryInterrupt(EvaluationInterrupt):
+    pass
+
+
 class ReturnInterrupt(EvaluationInterrupt):
     def __init__(self, expr):
         self.expr = expr
@@ -65,7 +73,12 @@ class WLThrowInterrupt(EvaluationInterrupt):
         self.value = value
 
 
+# set in threads started with a stack large enough for MAX_RECURSION_DEPTH
+_stack_thread = local()
+
+
 def _thread_target(request, queue) -> None:
+    _stack_thread.active = True
     try:
         result = request()
         queue.put((True, result))
@@ -108,40 +121,29 @@ def run_with_timeout_and_stack(request, timeout, evaluation):
     interrupts evaluation after a given time period. Provides a suitable stack environment.
     """
 
-    # only use set_thread_stack_size if max recursion depth was changed via the environment variable
-    # MATHICS_MAX_RECURSION_DEPTH. if it is set, we always use a thread, even if timeout is None, in
-    # order to be able to set the thread stack size.
+    # the timeout is a deadline on the evaluation, which checks it every time an
+    # expression is evaluated and raises a TimeoutInterrupt once it has passed.
+    # Long-running calls into sympy or other libraries are not interrupted, they
+    # run to completion and the evaluation stops right after.
+    if timeout is not None:
+        evaluation.push_deadline(timeout)
+    try:
+        # only use set_thread_stack_size if max recursion depth was changed via the environment
+        # variable MATHICS_MAX_RECURSION_DEPTH. if it is set, we run the request in a thread
+        # with a suitable stack, unless we are already running in one.
+        if MAX_RECURSION_DEPTH <= settings.DEFAULT_MAX_RECURSION_DEPTH or getattr(
+            _stack_thread, "active", False
+        ):
+            return request()
 
-    if MAX_RECURSION_DEPTH > settings.DEFAULT_MAX_RECURSION_DEPTH:
         set_thread_stack_size(python_stack_size(MAX_RECURSION_DEPTH))
-    elif timeout is None:
-        return request()
-
-    queue = Queue(maxsize=1)  # stores the result or exception
-    thread = Thread(target=_thread_target, args=(request, queue))
-    thread.start()
-
-    # Thead join(timeout) can leave zombie threads (we are the parent)
-    # when a time out occurs, but the thread hasn't terminated.  See
-    # https://docs.python.org/3/library/multiprocessing.shared_memory.html
-    # for a detailed discussion of this.
-    #
-    # To reduce this problem, we make use of specific properties of
-    # the Mathics evaluator: if we set "evaluation.timeout", the
-    # next call to "Expression.evaluate" in the thread will finish it
-    # immediately.
-    #
-    # However this still will not terminate long-running processes
-    # in Sympy or or libraries called by Mathics that might hang or run
-    # for a long time.
-    thread.join(timeout)
-    if thread.is_alive():
-        evaluation.timeout = True
-        while thread.is_alive():
-            pass
-        evaluation.timeout = False
-        evaluation.stopped = False
-        raise TimeoutInterrupt()
+        queue = Queue(maxsize=1)  # stores the result or exception
+        thread = Thread(target=_thread_target, args=(request, queue))
+        thread.start()
+        thread.join()
+    finally:
+        if timeout is not None:
+            evaluation.pop_deadline()
 
     success, result = queue.get()
     if success:
@@ -244,8 +246,14 @@ class Evaluation(object):
         self.definitions = definitions
         self.recursion_depth = 0
         self.timeout = False
-        self.timeout_queue = []
         self.stopped = False
+        # stack of the deadlines of the enclosing TimeConstrained, in time.monotonic()
+        # seconds, and the earliest of them
+        self.deadlines = []
+        self.deadline = None
+        # likewise for the MemoryConstrained limits, in allocated_bytes()
+        self.memory_limits = []
+        self.memory_limit = None
         self.out = []
         self.output = output if output else Output()
         self.listeners = {}
@@ -565,9 +573,45 @@ class Evaluation(object):
         else:
             raise NotImplementedError
 
+    def push_deadline(self, timeout) -> float:
+        "Requests the evaluation to stop after timeout seconds. Returns the deadline."
+        deadline = time.monotonic() + timeout
+        self.deadlines.append(deadline)
+        if self.deadline is None or deadline < self.deadline:
+            self.deadline = deadline
+        return deadline
+
+    def pop_deadline(self) -> None:
+        self.deadlines.pop()
+        self.deadline = min(self.deadlines) if self.deadlines else None
+
+    def time_remaining(self):
+        "Returns the seconds until the earliest deadline, or None if there is none."
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def push_memory_limit(self, nbytes) -> int:
+        "Requests the evaluation to stop after allocating nbytes more bytes. Returns the limit."
+        start_counting_allocations()
+        limit = allocated_bytes() + nbytes
+        self.memory_limits.append(limit)
+        if self.memory_limit is None or limit < self.memory_limit:
+            self.memory_limit = limit
+        return limit
+
+    def pop_memory_limit(self) -> None:
+        stop_counting_allocations()
+        self.memory_limits.pop()
+        self.memory_limit = min(self.memory_limits) if self.memory_limits else None
+
     def check_stopped(self) -> None:
         if self.stopped:
             raise TimeoutInterrupt
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise TimeoutInterrupt
+        if self.memory_limit is not None and allocated_bytes() >= self.memory_limit:
+            raise MemoryInterrupt
 
     def inc_recursion_depth(self) -> None:
         self.check_stopped()
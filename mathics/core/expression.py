@@ -4,7 +4,11 @@
 import sympy
 import mpmath
 import math
+import numpy
 import re
+import gc
+import threading
+import weakref
 
 import typing
 from typing import Any, Optional
@@ -15,8 +19,12 @@ from functools import lru_cache
 
 from mathics.core.numbers import get_type, dps, prec, min_prec, machine_precision
 from mathics.core.convert import sympy_symbol_prefix, SympyExpression
+from mathics.core import profiling
 import base64
 
+# the largest int64, the integer type of packed arrays
+_max_int64 = 2 ** 63 - 1
+
 # Imperical number that seems to work.
 # We have to be able to match mpmath values with sympy values
 COMPARE_PREC = 50
@@ -65,6 +73,19 @@ def system_symbols(*symbols) -> typing.List[str]:
     return [ensure_context(s) for s in symbols]
 
 
+# the heads of numeric expressions and the numeric constants, see is_numeric
+_numeric_heads = frozenset(
+    system_symbols(
+        "Sqrt", "Times", "Plus", "Subtract", "Minus", "Power", "Abs", "Divide", "Sin"
+    )
+)
+_numeric_constants = frozenset(
+    system_symbols(
+        "Pi", "E", "EulerGamma", "GoldenRatio", "MachinePrecision", "Catalan"
+    )
+)
+
+
 # system_symbols_dict({'SomeSymbol': ...}) -> {'System`SomeSymbol': ...}
 def system_symbols_dict(d):
     return {ensure_context(k): v for k, v in d.items()}
@@ -83,10 +104,17 @@ class ExpressionPointer(object):
         self.position = position
 
     def replace(self, new) -> None:
+        parent = self.parent
         if self.position == 0:
-            self.parent.set_head(new)
+            parent.set_head(new)
         else:
-            self.parent.set_leaf(self.position - 1, new)
+            parent.set_leaf(self.position - 1, new)
+        # the caches of the enclosing expressions (symbols, sort key and hash)
+        # describe the replaced part
+        pointer = parent.position
+        while pointer is not None:
+            pointer.parent.clear_cache()
+            pointer = pointer.parent.position
 
     def __str__(self) -> str:
         return "%s[[%s]]" % (self.parent, self.position)
@@ -151,6 +179,8 @@ def from_python(arg):
 
 
 class KeyComparable(object):
+    __slots__ = ()
+
     def get_sort_key(self):
         raise NotImplementedError
 
@@ -178,6 +208,14 @@ class KeyComparable(object):
         ) or self.get_sort_key() != other.get_sort_key()
 
 
+def sort_key(expr):
+    """
+    Returns the canonical sort key of expr. Sorting with key=sort_key gives the
+    same order as comparing the expressions, but computes each key only once.
+    """
+    return expr.get_sort_key()
+
+
 # ExpressionCache keeps track of the following attributes for one Expression instance:
 
 # time: (1) the last time (in terms of Definitions.now) this expression was evaluated
@@ -190,19 +228,51 @@ class KeyComparable(object):
 # sequences: (1) a list of leaf indices that indicate the position of all Sequence
 #   heads that are either in the leaf's head or any of the indicated leaf's sub
 #   expressions' heads, or (2) None, if no information is available.
+# sort_key: (1) the canonical sort key of this expression (see
+#   Expression.get_sort_key), which only depends on its structure, or (2) None, if
+#   it has not been computed since the leaves last changed.
+# hash: (1) the structural hash of this expression (see Expression.__hash__), or
+#   (2) None, if it has not been computed since the leaves last changed.
+# exact: if hash is set, whether the expression contains no inexact numbers. Reals
+#   that are SameQ may have different hashes, so only the hashes of exact
+#   expressions tell that they are not SameQ.
 
 
 class ExpressionCache:
-    def __init__(self, time=None, symbols=None, sequences=None, copy=None):
+    def __init__(
+        self,
+        time=None,
+        symbols=None,
+        sequences=None,
+        copy=None,
+        sort_key=None,
+        hash=None,
+        exact=None,
+    ):
         if copy is not None:
             time = time or copy.time
             symbols = symbols or copy.symbols
             sequences = sequences or copy.sequences
+            sort_key = sort_key or copy.sort_key
+            if hash is None:
+                hash, exact = copy.hash, copy.exact
         self.time = time
         self.symbols = symbols
         self.sequences = sequences
+        self.sort_key = sort_key
+        self.hash = hash
+        self.exact = exact
+
+    def __getstate__(self):
+        # the hashes of strings differ between processes
+        state = self.__dict__.copy()
+        state["hash"] = state["exact"] = None
+        return state
 
     def copy(self):
+        # the sort key and the hash are not carried over: the copied
+        # expression may be modified in place below the top level, which
+        # only invalidates the caches along the modified path
         return ExpressionCache(self.time, self.symbols, self.sequences)
 
     def sliced(self, lower, upper):
@@ -251,18 +321,130 @@ class ExpressionCache:
         )
 
 
+class _AllocationCount(threading.local):
+    """
+    An estimate of the bytes allocated for expressions by a thread, used to
+    enforce MemoryConstrained. Allocations are only counted while some
+    evaluation in the thread has pushed a limit (see
+    Evaluation.push_memory_limit). Memory that is released is not accounted
+    for.
+    """
+
+    def __init__(self) -> None:
+        self.nbytes = 0
+        # the number of limits that need the count
+        self.users = 0
+
+
+_allocation_count = _AllocationCount()
+
+# the number of threads that count their allocations. While it is zero,
+# which is the common case, allocating an expression costs nothing extra.
+_counting_threads = 0
+_counting_lock = threading.Lock()
+
+
+def _count_allocation(nbytes) -> None:
+    count = _allocation_count
+    if count.users:
+        count.nbytes += nbytes
+
+
+def start_counting_allocations() -> None:
+    "Counts the allocations of this thread until the matching stop."
+    global _counting_threads
+    count = _allocation_count
+    if not count.users:
+        with _counting_lock:
+            _counting_threads += 1
+    count.users += 1
+
+
+def stop_counting_allocations() -> None:
+    global _counting_threads
+    count = _allocation_count
+    count.users -= 1
+    if not count.users:
+        with _counting_lock:
+            _counting_threads -= 1
+
+
+def allocated_bytes() -> int:
+    """
+    Returns the estimated number of bytes allocated for expressions by this
+    thread while it counted its allocations.
+    """
+    return _allocation_count.nbytes
+
+
+_no_default = object()
+
+
+def _extra_field(name, default=_no_default):
+    """
+    A property stored in the _extra dict of an expression instead of a slot
+    of its own. Reading a field that was never set returns default or, if
+    there is none, raises AttributeError like an unset attribute.
+    """
+
+    def fget(self):
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        if default is _no_default:
+            raise AttributeError(name)
+        return default
+
+    def fset(self, value):
+        extra = self._extra
+        if extra is None:
+            if value is default:
+                return
+            extra = self._extra = {}
+        extra[name] = value
+
+    def fdel(self):
+        extra = self._extra
+        if extra is None or name not in extra:
+            raise AttributeError(name)
+        del extra[name]
+        if not extra:
+            self._extra = None
+
+    return property(fget, fset, fdel)
+
+
 class BaseExpression(KeyComparable):
     options: Any
     pattern_sequence: bool
     unformatted: Any
     last_evaluated: Any
 
+    # expressions are created in large numbers, so they have no __dict__.
+    # Fields that most instances never set (the original and position of
+    # copies made for Part assignments, the formatting cache) live in the
+    # dict _extra, which is None until one of them is set.
+    __slots__ = (
+        "options",
+        "pattern_sequence",
+        "unformatted",
+        "_cache",
+        "_extra",
+    )
+
+    original = _extra_field("original")
+    position = _extra_field("position")
+    _format_cache = _extra_field("_format_cache", None)
+
     def __new__(cls, *args, **kwargs):
+        if _counting_threads:
+            _count_allocation(cls.__basicsize__)
         self = object.__new__(cls)
         self.options = None
         self.pattern_sequence = False
         self.unformatted = self
         self._cache = None
+        self._extra = None
         return self
 
     def clear_cache(self):
@@ -395,6 +577,11 @@ class BaseExpression(KeyComparable):
             elif l2 is not None and level > l2:
                 return self, False
 
+        # Dispatch tables only hand out the rules that might match self.
+        get_candidates = getattr(rules, "get_candidates", None)
+        if get_candidates is not None:
+            rules = get_candidates(self)
+
         for rule in rules:
             result = rule.apply(self, evaluation, fully=False)
             if result is not None:
@@ -486,8 +673,7 @@ class BaseExpression(KeyComparable):
                 result = formatted.do_format(evaluation, form)
                 if include_form:
                     result = Expression(form, result)
-                result.unformatted = unformatted
-                return result
+                return _with_unformatted(result, unformatted)
 
             # If the expression is still enclosed by a Format,
             # iterate.
@@ -508,8 +694,7 @@ class BaseExpression(KeyComparable):
 
             if include_form:
                 expr = Expression(form, expr)
-            expr.unformatted = unformatted
-            return expr
+            return _with_unformatted(expr, unformatted)
         finally:
             evaluation.dec_recursion_depth()
 
@@ -706,11 +891,22 @@ class Monomial(object):
         return 0
 
 
+def _with_unformatted(expr, unformatted):
+    if expr is not unformatted and isinstance(expr, (Symbol, Integer, MachineReal)):
+        # these atoms are shared (see Symbol.__new__), so the attribute is set
+        # on a copy
+        expr = expr.do_copy()
+    expr.unformatted = unformatted
+    return expr
+
+
 class Expression(BaseExpression):
     head: "Symbol"
     leaves: typing.List[Any]
     _sequences: Any
 
+    __slots__ = ("_head", "_leaves", "_sequences")
+
     def __new__(cls, head, *leaves, **kwargs) -> "Expression":
         self = super().__new__(cls)
         if isinstance(head, str):
@@ -718,7 +914,8 @@ class Expression(BaseExpression):
         self._head = head
         self._leaves = tuple(from_python(leaf) for leaf in leaves)
         self._sequences = None
-        self._format_cache = None
+        if _counting_threads:
+            _count_allocation(8 * len(leaves))
         return self
 
     @property
@@ -794,7 +991,8 @@ class Expression(BaseExpression):
         # False, such a Symbol might or might not exist.
 
         cache = self._cache
-        if cache is None:
+        if cache is None or not symbol_name:
+            # compound heads have no name
             return False
 
         symbols = cache.symbols
@@ -865,7 +1063,11 @@ class Expression(BaseExpression):
         else:
             return cache
 
-        sym = set((self.get_head_name(),))
+        head = self._head
+        if isinstance(head, Expression):
+            sym = set(head._rebuild_cache().symbols)
+        else:
+            sym = set((head.get_name(),))
         seq = []
 
         for i, leaf in enumerate(self._leaves):
@@ -877,7 +1079,17 @@ class Expression(BaseExpression):
             elif isinstance(leaf, Symbol):
                 sym.add(leaf.get_name())
 
-        cache = ExpressionCache(time, sym, seq)
+        if cache is None:
+            cache = ExpressionCache(time, sym, seq)
+        else:
+            cache = ExpressionCache(
+                time,
+                sym,
+                seq,
+                sort_key=cache.sort_key,
+                hash=cache.hash,
+                exact=cache.exact,
+            )
         self._cache = cache
         return cache
 
@@ -905,8 +1117,10 @@ class Expression(BaseExpression):
         expr._leaves = tuple(leaf.copy(reevaluate) for leaf in self._leaves)
         if not reevaluate:
             # rebuilding the cache in self speeds up large operations, e.g.
-            # First[Timing[Fold[#1+#2&, Range[750]]]]
-            expr._cache = self._rebuild_cache()
+            # First[Timing[Fold[#1+#2&, Range[750]]]]. The copy gets its own
+            # cache object, since copies are modified in place (e.g. by Part
+            # assignments).
+            expr._cache = self._rebuild_cache().copy()
         expr.options = self.options
         expr.original = self
         expr._sequences = self._sequences
@@ -921,9 +1135,7 @@ class Expression(BaseExpression):
         if last_evaluated is not None and expr is not None:
             symbolname = expr.get_name()
             if symbolname != "":
-                if not evaluation.definitions.has_changed(
-                    last_evaluated, (symbolname,)
-                ):
+                if not evaluation.definitions.has_changed(last_evaluated, {symbolname}):
                     return expr
         expr = super().do_format(evaluation, form)
         self._format_cache[form] = (evaluation.definitions.now, expr)
@@ -1002,7 +1214,7 @@ class Expression(BaseExpression):
         if not leaf_counts:
             return False
         if leaf_counts and leaf_counts[0] is not None:
-            count = len(self._leaves)
+            count = self._leaf_count()
             if count not in leaf_counts:
                 if (
                     len(leaf_counts) == 2
@@ -1014,6 +1226,9 @@ class Expression(BaseExpression):
                     return False
         return True
 
+    def _leaf_count(self) -> int:
+        return len(self._leaves)
+
     def has_symbol(self, symbol_name) -> bool:
         if self._no_symbol(symbol_name):
             return False
@@ -1030,6 +1245,7 @@ class Expression(BaseExpression):
         f = sympy.Function(str(sympy_symbol_prefix + self.get_head_name()))
         return f(*sym_args)
 
+    @profiling.sympy_conversion
     def to_sympy(self, **kwargs):
         from mathics.builtin import mathics_to_sympy
 
@@ -1208,40 +1424,64 @@ class Expression(BaseExpression):
                     1,
                 ]
         else:
-            exps = {}
-            head = self._head.get_name()
-            if head == "System`Times":
-                for leaf in self._leaves:
-                    name = leaf.get_name()
-                    if leaf.has_form("Power", 2):
-                        var = leaf._leaves[0].get_name()
-                        exp = leaf._leaves[1].round_to_float()
-                        if var and exp is not None:
-                            exps[var] = exps.get(var, 0) + exp
-                    elif name:
-                        exps[name] = exps.get(name, 0) + 1
-            elif self.has_form("Power", 2):
-                var = self._leaves[0].get_name()
-                exp = self._leaves[1].round_to_float()
-                if var and exp is not None:
-                    exps[var] = exps.get(var, 0) + exp
-            if exps:
-                return [
-                    1 if self.is_numeric() else 2,
-                    2,
-                    Monomial(exps),
-                    1,
-                    self._head,
-                    self._leaves,
-                    1,
-                ]
+            # the key only depends on the structure, so it is kept in the cache
+            # until the leaves change
+            cache = self._cache
+            if cache is None:
+                key = self._get_canonical_sort_key()
+                self._cache = ExpressionCache(sort_key=key)
             else:
-                return [1 if self.is_numeric() else 2, 3, self._head, self._leaves, 1]
+                key = cache.sort_key
+                if key is None:
+                    key = self._get_canonical_sort_key()
+                    cache.sort_key = key
+            return key
+
+    def _get_canonical_sort_key(self):
+        exps = {}
+        head = self._head.get_name()
+        if head == "System`Times":
+            for leaf in self._leaves:
+                name = leaf.get_name()
+                if leaf.has_form("Power", 2):
+                    var = leaf._leaves[0].get_name()
+                    exp = leaf._leaves[1].round_to_float()
+                    if var and exp is not None:
+                        exps[var] = exps.get(var, 0) + exp
+                elif name:
+                    exps[name] = exps.get(name, 0) + 1
+        elif self.has_form("Power", 2):
+            var = self._leaves[0].get_name()
+            exp = self._leaves[1].round_to_float()
+            if var and exp is not None:
+                exps[var] = exps.get(var, 0) + exp
+        if exps:
+            return [
+                1 if self.is_numeric() else 2,
+                2,
+                Monomial(exps),
+                1,
+                self._head,
+                self._leaves,
+                1,
+            ]
+        else:
+            return [1 if self.is_numeric() else 2, 3, self._head, self._leaves, 1]
 
     def sameQ(self, other) -> bool:
         """Mathics SameQ"""
         if id(self) == id(other):
             return True
+        cache = self._cache
+        other_cache = getattr(other, "_cache", None)
+        if (
+            cache is not None
+            and other_cache is not None
+            and cache.exact
+            and other_cache.exact
+            and cache.hash != other_cache.hash
+        ):
+            return False
         if self.get_head_name() != other.get_head_name():
             return False
         if not self._head.sameQ(other.get_head()):
@@ -1289,9 +1529,6 @@ class Expression(BaseExpression):
     def evaluate(self, evaluation) -> typing.Union["Expression", "Symbol"]:
         from mathics.core.evaluation import ReturnInterrupt
 
-        if evaluation.timeout:
-            return
-
         expr = self
         reevaluate = True
         limit = None
@@ -1345,6 +1582,10 @@ class Expression(BaseExpression):
     def evaluate_next(self, evaluation) -> typing.Tuple["Expression", bool]:
         from mathics.builtin.base import BoxConstruct
 
+        profile = profiling.active
+        if profile is not None:
+            profile.count_evaluation(self)
+
         head = self._head.evaluate(evaluation)
         attributes = head.get_attributes(evaluation.definitions)
         leaves = self.get_mutable_leaves()
@@ -1389,8 +1630,9 @@ class Expression(BaseExpression):
             new = new.flatten_sequence(evaluation)
             leaves = new._leaves
 
-        for leaf in leaves:
-            leaf.unevaluated = False
+        # the positions of the leaves that were wrapped in Unevaluated. Atoms
+        # are shared (see Symbol.__new__), so this cannot be marked on them.
+        unevaluated = set()
 
         if "System`HoldAllComplete" not in attributes:
             dirty_leaves = None
@@ -1400,21 +1642,51 @@ class Expression(BaseExpression):
                     if dirty_leaves is None:
                         dirty_leaves = list(leaves)
                     dirty_leaves[index] = leaf._leaves[0]
-                    dirty_leaves[index].unevaluated = True
+                    unevaluated.add(index)
 
             if dirty_leaves:
                 new = Expression(head)
                 new._leaves = tuple(dirty_leaves)
                 leaves = dirty_leaves
 
-        def flatten_callback(new_leaves, old):
-            for leaf in new_leaves:
-                leaf.unevaluated = old.unevaluated
+        if "System`Listable" in attributes and "System`NumericFunction" in attributes:
+            # machine arithmetic on lists does not depend on the order of
+            # the arguments, so this is done before sorting them
+            result = new._compute_machine_arrays(evaluation)
+            if result is not None:
+                result._timestamp_cache(evaluation)
+                return result, False
 
         if "System`Flat" in attributes:
-            new = new.flatten(new._head, callback=flatten_callback)
+            flattened = new.flatten(new._head)
+            if unevaluated and flattened is not new:
+                # the leaves of a flattened leaf inherit its position
+                positions = set()
+                position = 0
+                for index, leaf in enumerate(new._leaves):
+                    count = 1
+                    if leaf.get_head().sameQ(new._head):
+                        count = len(leaf.flatten(new._head)._leaves)
+                    if index in unevaluated:
+                        positions.update(range(position, position + count))
+                    position += count
+                unevaluated = positions
+            new = flattened
         if "System`Orderless" in attributes:
-            new.sort()
+            if unevaluated:
+                old_leaves = new._leaves
+                order = sorted(
+                    range(len(old_leaves)),
+                    key=lambda index: sort_key(old_leaves[index]),
+                )
+                new.set_reordered_leaves([old_leaves[index] for index in order])
+                unevaluated = {
+                    position
+                    for position, index in enumerate(order)
+                    if index in unevaluated
+                }
+            else:
+                new.sort()
 
         new._timestamp_cache(evaluation)
 
@@ -1439,7 +1711,8 @@ class Expression(BaseExpression):
                                 yield rule
             lookup_name = new.get_lookup_name()
             if lookup_name == new.get_head_name():
-                for rule in evaluation.definitions.get_downvalues(lookup_name):
+                definition = evaluation.definitions.get_definition(lookup_name)
+                for rule in definition.get_downvalues_for(new, evaluation.definitions):
                     yield rule
             else:
                 for rule in evaluation.definitions.get_subvalues(lookup_name):
@@ -1456,16 +1729,11 @@ class Expression(BaseExpression):
                 else:
                     return result, True
 
-        dirty_leaves = None
-
         # Expression did not change, re-apply Unevaluated
-        for index, leaf in enumerate(new._leaves):
-            if leaf.unevaluated:
-                if dirty_leaves is None:
-                    dirty_leaves = list(new._leaves)
-                dirty_leaves[index] = Expression("Unevaluated", leaf)
-
-        if dirty_leaves:
+        if unevaluated:
+            dirty_leaves = list(new._leaves)
+            for index in unevaluated:
+                dirty_leaves[index] = Expression("Unevaluated", dirty_leaves[index])
             new = Expression(head)
             new._leaves = tuple(dirty_leaves)
 
@@ -1672,7 +1940,7 @@ class Expression(BaseExpression):
         if pattern:
             leaves.sort(key=lambda e: e.get_sort_key(pattern_sort=True))
         else:
-            leaves.sort()
+            leaves.sort(key=sort_key)
         self.set_reordered_leaves(leaves)
 
     def filter_leaves(self, head_name):
@@ -1685,28 +1953,49 @@ class Expression(BaseExpression):
             return [leaf for leaf in self._leaves if leaf.get_head_name() == head_name]
 
     def apply_rules(self, rules, evaluation, level=0, options=None):
-        """for rule in rules:
-        result = rule.apply(self, evaluation, fully=False)
-        if result is not None:
-            return result"""
+        """
+        Applies rules to self and its subexpressions like ReplaceAll, or like
+        Replace with options. Returns the result and whether a rule applied.
+        Subexpressions that no rule changes are kept, with their caches.
+        """
+        from mathics.core.rules import rule_symbols
+
+        symbols = rule_symbols(rules, evaluation.definitions)
+        return self._apply_rules(rules, evaluation, level, options, symbols)
+
+    def _apply_rules(self, rules, evaluation, level, options, symbols):
+        # symbols: one of them occurs in anything a rule matches, or None
+        if symbols is not None and symbols.isdisjoint(self._rebuild_cache().symbols):
+            return self, False
 
         # to be able to access it inside inner function
         new_applied = [False]
 
+        def apply_to(expr, level):
+            if isinstance(expr, Expression):
+                return expr._apply_rules(rules, evaluation, level, options, symbols)
+            return expr.apply_rules(rules, evaluation, level, options)
+
         def apply_leaf(leaf):
-            new, sub_applied = leaf.apply_rules(rules, evaluation, level + 1, options)
+            new, sub_applied = apply_to(leaf, level + 1)
             new_applied[0] = new_applied[0] or sub_applied
             return new
 
         def descend(expr):
-            return Expression(expr._head, *[apply_leaf(leaf) for leaf in expr._leaves])
+            leaves = expr._leaves
+            new_leaves = [apply_leaf(leaf) for leaf in leaves]
+            if all(new is old for new, old in zip(new_leaves, leaves)):
+                return expr
+            return Expression(expr._head, *new_leaves)
 
         if options is None:  # default ReplaceAll mode; replace breadth first
             result, applied = super().apply_rules(rules, evaluation, level, options)
             if applied:
                 return result, True
-            head, applied = self._head.apply_rules(rules, evaluation, level, options)
+            head, applied = apply_to(self._head, level)
             new_applied[0] = applied
+            if head is self._head:
+                return descend(self), new_applied[0]
             return descend(Expression(head, *self._leaves)), new_applied[0]
         else:  # Replace mode; replace depth first
             expr = descend(self)
@@ -1716,11 +2005,10 @@ class Expression(BaseExpression):
             new_applied[0] = new_applied[0] or applied
             if not applied and options["heads"]:
                 # heads in Replace are treated at the level of the arguments, i.e. level + 1
-                head, applied = expr._head.apply_rules(
-                    rules, evaluation, level + 1, options
-                )
+                head, applied = apply_to(expr._head, level + 1)
                 new_applied[0] = new_applied[0] or applied
-                expr = Expression(head, *expr._leaves)
+                if head is not expr._head:
+                    expr = Expression(head, *expr._leaves)
             return expr, new_applied[0]
 
     def replace_vars(
@@ -1806,6 +2094,26 @@ class Expression(BaseExpression):
             *[leaf.replace_slots(slots, evaluation) for leaf in self._leaves]
         )
 
+    def _compute_machine_arrays(self, evaluation) -> typing.Optional["Expression"]:
+        """
+        Computes a Listable numeric builtin on lists of machine numbers
+        in one go (see SympyFunction.compute_machine_arrays), provided its rules
+        have not been changed by the user.
+        """
+        for leaf in self._leaves:
+            if leaf.get_head_name() == "System`List":
+                break
+        else:
+            return None
+        name = self._head.get_name()
+        definitions = evaluation.definitions
+        if not name or name in definitions.user:
+            return None
+        builtin = definitions.get_definition(name).builtin
+        if getattr(builtin, "numpy_name", None) is None:
+            return None
+        return builtin.compute_machine_arrays(self._leaves, evaluation)
+
     def thread(self, evaluation, head=None) -> typing.Tuple[bool, "Expression"]:
         if head is None:
             head = Symbol("List")
@@ -1836,20 +2144,8 @@ class Expression(BaseExpression):
             return True, Expression(head, *leaves)
 
     def is_numeric(self) -> bool:
-        return (
-            self._head.get_name()
-            in system_symbols(
-                "Sqrt",
-                "Times",
-                "Plus",
-                "Subtract",
-                "Minus",
-                "Power",
-                "Abs",
-                "Divide",
-                "Sin",
-            )
-            and all(leaf.is_numeric() for leaf in self._leaves)
+        return self._head.get_name() in _numeric_heads and all(
+            leaf.is_numeric() for leaf in self._leaves
         )
         # TODO: complete list of numeric functions, or access NumericFunction
         # attribute
@@ -1887,7 +2183,24 @@ class Expression(BaseExpression):
         return atoms
 
     def __hash__(self):
-        return hash(("Expression", self._head) + tuple(self._leaves))
+        # the hash only depends on the structure, so it is kept in the cache
+        # until the leaves change. The hashes of subexpressions are cached as
+        # well, which makes hashing expressions with shared parts linear.
+        cache = self._cache
+        if cache is None:
+            cache = self._cache = ExpressionCache()
+        elif cache.hash is not None:
+            return cache.hash
+        head = self._head
+        leaves = self._leaves
+        value = hash(("Expression", head) + tuple(leaves))
+        exact = all(
+            leaf._cache.exact if isinstance(leaf, Expression) else not leaf.is_inexact()
+            for leaf in chain((head,), leaves)
+        )
+        cache.hash = value
+        cache.exact = exact
+        return value
 
     def user_hash(self, update):
         update(("%s>%d>" % (self.get_head_name(), len(self._leaves))).encode("utf8"))
@@ -1898,7 +2211,279 @@ class Expression(BaseExpression):
         return (self._head, self._leaves)
 
 
+class PackedArray(Expression):
+    """
+    A rectangular List of machine integers, machine reals or machine
+    complex numbers, stored as one contiguous, read-only NumPy array of
+    int64, float64 or complex128.
+
+    A PackedArray is a List: its head is List and its leaves are made
+    from the array the first time they are needed. Builtins that know
+    about packed arrays (see get_array) work on the array instead, which
+    spares creating an Expression for every element. Storing numbers of
+    the same kind keeps the array packed; any other change turns it into
+    an ordinary List.
+    """
+
+    __slots__ = ("_array", "_unpacked", "_parent")
+
+    def __new__(cls, array) -> "PackedArray":
+        array = numpy.asarray(array)
+        kind = array.dtype.kind
+        if array.ndim == 0:
+            raise ValueError("Cannot pack a scalar.")
+        if kind in "biu":
+            if kind == "u" and array.size and array.max() > _max_int64:
+                raise OverflowError
+            array = array.astype(numpy.int64, copy=False)
+        elif kind == "f":
+            array = array.astype(numpy.float64, copy=False)
+        elif kind == "c":
+            array = array.astype(numpy.complex128, copy=False)
+        else:
+            raise TypeError("Cannot pack an array of %s." % array.dtype)
+        if kind in "fc" and not numpy.isfinite(array).all():
+            # like MachineReal
+            raise OverflowError
+        if array.flags.writeable:
+            # the caller hands the array over, but the array must not change
+            # through this PackedArray or the ones sharing it
+            array = array.view()
+            array.flags.writeable = False
+        if _counting_threads:
+            _count_allocation(array.nbytes)
+        return cls._from_array(array)
+
+    @classmethod
+    def _from_array(cls, array) -> "PackedArray":
+        self = BaseExpression.__new__(cls)
+        self._head = SymbolList
+        self._array = array
+        self._unpacked = None
+        self._parent = None
+        self._sequences = None
+        return self
+
+    @property
+    def _leaves(self):
+        leaves = self._unpacked
+        if leaves is None:
+            leaves = self._unpacked = self._make_leaves()
+        return leaves
+
+    @_leaves.setter
+    def _leaves(self, leaves):
+        self._unpack()
+        self._unpacked = leaves
+
+    def _make_leaves(self):
+        array = self._array
+        # the leaves cannot form reference cycles, so there is no point in
+        # having the garbage collector scan them over and over while they are
+        # created.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if array.ndim > 1:
+                leaves = []
+                for row in array:
+                    leaf = PackedArray._from_array(row)
+                    leaf._parent = self
+                    leaves.append(leaf)
+                return tuple(leaves)
+            return tuple(map(_packed_element[array.dtype.kind], array.tolist()))
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _unpack(self) -> None:
+        if self._array is not None:
+            self._unpacked = self._leaves
+            self._array = None
+        parent = self._parent
+        if parent is not None:
+            # the leaves of the parent include this row, which no longer is
+            # part of the array of the parent
+            self._parent = None
+            parent._cache = None
+            parent._unpack()
+
+    def get_array(self):
+        """
+        Returns the NumPy array holding the leaves, or None if this
+        PackedArray has been unpacked. The array must not be changed.
+        """
+        return self._array
+
+    def updated(self, index, value) -> Optional["PackedArray"]:
+        """
+        Returns a new PackedArray with the part at the NumPy index 'index'
+        (integers and slices only) replaced by 'value', a number or a
+        PackedArray of the same shape as the part. Returns None if the
+        result would not be a packed array.
+        """
+        array = self._array
+        if array is None:
+            return None
+        shape = array[index].shape
+        kind = array.dtype.kind
+        if isinstance(value, PackedArray):
+            item = value._array
+            if item is None or item.shape != shape:
+                return None
+            item_kind = item.dtype.kind
+        elif shape:
+            return None
+        elif isinstance(value, Integer):
+            item = value.value
+            if not -_max_int64 - 1 <= item <= _max_int64:
+                return None
+            item_kind = "i"
+        elif isinstance(value, MachineReal):
+            item = value.value
+            item_kind = "f"
+        elif (
+            isinstance(value, Complex)
+            and isinstance(value.real, MachineReal)
+            and isinstance(value.imag, MachineReal)
+        ):
+            item = complex(value.real.value, value.imag.value)
+            item_kind = "c"
+        else:
+            return None
+        if item_kind != kind and not (kind == "c" and item_kind == "f"):
+            return None
+        array = array.copy()
+        array[index] = item
+        array.flags.writeable = False
+        return PackedArray._from_array(array)
+
+    def _leaf_count(self) -> int:
+        if self._array is None:
+            return len(self._unpacked)
+        return len(self._array)
+
+    def has_symbol(self, symbol_name) -> bool:
+        if self._array is None:
+            return super().has_symbol(symbol_name)
+        return self._head.has_symbol(symbol_name)
+
+    def _rebuild_cache(self):
+        if self._array is None:
+            return super()._rebuild_cache()
+        cache = self._cache
+        if cache is None or cache.symbols is None or cache.sequences is None:
+            cache = ExpressionCache(
+                None if cache is None else cache.time, {"System`List"}, ()
+            )
+            self._cache = cache
+        return cache
+
+    def evaluate(self, evaluation):
+        if self._array is None or "System`List" in evaluation.definitions.user:
+            return super().evaluate(evaluation)
+        evaluation.check_stopped()
+        return self
+
+    def evaluate_next(self, evaluation):
+        if self._array is None or "System`List" in evaluation.definitions.user:
+            return super().evaluate_next(evaluation)
+        return self, False
+
+    def shallow_copy(self) -> "Expression":
+        if self._array is None:
+            return super().shallow_copy()
+        expr = PackedArray._from_array(self._array)
+        expr._cache = self._rebuild_cache()
+        expr.options = self.options
+        return expr
+
+    def set_head(self, head):
+        self._unpack()
+        super().set_head(head)
+
+    def set_leaf(self, index, value):
+        expr = self.updated(index, value)
+        if expr is None:
+            super().set_leaf(index, value)
+            return
+        self._array = expr._array
+        self._unpacked = None
+        self._cache = None
+        parent = self._parent
+        if parent is not None:
+            self._parent = None
+            parent._cache = None
+            parent._unpack()
+
+    def set_reordered_leaves(self, leaves):
+        self._unpack()
+        super().set_reordered_leaves(leaves)
+
+    def replace_vars(
+        self, vars, options=None, in_scoping=True, in_function=True
+    ) -> "Expression":
+        if self._array is None:
+            return super().replace_vars(vars, options, in_scoping, in_function)
+        return self.shallow_copy()
+
+    def replace_slots(self, slots, evaluation):
+        if self._array is None:
+            return super().replace_slots(slots, evaluation)
+        return self.shallow_copy()
+
+    def numerify(self, evaluation) -> "Expression":
+        if self._array is None:
+            return super().numerify(evaluation)
+        return self
+
+    def to_python(self, *args, **kwargs):
+        array = self._array
+        if (
+            array is None
+            or array.dtype.kind == "c"
+            or kwargs.get("n_evaluation") is not None
+        ):
+            return super().to_python(*args, **kwargs)
+        return array.tolist()
+
+    def sameQ(self, other) -> bool:
+        """Mathics SameQ"""
+        array = self._array
+        other_array = other._array if isinstance(other, PackedArray) else None
+        if array is not None and other_array is not None:
+            if array.size and other_array.size:
+                if array.shape != other_array.shape:
+                    return False
+                if array.dtype == other_array.dtype:
+                    return numpy.array_equal(array, other_array)
+                if "i" in (array.dtype.kind, other_array.dtype.kind):
+                    # an Integer is never the same as a Real or a Complex
+                    return False
+        return super().sameQ(other)
+
+    def __getnewargs__(self):
+        if self._array is None:
+            return (numpy.zeros(0),)
+        return (self._array,)
+
+    def __getstate__(self):
+        # the slots, except for the one of Expression._leaves, which is
+        # shadowed by the property above
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name != "_leaves" and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        if self._array is not None:
+            state["_unpacked"] = None
+        state["_parent"] = None
+        return None, state
+
+
 class Atom(BaseExpression):
+    __slots__ = ()
+
     def is_atom(self) -> bool:
         return True
 
@@ -1966,23 +2551,50 @@ class Atom(BaseExpression):
 class Symbol(Atom):
     name: str
     sympy_dummy: Any
-    defined_symbols = {}
+
+    # Symbols are interned: there is one instance per name as long as it is
+    # referenced. The table is keyed by the name as given and the fully
+    # qualified name. Copies (see do_copy) and symbols with a sympy_dummy
+    # are separate instances.
+    defined_symbols = weakref.WeakValueDictionary()
+
+    __slots__ = ("name", "sympy_dummy", "_hash", "_sort_key", "__weakref__")
 
     def __new__(cls, name, sympy_dummy=None):
-        name = ensure_context(name)
-        self = cls.defined_symbols.get(name, None)
-        if self is None:
-            self = super(Symbol, cls).__new__(cls)
-            self.name = name
-            self.sympy_dummy = sympy_dummy
-            # cls.defined_symbols[name] = self
+        if sympy_dummy is None:
+            self = cls.defined_symbols.get(name)
+            if self is not None:
+                return self
+        full_name = ensure_context(name)
+        if sympy_dummy is None and full_name is not name:
+            self = cls.defined_symbols.get(full_name)
+            if self is not None:
+                cls.defined_symbols[name] = self
+                return self
+        self = cls._new(full_name, sympy_dummy)
+        if sympy_dummy is None:
+            cls.defined_symbols[full_name] = self
+            if full_name is not name:
+                cls.defined_symbols[name] = self
+        return self
+
+    @classmethod
+    def _new(cls, name, sympy_dummy=None):
+        # a new instance, bypassing the table
+        self = super(Symbol, cls).__new__(cls)
+        self.name = name
+        self.sympy_dummy = sympy_dummy
+        self._hash = hash(("Symbol", name))  # to distinguish from String
+        self._sort_key = None
         return self
 
     def __str__(self) -> str:
         return self.name
 
     def do_copy(self) -> "Symbol":
-        return Symbol(self.name)
+        # copies get positions assigned (see Expression.set_positions), so
+        # they must not be the interned instance
+        return Symbol._new(self.name, self.sympy_dummy)
 
     def boxes_to_text(self, **options) -> str:
         return str(self.name)
@@ -2037,8 +2649,9 @@ class Symbol(Atom):
     def get_sort_key(self, pattern_sort=False):
         if pattern_sort:
             return super(Symbol, self).get_sort_key(True)
-        else:
-            return [
+        key = self._sort_key
+        if key is None:
+            key = [
                 1 if self.is_numeric() else 2,
                 2,
                 Monomial({self.name: 1}),
@@ -2046,6 +2659,8 @@ class Symbol(Atom):
                 self.name,
                 1,
             ]
+            self._sort_key = key
+        return key
 
     def equal2(self, rhs: Any) -> Optional[bool]:
         """Mathics two-argument Equal (==)"""
@@ -2062,7 +2677,18 @@ class Symbol(Atom):
 
     def sameQ(self, rhs: Any) -> bool:
         """Mathics SameQ"""
-        return id(self) == id(rhs) or isinstance(rhs, Symbol) and self.name == rhs.name
+        return self is rhs or isinstance(rhs, Symbol) and self.name == rhs.name
+
+    def __eq__(self, other) -> bool:
+        # symbols have the same sort key if and only if they have the same name
+        if self is other:
+            return True
+        if isinstance(other, Symbol):
+            return self.name == other.name
+        return super(Symbol, self).__eq__(other)
+
+    def __ne__(self, other) -> bool:
+        return not self == other
 
     def replace_vars(self, vars, options={}, in_scoping=True):
         assert all(fully_qualified_symbol_name(v) for v in vars)
@@ -2087,18 +2713,17 @@ class Symbol(Atom):
         return self == SymbolTrue
 
     def is_numeric(self) -> bool:
-        return self.name in system_symbols(
-            "Pi", "E", "EulerGamma", "GoldenRatio", "MachinePrecision", "Catalan"
-        )
+        return self.name in _numeric_constants
 
     def __hash__(self):
-        return hash(("Symbol", self.name))  # to distinguish from String
+        return self._hash
 
     def user_hash(self, update) -> None:
         update(b"System`Symbol>" + self.name.encode("utf8"))
 
-    def __getnewargs__(self):
-        return (self.name, self.sympy_dummy)
+    def __reduce__(self):
+        # unpickling gives the interned instance
+        return (Symbol, (self.name, self.sympy_dummy))
 
 
 # Some common Symbols. This list is sorted in alpabetic order.
@@ -2140,6 +2765,8 @@ def from_mpmath(value, prec=None):
 
 
 class Number(Atom):
+    __slots__ = ()
+
     def __str__(self) -> str:
         return str(self.value)
 
@@ -2193,16 +2820,21 @@ _number_form_options = {
 class Integer(Number):
     value: int
 
+    __slots__ = ("value",)
+
     def __new__(cls, value) -> "Integer":
         n = int(value)
+        if _min_small_integer <= n <= _max_small_integer:
+            return _small_integers[n - _min_small_integer]
+        return cls._new(n)
+
+    @classmethod
+    def _new(cls, value):
+        # a new instance, bypassing the preallocated small integers
         self = super(Integer, cls).__new__(cls)
-        self.value = n
+        self.value = value
         return self
 
-    @lru_cache()
-    def __init__(self, value) -> "Integer":
-        super().__init__()
-
     def boxes_to_text(self, **options) -> str:
         return str(self.value)
 
@@ -2241,7 +2873,7 @@ class Integer(Number):
 
     def sameQ(self, other) -> bool:
         """Mathics SameQ"""
-        return isinstance(other, Integer) and self.value == other.value
+        return self is other or isinstance(other, Integer) and self.value == other.value
 
     def evaluate(self, evaluation):
         evaluation.check_stopped()
@@ -2254,7 +2886,7 @@ class Integer(Number):
             return [0, 0, self.value, 0, 1]
 
     def do_copy(self) -> "Integer":
-        return Integer(self.value)
+        return Integer._new(self.value)
 
     def __hash__(self):
         return hash(("Integer", self.value))
@@ -2262,8 +2894,8 @@ class Integer(Number):
     def user_hash(self, update):
         update(b"System`Integer>" + str(self.value).encode("utf8"))
 
-    def __getnewargs__(self):
-        return (self.value,)
+    def __reduce__(self):
+        return (Integer, (self.value,))
 
     def __neg__(self) -> "Integer":
         return Integer(-self.value)
@@ -2273,11 +2905,20 @@ class Integer(Number):
         return self.value == 0
 
 
+# Integer() returns the same instance for these values
+_min_small_integer = -128
+_max_small_integer = 1024
+_small_integers = [
+    Integer._new(n) for n in range(_min_small_integer, _max_small_integer + 1)
+]
+
 Integer0 = Integer(0)
 Integer1 = Integer(1)
 
 
 class Rational(Number):
+    __slots__ = ("value",)
+
     @lru_cache()
     def __new__(cls, numerator, denominator=1) -> "Rational":
         self = super().__new__(cls)
@@ -2375,6 +3016,8 @@ RationalOneHalf = Rational(1, 2)
 
 
 class Real(Number):
+    __slots__ = ("value",)
+
     def __new__(cls, value, p=None) -> "Real":
         if isinstance(value, str):
             value = str(value)
@@ -2460,11 +3103,23 @@ class MachineReal(Real):
 
     value: float
 
+    __slots__ = ()
+
     def __new__(cls, value) -> "MachineReal":
+        value = float(value)
+        self = _common_machine_reals.get(value)
+        # 0. and -0. compare equal
+        if self is None or value == 0.0 and math.copysign(1.0, value) < 0:
+            if math.isinf(value) or math.isnan(value):
+                raise OverflowError
+            self = cls._new(value)
+        return self
+
+    @classmethod
+    def _new(cls, value):
+        # a new instance, bypassing the preallocated common values
         self = Number.__new__(cls)
-        self.value = float(value)
-        if math.isinf(self.value) or math.isnan(self.value):
-            raise OverflowError
+        self.value = value
         return self
 
     def to_python(self, *args, **kwargs) -> float:
@@ -2481,7 +3136,9 @@ class MachineReal(Real):
 
     def sameQ(self, other) -> bool:
         """Mathics SameQ"""
-        if isinstance(other, MachineReal):
+        if self is other:
+            return True
+        elif isinstance(other, MachineReal):
             return self.value == other.value
         elif isinstance(other, PrecisionReal):
             return self.to_sympy() == other.value
@@ -2506,11 +3163,11 @@ class MachineReal(Real):
             n = 6
         return number_form(self, n, None, None, _number_form_options)
 
-    def __getnewargs__(self):
-        return (self.value,)
+    def __reduce__(self):
+        return (MachineReal, (self.value,))
 
     def do_copy(self) -> "MachineReal":
-        return MachineReal(self.value)
+        return MachineReal._new(self.value)
 
     def __neg__(self) -> "MachineReal":
         return MachineReal(-self.value)
@@ -2527,6 +3184,12 @@ class MachineReal(Real):
         return res
 
 
+# MachineReal() returns the same instance for these values
+_common_machine_reals = dict(
+    (value, MachineReal._new(value)) for value in (-1.0, 0.0, 0.5, 1.0, 2.0)
+)
+
+
 class PrecisionReal(Real):
     """
     Arbitrary precision real number.
@@ -2538,6 +3201,8 @@ class PrecisionReal(Real):
 
     value: sympy.Float
 
+    __slots__ = ()
+
     def __new__(cls, value) -> "PrecisionReal":
         self = Number.__new__(cls)
         self.value = sympy.Float(value)
@@ -2600,6 +3265,8 @@ class Complex(Number):
     real: Any
     imag: Any
 
+    __slots__ = ("real", "imag")
+
     def __new__(cls, real, imag):
         self = super().__new__(cls)
         if isinstance(real, Complex) or not isinstance(real, Number):
@@ -2749,6 +3416,33 @@ class Complex(Number):
         return real_zero and imag_zero
 
 
+def _machine_complex(z) -> Number:
+    if z.imag == 0.0:
+        return MachineReal(z.real)
+    return Complex(MachineReal(z.real), MachineReal(z.imag))
+
+
+# the leaves for the elements of packed arrays, by the kind of the array
+_packed_element = {"i": Integer, "f": MachineReal, "c": _machine_complex}
+
+
+def from_numpy(value) -> BaseExpression:
+    """
+    Converts a NumPy number or array of machine numbers, like the parts of
+    the array of a PackedArray, into a number or a PackedArray.
+    """
+    if isinstance(value, numpy.ndarray) and value.ndim > 0:
+        if value.dtype.kind == "c" and not value.imag.any():
+            value = value.real
+        return PackedArray(value)
+    value = value.item()
+    if isinstance(value, int):
+        return Integer(value)
+    if isinstance(value, float):
+        return MachineReal(value)
+    return _machine_complex(value)
+
+
 def encode_mathml(text: str) -> str:
     text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
     text = text.replace('"', "&quot;").replace(" ", "&nbsp;")
@@ -2820,9 +3514,13 @@ extra_operators = set(
 class String(Atom):
     value: str
 
+    __slots__ = ("value",)
+
     def __new__(cls, value):
         self = super().__new__(cls)
         self.value = str(value)
+        if _counting_threads:
+            _count_allocation(len(self.value))
         return self
 
     def __str__(self) -> str:
@@ -2996,6 +3694,8 @@ class String(Atom):
 class ByteArrayAtom(Atom):
     value: str
 
+    __slots__ = ("value",)
+
     def __new__(cls, value):
         self = super().__new__(cls)
         if type(value) in (bytes, bytearray):
@@ -3069,6 +3769,8 @@ class ByteArrayAtom(Atom):
 
 
 class StringFromPython(String):
+    __slots__ = ()
+
     def __new__(cls, value):
         self = super().__new__(cls, value)
         if isinstance(value, sympy.NumberSymbol):
@@ -1,18 +1,40 @@
+import importlib
 import inspect
 from typing import Callable
 
 # key is str: (to_xxx name, value) is formatter function to call
 format2fn = {}
 
+# the modules registering the conversion methods of each format. Importing
+# them imports the graphics builtins, so this is done on the first lookup
+# of the format rather than at startup.
+format_modules = {
+    "asy": "mathics.format.asy",
+    "json": "mathics.format.json",
+    "svg": "mathics.format.svg",
+}
+
+# key is (format, class): the conversion method found for the class
+_method_cache = {}
+
 
 def lookup_method(self, format: str, module_fn_name=None) -> Callable:
     """
     Find a conversion method for `format` in self's class method resolution order.
     """
+    key = (format, type(self))
+    format_fn = _method_cache.get(key, None)
+    if format_fn is not None:
+        return format_fn
+    module_name = format_modules.get(format)
+    if module_name is not None:
+        importlib.import_module(module_name)
+        del format_modules[format]
     for cls in inspect.getmro(type(self)):
         format_fn = format2fn.get((format, cls), None)
         if format_fn is not None:
             # print(f"format function: {format_fn.__name__} for {type(self).__name__}")
+            _method_cache[key] = format_fn
             return format_fn
     raise RuntimeError(
         f"Can't find formatter {format_fn.__name__} for {type(self).__name__}"
@@ -50,3 +72,5 @@ def add_conversion_fn(cls, module_fn_name=None) -> None:
 
     # Finally register the mapping: (Builtin-class, conversion name) -> conversion_function.
     format2fn[(conversion_type, cls)] = module_dict[module_fn_name]
+    # a subclass may have been resolved to the method of a base class
+    _method_cache.clear()
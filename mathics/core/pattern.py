@@ -3,7 +3,7 @@
 # -*- coding: utf-8 -*-
 
 
-from mathics.core.expression import Expression, system_symbols, ensure_context
+from mathics.core.expression import Expression, Symbol, system_symbols, ensure_context
 from mathics.core.util import subsets, subranges, permutations
 from itertools import chain
 
@@ -133,6 +133,21 @@ class Pattern(object):
             self.get_match_candidates(leaves, expression, attributes, evaluation, vars)
         )
 
+    def compile_matcher(self, heads):
+        """
+        Compiles this pattern into a function
+        matcher(expression, vars, evaluation) that returns the extended vars
+        if the pattern matches expression and None otherwise. Only patterns
+        that match exactly one expression in a single way can be compiled;
+        for all others, None is returned and the generic match() has to be
+        used.
+
+        The matcher assumes that none of the heads it checks is Flat,
+        Orderless or OneIdentity. Their names are added to heads, so that
+        callers can fall back to match() if any of them is.
+        """
+        return None
+
 
 class AtomPattern(Pattern):
     def __init__(self, expr):
@@ -164,6 +179,67 @@ class AtomPattern(Pattern):
     def get_match_count(self, vars={}):
         return (1, 1)
 
+    def compile_matcher(self, heads):
+        atom = self.atom
+
+        def matcher(expression, vars, evaluation):
+            if expression.sameQ(atom):
+                return vars
+            return None
+
+        return matcher
+
+
+def _pattern_names(expr, names) -> set:
+    "Adds the names of the pattern variables in expr to names."
+    if isinstance(expr, Expression):
+        if expr.has_form("Pattern", 2):
+            names.add(expr.leaves[0].get_name())
+        _pattern_names(expr.head, names)
+        for leaf in expr.leaves:
+            _pattern_names(leaf, names)
+    return names
+
+
+def _symbol_names(expr, names) -> set:
+    if isinstance(expr, Symbol):
+        names.add(expr.get_name())
+    elif isinstance(expr, Expression):
+        _symbol_names(expr.head, names)
+        for leaf in expr.leaves:
+            _symbol_names(leaf, names)
+    return names
+
+
+def _condition_names(expr, names) -> set:
+    "Adds the names of the symbols in the tests of the conditions in expr."
+    if isinstance(expr, Expression):
+        if expr.has_form("Condition", 2):
+            _symbol_names(expr.leaves[1], names)
+        _condition_names(expr.head, names)
+        for leaf in expr.leaves:
+            _condition_names(leaf, names)
+    return names
+
+
+def _local_conditions(leaves) -> bool:
+    """
+    Returns whether the conditions in each of the leaves only refer to the
+    pattern variables of that leaf. match() evaluates a condition once its
+    leaf is matched, when the variables of the other leaves may or may not
+    be bound yet, and compiled matchers don't reproduce that order.
+    """
+    bound = [_pattern_names(leaf, set()) for leaf in leaves]
+    for index, leaf in enumerate(leaves):
+        names = _condition_names(leaf, set())
+        if names:
+            others = set().union(
+                *(other for i, other in enumerate(bound) if i != index)
+            )
+            if not names.isdisjoint(others - bound[index]):
+                return False
+    return True
+
 
 # class StopGenerator_ExpressionPattern_match(StopGenerator):
 #    pass
@@ -443,6 +519,35 @@ class ExpressionPattern(Pattern):
     def get_match_count(self, vars={}):
         return (1, 1)
 
+    def compile_matcher(self, heads):
+        if not (
+            isinstance(self.head, AtomPattern) and isinstance(self.head.atom, Symbol)
+        ):
+            return None
+        if not _local_conditions(self.expr.leaves):
+            return None
+        leaf_matchers = []
+        for leaf in self.leaves:
+            leaf_matcher = leaf.compile_matcher(heads)
+            if leaf_matcher is None:
+                return None
+            leaf_matchers.append(leaf_matcher)
+        head_name = self.head.atom.get_name()
+        heads.add(head_name)
+        count = len(leaf_matchers)
+
+        def matcher(expression, vars, evaluation):
+            if not expression.has_form(head_name, count):
+                return None
+            evaluation.check_stopped()
+            for leaf, leaf_matcher in zip(expression.leaves, leaf_matchers):
+                vars = leaf_matcher(leaf, vars, evaluation)
+                if vars is None:
+                    return None
+            return vars
+
+        return matcher
+
     def get_wrappings(
         self,
         yield_func,
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in profiling of evaluations.
+
+A profile of the Python frames is dominated by generic functions like
+Expression.evaluate_next or the pattern matcher. An EvaluationProfile records
+statistics in terms of the evaluation instead: how often expressions with each
+head are evaluated, how often the rules of each definition are tried and
+match, the time spent in each builtin method and in conversions to and from
+SymPy. Profiling is active inside a with block:
+
+    with EvaluationProfile() as profile:
+        evaluation.parse_evaluate(query)
+    print(profile.report())
+"""
+
+from collections import defaultdict
+from functools import wraps
+import time
+
+# the profile which is being recorded, or None
+active = None
+
+
+def _short_name(name):
+    if name.startswith("System`"):
+        return name[len("System`") :]
+    return name
+
+
+class EvaluationProfile(object):
+    def __init__(self):
+        self.head_counts = defaultdict(int)
+        self.rule_attempts = defaultdict(int)
+        self.rule_matches = defaultdict(int)
+        self.builtin_calls = defaultdict(int)
+        # the time of a builtin method, with and without the builtin methods
+        # it calls
+        self.builtin_times = defaultdict(float)
+        self.builtin_self_times = defaultdict(float)
+        self.sympy_calls = 0
+        self.sympy_time = 0.0
+        self.time = 0.0
+
+        self._previous = []
+        self._start = None
+        # the time of the nested builtin calls of each running builtin call
+        self._nested = []
+        self._in_sympy = False
+
+    def __enter__(self):
+        global active
+        self._previous.append(active)
+        self._start = time.perf_counter()
+        active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global active
+        self.time += time.perf_counter() - self._start
+        active = self._previous.pop()
+
+    def count_evaluation(self, expr):
+        self.head_counts[expr.get_lookup_name()] += 1
+
+    def apply_rule(self, rule, *args, **kwargs):
+        name = getattr(rule, "name", None)
+        if name is None:
+            # the symbol whose definition has the rule, unless it is an upvalue
+            name = rule.pattern.get_lookup_name()
+        self.rule_attempts[name] += 1
+        result = rule._apply(*args, **kwargs)
+        # rules give a list of results when applied with return_list
+        if bool(result) if isinstance(result, list) else result is not None:
+            self.rule_matches[name] += 1
+        return result
+
+    def call_builtin(self, function, *args, **kwargs):
+        key = "%s.%s" % (function.__self__.get_name(short=True), function.__name__)
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.builtin_calls[key] += 1
+            self.builtin_times[key] += elapsed
+            self.builtin_self_times[key] += elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def get_head_counts(self):
+        "Returns the pairs of heads and evaluation counts, most frequent first."
+        return sorted(
+            self.head_counts.items(),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def get_rule_matches(self):
+        """
+        Returns the triples of definitions and the numbers of rule attempts
+        and matches, most attempted first.
+        """
+        return sorted(
+            (
+                (name, attempts, self.rule_matches[name])
+                for name, attempts in self.rule_attempts.items()
+            ),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def get_builtin_times(self):
+        """
+        Returns the quadruples of builtin methods, numbers of calls, total
+        and self time, most total time first.
+        """
+        return sorted(
+            (
+                (key, calls, self.builtin_times[key], self.builtin_self_times[key])
+                for key, calls in self.builtin_calls.items()
+            ),
+            key=lambda item: (-item[2], item[0]),
+        )
+
+    def report(self, limit=20) -> str:
+        "Returns a ranked report of the first limit entries of each statistic."
+        lines = ["Evaluation profile: %.3f s" % self.time, ""]
+        lines.append("Evaluations by head")
+        lines.append("%10s  %s" % ("count", "head"))
+        for name, count in self.get_head_counts()[:limit]:
+            lines.append("%10d  %s" % (count, _short_name(name)))
+        lines.append("")
+        lines.append("Builtin methods")
+        lines.append("%10s  %10s  %10s  %s" % ("calls", "total s", "self s", "method"))
+        for key, calls, total, self_time in self.get_builtin_times()[:limit]:
+            lines.append("%10d  %10.4f  %10.4f  %s" % (calls, total, self_time, key))
+        lines.append("")
+        lines.append("Rules by definition")
+        lines.append("%10s  %10s  %s" % ("attempts", "matches", "definition"))
+        for name, attempts, matches in self.get_rule_matches()[:limit]:
+            lines.append("%10d  %10d  %s" % (attempts, matches, _short_name(name)))
+        lines.append("")
+        lines.append("SymPy conversion")
+        lines.append("%10s  %10s" % ("calls", "total s"))
+        lines.append("%10d  %10.4f" % (self.sympy_calls, self.sympy_time))
+        return "\n".join(lines)
+
+
+def sympy_conversion(function):
+    """
+    Decorates a conversion to or from SymPy, which the active profile records.
+    Nested conversions count as part of the outermost one.
+    """
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = active
+        if profile is None or profile._in_sympy:
+            return function(*args, **kwargs)
+        profile._in_sympy = True
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.sympy_calls += 1
+            profile.sympy_time += time.perf_counter() - start
+            profile._in_sympy = False
+
+    return wrapper
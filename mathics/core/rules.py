@@ -3,11 +3,23 @@
 # -*- coding: utf-8 -*-
 
 
-from mathics.core.expression import Expression, strip_context, KeyComparable
-from mathics.core.pattern import Pattern, StopGenerator
+from mathics.core.expression import (
+    Atom,
+    Expression,
+    Integer,
+    KeyComparable,
+    Rational,
+    String,
+    Symbol,
+    strip_context,
+)
+from mathics.core.pattern import AtomPattern, ExpressionPattern, Pattern, StopGenerator
+from mathics.core import profiling
 from mathics.core.util import function_arguments
 
 from itertools import chain
+import copy
+import heapq
 
 
 class StopGenerator_BaseRule(StopGenerator):
@@ -18,10 +30,49 @@ class BaseRule(KeyComparable):
     def __init__(self, pattern, system=False) -> None:
         self.pattern = Pattern.create(pattern)
         self.system = system
+        self._matcher = None
+
+    def get_matcher(self):
+        """
+        Returns the compiled matcher of the pattern (see
+        Pattern.compile_matcher) together with the heads it assumes to be
+        structural. The matcher is None if the pattern cannot be compiled.
+        """
+        if self._matcher is None:
+            heads = set()
+            matcher = self.pattern.compile_matcher(heads)
+            self._matcher = (matcher, tuple(heads))
+        return self._matcher
 
     def apply(
         self, expression, evaluation, fully=True, return_list=False, max_list=None
     ):
+        profile = profiling.active
+        if profile is not None:
+            return profile.apply_rule(
+                self, expression, evaluation, fully, return_list, max_list
+            )
+        return self._apply(expression, evaluation, fully, return_list, max_list)
+
+    def _apply(self, expression, evaluation, fully, return_list, max_list):
+        if not return_list:
+            matcher, heads = self.get_matcher()
+            if matcher is not None:
+                definitions = evaluation.definitions
+                for name in heads:
+                    if not _NON_STRUCTURAL_ATTRIBUTES.isdisjoint(
+                        definitions.get_attributes(name)
+                    ):
+                        break
+                else:
+                    vars = matcher(expression, {}, evaluation)
+                    if vars is None:
+                        return None
+                    new_expression = self.do_replace(expression, vars, {}, evaluation)
+                    if new_expression is None:
+                        new_expression = expression
+                    return new_expression.flatten_pattern_sequence(evaluation)
+
         result_list = []
         # count = 0
 
@@ -76,6 +127,12 @@ class BaseRule(KeyComparable):
     def get_sort_key(self):
         return (self.system, self.pattern.get_sort_key(True))
 
+    def __getstate__(self):
+        # compiled matchers are closures, which cannot be pickled
+        odict = self.__dict__.copy()
+        odict["_matcher"] = None
+        return odict
+
 
 class Rule(BaseRule):
     def __init__(self, pattern, replace, system=False) -> None:
@@ -84,7 +141,6 @@ class Rule(BaseRule):
 
     def do_replace(self, expression, vars, options, evaluation):
         new = self.replace.replace_vars(vars)
-        new.options = options
 
         # if options is a non-empty dict, we need to ensure reevaluation of the whole expression, since 'new' will
         # usually contain one or more matching OptionValue[symbol_] patterns that need to get replaced with the
@@ -98,8 +154,12 @@ class Rule(BaseRule):
         # expression won't change in that case. the Expression.options would be None anyway, so OptionValue.apply
         # would just return the unchanged expression (which is what we have already).
 
+        # the options are set on the copy only: 'new' may be the rule's own
+        # replacement or a shared atom (see Symbol.__new__).
+
         if options:
             new = new.copy(reevaluate=True)
+            new.options = options
 
         return new
 
@@ -126,23 +186,292 @@ class BuiltinRule(BaseRule):
         if self.pass_expression:
             vars_noctx["expression"] = expression
         if options:
-            return self.function(evaluation=evaluation, options=options, **vars_noctx)
-        else:
-            return self.function(evaluation=evaluation, **vars_noctx)
+            vars_noctx["options"] = options
+        profile = profiling.active
+        if profile is not None:
+            return profile.call_builtin(
+                self.function, evaluation=evaluation, **vars_noctx
+            )
+        return self.function(evaluation=evaluation, **vars_noctx)
 
     def __repr__(self) -> str:
         return "<BuiltinRule: %s -> %s>" % (self.pattern, self.function)
 
     def __getstate__(self):
-        odict = self.__dict__.copy()
+        odict = super(BuiltinRule, self).__getstate__()
         del odict["function"]
         odict["function_"] = (self.function.__self__.get_name(), self.function.__name__)
         return odict
 
     def __setstate__(self, dict):
-        from mathics.builtin import builtins
-
         self.__dict__.update(dict)  # update attributes
-        cls, name = dict["function_"]
+        cls, name = self.__dict__.pop("function_")
+
+        self.function = getattr(lookup_builtin(cls), name)
+
+
+def lookup_builtin(name):
+    """Returns the registered Builtin instance with the given name."""
+    from mathics.builtin import _builtins, builtins_dict
+
+    builtin = _builtins.get(name)
+    if builtin is None:
+        builtin = builtins_dict()[name]
+    return builtin
+
+
+def _head_attributes(name, definitions):
+    # get_attributes() would create a Global` definition for unknown
+    # symbols; we only want to peek.
+    definition = definitions.get_definition(name, only_if_exists=True)
+    if definition is None:
+        return set()
+    return definition.attributes
+
+
+_NON_STRUCTURAL_ATTRIBUTES = set(
+    ("System`Flat", "System`Orderless", "System`OneIdentity")
+)
+
+
+def _literal_key(expr):
+    # key under which a literal atom is indexed. Reals and Complexes are
+    # left out on purpose: their sameQ and __hash__ do not agree across
+    # precisions.
+    if isinstance(expr, Symbol):
+        return ("Symbol", expr.get_name())
+    elif isinstance(expr, (Integer, String, Rational)):
+        return (expr.get_atom_name(), expr.value)
+    return None
+
+
+def _is_literal(expr, definitions):
+    # a literal left-hand side only matches expressions that are sameQ to it,
+    # which is not true if some head is Flat, Orderless or OneIdentity.
+    from mathics.builtin import pattern_objects
+
+    if expr.is_atom():
+        if isinstance(expr, Symbol):
+            return expr.get_name() not in pattern_objects
+        return _literal_key(expr) is not None
+    head = expr.get_head()
+    if not isinstance(head, Symbol):
+        return False
+    name = head.get_name()
+    if name in pattern_objects:
+        return False
+    if _head_attributes(name, definitions) & _NON_STRUCTURAL_ATTRIBUTES:
+        return False
+    return all(_is_literal(leaf, definitions) for leaf in expr.leaves)
+
+
+def _unwrap_pattern(pattern):
+    # Condition, PatternTest, HoldPattern and Pattern only match a subset of
+    # what their inner pattern matches, so we can index on the latter.
+    while True:
+        name = pattern.get_head_name()
+        if name in (
+            "System`Condition",
+            "System`PatternTest",
+            "System`HoldPattern",
+        ):
+            pattern = pattern.leaves[0]
+        elif name == "System`Pattern":
+            pattern = pattern.leaves[1]
+        else:
+            return pattern
+
+
+def _pattern_symbols(pattern, definitions):
+    # the names of symbols one of which occurs in every expression that
+    # pattern matches, or None. OneIdentity lets f[x_., y_] match y, which
+    # need not contain f.
+    pattern = _unwrap_pattern(pattern)
+    if isinstance(pattern, AtomPattern):
+        if isinstance(pattern.atom, Symbol):
+            return {pattern.atom.get_name()}
+    elif isinstance(pattern, ExpressionPattern):
+        head = pattern.head
+        if isinstance(head, AtomPattern) and isinstance(head.atom, Symbol):
+            name = head.atom.get_name()
+            if "System`OneIdentity" not in _head_attributes(name, definitions):
+                return {name}
+    elif pattern.get_head_name() == "System`Alternatives":
+        symbols = set()
+        for alternative in pattern.alternatives:
+            alternative_symbols = _pattern_symbols(alternative, definitions)
+            if alternative_symbols is None:
+                return None
+            symbols.update(alternative_symbols)
+        return symbols
+    return None
+
+
+def rule_symbols(rules, definitions):
+    """
+    Returns the names of symbols one of which occurs in every expression that
+    one of rules can match, or None if some rule might match expressions
+    without any particular symbol. Expression.apply_rules skips the
+    subexpressions that contain none of these symbols.
+    """
+    if isinstance(rules, DispatchRules):
+        return rules.symbols
+    symbols = set()
+    for rule in rules:
+        pattern = getattr(rule, "pattern", None)
+        if pattern is None:
+            return None
+        pattern_symbols = _pattern_symbols(pattern, definitions)
+        if pattern_symbols is None:
+            return None
+        symbols.update(pattern_symbols)
+    return frozenset(symbols)
+
+
+class DispatchRules(Atom):
+    """
+    An optimized, immutable set of rules as created by Dispatch[].
+
+    Rules are indexed by the head and the number of leaves of their left hand
+    side, and fully literal left hand sides (like f[1] or "abc") are indexed
+    by value. get_candidates() then returns, in their original order, only
+    the rules that can possibly match a given expression, so that applying a
+    large table of rules costs about O(1) per subexpression instead of
+    O(len(rules)).
+
+    Note that the index is built using the attributes that the heads
+    occurring in the rules have when the table is created.
+    """
+
+    def __init__(self, src, rules, evaluation, **kwargs):
+        super(DispatchRules, self).__init__(**kwargs)
+        self.src = src
+        self.rules = rules
+
+        definitions = evaluation.definitions
+        generic = []  # rules that might match anything
+        by_head = {}  # head name -> rules with variable number of leaves
+        by_shape = {}  # (head name, number of leaves) -> rules
+        literals = {}  # (head name, number of leaves) -> {hash: rules}
+        atoms = {}  # literal key -> rules
+
+        for index, rule in enumerate(rules):
+            pattern = _unwrap_pattern(rule.pattern)
+            expr = pattern.expr
+
+            if _is_literal(expr, definitions):
+                if expr.is_atom():
+                    atoms.setdefault(_literal_key(expr), []).append(index)
+                else:
+                    shape = (expr.get_head_name(), len(expr.leaves))
+                    table = literals.setdefault(shape, {})
+                    table.setdefault(hash(expr), []).append(index)
+                continue
+
+            if isinstance(pattern, ExpressionPattern) and isinstance(
+                pattern.head, AtomPattern
+            ):
+                head = pattern.head.atom
+                if isinstance(head, Symbol):
+                    name = head.get_name()
+                    attributes = _head_attributes(name, definitions)
+                    if not (
+                        "System`Flat" in attributes
+                        or "System`OneIdentity" in attributes
+                    ):
+                        if all(
+                            tuple(leaf.get_match_count()) == (1, 1)
+                            for leaf in pattern.leaves
+                        ):
+                            shape = (name, len(pattern.leaves))
+                            by_shape.setdefault(shape, []).append(index)
+                        else:
+                            by_head.setdefault(name, []).append(index)
+                        continue
+
+            generic.append(index)
+
+        self.symbols = rule_symbols(rules, definitions)
+        self._generic = generic
+        self._by_head = by_head
+        self._by_shape = by_shape
+        self._literals = literals
+        self._atoms = atoms
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get_candidates(self, expression):
+        "Returns the rules that might match expression, in their original order."
+        buckets = [self._generic]
+
+        if expression.is_atom():
+            key = _literal_key(expression)
+            if key is not None:
+                buckets.append(self._atoms.get(key, ()))
+        else:
+            head = expression.get_head()
+            if isinstance(head, Symbol):
+                name = head.get_name()
+                shape = (name, len(expression.leaves))
+                buckets.append(self._by_head.get(name, ()))
+                buckets.append(self._by_shape.get(shape, ()))
+                table = self._literals.get(shape)
+                if table is not None:
+                    try:
+                        buckets.append(table.get(hash(expression), ()))
+                    except (TypeError, NotImplementedError):
+                        # unhashable leaves: fall back to all literals of
+                        # this shape.
+                        buckets.extend(table.values())
+
+        buckets = [bucket for bucket in buckets if bucket]
+        rules = self.rules
+        if not buckets:
+            return ()
+        elif len(buckets) == 1:
+            return [rules[index] for index in buckets[0]]
+        else:
+            return [rules[index] for index in heapq.merge(*buckets)]
+
+    def __str__(self) -> str:
+        return "Dispatch[%s]" % self.src
+
+    def do_copy(self) -> "DispatchRules":
+        # the index is immutable and can be shared.
+        return copy.copy(self)
+
+    def default_format(self, evaluation, form) -> str:
+        return "Dispatch[%s]" % self.src.default_format(evaluation, form)
+
+    def atom_to_boxes(self, f, evaluation):
+        return Expression("Dispatch", self.src).format(evaluation, f.get_name())
+
+    def get_atom_name(self) -> str:
+        return "Dispatch"
+
+    def get_sort_key(self, pattern_sort=False):
+        if pattern_sort:
+            return super(DispatchRules, self).get_sort_key(True)
+        else:
+            return Expression("Dispatch", self.src).get_sort_key()
+
+    def sameQ(self, other) -> bool:
+        """Mathics SameQ"""
+        return isinstance(other, DispatchRules) and self.src.sameQ(other.src)
+
+    def to_sympy(self, **kwargs):
+        return None
+
+    def to_python(self, *args, **kwargs):
+        return self
+
+    def __hash__(self):
+        return hash(("Dispatch", self.src))
 
-        self.function = getattr(builtins[cls], name)
+    def user_hash(self, update):
+        update(b"System`Dispatch>")
+        self.src.user_hash(update)
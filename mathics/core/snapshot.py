@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent snapshot of the builtin definitions.
+
+Building the builtin definitions means contributing every Builtin,
+parsing all of their rules and evaluating the autoloaded packages,
+which takes seconds. A snapshot stores the result on disk, with every
+Definition pickled separately, so that a fresh interpreter only needs to
+map the file and unpickle the definitions it actually looks up.
+
+The file starts with a fixed-size preamble (magic string and header
+length), followed by the pickled header and the pickled definitions.
+The header holds the snapshot key, the index of the definitions
+(name -> offset, length), the manifest of the builtin modules (see
+mathics.builtin.install_manifest) and the Python-level tables that are
+filled in while loading the builtins, like the registered importers and
+exporters. The operator tables of the parser are not among them: they
+are static (see mathics.core.parser.operators), and the definitions of
+the operators are in the snapshot like any other.
+
+A snapshot is only used if its key matches the running Mathics: the key
+covers the version numbers and a hash of the sources the builtin
+definitions are built from. Hashing the sources takes a noticeable part
+of the start, so the header also holds a stamp of the names, sizes and
+modification times of the sources. As long as the stamp matches, the
+sources are taken to be the ones the snapshot was made from.
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+from collections.abc import MutableMapping
+
+from mathics.version import __version__
+
+
+MAGIC = b"MTHSNAP1"
+PREAMBLE = struct.Struct("<8sQ")
+
+# Sources the builtin definitions depend on, relative to the mathics package.
+SOURCE_PATTERNS = (
+    ("builtin", ".py"),
+    ("core", ".py"),
+    ("autoload", ".m"),
+)
+
+# Module-level tables that are filled in as a side effect of building the
+# builtin definitions, as (module name, attribute name).
+TABLES = (
+    ("mathics.builtin.files_io.importexport", "IMPORTERS"),
+    ("mathics.builtin.files_io.importexport", "EXPORTERS"),
+)
+
+_snapshot_key = None
+_source_stamp = None
+
+
+def _source_digest():
+    """
+    Returns a digest of the version numbers and settings the builtin
+    definitions depend on, and the paths of their source files.
+    """
+    import mathics_scanner
+    from mathics.settings import ENABLE_FILES_MODULE, ROOT_DIR
+
+    digest = hashlib.sha1()
+    for part in (
+        __version__,
+        getattr(mathics_scanner, "__version__", ""),
+        "%d.%d" % sys.version_info[:2],
+        str(pickle.HIGHEST_PROTOCOL),
+        str(ENABLE_FILES_MODULE),
+    ):
+        digest.update(part.encode("utf-8") + b"\0")
+    paths = []
+    for subdir, extension in SOURCE_PATTERNS:
+        top = os.path.join(ROOT_DIR, subdir)
+        for root, dirs, files in os.walk(top):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(extension):
+                    paths.append(os.path.join(root, filename))
+    return digest, [(path, os.path.relpath(path, ROOT_DIR)) for path in paths]
+
+
+def snapshot_key() -> str:
+    """Returns the key identifying the builtin definitions of this Mathics."""
+    global _snapshot_key
+
+    if _snapshot_key is None:
+        digest, paths = _source_digest()
+        for path, name in paths:
+            digest.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _snapshot_key = digest.hexdigest()
+    return _snapshot_key
+
+
+def source_stamp() -> str:
+    """
+    Returns a stamp of the sources of the builtin definitions, which only
+    looks at the sizes and modification times of the files.
+    """
+    global _source_stamp
+
+    if _source_stamp is None:
+        digest, paths = _source_digest()
+        for path, name in paths:
+            stat = os.stat(path)
+            digest.update(
+                ("%s\0%d\0%d\0" % (name, stat.st_size, stat.st_mtime_ns)).encode(
+                    "utf-8"
+                )
+            )
+        _source_stamp = digest.hexdigest()
+    return _source_stamp
+
+
+def get_snapshot_filename(setting):
+    """
+    Interprets a snapshot setting, as given on the command line or in
+    the MATHICS_BUILTIN_SNAPSHOT environment variable: a false value
+    ("0", "no", "") disables the snapshot, a true value ("1", "yes")
+    selects the default file in the data directory and anything else is
+    taken as a file name.
+    """
+    if setting is None or setting is False:
+        return None
+    if setting is not True:
+        value = str(setting).strip()
+        if value.lower() in ("", "0", "no", "false", "off"):
+            return None
+        if value.lower() not in ("1", "yes", "true", "on"):
+            return os.path.expanduser(value)
+    from mathics.settings import DATA_DIR
+
+    return os.path.join(DATA_DIR, "builtins-%s.snapshot" % __version__)
+
+
+def save_snapshot(filename, definitions) -> None:
+    """Writes the builtin definitions of definitions to filename."""
+    from mathics.builtin import get_manifest
+
+    blobs = []
+    index = {}
+    offset = 0
+    for name, definition in definitions.builtin.items():
+        blob = pickle.dumps(definition, pickle.HIGHEST_PROTOCOL)
+        index[name] = (offset, len(blob))
+        offset += len(blob)
+        blobs.append(blob)
+
+    tables = {}
+    for module_name, table_name in TABLES:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            tables[(module_name, table_name)] = getattr(module, table_name)
+
+    header = pickle.dumps(
+        {
+            "key": snapshot_key(),
+            "stamp": source_stamp(),
+            "index": index,
+            "manifest": get_manifest(),
+            "tables": tables,
+            "now": definitions.now,
+        },
+        pickle.HIGHEST_PROTOCOL,
+    )
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    # write to a temporary file first so that concurrent interpreters never
+    # see a partially written snapshot
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    try:
+        with open(tmp_filename, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+class Snapshot(object):
+    """A memory-mapped snapshot file."""
+
+    def __init__(self, filename) -> None:
+        with open(filename, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = PREAMBLE.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError("%s is not a Mathics snapshot" % filename)
+        start = PREAMBLE.size
+        header = pickle.loads(self.map[start : start + header_length])
+        self.key = header["key"]
+        self.stamp = header.get("stamp")
+        self.index = header["index"]
+        self.manifest = header["manifest"]
+        self.tables = header["tables"]
+        self.now = header["now"]
+        self.data_offset = start + header_length
+
+    def load(self, name):
+        offset, length = self.index[name]
+        offset += self.data_offset
+        return pickle.loads(self.map[offset : offset + length])
+
+    def install(self) -> None:
+        """
+        Prepares loading the builtins from this snapshot: builtin modules
+        are only imported once something they define is used, and the
+        tables saved with the snapshot are restored as their modules are
+        loaded.
+        """
+        from mathics.builtin import call_when_loaded, install_manifest
+
+        install_manifest(self.manifest)
+        for (module_name, table_name), table in self.tables.items():
+
+            def restore(module, table_name=table_name, table=table):
+                getattr(module, table_name).update(table)
+
+            call_when_loaded(module_name, restore)
+
+
+def load_snapshot(filename):
+    """
+    Returns the Snapshot stored in filename, or None if there is none or
+    it was made by a different version of Mathics.
+    """
+    try:
+        snapshot = Snapshot(filename)
+    except (
+        OSError,
+        KeyError,
+        ValueError,
+        EOFError,
+        pickle.UnpicklingError,
+        struct.error,
+    ):
+        return None
+    # the sources are only hashed if their files have been touched
+    if snapshot.stamp != source_stamp() and snapshot.key != snapshot_key():
+        return None
+    return snapshot
+
+
+class SnapshotDefinitions(MutableMapping):
+    """
+    A dict of builtin definitions that unpickles each definition from a
+    Snapshot the first time it is looked up.
+    """
+
+    def __init__(self, snapshot) -> None:
+        self.snapshot = snapshot
+        self.loaded = {}
+        self.names = set(snapshot.index)
+
+    def __getitem__(self, name):
+        definition = self.loaded.get(name)
+        if definition is None:
+            if name not in self.names:
+                raise KeyError(name)
+            definition = self.loaded[name] = self.snapshot.load(name)
+        return definition
+
+    def get(self, name, default=None):
+        if name in self.names:
+            return self[name]
+        return default
+
+    def __contains__(self, name) -> bool:
+        return name in self.names
+
+    def __setitem__(self, name, definition) -> None:
+        self.loaded[name] = definition
+        self.names.add(name)
+
+    def __delitem__(self, name) -> None:
+        self.names.remove(name)
+        self.loaded.pop(name, None)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
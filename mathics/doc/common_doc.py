@@ -630,6 +630,7 @@ class MathicsMainDocumentation(Documentation):
                     part.is_appendix = True
                     appendix.append(part)
 
+        builtin.load_all_builtins()
         for title, modules, builtins_by_module, start in [
             (
                 "Reference of Built-in Symbols",
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+from contextlib import contextmanager
 import locale
 import os
 import re
@@ -12,8 +13,10 @@ import os.path as osp
 from mathics.core.parser import MathicsFileLineFeeder, MathicsLineFeeder
 
 from mathics.core.definitions import autoload_files, Definitions, Symbol
+from mathics.core.snapshot import get_snapshot_filename
 from mathics.core.expression import strip_context
 from mathics.core.evaluation import Evaluation, Output
+from mathics.core.profiling import EvaluationProfile
 from mathics import version_string, license_string, __version__
 from mathics import settings
 
@@ -23,6 +26,20 @@ def get_srcdir():
     return osp.realpath(filename)
 
 
+@contextmanager
+def profiled(enabled):
+    "Prints a report of the evaluations in the block if enabled."
+    if not enabled:
+        yield
+        return
+    profile = EvaluationProfile()
+    try:
+        with profile:
+            yield
+    finally:
+        print(profile.report())
+
+
 class TerminalShell(MathicsLineFeeder):
     def __init__(self, definitions, colors, want_readline, want_completion):
         super(TerminalShell, self).__init__("<stdin>")
@@ -290,6 +307,23 @@ Please contribute to Mathics!""",
         action="store_true",
     )
 
+    argparser.add_argument(
+        "--snapshot",
+        nargs="?",
+        const="1",
+        metavar="FILE",
+        help="load the builtin definitions from the snapshot FILE, creating it "
+        "if needed; without FILE a default location is used and "
+        "--snapshot=0 disables it (default: $MATHICS_BUILTIN_SNAPSHOT)",
+    )
+
+    argparser.add_argument(
+        "--profile",
+        help="print a ranked report of the heads, rules and builtin methods "
+        "used by the evaluations of FILE, of -e or of each input line",
+        action="store_true",
+    )
+
     argparser.add_argument(
         "--version", "-v", action="version", version="%(prog)s " + __version__
     )
@@ -313,7 +347,15 @@ Please contribute to Mathics!""",
 
         extension_modules = default_pymathics_modules
 
-    definitions = Definitions(add_builtin=True, extension_modules=extension_modules)
+    snapshot = args.snapshot
+    if snapshot is None:
+        snapshot = settings.BUILTIN_SNAPSHOT
+
+    definitions = Definitions(
+        add_builtin=True,
+        builtin_filename=get_snapshot_filename(snapshot),
+        extension_modules=extension_modules,
+    )
     definitions.set_line_no(0)
 
     shell = TerminalShell(
@@ -326,16 +368,17 @@ Please contribute to Mathics!""",
     if args.initfile:
         feeder = MathicsFileLineFeeder(args.initfile)
         try:
-            while not feeder.empty():
-                evaluation = Evaluation(
-                    shell.definitions,
-                    output=TerminalOutput(shell),
-                    catch_interrupt=False,
-                )
-                query = evaluation.parse_feeder(feeder)
-                if query is None:
-                    continue
-                evaluation.evaluate(query, timeout=settings.TIMEOUT)
+            with profiled(args.profile):
+                while not feeder.empty():
+                    evaluation = Evaluation(
+                        shell.definitions,
+                        output=TerminalOutput(shell),
+                        catch_interrupt=False,
+                    )
+                    query = evaluation.parse_feeder(feeder)
+                    if query is None:
+                        continue
+                    evaluation.evaluate(query, timeout=settings.TIMEOUT)
         except (KeyboardInterrupt):
             print("\nKeyboardInterrupt")
 
@@ -344,16 +387,17 @@ Please contribute to Mathics!""",
     if args.FILE is not None:
         feeder = MathicsFileLineFeeder(args.FILE)
         try:
-            while not feeder.empty():
-                evaluation = Evaluation(
-                    shell.definitions,
-                    output=TerminalOutput(shell),
-                    catch_interrupt=False,
-                )
-                query = evaluation.parse_feeder(feeder)
-                if query is None:
-                    continue
-                evaluation.evaluate(query, timeout=settings.TIMEOUT)
+            with profiled(args.profile):
+                while not feeder.empty():
+                    evaluation = Evaluation(
+                        shell.definitions,
+                        output=TerminalOutput(shell),
+                        catch_interrupt=False,
+                    )
+                    query = evaluation.parse_feeder(feeder)
+                    if query is None:
+                        continue
+                    evaluation.evaluate(query, timeout=settings.TIMEOUT)
         except (KeyboardInterrupt):
             print("\nKeyboardInterrupt")
 
@@ -365,7 +409,8 @@ Please contribute to Mathics!""",
     if args.execute:
         for expr in args.execute:
             evaluation = Evaluation(shell.definitions, output=TerminalOutput(shell))
-            result = evaluation.parse_evaluate(expr, timeout=settings.TIMEOUT)
+            with profiled(args.profile):
+                result = evaluation.parse_evaluate(expr, timeout=settings.TIMEOUT)
             shell.print_result(
                 result, no_out_prompt=True, strict_wl_output=args.strict_wl_output
             )
@@ -399,7 +444,8 @@ Please contribute to Mathics!""",
                 continue
             if args.full_form:
                 print(query)
-            result = evaluation.evaluate(query, timeout=settings.TIMEOUT)
+            with profiled(args.profile):
+                result = evaluation.evaluate(query, timeout=settings.TIMEOUT)
             if result is not None:
                 shell.print_result(result, strict_wl_output=args.strict_wl_output)
         except (KeyboardInterrupt):
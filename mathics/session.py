@@ -14,6 +14,8 @@ from mathics.core.definitions import autoload_files
 from mathics.core.parser import parse, MathicsSingleLineFeeder
 from mathics.core.definitions import Definitions
 from mathics.core.evaluation import Evaluation
+from mathics.core.snapshot import get_snapshot_filename
+from mathics import settings
 
 
 def load_default_settings_files(
@@ -50,8 +52,23 @@ class MathicsSession:
     it and evaluating it in the context of the current session.
     """
 
-    def __init__(self, add_builtin=True, catch_interrupt=False, form="InputForm"):
-        self.definitions = Definitions(add_builtin)
+    def __init__(
+        self,
+        add_builtin=True,
+        catch_interrupt=False,
+        form="InputForm",
+        snapshot=None,
+    ):
+        """
+        If snapshot is given, the builtin definitions are loaded from (or
+        saved to) a snapshot file: it is either a file name, or True for
+        the default file. By default, settings.BUILTIN_SNAPSHOT is used.
+        """
+        if snapshot is None:
+            snapshot = settings.BUILTIN_SNAPSHOT
+        self.definitions = Definitions(
+            add_builtin, builtin_filename=get_snapshot_filename(snapshot)
+        )
         self.evaluation = Evaluation(
             definitions=self.definitions, catch_interrupt=catch_interrupt
         )
@@ -40,6 +40,12 @@ else:
 # if not path.exists(DATA_DIR):
 #    os.makedirs(DATA_DIR)
 
+# Snapshot of the builtin definitions, which makes starting Mathics much
+# faster (see mathics.core.snapshot). The environment variable
+# MATHICS_BUILTIN_SNAPSHOT is either a file name, or 1 to use a file in
+# DATA_DIR. By default, the builtin definitions are built from scratch.
+BUILTIN_SNAPSHOT = os.environ.get("MATHICS_BUILTIN_SNAPSHOT")
+
 DOC_DIR = os.path.join(ROOT_DIR, "doc/documentation/")
 DOC_TEX_DATA_PATH = os.path.join(ROOT_DIR, "doc/tex/doc_tex_data.pcl")
 DOC_LATEX_FILE = os.path.join(ROOT_DIR, "doc/tex/documentation.tex")
@@ -36,3 +36,49 @@ def test_setdelayed_oneidentity():
             expr = ""
         except IncompleteSyntaxError:
             continue
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        (
+            "ClearAll[litF]; litF[1] = a; litF[2] = b; litF[x_] := x^2; {litF[1], litF[2], litF[3]}",
+            "{a, b, 9}",
+        ),
+        ("ClearAll[litF]; litF[x_] := x^2; litF[1] = a; {litF[1], litF[2]}", "{a, 4}"),
+        (
+            "ClearAll[litF]; litF[x_Integer] := x; litF[1] = a; litF[1] = c; {litF[1], litF[2]}",
+            "{c, 2}",
+        ),
+        (
+            "ClearAll[litF]; litF[1] = a; litF[2] = b; litF[1] =.; {litF[1], litF[2]}",
+            "{litF[1], b}",
+        ),
+        (
+            "ClearAll[litF]; litF[1] = a; litF[2] = b; DownValues[litF] = {HoldPattern[litF[2]] :> c}; {litF[1], litF[2]}",
+            "{litF[1], c}",
+        ),
+        (
+            "ClearAll[litFib]; litFib[0] = 0; litFib[1] = 1; litFib[n_] := litFib[n] = litFib[n - 1] + litFib[n - 2]; litFib[60]",
+            "1548008755920",
+        ),
+        (
+            "ClearAll[litF]; litF[1.] = a; litF[2] = b; {litF[1.], litF[2], litF[2.]}",
+            "{a, b, litF[2.]}",
+        ),
+        (
+            "ClearAll[litF, litG]; litF[litG[2, 1]] = a; litF[3] = b; SetAttributes[litG, Orderless]; litF[litG[1, 2]]",
+            "a",
+        ),
+        (
+            "ClearAll[litF, litG]; SetAttributes[litG, Flat]; litF[litG[1, 2]] = a; litF[3] = b; litF[litG[1, 2]]",
+            "a",
+        ),
+        (
+            "ClearAll[litF]; litF[1 | 2] := x; litF[1] = a; litF[2] = b; litF[3] = c; litF[1] = d; litF[2] = e; Last /@ DownValues[litF]",
+            "{e, d, c, x}",
+        ),
+    ],
+)
+def test_literal_downvalues(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
@@ -63,7 +63,7 @@ tests1 = [
     (
         "Graphics[{Disk[{0,0},1]}]",
         "Compile[{x}, Sqrt[x]]",
-        '"-Graphics- == CompiledFunction[{x}, Sqrt[x], -PythonizedCode-]"',
+        '"-Graphics- == CompiledFunction[{x}, Sqrt[x], -CompiledCode-]"',
     ),
     ('"1 / 4"', "2 + 3 a", '"1 / 4 == 2 + 3 a"'),
     ('"1 / 4"', "Infinity", '"1 / 4 == Infinity"'),
@@ -156,87 +156,87 @@ tests1 = [
     (
         "Compile[{x}, Sqrt[x]]",
         "2 + 3 a",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 2 + 3 a"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 2 + 3 a"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "Infinity",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == Infinity"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == Infinity"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "-Infinity",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == -Infinity"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == -Infinity"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "Sqrt[I] Infinity",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == -1 ^ (1 / 4) Infinity"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == -1 ^ (1 / 4) Infinity"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "a",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == a"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == a"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         '"a"',
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == a"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == a"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         '"1 / 4"',
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 1 / 4"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 1 / 4"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "I",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == I"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == I"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "0",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 0"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 0"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "1 / 4",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 1 / 4"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 1 / 4"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         ".25",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 0.25"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 0.25"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "Sqrt[2]",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == Sqrt[2]"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == Sqrt[2]"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "BesselJ[0, 2]",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == BesselJ[0, 2]"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == BesselJ[0, 2]"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "3+2 I",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 3 + 2 I"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 3 + 2 I"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "2.+ Pi I",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 2. + 3.14159 I"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 2. + 3.14159 I"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         "3+I Pi",
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == 3 + I Pi"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == 3 + I Pi"',
     ),
     (
         "Compile[{x}, Sqrt[x]]",
         'TestFunction["Tengo una vaca lechera"]',
-        '"CompiledFunction[{x}, Sqrt[x], -PythonizedCode-] == TestFunction[Tengo una vaca lechera]"',
+        '"CompiledFunction[{x}, Sqrt[x], -CompiledCode-] == TestFunction[Tengo una vaca lechera]"',
     ),
 ]
 
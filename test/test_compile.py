@@ -5,7 +5,12 @@ import itertools
 import random
 import io
 import math
+import ctypes
+from unittest import mock
 
+import numpy
+
+from .helper import evaluate
 from mathics.core.expression import Expression, Symbol, Integer, MachineReal, String
 
 from mathics.builtin.compile import has_llvmlite
@@ -17,8 +22,11 @@ if has_llvmlite:
         int_type,
         real_type,
         bool_type,
+        tensor_type,
         CompileError,
+        CompiledCodeError,
     )
+    from mathics.builtin.compile import runtime
 
 
 class CompileTest(unittest.TestCase):
@@ -504,3 +512,221 @@ class BitwiseTest(CompileTest):
     def test_bitnot(self):
         self._test_bitwise("BitNot", [0], -1)
         self._test_bitwise("BitNot", [13413], -13414)
+
+
+def held(str_expr):
+    # the expression unevaluated, with its symbols in Global`
+    return evaluate("Hold[%s]" % str_expr).leaves[0]
+
+
+class TensorTest(CompileTest):
+    def test_norm(self):
+        expr = held("Module[{s = 0.}, Do[s += v[[i]] ^ 2, {i, Length[v]}]; Sqrt[s]]")
+        args = [CompileArg("Global`v", tensor_type(real_type, 1))]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(numpy.array([3.0, 4.0])), 5.0)
+        self.assertTypeEqual(cfunc([1, 2, 2]), 3.0)
+        self.assertTypeEqual(cfunc([]), 0.0)
+
+    def test_argument_type(self):
+        expr = held("Total[v]")
+        args = [CompileArg("Global`v", tensor_type(int_type, 1))]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(range(5)), 10)
+        for value in ([[1, 2]], [1.5], ["a"], [True]):
+            with self.assertRaises(TypeError):
+                cfunc(value)
+
+    def test_part(self):
+        expr = held("m[[i, j]]")
+        args = [
+            CompileArg("Global`m", tensor_type(int_type, 2)),
+            CompileArg("Global`i", int_type),
+            CompileArg("Global`j", int_type),
+        ]
+        cfunc = _compile(expr, args)
+        m = numpy.arange(6).reshape(2, 3)
+        self.assertTypeEqual(cfunc(m, 2, 1), 3)
+        self.assertTypeEqual(cfunc(m, -1, -1), 5)
+        for i, j in ((0, 1), (3, 1), (1, 4), (1, -4)):
+            with self.assertRaises(CompiledCodeError):
+                cfunc(m, i, j)
+
+    def test_row(self):
+        expr = held("m[[i]]")
+        args = [
+            CompileArg("Global`m", tensor_type(real_type, 2)),
+            CompileArg("Global`i", int_type),
+        ]
+        cfunc = _compile(expr, args)
+        m = numpy.arange(6.0).reshape(2, 3)
+        result = cfunc(m, 2)
+        self.assertEqual(result.dtype, numpy.float64)
+        self.assertEqual(result.tolist(), [3.0, 4.0, 5.0])
+
+    def test_assign_part(self):
+        expr = held("m[[1, 1]] = x; m")
+        args = [
+            CompileArg("Global`m", tensor_type(real_type, 2)),
+            CompileArg("Global`x", int_type),
+        ]
+        cfunc = _compile(expr, args)
+        m = numpy.zeros((2, 2))
+        self.assertEqual(cfunc(m, 1).tolist(), [[1.0, 0.0], [0.0, 0.0]])
+        # the argument is not changed
+        self.assertEqual(m.tolist(), [[0.0, 0.0], [0.0, 0.0]])
+
+    def test_list(self):
+        expr = held("{{x, 1}, {2, x}}")
+        args = [CompileArg("Global`x", real_type)]
+        cfunc = _compile(expr, args)
+        self.assertEqual(cfunc(0.5).tolist(), [[0.5, 1.0], [2.0, 0.5]])
+
+    def test_table(self):
+        expr = held("Table[i j, {i, n}, {j, 2, 3}]")
+        args = [CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args)
+        result = cfunc(3)
+        self.assertEqual(result.dtype, numpy.int64)
+        self.assertEqual(result.tolist(), [[2, 3], [4, 6], [6, 9]])
+        self.assertEqual(cfunc(0).shape, (0, 2))
+        self.assertEqual(cfunc(-1).shape, (0, 2))
+
+    def test_table_of_lists(self):
+        expr = held("Table[{i, x}, {i, 3, 1, -1}]")
+        args = [CompileArg("Global`x", real_type)]
+        cfunc = _compile(expr, args)
+        self.assertEqual(cfunc(0.5).tolist(), [[3.0, 0.5], [2.0, 0.5], [1.0, 0.5]])
+
+    def test_table_real_iterator(self):
+        expr = held("Table[k, {k, 0, x, 0.5}]")
+        args = [CompileArg("Global`x", real_type)]
+        cfunc = _compile(expr, args)
+        self.assertEqual(cfunc(1.2).tolist(), [0.0, 0.5, 1.0])
+
+    def test_iterate_list(self):
+        expr = held("Module[{s = 0}, Do[s += k, {k, v}]; s]")
+        args = [CompileArg("Global`v", tensor_type(int_type, 1))]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc([1, 2, 3]), 6)
+
+
+class LoopTest(CompileTest):
+    def test_gcd(self):
+        expr = held("While[b != 0, {a, b} = {b, Mod[a, b]}]; a")
+        args = [CompileArg("Global`a", int_type), CompileArg("Global`b", int_type)]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(12, 18), 6)
+        self.assertTypeEqual(cfunc(7, 0), 7)
+
+    def test_for(self):
+        expr = held(
+            "Module[{s = 0, i}, For[i = 1, i <= n, i++, If[Mod[i, 2] == 0, Continue[]]; s += i]; s]"
+        )
+        args = [CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(10), 25)
+
+    def test_break(self):
+        expr = held("Module[{k = 0}, While[True, If[k ^ 2 > x, Break[]]; k++]; k]")
+        args = [CompileArg("Global`x", real_type)]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(10.0), 4)
+
+    def test_widen_variable(self):
+        # s starts out as an integer
+        expr = held("Module[{s = 0}, Do[s += 1 / k, {k, n}]; s]")
+        args = [CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args)
+        self.assertNumEqual(cfunc(2), 1.5)
+
+    def test_return_from_loop(self):
+        expr = held("Do[If[k ^ 2 > x, Return[k]], {k, 10}]; 0")
+        args = [CompileArg("Global`x", int_type)]
+        cfunc = _compile(expr, args)
+        self.assertTypeEqual(cfunc(10), 4)
+        self.assertTypeEqual(cfunc(200), 0)
+
+    def test_mod_quotient(self):
+        expr = held("{Mod[a, b], Quotient[a, b]}")
+        args = [CompileArg("Global`a", int_type), CompileArg("Global`b", int_type)]
+        cfunc = _compile(expr, args)
+        for a, b in ((7, 3), (-7, 3), (7, -3), (-7, -3), (6, 3)):
+            self.assertEqual(cfunc(a, b).tolist(), [a % b, a // b])
+            with self.assertRaises(CompiledCodeError):
+                cfunc(a, 0)
+
+    def test_undefined_variable(self):
+        expr = held("Module[{s}, s + 1]")
+        with self.assertRaises(CompileError):
+            _compile(expr, [])
+
+
+class ListableTest(CompileTest):
+    def test_kernel(self):
+        expr = held("x ^ n + 1")
+        args = [CompileArg("Global`x", real_type), CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args, listable=True)
+        self.assertIsNotNone(cfunc.kernel)
+        self.assertTypeEqual(cfunc(2.0, 2), 5.0)
+        x = numpy.linspace(0, 1, 11)
+        self.assertEqual(cfunc(x, 2).tolist(), (x ** 2 + 1).tolist())
+        self.assertEqual(cfunc(2, [1, 2]).tolist(), [3.0, 5.0])
+        # lists of lower rank thread over the outer dimensions
+        self.assertEqual(
+            cfunc([[1, 2], [3, 4]], [1, 2]).tolist(), [[2.0, 3.0], [10.0, 17.0]]
+        )
+        with self.assertRaises(CompiledCodeError):
+            cfunc([1, 2], [1, 2, 3])
+        with self.assertRaises(TypeError):
+            cfunc([1, 2], [1.5, 2])
+
+    def test_not_listable(self):
+        expr = held("x + 1")
+        args = [CompileArg("Global`x", int_type)]
+        cfunc = _compile(expr, args)
+        self.assertIsNone(cfunc.kernel)
+        with self.assertRaises(ctypes.ArgumentError):
+            cfunc([1, 2])
+
+    def test_bool(self):
+        expr = held("If[b, x, -x] > 0")
+        args = [CompileArg("Global`b", bool_type), CompileArg("Global`x", int_type)]
+        cfunc = _compile(expr, args, listable=True)
+        result = cfunc([True, False, True], [1, 1, -1])
+        self.assertEqual(result.dtype, numpy.bool_)
+        self.assertEqual(result.tolist(), [True, False, False])
+
+    def test_error(self):
+        expr = held("Quotient[100, n]")
+        args = [CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args, listable=True)
+        self.assertEqual(cfunc([1, 3, 100]).tolist(), [100, 33, 1])
+        with self.assertRaises(CompiledCodeError):
+            cfunc([1, 0, 2])
+
+    def test_parallel(self):
+        expr = held("Module[{s = 0}, Do[s += k, {k, n}]; s]")
+        args = [CompileArg("Global`n", int_type)]
+        cfunc = _compile(expr, args, listable=True, parallel=True)
+        n = numpy.arange(1000)
+        with mock.patch.object(runtime, "thread_count", 4), mock.patch.object(
+            runtime, "min_chunk_size", 100
+        ):
+            self.assertEqual(len(runtime.chunks(len(n), True)), 4)
+            self.assertEqual(cfunc(n).tolist(), (n * (n + 1) // 2).tolist())
+            n[500] = -1
+            self.assertEqual(cfunc(n)[500], 0)
+
+    def test_tensor_arguments(self):
+        # threaded over in Python, as there is no kernel for tensors
+        expr = held("Total[v] + x")
+        args = [
+            CompileArg("Global`v", tensor_type(int_type, 1)),
+            CompileArg("Global`x", int_type),
+        ]
+        cfunc = _compile(expr, args, listable=True)
+        self.assertIsNone(cfunc.kernel)
+        self.assertTypeEqual(cfunc([1, 2], 1), 4)
+        self.assertEqual(cfunc([[1, 2], [3, 4]], 1).tolist(), [4, 8])
+        self.assertEqual(cfunc([1, 2], [0, 1]).tolist(), [3, 4])
@@ -2,6 +2,7 @@
 from .helper import check_evaluation, evaluate
 
 import sys
+import threading
 import time
 
 if sys.platform not in ("win32",):
@@ -71,3 +72,20 @@ def test_datestring():
         check_evaluation(
             str_expr, str_expected, to_string_expected=False, to_python_expected=True
         )
+
+
+def test_timeconstrained_nested():
+    check_evaluation(
+        "TimeConstrained[TimeConstrained[Pause[2], 5, inner]; 1, 0.3, outer]", "outer"
+    )
+    check_evaluation(
+        "TimeConstrained[TimeConstrained[Pause[2], 0.2, inner], 5]", "inner"
+    )
+    check_evaluation("TimeConstrained[While[True], 0.3]", "$Aborted")
+
+
+def test_timeconstrained_threads():
+    # time constraints are deadlines checked by the evaluation, not threads
+    count = threading.active_count()
+    check_evaluation("Do[TimeConstrained[i, 10], {i, 100}]", "Null")
+    assert threading.active_count() == count
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from .helper import check_evaluation
+
+import pytest
+
+import mathics.core.definitions
+from mathics.core.definitions import Definition, Definitions
+
+
+def test_has_changed():
+    definitions = Definitions()
+    a = definitions.get_user_definition("Global`a")
+    b = definitions.get_user_definition("Global`b")
+
+    start = definitions.now
+    assert not definitions.has_changed(start, {"Global`a", "Global`b"})
+
+    definitions.mark_changed(a)
+    assert definitions.has_changed(start, {"Global`a", "Global`b"})
+    assert not definitions.has_changed(start, {"Global`b", "Global`c"})
+    assert not definitions.has_changed(definitions.now, {"Global`a"})
+
+    # many changes since the given time: the symbols are looked up one by one
+    time = definitions.now
+    for i in range(5):
+        definitions.mark_changed(b)
+    assert definitions.has_changed(time, {"Global`b"})
+    assert not definitions.has_changed(time, {"Global`a"})
+
+    definitions.reset_user_definition("Global`a")
+    assert definitions.has_changed(time, {"Global`a"})
+
+    time = definitions.now
+    definitions.reset_user_definitions()
+    assert definitions.has_changed(time, {"Global`c"})
+
+
+def test_has_changed_after_log_overflow(monkeypatch):
+    monkeypatch.setattr(mathics.core.definitions, "MAX_CHANGE_LOG", 4)
+    definitions = Definitions()
+    a = Definition(name="Global`a")
+    b = Definition(name="Global`b")
+
+    definitions.mark_changed(a)
+    time = definitions.now
+    for i in range(10):
+        definitions.mark_changed(b)
+        assert len(definitions.change_log) <= 4
+    assert definitions.has_changed(time, {"Global`b"})
+    assert not definitions.has_changed(time, {"Global`a"})
+    assert definitions.has_changed(time - 1, {"Global`a"})
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        ("hcList = {hc1, hc2, hc3}; hcList", "{hc1, hc2, hc3}"),
+        ("hc2 = 5; hcList", "{hc1, 5, hc3}"),
+        ("hc2 =.; hcList", "{hc1, hc2, hc3}"),
+        ("hcList = {hc3[1], hc3[2]}; hcList", "{hc3[1], hc3[2]}"),
+        ("hc3[x_] := 2 x; hcList", "{2, 4}"),
+        ("ClearAll[hc1, hc2, hc3, hcList]", "Null"),
+    ],
+)
+def test_reevaluation(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
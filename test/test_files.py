@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+import numpy
 import os.path as osp
 import sys
 from .helper import check_evaluation, evaluate
+from mathics.core.expression import PackedArray
 
 
 def test_compress():
@@ -37,6 +39,63 @@ if sys.platform not in ("win32",):
         assert evaled.has_form("List", 1, None)
         check_evaluation('Get["fortytwo.m"]', "42")
 
+    def test_binary_read_list(tmp_path):
+        path = str(tmp_path / "data.bin")
+        numpy.array([1.5, -2.0, 3.25, 4.0], ">f8").tofile(path)
+
+        result = evaluate(f'BinaryReadList["{path}", "Real64", ByteOrdering -> 1]')
+        assert isinstance(result, PackedArray)
+        assert result.get_array().tolist() == [1.5, -2.0, 3.25, 4.0]
+        result = evaluate(
+            f'BinaryReadList["{path}", {{"Real64", "Real64"}}, ByteOrdering -> 1]'
+        )
+        assert isinstance(result, PackedArray)
+        assert result.get_array().tolist() == [[1.5, -2.0], [3.25, 4.0]]
+        check_evaluation(
+            f'BinaryReadList["{path}", "Real64", 3, ByteOrdering -> 1]',
+            "{1.5, -2., 3.25}",
+        )
+        check_evaluation(
+            f'Import["{path}", {{"Real64", "Data", -1}}, "ByteOrdering" -> 1]', "4."
+        )
+
+        # numbers which are not machine numbers are not packed
+        numpy.array([1.0, numpy.inf, numpy.nan], "<f4").tofile(path)
+        check_evaluation(
+            f'BinaryReadList["{path}", "Real32", ByteOrdering -> -1]',
+            "{1., Infinity, Indeterminate}",
+        )
+        numpy.array([2 ** 64 - 1, 1], "<u8").tofile(path)
+        check_evaluation(
+            f'BinaryReadList["{path}", "UnsignedInteger64", ByteOrdering -> -1]',
+            "{18446744073709551615, 1}",
+        )
+
+    def test_binary_write_list(tmp_path):
+        path = str(tmp_path / "data.bin")
+
+        def write(data, typ, byte_ordering):
+            evaluate(
+                f'Close[BinaryWrite[OpenWrite["{path}", BinaryFormat -> True], '
+                f"{data}, {typ}, ByteOrdering -> {byte_ordering}]]"
+            )
+            with open(path, "rb") as f:
+                return f.read()
+
+        # lists written at once and element by element give the same bytes
+        for data, typ, dtype in (
+            ("Range[-2, 2]", '"Integer16"', "i2"),
+            ("{1, 255}", '"UnsignedInteger8"', "u1"),
+            ("N[Range[3] / 4]", '"Real32"', "f4"),
+            ("{1, 2.5, 3 + I}", '"Complex128"', "c16"),
+        ):
+            for byte_ordering, order in ((1, ">"), (-1, "<")):
+                expected = numpy.array(evaluate(data).to_python(), order + dtype)
+                assert write(data, typ, byte_ordering) == expected.tobytes()
+                pairs = "{%s, %s}" % (typ, typ)
+                assert write(data, pairs, byte_ordering) == expected.tobytes()
+        assert write("{1, 2}", '"Integer24"', 1) == bytes([0, 0, 1, 0, 0, 2])
+
 
 # I do not know what this is it supposed to test with this...
 # def test_Inputget_and_put():
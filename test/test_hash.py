@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 
+from .helper import check_evaluation
 from mathics.core.evaluation import Evaluation
 from mathics.core.expression import (
     Complex,
@@ -15,6 +16,7 @@ from mathics.core.expression import (
     SymbolFalse,
 )
 from mathics.core.definitions import Definitions
+import pickle
 import sys
 import unittest
 
@@ -130,6 +132,72 @@ class HashAndSameQ(unittest.TestCase):
             )
         )
 
+    def testExpression(self):
+        _test_group(
+            Expression("f", Integer(1), Symbol("x")),
+            Expression("f", Integer(1), Symbol("x")),
+            Expression("f", Symbol("x"), Integer(1)),
+            Expression("g", Integer(1), Symbol("x")),
+            Expression("f", Expression("f", MachineReal(1.5))),
+        )
+
+
+class CachedHash(unittest.TestCase):
+    def testCached(self):
+        inner = Expression("g", Integer(1))
+        expr = Expression("f", inner, Symbol("x"))
+        value = hash(expr)
+        self.assertEqual(expr._cache.hash, value)
+        self.assertEqual(inner._cache.hash, hash(inner))
+        self.assertEqual(hash(expr.copy()), value)
+
+        # changing the leaves drops the hash
+        expr.set_leaf(1, Symbol("y"))
+        self.assertIsNone(expr._cache)
+        self.assertEqual(hash(expr), hash(Expression("f", inner, Symbol("y"))))
+        expr.set_reordered_leaves(expr.leaves[::-1])
+        self.assertIsNone(expr._cache.hash)
+
+        # cached hashes are not pickled, since those of strings depend on the
+        # process
+        expr = Expression("f", String("s"))
+        hash(expr)
+        copied = pickle.loads(pickle.dumps(expr))
+        self.assertIsNone(copied._cache.hash)
+        self.assertEqual(hash(copied), hash(expr))
+
+    def testSameQ(self):
+        a = Expression("f", Integer(1), Symbol("x"))
+        b = Expression("f", Integer(2), Symbol("x"))
+        hash(a), hash(b)
+        self.assertFalse(a.sameQ(b))
+        self.assertTrue(a.sameQ(Expression("f", Integer(1), Symbol("x"))))
+
+        # SameQ reals may have different hashes
+        a = Expression("f", MachineReal(1.5))
+        b = Expression("f", Real("1.5", 30))
+        hash(a), hash(b)
+        self.assertTrue(a.sameQ(b))
+
+    def testCopy(self):
+        # copies are modified in place below the top level, so they don't
+        # inherit the cached hash
+        a = Expression("f", Expression("g", Integer(1)))
+        hash(a)
+        b = a.copy()
+        b.leaves[0].set_leaf(0, Integer(2))
+        c = Expression("f", Expression("g", Integer(2)))
+        hash(c)
+        self.assertTrue(b.sameQ(c))
+        self.assertEqual(hash(b), hash(c))
+
+    def testNestedPartAssignment(self):
+        check_evaluation(
+            "hashm = {{{1, 2}}, {{3, 4}}}; Tally[{hashm}]; hashm[[1, 1, 1]] = 9; "
+            "DeleteDuplicates[{hashm[[1]], {{9, 2}}}]",
+            "{{{9, 2}}}",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,6 +4,8 @@ import os
 import os.path as osp
 import sys
 from .helper import check_evaluation, session
+from mathics.builtin.files_io import importexport
+from mathics.core.expression import PackedArray
 
 
 def test_import():
@@ -18,6 +20,53 @@ def test_import():
         check_evaluation(str_expr, str_expected, message)
 
 
+def test_import_table(monkeypatch):
+    # parse the records in chunks of two
+    monkeypatch.setattr(importexport, "_TABLE_CHUNK_SIZE", 2)
+
+    data = session.evaluate('ImportString["1.5,2.5\\n3.,4.0\\n5e0,6e1", "CSV"]')
+    assert isinstance(data, PackedArray)
+    assert data.get_array().tolist() == [[1.5, 2.5], [3.0, 4.0], [5.0, 60.0]]
+    data = session.evaluate('ImportString["1\\t2\\n3\\t4\\n5\\t6", "TSV"]')
+    assert isinstance(data, PackedArray)
+    assert data.get_array().tolist() == [[1, 2], [3, 4], [5, 6]]
+
+    for str_expr, str_expected in (
+        # numbers are parsed column by column, other fields one by one
+        (
+            'ImportString["1,a\\n2.5,3\\n\\"x,y\\",4", "CSV"]',
+            '{{1, a}, {2.5, 3}, {"x,y", 4}}',
+        ),
+        ('ImportString["1,2\\n3\\n4,5", "CSV"]', "{{1, 2}, {3}, {4, 5}}"),
+        ('ImportString["1,2\\n,1e400", "CSV"]', '{{1, 2}, {"", "1e400"}}'),
+        ('ImportString["1,2\\n3,4.5", "CSV"][[2, 1]]', "3"),
+        ('ImportString["1.5\\n2.5\\n3\\n4", "CSV"]', "{{1.5}, {2.5}, {3}, {4}}"),
+        (
+            'ImportString["a;b\\n1;2", "CSV", "FieldSeparators" -> ";"]',
+            "{{a, b}, {1, 2}}",
+        ),
+        # rows are selected like Part
+        (
+            'ImportString["1\\n2\\n3\\n4\\n5", {"CSV", "Data", 2 ;; -2}]',
+            "{{2}, {3}, {4}}",
+        ),
+        (
+            'ImportString["1\\n2\\n3\\n4\\n5", {"CSV", "Data", 1 ;; 5 ;; 2}]',
+            "{{1}, {3}, {5}}",
+        ),
+        (
+            'ImportString["1\\n2\\n3\\n4\\n5", {"CSV", "Data", {4, 1, 4}}]',
+            "{{4}, {1}, {4}}",
+        ),
+        ('ImportString["1\\n2\\n3\\n4\\n5", {"CSV", "Data", -2, 1}]', "4"),
+        (
+            'ImportString["x\\ny\\n1\\n2\\n3", {"CSV", "Data", 2}, "SkipLines" -> 1, "HeaderLines" -> 1]',
+            "{2}",
+        ),
+    ):
+        check_evaluation(str_expr, str_expected)
+
+
 def run_export(temp_dirname: str, short_name: str, file_data: str, character_encoding):
     file_path = osp.join(temp_dirname, short_name)
     expr = fr'Export["{file_path}", {file_data}'
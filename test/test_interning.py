@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import gc
+import pickle
+
+from .helper import check_evaluation
+from mathics.core.expression import Integer, MachineReal, Symbol
+
+
+def test_symbols():
+    assert Symbol("List") is Symbol("System`List")
+    assert Symbol("Global`interned") is Symbol("Global`interned")
+
+    # symbols with a sympy_dummy are separate instances
+    dummy = Symbol("Global`interned", sympy_dummy=object())
+    assert dummy is not Symbol("Global`interned")
+    assert dummy.sameQ(Symbol("Global`interned"))
+
+    # the table doesn't keep symbols alive
+    name = "Global`interned%d" % id(dummy)
+    Symbol(name)
+    gc.collect()
+    assert name not in Symbol.defined_symbols
+
+
+def test_numbers():
+    assert Integer(5) is Integer(5)
+    assert Integer(-128) is Integer(-128)
+    assert Integer(10 ** 6).sameQ(Integer(10 ** 6))
+    assert Integer(-129).value == -129
+    assert MachineReal(1) is MachineReal(1.0)
+    assert MachineReal(0.0) is not MachineReal(-0.0)
+    assert str(MachineReal(-0.0).value) == "-0.0"
+
+
+def test_copies():
+    # copies are assigned positions, so they must not be the shared instance
+    for atom in (Symbol("Global`x"), Integer(1), MachineReal(0.5)):
+        copied = atom.copy()
+        assert copied is not atom
+        assert copied.sameQ(atom) and atom.sameQ(copied)
+        assert copied == atom
+        assert hash(copied) == hash(atom)
+        assert copied.original is atom
+        assert not hasattr(atom, "original")
+
+
+def test_pickle():
+    for atom in (Symbol("Global`x"), Integer(1), MachineReal(0.5)):
+        assert pickle.loads(pickle.dumps(atom)) is atom
+        assert pickle.loads(pickle.dumps(atom.copy())) is atom
+    assert pickle.loads(pickle.dumps(Integer(10 ** 6))).sameQ(Integer(10 ** 6))
+
+
+def test_part_assignment():
+    # assigning parts works on copies of the shared atoms
+    check_evaluation("internl = {1, 1, x}; internl[[2]] = 2; internl", "{1, 2, x}")
+    check_evaluation("internl[[3]] = y; {internl, x}", "{{1, 2, y}, x}")
+    check_evaluation(
+        "internm = {{1, 1}, {1, 1}}; internm[[1, 1]] = 0; internm", "{{0, 1}, {1, 1}}"
+    )
+
+
+def test_unevaluated():
+    # only the occurrence wrapped in Unevaluated keeps the wrapper
+    check_evaluation("f[Unevaluated[a], a]", "f[Unevaluated[a], a]")
+    check_evaluation("g[Unevaluated[1], 1]", "g[Unevaluated[1], 1]")
+    check_evaluation("k[Unevaluated[1.], 1.]", "k[Unevaluated[1.], 1.]")
+    check_evaluation(
+        "SetAttributes[internh, {Flat, Orderless}]; "
+        "internh[Unevaluated[c], internh[b, a], c]",
+        "internh[a, b, Unevaluated[c], c]",
+    )
+    check_evaluation(
+        "SetAttributes[internf, Flat]; internf[Unevaluated[internf[c, d]], e]",
+        "internf[Unevaluated[c], Unevaluated[d], e]",
+    )
+
+
+def test_rule_options():
+    # options of a rule application are set on a copy of the replacement
+    check_evaluation(
+        "Options[internopt] = {internval -> 1}; "
+        "internopt[OptionsPattern[]] := OptionValue[internval]; "
+        "{internopt[internval -> 2], internopt[], 1}",
+        "{2, 1, 1}",
+    )
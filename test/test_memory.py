@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from .helper import check_evaluation, session
+from mathics.core.evaluation import Evaluation
+from mathics.core.expression import (
+    Expression,
+    Integer,
+    String,
+    SymbolAborted,
+    allocated_bytes,
+    start_counting_allocations,
+    stop_counting_allocations,
+)
+from mathics.core.parser import MathicsSingleLineFeeder, parse
+
+
+def test_allocated_bytes():
+    # nothing is counted unless a limit needs it
+    start = allocated_bytes()
+    Expression("Global`f", *range(100))
+    assert allocated_bytes() == start
+    start_counting_allocations()
+    try:
+        _check_allocated_bytes()
+    finally:
+        stop_counting_allocations()
+
+
+def _check_allocated_bytes():
+    start = allocated_bytes()
+    Expression("Global`f", *range(100))
+    assert allocated_bytes() - start >= 800
+    start = allocated_bytes()
+    String("x" * 1000)
+    assert allocated_bytes() - start >= 1000
+    # preallocated integers don't allocate
+    start = allocated_bytes()
+    Integer(1)
+    assert allocated_bytes() == start
+
+
+def test_memory_constrained():
+    check_evaluation("MemoryConstrained[Table[i, {i, 10^6}], 10^5]", "$Aborted")
+    check_evaluation("MemoryConstrained[Range[3], 10^5]", "{1, 2, 3}")
+    check_evaluation("MemoryConstrained[Table[i, {i, 10^6}], 10^5, memf]; memf", "memf")
+    # the constraint that was exceeded gives the result
+    check_evaluation(
+        "MemoryConstrained[MemoryConstrained[Table[i, {i, 10^6}], 10^7, inner]; x, 10^5, outer]",
+        "outer",
+    )
+    check_evaluation(
+        "MemoryConstrained[MemoryConstrained[Table[i, {i, 10^6}], 10^5, inner]; x, 10^7, outer]",
+        "x",
+    )
+    check_evaluation(
+        "TimeConstrained[MemoryConstrained[Table[i, {i, 10^6}], 10^5, inner], 10]",
+        "inner",
+    )
+
+
+def test_overlapping_limits():
+    # the limits of evaluations in different threads don't count each
+    # other's allocations
+    evaluation = session.evaluation
+    evaluation.push_memory_limit(10 ** 5)
+    try:
+        results = []
+
+        def run():
+            other = Evaluation(definitions=session.definitions)
+            expr = parse(
+                session.definitions,
+                MathicsSingleLineFeeder("MemoryConstrained[Table[i, {i, 10^6}], 10^6]"),
+            )
+            results.append(expr.evaluate(other))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        assert results == [SymbolAborted]
+        evaluation.check_stopped()
+    finally:
+        evaluation.pop_memory_limit()
+    check_evaluation("MemoryConstrained[Table[i, {i, 10^6}], 10^5]", "$Aborted")
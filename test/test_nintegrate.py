@@ -15,7 +15,14 @@ except:
 
 
 if usescipy:
-    methods = ["Automatic", "Romberg", "Internal", "NQuadrature"]
+    methods = [
+        "Automatic",
+        "Romberg",
+        "Internal",
+        "NQuadrature",
+        "GaussKronrod",
+        "SparseGrid",
+    ]
 
     generic_tests_for_nintegrate = [
         (r"NIntegrate[x^2, {x,0,1}, {method} ]", r"1/3.", ""),
@@ -47,3 +54,34 @@ def test_nintegrate(str_expr: str, str_expected: str, msg: str, message=""):
         assert result == expected, msg
     else:
         assert result == expected
+
+
+@pytest.mark.parametrize(
+    "str_expr, str_expected",
+    [
+        (r"NIntegrate[x y z, {x,0,1},{y,0,1},{z,0,1}, {method}]", r"1/8."),
+        (
+            r"NIntegrate[Exp[-x^2-y^2], {x,-Infinity,Infinity},{y,0,Infinity}, {method}]",
+            r"Pi/2.",
+        ),
+        (
+            r"NIntegrate[Exp[-x-y-z-w], {x,0,1},{y,0,1},{z,0,1},{w,0,1}, {method}]",
+            r"(1-1/E)^4.",
+        ),
+    ],
+)
+@pytest.mark.parametrize("method", ["Automatic", "GaussKronrod", "SparseGrid"])
+def test_cubature(str_expr, str_expected, method):
+    result = evaluate(
+        str_expr.replace("{method}", "Method->" + method) + " - " + str_expected
+    )
+    assert abs(result.to_python()) < 1e-8
+
+
+@pytest.mark.parametrize("method", ["Automatic", "GaussKronrod", "Internal"])
+def test_complex_integrand(method):
+    # the integrand is evaluated in real arithmetic first, which gives NaN
+    result = evaluate(
+        "NIntegrate[Sqrt[x - 1], {x, 0, 1}, Method -> %s] - 2/3. I" % method
+    )
+    assert abs(result.to_python()) < 1e-4
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
-from .helper import check_evaluation
+from .helper import check_evaluation, session
+
+import math
+
+import pytest
+
+from mathics.core.expression import Expression, MachineReal, SymbolList
 
 
 def test_realvalued():
@@ -183,3 +189,54 @@ def test_n():
         ("N[1.01234567890123456789`, 2] // Precision", "MachinePrecision"),
     ):
         check_evaluation(str_expr, str_expected)
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        ("{1.5, 2.5} + {1, 2}", "{2.5, 4.5}"),
+        ("{1., 2.} + {{1, 2}, {3, 4}}", "{{2., 3.}, {5., 6.}}"),
+        ("{-1., 2.} * {0., 0}", "{0., 0.}"),
+        ("Times[{1., 2.}, 3, {4., 5.}]", "{12., 30.}"),
+        ("{1.5, 2.} ^ {2, -1}", "{2.25, 0.5}"),
+        ("Sin[{0., 0.5}] == {Sin[0.], Sin[0.5]}", "True"),
+        ("Abs[{-1.5, 3. + 4. I}]", "{1.5, 5.}"),
+        ("{1. + 2. I, 3.} + {1. - 2. I, I}", "{2., 3. + I}"),
+        ("Log[{1., E + 0.}]", "{0., 1.}"),
+        # the elements that are not machine numbers stay exact
+        ("{1, 2} + {3, 4}", "{4, 6}"),
+        ("Sin[{0, 0.}]", "{0, 0.}"),
+        ("Power[{0, 4}, 0.5]", "{0, 2.}"),
+        # results that are not real machine numbers
+        ("Log[{-1., 0.}]", "{0. + 3.14159 I, Indeterminate}"),
+        ("{2^60, 1.} + 1.", "{1.15292*^18, 2.}"),
+        ("{a, 1.} + {1., 2.}", "{1. + a, 3.}"),
+        # numpy_name is not a ufunc
+        ("Arg[{1., -1.}]", "{0., 3.14159}"),
+    ],
+)
+def test_machine_arrays(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
+
+
+def test_machine_arrays_fast_path():
+    expr = Expression("Sin", Expression(SymbolList, MachineReal(0.5), MachineReal(1.5)))
+    result = expr._compute_machine_arrays(session.evaluation)
+    assert result.get_head_name() == "System`List"
+    assert [leaf.value for leaf in result.leaves] == pytest.approx(
+        [math.sin(0.5), math.sin(1.5)]
+    )
+
+    # lists of different lengths are left to Thread, which complains
+    expr = Expression(
+        "Plus",
+        Expression(SymbolList, MachineReal(1.0)),
+        Expression(SymbolList, MachineReal(1.0), MachineReal(2.0)),
+    )
+    assert expr._compute_machine_arrays(session.evaluation) is None
+
+    # numpy.angle is not a ufunc, so Arg takes the regular path
+    expr = Expression(
+        "Arg", Expression(SymbolList, MachineReal(1.0), MachineReal(-1.0))
+    )
+    assert expr._compute_machine_arrays(session.evaluation) is None
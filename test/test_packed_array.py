@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pytest
+
+from .helper import check_evaluation, evaluate
+from mathics.core.expression import (
+    Integer,
+    MachineReal,
+    PackedArray,
+    Symbol,
+)
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        ("Range[5]", "{1, 2, 3, 4, 5}"),
+        ("FullForm[Range[3]]", "FullForm[{1, 2, 3}]"),
+        ("Length[Range[10^6]]", "1000000"),
+        ("Range[-2^63, 2^63 - 1, 2^63 - 1]", "{-2^63, -1, 2^63 - 2}"),
+        ("Range[2^63, 2^63 + 1]", "{2^63, 2^63 + 1}"),
+        ("Range[3] === {1, 2, 3}", "True"),
+        ("Range[3] === {1., 2., 3.}", "False"),
+        ("N[Range[3]] === {1., 2., 3.}", "True"),
+        ("MatchQ[Range[3], {__Integer}]", "True"),
+        ("Range[3] /. 2 -> a", "{1, a, 3}"),
+        ("Dimensions[ConstantArray[0., {2, 3}]]", "{2, 3}"),
+        ("ConstantArray[1, {2, 2}] + 0.5", "{{1.5, 1.5}, {1.5, 1.5}}"),
+        # Part
+        ("Range[10][[3]]", "3"),
+        ("Range[10][[-1]]", "10"),
+        ("Range[10][[2 ;; 8 ;; 3]]", "{2, 5, 8}"),
+        ("Range[10][[{1, -1, 1}]]", "{1, 10, 1}"),
+        ("Range[10][[Range[3]]]", "{1, 2, 3}"),
+        ("ConstantArray[1., {2, 3}][[All, 2]]", "{1., 1.}"),
+        ("(N[Range[6]] + 0. I)[[3]]", "3."),
+        ("Range[10][[0]]", "List"),
+        ("Quiet[Range[3][[4]]]", "{1, 2, 3}[[4]]"),
+        # assignments keep arrays packed as long as the new parts are
+        # numbers of the same kind
+        ("packedv = Range[5]; packedv[[2]] = 7; packedv", "{1, 7, 3, 4, 5}"),
+        ("packedv[[3 ;; 4]] = 0; packedv", "{1, 7, 0, 0, 5}"),
+        ("packedv[[1]] = x; packedv", "{x, 7, 0, 0, 5}"),
+        (
+            "packedm = ConstantArray[0., {2, 2}]; packedm[[1, 2]] = 1.; packedm",
+            "{{0., 1.}, {0., 0.}}",
+        ),
+        ("packedm[[2]] = {2., 3.}; packedm", "{{0., 1.}, {2., 3.}}"),
+        ("packedm[[2, 1]] = 1; packedm", "{{0., 1.}, {1, 3.}}"),
+        # Total and Dot
+        ("Total[Range[100]]", "5050"),
+        ("Total[ConstantArray[1, {3, 2}]]", "{3, 3}"),
+        ("Total[N[Range[4]]]", "10."),
+        ("Total[Range[2^62, 2^62 + 1]]", "2^63 + 1"),
+        ("N[Range[3]] . Range[3]", "14."),
+        ("Range[3] . Range[3]", "14"),
+    ],
+)
+def test_packed_arrays(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
+
+
+def test_packed_producers():
+    for str_expr in (
+        "Range[10]",
+        "RandomReal[1, 10]",
+        "RandomInteger[5, {3, 2}]",
+        "ConstantArray[0, 10]",
+        "Range[10] + 0.5",
+    ):
+        result = evaluate(str_expr)
+        assert isinstance(result, PackedArray), str_expr
+        assert result.get_array() is not None, str_expr
+
+
+def test_packed_leaves():
+    packed = PackedArray(numpy.arange(3))
+    assert packed.get_head_name() == "System`List"
+    assert packed.has_form("List", 3)
+    assert not packed.has_form("List", 2)
+    assert packed.to_python() == [0, 1, 2]
+    assert [leaf.get_int_value() for leaf in packed.leaves] == [0, 1, 2]
+
+    # the array stays shared and read-only
+    with pytest.raises(ValueError):
+        packed.get_array()[0] = 1
+
+    matrix = PackedArray(numpy.zeros((2, 2)))
+    row = matrix.leaves[0]
+    assert isinstance(row, PackedArray)
+    assert row.sameQ(PackedArray(numpy.zeros(2)))
+
+    with pytest.raises(OverflowError):
+        PackedArray(numpy.array([1.0, numpy.inf]))
+
+
+def test_packed_set_leaf():
+    packed = PackedArray(numpy.arange(3))
+    packed.set_leaf(1, Integer(5))
+    assert packed.get_array() is not None
+    assert packed.to_python() == [0, 5, 2]
+
+    # a real in an array of integers unpacks it
+    packed.set_leaf(0, MachineReal(0.5))
+    assert packed.get_array() is None
+    assert packed.to_python() == [0.5, 5, 2]
+
+    # so does changing a row of a matrix, for the matrix
+    matrix = PackedArray(numpy.zeros((2, 2)))
+    matrix.leaves[0].set_leaf(0, Symbol("Global`x"))
+    assert matrix.get_array() is None
+    assert matrix.leaves[0].leaves[0].get_name() == "Global`x"
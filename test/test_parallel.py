@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from .helper import check_evaluation, evaluate
+from mathics.builtin.compile import has_llvmlite
+from mathics.builtin.parallel import _chunks
+
+
+def test_chunks():
+    items = list(range(10))
+    assert len(list(_chunks(items, "FinestGrained", 2))) == 10
+    assert len(list(_chunks(items, "CoarsestGrained", 2))) == 2
+    assert sum(_chunks(items, "Automatic", 2), []) == items
+
+
+@pytest.mark.parametrize("method", ["Automatic", "FinestGrained", "CoarsestGrained"])
+def test_parallel_table(method):
+    check_evaluation(
+        'ParallelTable[i j, {i, 3}, {j, 2}, Method -> "%s"]' % method,
+        "{{1, 2}, {2, 4}, {3, 6}}",
+    )
+
+
+def test_parallel_functions():
+    check_evaluation("ParallelSum[i^2, {i, 10}]", "385")
+    check_evaluation("ParallelMap[PrimeQ, {2, 4, 7}]", "{True, False, True}")
+    check_evaluation("ParallelMap[f, g[1, 2]]", "g[f[1], f[2]]")
+    check_evaluation("ParallelMap[f, x]", "x")
+    check_evaluation("ParallelTable[i, {i, 0}]", "{}")
+    check_evaluation("ParallelDo[i, {i, 3}]", "Null")
+
+
+def test_definitions():
+    # definitions are sent to the kernels and kept up to date
+    check_evaluation("parf[x_] := 1; ParallelTable[parf[i], {i, 2}]", "{1, 1}")
+    check_evaluation("parf[x_] := 2; ParallelTable[parf[i], {i, 2}]", "{2, 2}")
+    check_evaluation("Clear[parf]; ParallelMap[parf, {1}]", "{parf[1]}")
+    check_evaluation("pary = 5; ParallelMap[# + pary &, {1, 2}]", "{6, 7}")
+
+
+def test_sequential_fallback():
+    # a definition too deeply nested to be pickled for the kernels; it is
+    # cleared again so that it doesn't leak into other tests of the session
+    try:
+        check_evaluation(
+            "pardeep = Nest[parh, 0, 10^5]; ParallelMap[Length[pardeep] + # &, {1, 2}]",
+            "{2, 3}",
+        )
+    finally:
+        evaluate("Clear[pardeep]")
+    check_evaluation("ParallelTable[i, {i, parn}]", "Table[i, {i, parn}]")
+
+
+@pytest.mark.skipif(not has_llvmlite, reason="requires llvmlite")
+def test_sequential_fallback_compiled():
+    check_evaluation(
+        "parc = Compile[{x}, x^2]; ParallelMap[parc, {1., 2.}]", "{1., 4.}"
+    )
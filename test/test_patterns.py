@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from .helper import check_evaluation, evaluate, session
+from mathics.core.expression import Expression, Integer, Symbol
+from mathics.core.rules import Rule
+
+
+@pytest.mark.parametrize(
+    ("str_pattern", "compiled"),
+    [
+        ("f[x_, y_Integer, 2]", True),
+        ("f[x_, {y_, x_}]", True),
+        ("HoldPattern[f[x_?EvenQ]]", True),
+        ("f[x_ /; x > 0]", True),
+        ("f[x_ /; x > 0, y_ /; y > 0]", True),
+        ("f[x_, y_] /; y > x", True),
+        # match() evaluates conditions before or after the other leaves bind
+        # their variables
+        ("f[x_, y_ /; y > x]", False),
+        ("f[{x_ /; x > y}, y_]", False),
+        ("f[x__]", False),
+        ("f[x, s:0..]", False),
+        ("f[x_:1]", False),
+        ("f[x_ | y_]", False),
+        ("h_[x_]", False),
+    ],
+)
+def test_compile_matcher(str_pattern, compiled):
+    rule = Rule(evaluate("Hold[%s]" % str_pattern).leaves[0], Integer(1))
+    matcher, heads = rule.get_matcher()
+    assert (matcher is not None) == compiled
+    if compiled:
+        assert "Global`f" in heads
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        ("cpf[x_Integer, y_] := {x, y}; cpf[1, a]", "{1, a}"),
+        ("cpf[a, 1]", "cpf[a, 1]"),
+        ("cpf[1]", "cpf[1]"),
+        ("cpf[1, Sequence[]]", "cpf[1]"),
+        (
+            "cpg[x_, {y_, x_}] := y; {cpg[1, {2, 1}], cpg[1, {2, 3}]}",
+            "{2, cpg[1, {2, 3}]}",
+        ),
+        ("cph[x_?EvenQ] := x; {cph[2], cph[3]}", "{2, cph[3]}"),
+        ("cpk[x_ /; x > 0] := x; {cpk[1], cpk[-1]}", "{1, cpk[-1]}"),
+        ("cpl[{x_, y_}] := x + y; cpl[Range[2]]", "3"),
+        ("{cpl[Range[3]], cpl[a]}", "{cpl[{1, 2, 3}], cpl[a]}"),
+        # the compiled matchers assume heads that are not Flat, Orderless or
+        # OneIdentity; rules fall back to the generic matcher otherwise
+        ("SetAttributes[cpo, Orderless]; cpm[cpo[x_, 1]] := x; cpm[cpo[1, a]]", "a"),
+        ("cpn[cpp[x_, 1]] := x; cpn[cpp[1, b]]", "cpn[cpp[1, b]]"),
+        ("SetAttributes[cpp, Orderless]; cpn[cpp[1, c]]", "c"),
+        ("cpq[x_, y_Integer] := y; SetAttributes[cpq, OneIdentity]; cpq[a, 1]", "1"),
+        ("{cps[1], cpt[2]} /. cps[x_] -> x", "{1, cpt[2]}"),
+        ("ReplaceList[cps[1], cps[x_] -> x]", "{1}"),
+        # Replace and ReplaceList agree on conditions using other variables
+        (
+            "cpr = cpu[x_, y_ /; y > x] :> ok; "
+            + "Replace[cpu[1, 2], cpr] === "
+            + "If[ReplaceList[cpu[1, 2], cpr] === {}, cpu[1, 2], ok]",
+            "True",
+        ),
+    ],
+)
+def test_compiled_rules(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
+
+
+@pytest.mark.parametrize(
+    "str_pattern",
+    [
+        "f[x_, y_Integer]",
+        "f[x_ /; x > 1, y_]",
+        "f[x_, y_] /; y > x",
+        "f[{x_, y_ /; y > 1}, z_?EvenQ]",
+        "f[x_, x_]",
+    ],
+)
+def test_compiled_matcher_agrees(str_pattern):
+    rule = Rule(evaluate("Hold[%s]" % str_pattern).leaves[0], Integer(1))
+    matcher = rule.get_matcher()[0]
+    assert matcher is not None
+    for str_expr in (
+        "f[1, 2]",
+        "f[2, 1]",
+        "f[2, 2]",
+        "f[a, 2]",
+        "f[{1, 2}, 4]",
+        "f[{1, 1}, 4]",
+        "f[{1, 2}, 3]",
+    ):
+        expr = evaluate(str_expr)
+        compiled = matcher(expr, {}, session.evaluation) is not None
+        assert compiled == rule.pattern.does_match(expr, session.evaluation)
+
+
+def test_pickle_compiled_rule():
+    rule = Rule(
+        Expression(
+            "Global`f", Expression("Pattern", Symbol("Global`x"), Expression("Blank"))
+        ),
+        Symbol("Global`x"),
+    )
+    assert rule.apply(Expression("Global`f", Integer(1)), session.evaluation).sameQ(
+        Integer(1)
+    )
+    assert rule.get_matcher()[0] is not None
+
+    copied = pickle.loads(pickle.dumps(rule))
+    assert copied.apply(Expression("Global`f", Integer(2)), session.evaluation).sameQ(
+        Integer(2)
+    )
+
+
+@pytest.mark.parametrize(
+    ("str_expr", "str_expected"),
+    [
+        ("{rsa, rsb + rsc, Sin[rsb]} /. rsb -> 2", "{rsa, 2 + rsc, Sin[2]}"),
+        ("{rsa, {rsb}} /. (rsa | rsb) -> 0", "{0, {0}}"),
+        ("rsf[1][rsx] /. rsf -> rsg", "rsg[1][rsx]"),
+        ("Replace[{rsa, {rsb}}, rsb -> 1, {2}]", "{rsa, {1}}"),
+        ("Replace[rsf[rsa][rsb], rsf[rsa] -> rsg, {1}, Heads -> True]", "rsg[rsb]"),
+        ("{1, 2.5, rsa} /. _Real -> 0", "{1, 0, rsa}"),
+        ("g[rsx] /. Dispatch[{rsy -> 1}]", "g[rsx]"),
+        # with OneIdentity, patterns match expressions without their head
+        (
+            "SetAttributes[rsh, OneIdentity]; Default[rsh] = 0; "
+            + "{rsa, {5}} /. rsh[n_., x_Integer] :> x + 10",
+            "{rsa, {15}}",
+        ),
+    ],
+)
+def test_replace(str_expr, str_expected):
+    check_evaluation(str_expr, str_expected)
+
+
+def test_replace_shares_unchanged_parts():
+    expr = evaluate("{rsp[1], {rsp[2], rsq}, rsq}")
+    result, applied = expr.apply_rules(
+        [Rule(Symbol("Global`rsq"), Integer(0))], session.evaluation
+    )
+    assert applied
+    assert result.leaves[0] is expr.leaves[0]
+    assert result.leaves[1].leaves[0] is expr.leaves[1].leaves[0]
+
+    # rules that might match, but don't, and rules with symbols that don't
+    # occur in expr
+    for lhs in ("rsp[3]", "rsr"):
+        rules = [Rule(evaluate("Hold[%s]" % lhs).leaves[0], Integer(0))]
+        result, applied = expr.apply_rules(rules, session.evaluation)
+        assert result is expr and not applied
+        options = {"levelspec": (0, None), "heads": True}
+        result, applied = expr.apply_rules(rules, session.evaluation, options=options)
+        assert result is expr and not applied
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from .helper import check_evaluation, session
+from mathics.builtin.drawing.plot import compile_quiet_batch_function
+from mathics.core.parser import parse, MathicsSingleLineFeeder
+
+
+def batch_function(str_expr, expect_list=False):
+    expr = parse(session.definitions, MathicsSingleLineFeeder(str_expr))
+    return compile_quiet_batch_function(
+        expr, ["Global`x"], session.evaluation, expect_list
+    )
+
+
+def test_batch_function():
+    assert batch_function("x^2")([1.0, 2.0]) == [1.0, 4.0]
+    assert batch_function("3")([1.0, 2.0]) == [3.0, 3.0]
+    # points without a real value
+    assert batch_function("1 / x")([0.0, 2.0]) == [None, 0.5]
+    assert batch_function("Sqrt[x]")([-1.0, 4.0]) == [None, 2.0]
+    assert batch_function("{x, 2 x}", expect_list=True)([1.0]) == [[1.0, 2.0]]
+
+
+def test_batch_function_evaluation():
+    # definitions and functions NumPy doesn't have are evaluated point by point
+    session.evaluate("plotf[x_] := x + 1; plota = 2")
+    assert batch_function("plotf[x]")([1.0, 2.0]) == [2.0, 3.0]
+    assert batch_function("plota x")([1.0, 2.0]) == [2.0, 4.0]
+    assert batch_function("BesselJ[0, x]")([0.0]) == [1.0]
+
+
+def test_plot():
+    for str_expr in (
+        "Plot[Sin[x], {x, 0, 4 Pi}]",
+        "Plot[1 / x, {x, -1, 1}]",
+        "ParametricPlot[{Sin[u], Cos[3 u]}, {u, 0, 2 Pi}]",
+        "PolarPlot[Cos[5t], {t, 0, Pi}]",
+    ):
+        check_evaluation("Head[%s]" % str_expr, "Graphics")
+
+
+def test_plot3d():
+    check_evaluation(
+        "Dimensions[Cases[Plot3D[x + y, {x, 0, 1}, {y, 0, 1}, PlotPoints -> {2, 3}], _Polygon, Infinity][[1, 1]]]",
+        "{12, 3, 3}",
+    )
+    # triangles are only drawn where the function is defined
+    check_evaluation(
+        "Max[Cases[Plot3D[Sqrt[1 - x^2 - y^2], {x, -1, 1}, {y, -1, 1}], _Polygon, Infinity][[1, 1, All, All, 1]]^2 + "
+        "Cases[Plot3D[Sqrt[1 - x^2 - y^2], {x, -1, 1}, {y, -1, 1}], _Polygon, Infinity][[1, 1, All, All, 2]]^2] <= 1",
+        "True",
+    )
+    check_evaluation(
+        "Cases[Plot3D[z, {x, 1, 20}, {y, 1, 10}], _Polygon, Infinity]", "{}"
+    )
+
+
+def test_density_plot():
+    check_evaluation(
+        "densityp = Cases[DensityPlot[x y, {x, 0, 1}, {y, 0, 1}, PlotPoints -> 2], _Polygon, Infinity][[1]]; "
+        "{Dimensions[densityp[[1]]], Dimensions[densityp[[2, 2]]]}",
+        "{{8, 3, 2}, {8, 3}}",
+    )
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+import pytest
+
+from .helper import check_evaluation, session
+from mathics.core import profiling
+from mathics.core.profiling import EvaluationProfile
+
+
+def test_profile():
+    session.evaluate("proff[0] = 1; proff[n_] := n proff[n - 1]")
+    with EvaluationProfile() as profile:
+        assert session.evaluate("proff[5]").get_int_value() == 120
+        session.evaluate("Factor[x^2 - 1]")
+    assert profiling.active is None
+
+    assert profile.head_counts["Global`proff"] == 6
+    assert profile.rule_attempts["Global`proff"] == 6
+    assert profile.rule_matches["Global`proff"] == 6
+    assert profile.builtin_calls["Times.apply"] >= 5
+    assert profile.builtin_self_times["Factor.apply"] <= (
+        profile.builtin_times["Factor.apply"]
+    )
+    assert profile.sympy_calls >= 2
+    report = profile.report()
+    assert "Global`proff" in report and "Factor.apply" in report
+
+
+def test_nested_profiles():
+    with EvaluationProfile() as outer:
+        with EvaluationProfile() as inner:
+            session.evaluate("proff[2]")
+        assert profiling.active is outer
+        session.evaluate("proff[3]")
+    assert inner.head_counts["Global`proff"] == 3
+    assert outer.head_counts["Global`proff"] == 4
+
+
+def test_evaluation_profile():
+    check_evaluation(
+        'proff /. First[EvaluationProfile[proff[4], "RuleMatches"]]', "{5, 5}"
+    )
+    check_evaluation('Last[EvaluationProfile[proff[4], "SymPyTime"]]', "24")
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="requires Python 3.7 or higher")
+def test_cli():
+    output = subprocess.run(
+        [sys.executable, "-m", "mathics.main", "--profile", "-e", "Factor[x^2 - 1]"],
+        capture_output=True,
+    ).stdout.decode("utf-8")
+    assert "Factor.apply" in output
+    assert "SymPy conversion" in output
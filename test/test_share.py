@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from .helper import check_evaluation, session
+from mathics.core.definitions import ExpressionSharer
+from mathics.core.expression import Expression, Integer, MachineReal, Symbol
+
+
+def test_sharer():
+    sharer = ExpressionSharer()
+    first = sharer.share(
+        Expression("Global`f", Expression("Global`g", Integer(10 ** 6)))
+    )
+    second = sharer.share(
+        Expression("Global`h", Expression("Global`g", Integer(10 ** 6)))
+    )
+    assert first.leaves[0] is second.leaves[0]
+    assert sharer.reclaimed > 0
+
+    # copies of symbols are replaced by the interned instance
+    assert sharer.share(Symbol("Global`x").copy()) is Symbol("Global`x")
+
+    # only SameQ expressions of the same kind are shared
+    assert sharer.share(MachineReal(-0.0)) is not sharer.share(MachineReal(0.0))
+    assert sharer.share(Integer(1)) is not sharer.share(MachineReal(1.0))
+
+
+def test_share_definitions():
+    check_evaluation("sharel = Table[{i, {x, y}}, {i, 3}]; Share[sharel] > 0", "True")
+    value = session.definitions.get_ownvalue("Global`sharel").replace
+    assert value.leaves[0].leaves[1] is value.leaves[2].leaves[1]
+
+    check_evaluation(
+        "sharef[1] = {a, {b}}; sharef[2] = {c, {b}}; Share[sharef] > 0", "True"
+    )
+    check_evaluation("sharef /@ {1, 2}", "{{a, {b}}, {c, {b}}}")
+    check_evaluation(
+        "sharef[n_] := n; Share[]; sharef /@ {1, 2, 3}", "{{a, {b}}, {c, {b}}, 3}"
+    )
+    check_evaluation("sharel[[2, 2]] = 0; sharel", "{{1, {x, y}}, {2, 0}, {3, {x, y}}}")
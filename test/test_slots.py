@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import numpy
+import pytest
+
+from .helper import check_evaluation
+from mathics.builtin.structure import count_bytes
+from mathics.core.expression import (
+    ByteArrayAtom,
+    Complex,
+    Expression,
+    Integer,
+    MachineReal,
+    PackedArray,
+    PrecisionReal,
+    Rational,
+    String,
+    Symbol,
+)
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        Expression("Global`f", Integer(1)),
+        PackedArray(numpy.arange(3)),
+        Symbol("Global`x"),
+        Integer(10 ** 6),
+        Rational(1, 3),
+        MachineReal(0.25),
+        PrecisionReal("0.25"),
+        Complex(Integer(1), Integer(2)),
+        String("s"),
+        ByteArrayAtom(b"s"),
+    ],
+)
+def test_no_dict(expr):
+    assert not hasattr(expr, "__dict__")
+    with pytest.raises(AttributeError):
+        expr.undeclared = 1
+
+
+def test_extra_fields():
+    expr = Expression("Global`f", Symbol("Global`x"))
+    assert expr._extra is None
+    assert expr._format_cache is None
+    with pytest.raises(AttributeError):
+        expr.original
+    with pytest.raises(AttributeError):
+        expr.position
+
+    copied = expr.copy()
+    assert copied.original is expr
+    assert copied._extra is not None
+    assert expr._extra is None
+
+    copied.set_positions()
+    assert copied.position is None
+    assert copied.leaves[0].position.parent is copied
+
+    # resetting the formatting cache doesn't create the side structure
+    expr._format_cache = None
+    assert expr._extra is None
+
+
+def test_pickle():
+    expr = Expression("Global`f", Integer(1), String("s"), Rational(1, 3))
+    assert pickle.loads(pickle.dumps(expr)).sameQ(expr)
+
+    packed = PackedArray(numpy.arange(3))
+    packed.leaves
+    copied = pickle.loads(pickle.dumps(packed))
+    assert copied.get_array() is not None
+    assert copied.sameQ(packed)
+
+
+def test_byte_count():
+    # without a __dict__, an Integer takes little more than its int
+    assert count_bytes(Integer(10 ** 6)) < 256
+    check_evaluation("MemoryInUse[] > 10^6", "True")
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+from mathics.builtin.files_io.importexport import IMPORTERS
+from mathics.core import snapshot
+from mathics.core.snapshot import SnapshotDefinitions, get_snapshot_filename
+from mathics.session import MathicsSession
+
+
+def test_snapshot(tmpdir):
+    filename = str(tmpdir.join("builtins.snapshot"))
+
+    # the first session builds the builtins and writes the snapshot
+    session = MathicsSession(snapshot=filename)
+    assert not isinstance(session.definitions.builtin, SnapshotDefinitions)
+    assert os.path.exists(filename)
+
+    # tables filled in by the autoloaded packages are restored as well
+    IMPORTERS.clear()
+    session = MathicsSession(snapshot=filename)
+    assert "CSV" in IMPORTERS
+    builtin = session.definitions.builtin
+    assert isinstance(builtin, SnapshotDefinitions)
+    assert len(builtin.loaded) == 0
+
+    for str_expr, str_expected in (
+        ("ToString[Expand[(a + b)^2]]", "a ^ 2 + 2 a b + b ^ 2"),
+        ("ToString[Integrate[x^2, x]]", "x ^ 3 / 3"),
+        # defined by an autoloaded package, and registered in IMPORTERS
+        ('ToString[ImportString["a,b\\nc,d", "CSV"]]', "{{a, b}, {c, d}}"),
+        (
+            "ToString[Attributes[Plus]]",
+            "{Flat, Listable, NumericFunction, OneIdentity, Orderless, Protected}",
+        ),
+        # operators without builtins have definitions in the snapshot, and
+        # the operator tables of the parser are static
+        ("ToString[FullForm[a \\[Cup] b]]", "Cup[a, b]"),
+        ("ToString[MemberQ[Options[Graphics], $OptionSyntax -> _]]", "False"),
+    ):
+        assert session.evaluate(str_expr).value == str_expected
+
+    # only the definitions that were looked up have been loaded
+    assert 0 < len(builtin.loaded) < len(builtin)
+    assert "System`Plot" in builtin.names
+    assert "System`Plot" not in builtin.loaded
+
+
+def test_invalid_snapshot(tmpdir):
+    filename = str(tmpdir.join("builtins.snapshot"))
+    with open(filename, "wb") as f:
+        f.write(b"not a snapshot")
+
+    session = MathicsSession(snapshot=filename)
+    assert not isinstance(session.definitions.builtin, SnapshotDefinitions)
+    assert session.evaluate("ToString[1 + 1]").value == "2"
+    # the invalid file was replaced by a valid snapshot
+    session = MathicsSession(snapshot=filename)
+    assert isinstance(session.definitions.builtin, SnapshotDefinitions)
+
+
+def test_snapshot_stamp(tmpdir, monkeypatch):
+    filename = str(tmpdir.join("builtins.snapshot"))
+    MathicsSession(snapshot=filename)
+    key = snapshot.snapshot_key()
+
+    def no_key():
+        raise AssertionError("the sources are hashed")
+
+    # while the files are unchanged, the sources are not hashed
+    monkeypatch.setattr(snapshot, "snapshot_key", no_key)
+    assert snapshot.load_snapshot(filename) is not None
+
+    # touched files are hashed, and the snapshot is used if they are the same
+    monkeypatch.setattr(snapshot, "source_stamp", lambda: "touched")
+    monkeypatch.setattr(snapshot, "snapshot_key", lambda: key)
+    assert snapshot.load_snapshot(filename) is not None
+    monkeypatch.setattr(snapshot, "snapshot_key", lambda: "changed")
+    assert snapshot.load_snapshot(filename) is None
+
+
+def test_snapshot_filename():
+    assert get_snapshot_filename(None) is None
+    assert get_snapshot_filename("0") is None
+    assert get_snapshot_filename(False) is None
+    assert get_snapshot_filename("/tmp/x.snapshot") == "/tmp/x.snapshot"
+    assert get_snapshot_filename("1") == get_snapshot_filename(True)
+    assert get_snapshot_filename(True).endswith(".snapshot")
+
+
+def test_lazy_builtin_modules(tmpdir):
+    filename = str(tmpdir.join("builtins.snapshot"))
+    # builtin modules are imported lazily once the snapshot provides a
+    # manifest, so this has to run in a fresh interpreter
+    script = """
+import sys
+from mathics.session import MathicsSession
+import mathics.builtin
+
+session = MathicsSession(snapshot=sys.argv[1])
+print(session.evaluate("ToString[Expand[(x + 1)^2]]").value)
+print(len(mathics.builtin.modules), len(mathics.builtin.get_builtin_module_names()))
+print("mathics.builtin.files_io.importexport" in sys.modules)
+# the formatters are imported when they are first needed
+print("mathics.format.svg" in sys.modules)
+session.evaluate('ExportString[Graphics[Circle[]], "SVG"]')
+print("mathics.format.svg" in sys.modules)
+"""
+    for i in range(2):
+        output = subprocess.check_output(
+            [sys.executable, "-c", script, filename], universal_newlines=True
+        ).split("\n")
+
+    assert output[0] == "1 + 2 x + x ^ 2"
+    loaded, total = map(int, output[1].split())
+    assert loaded < total
+    assert output[2] == "False"
+    assert output[3:5] == ["False", "True"]
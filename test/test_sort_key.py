@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from .helper import check_evaluation
+from mathics.core.definitions import ExpressionSharer
+from mathics.core.expression import Expression, Integer, Symbol, sort_key
+
+
+def test_cached_sort_key():
+    expr = Expression("Global`f", Symbol("Global`x"), Integer(2))
+    key = expr.get_sort_key()
+    assert expr.get_sort_key() is key
+    assert expr.get_sort_key(True) is not key
+    assert Symbol("Global`x").get_sort_key() is Symbol("Global`x").get_sort_key()
+
+    # reordering or replacing leaves invalidates the key
+    expr.sort()
+    assert expr.leaves[0] == Integer(2)
+    reordered = expr.get_sort_key()
+    assert reordered is not key
+    expr.set_leaf(0, Integer(3))
+    assert expr.get_sort_key() is not reordered
+    assert expr.get_sort_key() > reordered
+
+    # Share replaces leaves, and must not keep them alive through the key
+    shared = Expression("Global`f", Expression("Global`g", Integer(1)))
+    key = shared.get_sort_key()
+    sharer = ExpressionSharer()
+    sharer.share(Expression("Global`h", Expression("Global`g", Integer(1))))
+    sharer.share(shared)
+    assert shared.get_sort_key() is not key
+    assert shared.get_sort_key() == key
+
+
+def test_sort_key_order():
+    items = [
+        Expression("Global`f", Integer(2)),
+        Symbol("Global`x"),
+        Integer(1),
+        Expression("Times", Integer(2), Symbol("Global`x")),
+        Expression("Global`f", Integer(1)),
+    ]
+    assert sorted(items, key=sort_key) == sorted(items)
+
+
+def test_canonical_order():
+    check_evaluation(
+        "Sort[{f[2], y, 1, x^2, f[1], 2 x, Pi}]", "{1, Pi, 2 x, x ^ 2, y, f[1], f[2]}"
+    )
+    check_evaluation("Union[{g[2], g[1], x, g[2]}, {x, 1}]", "{1, x, g[1], g[2]}")
+    check_evaluation(
+        "{Order[f[1], f[2]], Order[f[2], f[1]], Order[x, x]}", "{1, -1, 0}"
+    )
+    check_evaluation("OrderedQ[a + b, a + c]", "True")
+    check_evaluation("sortkeyl = {c, a}; sortkeyl[[1]] = b; Sort[sortkeyl]", "{a, b}")
+    check_evaluation("Expand[(a + b)^2] - (a^2 + 2 a b + b^2)", "0")
+
+
+def test_nested_part_assignment():
+    # assigning a nested part invalidates the cached keys of the enclosing
+    # expressions
+    check_evaluation("sortkeyr = {{{c}}}; Order[sortkeyr[[1]], {{b}}]", "-1")
+    check_evaluation(
+        "sortkeyr[[1, 1, 1]] = a; Sort[{{{b}}, sortkeyr[[1]]}]", "{{{a}}, {{b}}}"
+    )
+    check_evaluation("Order[sortkeyr[[1]], {{b}}]", "1")
+
+    expr = Expression("Global`f", Expression("Global`g", Symbol("Global`c")))
+    key = expr.get_sort_key()
+    copied = expr.copy()
+    copied.set_positions()
+    copied.leaves[0].leaves[0].position.replace(Symbol("Global`a"))
+    assert copied.get_sort_key() < key
+    assert expr.get_sort_key() is key